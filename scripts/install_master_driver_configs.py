@@ -112,37 +112,25 @@ def install_configs(input_directory, keep=False):
                            'manage_delete_store',
                            'platform.driver').get(timeout=10)
 
+    configs = []
     with open("config") as f:
-        print "Storing main configuration"
-        agent.vip.rpc.call('config.store',
-                           'manage_store',
-                           'platform.driver',
-                           'config',
-                           f.read(),
-                           config_type="json").get(timeout=10)
-
+        configs.append(("config", f.read(), "json"))
 
     for name in glob.iglob("registry_configs/*"):
         with open(name) as f:
-            print "Storing configuration:", name
-            agent.vip.rpc.call('config.store',
-                               'manage_store',
-                               'platform.driver',
-                               name,
-                               f.read(),
-                               config_type="csv").get(timeout=10)
+            configs.append((name, f.read(), "csv"))
 
     for dir_path, _, files in os.walk("devices"):
         for file_name in files:
             name = os.path.join(dir_path, file_name)
             with open(name) as f:
-                print "Storing configuration:", name
-                agent.vip.rpc.call('config.store',
-                                   'manage_store',
-                                   'platform.driver',
-                                   name,
-                                   f.read(),
-                                   config_type="json").get(timeout=10)
+                configs.append((name, f.read(), "json"))
+
+    print "Storing {} configurations".format(len(configs))
+    agent.vip.rpc.call('config.store',
+                       'manage_store_bulk',
+                       'platform.driver',
+                       configs).get(timeout=300)
 
 if __name__ == "__main__":
     parser = ArgumentParser(description=description, formatter_class=RawTextHelpFormatter)
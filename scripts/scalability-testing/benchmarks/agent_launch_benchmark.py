@@ -0,0 +1,184 @@
+#!python
+
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Measure how long it takes to start a number of agents.
+
+Each agent imports the modules a typical agent uses (the VIP agent,
+agent utils and dateutil), writes a line to stdout and exits. The agents
+are started cold, each in a new interpreter as the platform's exec
+launcher does, and warm, forked from the zygote launcher with those
+modules preloaded. The time from the first start until every agent has
+reported, the time to start the launcher itself and the CPU time used by
+the agent processes are reported::
+
+    python scripts/scalability-testing/benchmarks/agent_launch_benchmark.py
+    python scripts/scalability-testing/benchmarks/agent_launch_benchmark.py \
+        --agents 40
+"""
+
+from __future__ import print_function
+
+import argparse
+import logging
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import gevent
+from gevent import subprocess
+from gevent.subprocess import PIPE
+
+from volttron.platform.launcher import AgentLauncher
+
+AGENT = '''\
+from volttron.platform.vip.agent import Agent
+from volttron.platform.agent import utils
+from dateutil.parser import parse
+
+
+def main():
+    print('ready')
+'''
+
+
+def children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def wait_ready(procs):
+    def ready(proc):
+        assert proc.stdout.readline().strip() == 'ready', proc.stderr.read()
+        proc.wait()
+    gevent.joinall([gevent.spawn(ready, proc) for proc in procs],
+                   raise_error=True)
+
+
+def agent_env(agent_dir):
+    env = os.environ.copy()
+    env['PYTHONPATH'] = ':'.join([agent_dir] + sys.path)
+    return env
+
+
+def run_cold(args, agent_dir):
+    argv = [sys.executable, '-c',
+            "__import__('benchagent', fromlist=['main']).main()"]
+    env = agent_env(agent_dir)
+    cpu = children_cpu()
+    start = time.time()
+    procs = [subprocess.Popen(argv, cwd=agent_dir, env=env, close_fds=True,
+                              stdin=open(os.devnull), stdout=PIPE,
+                              stderr=PIPE)
+             for _ in range(args.agents)]
+    wait_ready(procs)
+    return time.time() - start, children_cpu() - cpu
+
+
+def run_warm(args, agent_dir):
+    env = agent_env(agent_dir)
+    launcher = AgentLauncher(agent_dir)
+    start = time.time()
+    launcher.start()
+    # A first agent waits for the launcher's imports to complete.
+    wait_ready([launcher.launch('benchagent', 'main', agent_dir, env)])
+    launcher_seconds = time.time() - start
+    cpu = children_cpu()
+    start = time.time()
+    procs = [launcher.launch('benchagent', 'main', agent_dir, env)
+             for _ in range(args.agents)]
+    wait_ready(procs)
+    elapsed = time.time() - start
+    launcher.stop()
+    # Agents forked by the launcher are its children, not ours, so
+    # their CPU time is counted through the launcher when it exits.
+    return launcher_seconds, elapsed, children_cpu() - cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--agents', type=int, default=40,
+                        help='number of agents to start')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    agent_dir = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(agent_dir, 'benchagent.py'), 'w') as file:
+            file.write(AGENT)
+        cold, cold_cpu = run_cold(args, agent_dir)
+        launcher_seconds, warm, warm_cpu = run_warm(args, agent_dir)
+        print('{} agents'.format(args.agents))
+        print('{:>8} {:>16} {:>16} {:>16}'.format(
+            'start', 'launcher s', 'all ready s', 'agent cpu s'))
+        print('{:>8} {:>16} {:>16.2f} {:>16.2f}'.format(
+            'cold', '-', cold, cold_cpu))
+        print('{:>8} {:>16.2f} {:>16.2f} {:>16.2f}'.format(
+            'warm', launcher_seconds, warm, warm_cpu))
+    finally:
+        shutil.rmtree(agent_dir)
+
+
+if __name__ == '__main__':
+    main()
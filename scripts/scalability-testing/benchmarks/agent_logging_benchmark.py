@@ -0,0 +1,163 @@
+#!python
+
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Measure the CPU time agents and the platform spend on agent log records.
+
+A simulated historian logs a number of DEBUG records and one INFO record
+for every message it handles, while the platform keeps only INFO and
+above. With JSON logging the agent serializes every record and the
+platform parses every line before checking its level. With framed
+logging the platform's level is passed to the agent, which drops DEBUG
+records before they are created, and the platform reads the level from
+each frame's header before unpacking the rest. The agent's and the
+platform's CPU time and the bytes written to stderr are reported::
+
+    python scripts/scalability-testing/benchmarks/agent_logging_benchmark.py
+    python scripts/scalability-testing/benchmarks/agent_logging_benchmark.py \
+        --messages 20000 --debug-per-message 5
+"""
+
+from __future__ import print_function
+
+import argparse
+import io
+import logging
+import time
+
+from volttron.platform.agent.utils import JsonFormatter, LogFrameHandler
+from volttron.platform.aip import log_entries
+
+
+class NullHandler(logging.Handler):
+    def __init__(self):
+        super(NullHandler, self).__init__()
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+def agent_logger(handler, level):
+    log = logging.getLogger('historian')
+    log.handlers = [handler]
+    log.propagate = False
+    log.setLevel(level)
+    return log
+
+
+def run_agent(args, log):
+    start = time.clock()
+    for message in range(args.messages):
+        for point in range(args.debug_per_message):
+            log.debug('inserting point %s of message %s', point, message)
+        log.info('published message %s', message)
+    return time.clock() - start
+
+
+def run(args, framed):
+    stream = io.BytesIO()
+    if framed:
+        handler = LogFrameHandler(stream)
+        handler.setLevel(logging.INFO)
+        log = agent_logger(handler, logging.INFO)
+    else:
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(JsonFormatter())
+        log = agent_logger(handler, logging.DEBUG)
+    agent_cpu = run_agent(args, log)
+    # The agent's logger is in the platform's logger dictionary too, as
+    # both run in this process, so give it the platform's level.
+    log.setLevel(logging.INFO)
+
+    platform = logging.getLogger('agents.log')
+    kept = NullHandler()
+    platform.handlers = [kept]
+    platform.propagate = False
+    platform.setLevel(logging.INFO)
+    size = stream.tell()
+    stream.seek(0)
+    start = time.clock()
+    for _ in log_entries('agents.log', 'historian', 1, logging.ERROR, stream):
+        pass
+    return agent_cpu, time.clock() - start, size, kept.count
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=20000,
+                        help='messages handled by the agent')
+    parser.add_argument('--debug-per-message', type=int, default=5,
+                        help='DEBUG records logged for each message')
+    args = parser.parse_args()
+
+    print('{} messages, {} DEBUG and 1 INFO record each, platform at '
+          'INFO'.format(args.messages, args.debug_per_message))
+    print('{:>8} {:>14} {:>16} {:>14} {:>8}'.format(
+        'logging', 'agent cpu s', 'platform cpu s', 'stderr MB', 'kept'))
+    for name, framed in (('json', False), ('framed', True)):
+        agent_cpu, platform_cpu, size, kept = run(args, framed)
+        print('{:>8} {:>14.2f} {:>16.2f} {:>14.1f} {:>8}'.format(
+            name, agent_cpu, platform_cpu, size / 1e6, kept))
+
+
+if __name__ == '__main__':
+    main()
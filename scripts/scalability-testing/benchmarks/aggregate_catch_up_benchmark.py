@@ -0,0 +1,222 @@
+#!python
+
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Measure how long the aggregate historian takes to catch up on missed
+aggregation periods.
+
+A SQLite historian database is filled with one minute data that ends now.
+Five minute averages for every topic are then computed once one period at a
+time, as the aggregate historian used to do after downtime, and once with
+the bulk aggregation engine that handles every missed period in one scan::
+
+    python scripts/scalability-testing/benchmarks/aggregate_catch_up_benchmark.py
+    python scripts/scalability-testing/benchmarks/aggregate_catch_up_benchmark.py \
+        --days 7 --topics 50 --period 15m
+"""
+
+from __future__ import print_function
+
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+from volttron.platform.agent.base_aggregate_historian import \
+    AggregateHistorian
+from volttron.platform.agent.utils import fix_sqlite3_datetime
+from volttron.platform.dbutils.sqlitefuncts import SqlLiteFuncts
+
+TABLE_NAMES = {'data_table': 'data',
+               'topics_table': 'topics',
+               'meta_table': 'meta',
+               'agg_topics_table': 'aggregate_topics',
+               'agg_meta_table': 'aggregate_meta'}
+
+
+class BenchmarkHistorian(AggregateHistorian):
+    """
+    Aggregate historian backed by SqlLiteFuncts without the agent setup.
+    """
+    bulk_aggregation = True
+
+    def __init__(self, functs, agg_topic_id_map):
+        self.functs = functs
+        self.agg_topic_id_map = agg_topic_id_map
+
+    def find_topics_by_pattern(self, topic_pattern):
+        return self.functs.find_topics_by_pattern(topic_pattern)
+
+    def collect_aggregate(self, topic_ids, agg_type, start_time, end_time):
+        return self.functs.collect_aggregate(topic_ids, agg_type,
+                                             start_time, end_time)
+
+    def insert_aggregate(self, topic_id, agg_type, period, end_time,
+                         value, topic_ids):
+        self.functs.insert_aggregate(topic_id, agg_type, period, end_time,
+                                     value, topic_ids)
+
+    def collect_aggregate_buckets(self, topic_ids, start_time, end_time,
+                                  period):
+        return self.functs.collect_aggregate_buckets(topic_ids, start_time,
+                                                     end_time, period)
+
+    def insert_aggregates(self, agg_type, agg_time_period, rows):
+        self.functs.bulk_insert_aggregates(agg_type, agg_time_period, rows)
+
+    def get_aggregate_watermarks(self, agg_type, agg_time_period):
+        return self.functs.get_aggregate_watermarks(agg_type,
+                                                    agg_time_period)
+
+
+def populate(functs, topics, start, minutes):
+    topic_ids = []
+    for i in xrange(topics):
+        topic = 'campus/building/device/point{}'.format(i)
+        topic_ids.append(functs.insert_topic(topic)[0])
+    functs.commit()
+
+    for minute in xrange(0, minutes, 60):
+        rows = []
+        for m in xrange(minute, min(minute + 60, minutes)):
+            ts = start + timedelta(minutes=m)
+            rows.extend((ts, topic_id, float(m)) for topic_id in topic_ids)
+        functs.bulk_insert_data(rows)
+        functs.commit()
+    return topic_ids
+
+
+def per_period(historian, collection_time, period, points):
+    now = datetime.utcnow().replace(tzinfo=pytz.utc)
+    periods = 0
+    while collection_time <= now:
+        historian._collect_aggregate_slice(collection_time, period, True,
+                                           points)
+        collection_time = AggregateHistorian.compute_next_collection_time(
+            collection_time, period, True)
+        periods += 1
+    return periods
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark aggregate historian catch up.")
+    parser.add_argument('--topics', type=int, default=10,
+                        help='number of topics to aggregate')
+    parser.add_argument('--days', type=int, default=30,
+                        help='days of one minute data to catch up on')
+    parser.add_argument('--period', default='5m',
+                        help='aggregation period')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    fix_sqlite3_datetime()
+    work_dir = tempfile.mkdtemp()
+    try:
+        database = os.path.join(work_dir, 'historian.sqlite')
+        functs = SqlLiteFuncts({'database': database}, TABLE_NAMES)
+        functs.setup_historian_tables()
+        functs.create_aggregate_store('avg', args.period)
+
+        now = datetime.utcnow().replace(tzinfo=pytz.utc)
+        start = now.replace(second=0, microsecond=0) - \
+            timedelta(days=args.days)
+        print("Populating {} topics with {} days of data".format(
+            args.topics, args.days))
+        topic_ids = populate(functs, args.topics, start,
+                             args.days * 24 * 60)
+
+        agg_topic_id_map = {}
+        points = []
+        for i, topic_id in enumerate(topic_ids):
+            name = 'campus/building/device/point{}'.format(i)
+            agg_topic_id_map[(name, 'avg', args.period)] = topic_id
+            points.append({'topic_names': [name],
+                           'topic_ids': [topic_id],
+                           'aggregation_type': 'avg',
+                           'aggregation_topic_name': name})
+        historian = BenchmarkHistorian(functs, agg_topic_id_map)
+
+        period = AggregateHistorian.compute_aggregation_period_seconds(
+            args.period)
+        first_collection_time = start + timedelta(seconds=period)
+
+        t = time.time()
+        periods = per_period(historian, first_collection_time, args.period,
+                             points)
+        per_period_time = time.time() - t
+
+        functs.execute_stmt('DELETE FROM avg_' + args.period)
+        t = time.time()
+        historian._collect_aggregate_buckets(first_collection_time,
+                                             args.period, True, points)
+        bulk_time = time.time() - t
+        stored = functs.select('SELECT count(*) FROM avg_' + args.period,
+                               None)[0][0]
+
+        print("{} periods x {} topics ({} aggregates): per period {:8.3f}s "
+              "bulk {:8.3f}s".format(periods, args.topics, stored,
+                                     per_period_time, bulk_time))
+    finally:
+        shutil.rmtree(work_dir)
@@ -0,0 +1,240 @@
+#!python
+
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Measure the cost of tracking publish timeouts in the alert agent.
+
+A watch list of devices, each with a list of expected points, is driven
+with a simulated clock. Every device publishes all of its points once
+per scrape interval except for the last device, which stops publishing
+part way through. The same publishes are handled by the old once a second
+countdown of every topic and point and by the agent's deadline heap, and
+the CPU time of the once a second check, the time spent handling
+publishes and the number of alerts sent are reported::
+
+    python scripts/scalability-testing/benchmarks/alert_ttl_benchmark.py
+    python scripts/scalability-testing/benchmarks/alert_ttl_benchmark.py \
+        --devices 1000 --points 100 --duration 600
+"""
+
+from __future__ import print_function
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir,
+                                os.pardir, os.pardir, 'services', 'core',
+                                'AlertAgent'))
+
+from alerter import agent as alert_module
+from alerter.agent import AlertAgent
+
+
+class SimulatedClock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self):
+        return self.now
+
+
+class NullPubSub(object):
+    def subscribe(self, peer, prefix, callback):
+        pass
+
+
+class CountingHealth(object):
+    def __init__(self):
+        self.alerts = 0
+
+    def send_alert(self, alert_key, status):
+        self.alerts += 1
+
+
+class VIP(object):
+    def __init__(self):
+        self.pubsub = NullPubSub()
+        self.health = CountingHealth()
+
+
+class CountdownTracker(object):
+    """The previous alert agent bookkeeping: a countdown per topic and
+    point, decremented once a second, alerting every second at zero."""
+
+    def __init__(self, health):
+        self.health = health
+        self.wait_time = {}
+        self.topic_ttl = {}
+        self.point_ttl = {}
+
+    def watch_device(self, topic, timeout, points):
+        self.point_ttl[topic] = dict.fromkeys(points, timeout)
+        self.wait_time[topic] = timeout
+        self.topic_ttl[topic] = timeout
+
+    def reset_time(self, peer, sender, bus, topic, headers, message):
+        self.topic_ttl[topic] = self.wait_time[topic]
+        if topic in self.point_ttl:
+            received_points = set(message[0].keys())
+            expected_points = self.point_ttl[topic].keys()
+            for point in expected_points:
+                if point in received_points:
+                    self.point_ttl[topic][point] = self.wait_time[topic]
+
+    def check(self):
+        for topic in self.wait_time.iterkeys():
+            self.topic_ttl[topic] -= 1
+            if self.topic_ttl[topic] <= 0:
+                self.health.send_alert(topic, None)
+            try:
+                points = self.point_ttl[topic].keys()
+                for p in points:
+                    self.point_ttl[topic][p] -= 1
+                    if self.point_ttl[topic][p] <= 0:
+                        self.health.send_alert(topic, None)
+            except KeyError:
+                pass
+
+
+def make_deadline_tracker():
+    agent = AlertAgent.__new__(AlertAgent)
+    agent.wait_time = {}
+    agent.realert_time = {}
+    agent.topic_seen = {}
+    agent.point_seen = {}
+    agent.alerting = {}
+    agent._deadlines = []
+    agent._scheduled = {}
+    agent.vip = VIP()
+    agent.check = agent.check_deadlines
+    agent.health = agent.vip.health
+    return agent
+
+
+def run(tracker, clock, args):
+    topics = ['devices/campus/building/device{}/all'.format(i)
+              for i in range(args.devices)]
+    points = ['point{}'.format(i) for i in range(args.points)]
+    message = [dict.fromkeys(points, 0.0), {}]
+    clock.now = 0.0
+    for topic in topics:
+        tracker.watch_device(topic, args.timeout, points)
+
+    failed = topics[-1]
+    fail_at = args.duration // 2
+    check_time = 0.0
+    publish_time = 0.0
+    for second in range(1, args.duration + 1):
+        clock.now = float(second)
+        start = time.clock()
+        for index, topic in enumerate(topics):
+            if (second + index) % args.interval:
+                continue
+            if topic is failed and second >= fail_at:
+                continue
+            tracker.reset_time('pubsub', 'platform.driver', 'pubsub',
+                               topic, {}, message)
+        publish_time += time.clock() - start
+
+        start = time.clock()
+        tracker.check()
+        check_time += time.clock() - start
+
+    return check_time, publish_time, tracker.health.alerts
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--devices', type=int, default=1000,
+                        help='watched devices')
+    parser.add_argument('--points', type=int, default=100,
+                        help='expected points per device')
+    parser.add_argument('--interval', type=int, default=60,
+                        help='seconds between publishes of a device')
+    parser.add_argument('--timeout', type=int, default=90,
+                        help='seconds before a topic or point times out')
+    parser.add_argument('--duration', type=int, default=600,
+                        help='simulated seconds')
+    args = parser.parse_args()
+
+    logging.getLogger('alerter.agent').setLevel(logging.WARNING)
+    clock = SimulatedClock()
+    alert_module.time.time = clock.time
+
+    print('{} devices x {} points, publish every {} s, timeout {} s, '
+          '{} simulated seconds'.format(args.devices, args.points,
+                                        args.interval, args.timeout,
+                                        args.duration))
+    print('{:>10} {:>14} {:>14} {:>10}'.format(
+        'tracker', 'check ms/s', 'publish ms', 'alerts'))
+    for name, tracker in (('countdown', CountdownTracker(CountingHealth())),
+                          ('deadline', make_deadline_tracker())):
+        check_time, publish_time, alerts = run(tracker, clock, args)
+        print('{:>10} {:>14.3f} {:>14.1f} {:>10}'.format(
+            name, check_time * 1000.0 / args.duration,
+            publish_time * 1000.0, alerts))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+#!python
+
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Measure the ingest rate of the historian backup cache.
+
+Readings are generated the way :py:meth:`BaseHistorianAgent._capture_data`
+queues them (one record per point of a device scrape) and handed to
+:py:meth:`BackupDatabase.backup_new_data` in a single cycle. The rate is
+reported in rows per second written to backup.sqlite.
+
+Run from an activated environment::
+
+    python scripts/scalability-testing/benchmarks/backup_db_benchmark.py
+    python scripts/scalability-testing/benchmarks/backup_db_benchmark.py \
+        --journal-mode WAL --synchronous NORMAL
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from volttron.platform.agent.base_historian import BackupDatabase
+from volttron.platform.agent.utils import get_aware_utc_now
+
+DEFAULT_SIZES = (10000, 100000, 1000000)
+
+
+class _Owner(object):
+    """Stand in for the historian agent that owns the cache."""
+
+
+def make_records(count, points_per_device, timestamp):
+    meta = {'units': 'F', 'type': 'float', 'tz': 'UTC'}
+    records = []
+    for i in xrange(count):
+        device = i // points_per_device
+        point = i % points_per_device
+        records.append({'source': 'scrape',
+                        'topic': 'campus/building/device{}/point{}'.format(
+                            device, point),
+                        'readings': [(timestamp, float(i))],
+                        'meta': meta})
+    return records
+
+
+def run(sizes, points_per_device, journal_mode, synchronous):
+    owner = _Owner()
+    for size in sizes:
+        work_dir = tempfile.mkdtemp()
+        cwd = os.getcwd()
+        os.chdir(work_dir)
+        try:
+            backupdb = BackupDatabase(owner, None, journal_mode=journal_mode,
+                                      synchronous=synchronous)
+            # First cycle creates the topics, the second one is the steady
+            # state cost of a scrape.
+            backupdb.backup_new_data(
+                make_records(size, points_per_device, get_aware_utc_now()))
+            records = make_records(size, points_per_device,
+                                   get_aware_utc_now())
+            start = time.time()
+            backupdb.backup_new_data(records)
+            elapsed = time.time() - start
+            print("{:>8} readings: {:8.3f}s {:>12.0f} rows/sec".format(
+                size, elapsed, size / elapsed))
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(work_dir)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the historian backup cache write path.")
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=list(DEFAULT_SIZES),
+                        help='readings per cycle to benchmark')
+    parser.add_argument('--points-per-device', type=int, default=100,
+                        help='number of points in each device scrape')
+    parser.add_argument('--journal-mode', default=None,
+                        help='backup_journal_mode setting (e.g. WAL)')
+    parser.add_argument('--synchronous', default=None,
+                        help='backup_synchronous setting (e.g. NORMAL)')
+    args = parser.parse_args()
+    run(args.sizes, args.points_per_device, args.journal_mode,
+        args.synchronous)
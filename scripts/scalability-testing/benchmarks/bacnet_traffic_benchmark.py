@@ -0,0 +1,245 @@
+#!python
+
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Estimate the BACnet network traffic needed to keep the values of a building
+full of devices current.
+
+No network or device is used. Requests and responses are encoded with
+bacpypes to get their size and the traffic for an hour is counted three
+ways: polling with one ReadPropertyMultiple per max_per_request objects,
+polling with requests sized by the device APDU length, and subscribing to
+changes of value where only changes and subscription renewals are sent.
+Responses that do not fit the device APDU are segmented or, with
+--no-segmentation, aborted by the device and retried in two halves::
+
+    python scripts/scalability-testing/benchmarks/bacnet_traffic_benchmark.py
+    python scripts/scalability-testing/benchmarks/bacnet_traffic_benchmark.py \
+        --devices 500 --points 100 --max-apdu 206 --no-segmentation
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '../../../services/core/BACnetProxy'))
+
+from bacpypes.apdu import (APDU, ReadPropertyMultipleRequest, ReadAccessSpecification,
+                           PropertyReference, ReadPropertyMultipleACK, ReadAccessResult,
+                           ReadAccessResultElement, ReadAccessResultElementChoice,
+                           SubscribeCOVRequest, ConfirmedCOVNotificationRequest)
+from bacpypes.basetypes import PropertyValue
+from bacpypes.constructeddata import Any
+from bacpypes.primitivedata import Real
+
+from bacnet_proxy.agent import (plan_read_requests, split_read_request,
+                                RPM_ACK_HEADER_SIZE, RPM_MAX_SEGMENTS)
+
+# Ethernet, IP and UDP headers plus the BVLL and NPDU of a local BACnet/IP packet.
+PACKET_OVERHEAD = 14 + 20 + 8 + 4 + 2
+CONFIRMED_REQUEST_HEADER = 4
+SEGMENTED_ACK_HEADER = 5
+ABORT_SIZE = 3
+SEGMENT_ACK_SIZE = 4
+
+
+def encoded_size(pdu):
+    apdu = APDU()
+    pdu.encode(apdu)
+    return len(apdu.pduData)
+
+
+def real_value():
+    value = Any()
+    value.cast_in(Real(72.5))
+    return value
+
+
+def read_sizes(read_request):
+    """Return the encoded request and response sizes of one
+    ReadPropertyMultiple request."""
+    specs = []
+    results = []
+    for obj, properties in read_request:
+        specs.append(ReadAccessSpecification(
+            objectIdentifier=obj,
+            listOfPropertyReferences=[PropertyReference(propertyIdentifier=p)
+                                      for p, _ in properties]))
+        results.append(ReadAccessResult(
+            objectIdentifier=obj,
+            listOfResults=[ReadAccessResultElement(
+                propertyIdentifier=p,
+                readResult=ReadAccessResultElementChoice(propertyValue=real_value()))
+                for p, _ in properties]))
+    request = ReadPropertyMultipleRequest(listOfReadAccessSpecs=specs)
+    ack = ReadPropertyMultipleACK(listOfReadAccessResults=results)
+    return (CONFIRMED_REQUEST_HEADER + encoded_size(request),
+            RPM_ACK_HEADER_SIZE + encoded_size(ack))
+
+
+def read_traffic(read_request, max_apdu_len, segmentation):
+    """Packets and bytes to complete one ReadPropertyMultiple request."""
+    request_size, ack_size = read_sizes(read_request)
+    if ack_size <= max_apdu_len:
+        return 2, request_size + ack_size + 2 * PACKET_OVERHEAD
+
+    if not segmentation:
+        packets = 2
+        octets = request_size + ABORT_SIZE + 2 * PACKET_OVERHEAD
+        for half in split_read_request(read_request):
+            half_packets, half_octets = read_traffic(half, max_apdu_len, segmentation)
+            packets += half_packets
+            octets += half_octets
+        return packets, octets
+
+    segment_size = max_apdu_len - SEGMENTED_ACK_HEADER
+    segments = -(-(ack_size - RPM_ACK_HEADER_SIZE) // segment_size)
+    ack_size += segments * SEGMENTED_ACK_HEADER - RPM_ACK_HEADER_SIZE
+    # The client acknowledges every segment.
+    packets = 1 + 2 * segments
+    octets = (request_size + ack_size + segments * SEGMENT_ACK_SIZE +
+              packets * PACKET_OVERHEAD)
+    return packets, octets
+
+
+def poll_traffic(object_map, max_apdu_len, max_per_request, sized, segmentation):
+    """Packets and bytes for one scrape of a device."""
+    budget = None
+    if sized:
+        budget = max_apdu_len * (RPM_MAX_SEGMENTS if segmentation else 1)
+    packets = 0
+    octets = 0
+    for read_request in plan_read_requests(object_map, budget, max_per_request):
+        request_packets, request_octets = read_traffic(read_request, max_apdu_len,
+                                                       segmentation)
+        packets += request_packets
+        octets += request_octets
+    return packets, octets
+
+
+def cov_traffic(points, changes_per_hour, lifetime):
+    """Packets and bytes per hour for the subscriptions of one device."""
+    notification = ConfirmedCOVNotificationRequest(
+        subscriberProcessIdentifier=1,
+        initiatingDeviceIdentifier=('device', 500),
+        monitoredObjectIdentifier=('analogInput', 1),
+        timeRemaining=lifetime,
+        listOfValues=[PropertyValue(propertyIdentifier='presentValue', value=real_value()),
+                      PropertyValue(propertyIdentifier='statusFlags', value=real_value())])
+    subscribe = SubscribeCOVRequest(subscriberProcessIdentifier=1,
+                                    monitoredObjectIdentifier=('analogInput', 1),
+                                    issueConfirmedNotifications=True,
+                                    lifetime=lifetime)
+    exchange_overhead = 2 * PACKET_OVERHEAD + CONFIRMED_REQUEST_HEADER + 3
+
+    notifications = points * changes_per_hour
+    renewals = points * 3600.0 / (lifetime / 2.0)
+    packets = 2 * (notifications + renewals)
+    octets = (notifications * (encoded_size(notification) + exchange_overhead) +
+              renewals * (encoded_size(subscribe) + exchange_overhead))
+    return packets, octets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--devices', type=int, default=500)
+    parser.add_argument('--points', type=int, default=40,
+                        help='present values read from each device')
+    parser.add_argument('--interval', type=float, default=60.0,
+                        help='seconds between scrapes of a device')
+    parser.add_argument('--max-apdu', type=int, default=480,
+                        help='max APDU length accepted by the devices')
+    parser.add_argument('--max-per-request', type=int, default=24,
+                        help='objects per request without APDU sizing')
+    parser.add_argument('--no-segmentation', dest='segmentation', action='store_false',
+                        help='devices do not send segmented responses')
+    parser.add_argument('--changes-per-hour', type=float, default=6.0,
+                        help='value changes per point per hour')
+    parser.add_argument('--lifetime', type=int, default=1800,
+                        help='COV subscription lifetime in seconds')
+    args = parser.parse_args()
+
+    object_map = dict((('analogInput', i), [('presentValue', None)])
+                      for i in xrange(args.points))
+    scrapes = 3600.0 / args.interval
+
+    rows = []
+    for name, sized in (('poll, max_per_request', False),
+                        ('poll, sized by APDU', True)):
+        packets, octets = poll_traffic(object_map, args.max_apdu,
+                                       args.max_per_request, sized,
+                                       args.segmentation)
+        rows.append((name, packets * scrapes, octets * scrapes))
+    rows.append(('change of value',) +
+                cov_traffic(args.points, args.changes_per_hour, args.lifetime))
+
+    print('{} devices, {} points each, {} byte APDU'.format(
+        args.devices, args.points, args.max_apdu))
+    print('{:<24}{:>16}{:>16}'.format('mode', 'packets/hour', 'MB/hour'))
+    for name, packets, octets in rows:
+        print('{:<24}{:>16.0f}{:>16.2f}'.format(name, packets * args.devices,
+                                                octets * args.devices / 1e6))
+
+
+if __name__ == '__main__':
+    main()
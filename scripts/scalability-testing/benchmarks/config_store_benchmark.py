@@ -0,0 +1,157 @@
+#!python
+
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Measure the cost of changing one configuration in a large configuration
+store.
+
+A store is filled with device configs and registry CSVs, the way the
+master driver's store looks on a large site. Single configs are then
+updated one at a time with the old whole file JSON store (deep copy and
+rewrite of the file on every change) and with the log structured store,
+and the time and bytes written per update are reported::
+
+    python scripts/scalability-testing/benchmarks/config_store_benchmark.py
+    python scripts/scalability-testing/benchmarks/config_store_benchmark.py \
+        --entries 5000 --updates 200
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from copy import deepcopy
+
+from volttron.utils.persistance import LogStructuredDict, PersistentDict
+
+
+def registry(index, rows):
+    lines = ["Volttron Point Name,Units,Modbus Register,Writable,Point Address"]
+    lines.extend("Point{},degF,>f,TRUE,{}".format(i, 1000 + index + i) for i in xrange(rows))
+    return {"type": "csv", "data": "\n".join(lines)}
+
+
+def fill(store, entries, rows):
+    for i in xrange(entries // 2):
+        store["devices/campus/building/unit{}".format(i)] = {
+            "type": "json",
+            "data": '{"driver_type": "modbus", "registry_config": "config://registry%d.csv"}' % i}
+        store["registry{}.csv".format(i)] = registry(i, rows)
+
+
+def run_persistent_dict(path, entries, updates, rows):
+    store = PersistentDict(filename=path, flag='c', format='json')
+    fill(store, entries, rows)
+    store.sync()
+
+    written = 0
+    start = time.time()
+    for i in xrange(updates):
+        store["registry{}.csv".format(i)] = registry(i + 1, rows)
+        # What async_sync hands to the worker thread.
+        PersistentDict._update_file(path, deepcopy(store), 'json', None)
+        written += os.path.getsize(path)
+    return time.time() - start, written
+
+
+def run_log(path, entries, updates, rows):
+    store = LogStructuredDict(path)
+    fill(store, entries, rows)
+    store.compact()
+
+    written = 0
+    start = time.time()
+    for i in xrange(updates):
+        size = os.path.getsize(path)
+        store["registry{}.csv".format(i)] = registry(i + 1, rows)
+        written += max(os.path.getsize(path) - size, 0)
+    elapsed = time.time() - start
+    store.close()
+    return elapsed, written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=5000,
+                        help='configs in the store')
+    parser.add_argument('--updates', type=int, default=200,
+                        help='single config updates to time')
+    parser.add_argument('--rows', type=int, default=20,
+                        help='points in each registry CSV')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        print("{} configs, {} updates".format(args.entries, args.updates))
+        for name, run in (('whole file', run_persistent_dict),
+                          ('log', run_log)):
+            elapsed, written = run(os.path.join(directory, name.replace(' ', '_') + '.store'),
+                                   args.entries, args.updates, args.rows)
+            print("{:<12}{:>10.2f} ms/update{:>14.0f} bytes/update".format(
+                name, elapsed * 1000 / args.updates, float(written) / args.updates))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+#!python
+
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Measure how long it takes to load the configurations of a large site into
+the configuration store.
+
+The store service and the agent side of the configuration store run in
+this process and RPC calls between them are made directly, with a fixed
+delay standing in for the message bus round trip. A master driver style
+store of registry CSVs and device configs is loaded once with a
+manage_store call per config, each followed by a config.update to the
+agent, and once with a single manage_store_bulk call::
+
+    python scripts/scalability-testing/benchmarks/config_store_bulk_benchmark.py
+    python scripts/scalability-testing/benchmarks/config_store_bulk_benchmark.py \
+        --devices 2000 --registries 20 --rpc-latency 0.005
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from gevent.event import AsyncResult
+
+from volttron.platform.store import ConfigStoreService
+from volttron.platform.vip.agent.subsystems.configstore import ConfigStore
+
+
+class Signal(object):
+    def connect(self, receiver, owner=None):
+        pass
+
+
+class Core(object):
+    onsetup = Signal()
+    configuration = Signal()
+
+
+class RPC(object):
+    """Delivers calls from the store service to the agent after a delay."""
+    def __init__(self, latency):
+        self.latency = latency
+        self.config_store = None
+        self.calls = 0
+
+    def call(self, peer, method, *args, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        if method == "config.update_bulk":
+            method = self.config_store._update_configs
+        else:
+            method = self.config_store._update_config
+        result = AsyncResult()
+        result.set(method(*args, **kwargs))
+        return result
+
+    def export(self, method, name=None):
+        pass
+
+
+class VIP(object):
+    def __init__(self, rpc):
+        self.rpc = rpc
+
+
+def setup(directory, latency):
+    os.mkdir(directory)
+    rpc = RPC(latency)
+    config_store = ConfigStore(None, Core(), rpc)
+    config_store._initial_update({})
+    config_store._initial_callbacks_called = True
+    config_store.subscribe(lambda name, action, contents: None, pattern="devices/*")
+    rpc.config_store = config_store
+
+    service = ConfigStoreService.__new__(ConfigStoreService)
+    service.store = {}
+    service.store_path = directory
+    service.vip = VIP(rpc)
+    return service, rpc
+
+
+def site_configs(devices, registries):
+    configs = [("config", json.dumps({"driver_scrape_interval": 0.05}), "json")]
+    for i in xrange(registries):
+        rows = ["Volttron Point Name,Units,Modbus Register,Writable,Point Address"]
+        rows.extend("Point{},degF,>f,TRUE,{}".format(j, j) for j in xrange(50))
+        configs.append(("registry{}.csv".format(i), "\n".join(rows), "csv"))
+    for i in xrange(devices):
+        configs.append(("devices/campus/building{}/unit{}".format(i // 100, i),
+                        json.dumps({"driver_type": "modbus",
+                                    "driver_config": {"device_address": "10.0.0.1"},
+                                    "registry_config": "config://registry{}.csv".format(i % registries)}),
+                        "json"))
+    return configs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--devices', type=int, default=2000)
+    parser.add_argument('--registries', type=int, default=20)
+    parser.add_argument('--rpc-latency', type=float, default=0.005,
+                        help='seconds per RPC round trip')
+    args = parser.parse_args()
+
+    configs = site_configs(args.devices, args.registries)
+    print("{} configs, {} ms per RPC".format(len(configs), args.rpc_latency * 1000))
+
+    directory = tempfile.mkdtemp()
+    try:
+        service, rpc = setup(os.path.join(directory, 'single'), args.rpc_latency)
+        start = time.time()
+        for config in configs:
+            # The manage_store call from volttron-ctl.
+            time.sleep(args.rpc_latency)
+            service.manage_store("platform.driver", *config)
+        print("{:<18}{:>8.2f} s{:>8} RPCs".format("manage_store", time.time() - start,
+                                                  rpc.calls + len(configs)))
+
+        service, rpc = setup(os.path.join(directory, 'bulk'), args.rpc_latency)
+        start = time.time()
+        time.sleep(args.rpc_latency)
+        service.manage_store_bulk("platform.driver", configs)
+        print("{:<18}{:>8.2f} s{:>8} RPCs".format("manage_store_bulk", time.time() - start,
+                                                  rpc.calls + 1))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+#!python
+
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Measure how a slow RPC method in an agent affects the agent's data ingest.
+
+A VIP router, the pubsub service, a publisher and a historian like agent
+run in this process over inproc sockets. The publisher sends device
+messages at a fixed rate. Part way through, another agent calls a query
+method on the historian that spends its time computing. Each ingest
+callback yields for a random time, as a database insert would, and
+records whether it finished out of publish order.
+
+The historian is run with the old dispatch (callbacks run as pushes
+arrive, the query on the gevent hub) and with ordered callback queues and
+the query marked @threaded. The worst and average ingest latency, the
+callbacks run out of publish order and the historian's dispatch queue
+stats are reported. All of the agents share one gevent hub, so a query
+run on the hub holds up the publisher as well::
+
+    python scripts/scalability-testing/benchmarks/dispatch_benchmark.py
+    python scripts/scalability-testing/benchmarks/dispatch_benchmark.py \
+        --rate 200 --seconds 3 --query-seconds 1
+"""
+
+from __future__ import print_function
+
+import argparse
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import gevent
+from zmq import green as zmq
+
+from volttron.platform.vip.agent import Agent, Core, PubSub, RPC, threaded
+from volttron.platform.vip.router import BaseRouter
+
+ADDRESS = 'inproc://dispatch-benchmark'
+
+
+class InprocRouter(BaseRouter):
+    _context_class = zmq.Context
+    _socket_class = zmq.Socket
+
+    def setup(self):
+        self.socket.bind(ADDRESS)
+
+
+class PubSubService(Agent):
+    @Core.receiver('onstart')
+    def setup_agent(self, sender, **kwargs):
+        self.vip.pubsub.add_bus('')
+
+
+def burn(seconds):
+    end = time.time() + seconds
+    count = 0
+    while time.time() < end:
+        count += sum(xrange(1000))
+    return count
+
+
+class Historian(Agent):
+    def __init__(self, insert_seconds, **kwargs):
+        super(Historian, self).__init__(**kwargs)
+        self.insert_seconds = insert_seconds
+        self.latencies = []
+        self.last_sequence = -1
+        self.out_of_order = 0
+
+    @PubSub.subscribe('pubsub', 'devices')
+    def capture(self, peer, sender, bus, topic, headers, message):
+        self.latencies.append(time.time() - headers['published'])
+        gevent.sleep(random.uniform(0, 2 * self.insert_seconds))
+        sequence = message['sequence']
+        if sequence < self.last_sequence:
+            self.out_of_order += 1
+        self.last_sequence = max(sequence, self.last_sequence)
+
+    @RPC.export
+    def query(self, seconds):
+        return burn(seconds)
+
+    @RPC.export
+    @threaded
+    def query_threaded(self, seconds):
+        return burn(seconds)
+
+
+def start(agent):
+    event = gevent.event.Event()
+    gevent.spawn(agent.core.run, event)
+    event.wait(5)
+    return agent
+
+
+def run(args, name, new_dispatch):
+    historian = start(Historian(args.insert_seconds, address=ADDRESS,
+                                identity='historian-' + name,
+                                enable_store=False,
+                                ordered_callbacks=new_dispatch))
+    publisher = start(Agent(address=ADDRESS, identity='publisher-' + name,
+                            enable_store=False))
+    client = start(Agent(address=ADDRESS, identity='client-' + name,
+                         enable_store=False))
+    gevent.sleep(0.5)
+
+    method = 'query_threaded' if new_dispatch else 'query'
+    query = gevent.spawn_later(args.seconds / 3.0, lambda: client.vip.rpc.call(
+        historian.core.identity, method, args.query_seconds).get(timeout=60))
+
+    interval = 1.0 / args.rate
+    next_publish = time.time()
+    for sequence in range(int(args.rate * args.seconds)):
+        publisher.vip.pubsub.publish_nowait(
+            'pubsub', 'devices/campus/building/device',
+            {'published': time.time()}, {'sequence': sequence})
+        next_publish += interval
+        gevent.sleep(max(0, next_publish - time.time()))
+    query.get()
+    gevent.sleep(1)
+
+    stats = historian.vip.rpc._dispatch_stats()
+    for agent in (historian, publisher, client):
+        agent.core.stop()
+    return historian, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rate', type=int, default=200,
+                        help='device messages published per second')
+    parser.add_argument('--seconds', type=float, default=3.0,
+                        help='seconds to publish for')
+    parser.add_argument('--query-seconds', type=float, default=1.0,
+                        help='CPU seconds spent by the query')
+    parser.add_argument('--insert-seconds', type=float, default=0.002,
+                        help='average seconds each ingest callback yields for')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    home = tempfile.mkdtemp()
+    # The agents write their keystores under VOLTTRON_HOME.
+    os.environ['VOLTTRON_HOME'] = home
+    router = InprocRouter()
+    router_task = gevent.spawn(router.run)
+    pubsub = start(PubSubService(address=ADDRESS, identity='pubsub',
+                                 enable_store=False))
+    try:
+        print('{} messages/s for {} s, {} s query'.format(
+            args.rate, args.seconds, args.query_seconds))
+        print('{:>10} {:>10} {:>16} {:>16} {:>14}'.format(
+            'dispatch', 'received', 'max ingest ms', 'avg ingest ms',
+            'out of order'))
+        for name, new_dispatch in (('old', False), ('new', True)):
+            historian, stats = run(args, name, new_dispatch)
+            latencies = historian.latencies
+            print('{:>10} {:>10} {:>16.1f} {:>16.1f} {:>14}'.format(
+                name, len(latencies), max(latencies) * 1000.0,
+                sum(latencies) * 1000.0 / len(latencies),
+                historian.out_of_order))
+            if new_dispatch:
+                print()
+                print('historian dispatch queues:')
+                for queue in stats:
+                    print('  {name}: completed {completed}, max depth '
+                          '{max_depth}, max wait {wait_max:.3f} s, '
+                          'max run {run_max:.3f} s'.format(**queue))
+    finally:
+        pubsub.core.stop()
+        router_task.kill()
+        shutil.rmtree(home)
+
+
+if __name__ == '__main__':
+    main()
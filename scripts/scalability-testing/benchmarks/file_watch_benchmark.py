@@ -0,0 +1,184 @@
+#!python
+
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Measure the messages published by the file watch publisher for a busy log.
+
+A log file is written in one second bursts at the given rate. After each
+burst the agent is told the file changed, as inotify would. The old
+reader, one message per line, and the batched reader are compared by the
+number of messages, the largest message and the CPU time spent reading
+and publishing::
+
+    python scripts/scalability-testing/benchmarks/file_watch_benchmark.py
+    python scripts/scalability-testing/benchmarks/file_watch_benchmark.py \
+        --mb-per-minute 50 --seconds 60 --line-bytes 120
+"""
+
+from __future__ import print_function
+
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir,
+                                os.pardir, os.pardir, 'services', 'core',
+                                'FileWatchPublisher'))
+
+from zmq.utils import jsonapi
+
+from filewatchpublisher.agent import FileWatchPublisher
+
+
+class MessageCounter(object):
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+        self.largest = 0
+
+    def publish(self, peer, topic, headers=None, message=None, bus=''):
+        size = len(jsonapi.dumps(message))
+        self.messages += 1
+        self.bytes += size
+        self.largest = max(self.largest, size)
+
+
+def read_file_by_line(agent, file):
+    """The previous read_file: every new line is published on its own."""
+    with open(file, 'r') as f:
+        f.seek(agent.line_position)
+        for line in f:
+            agent.publish_file(line.strip(), agent.file_topic[file])
+        f.seek(0, 2)
+        agent.line_position = f.tell()
+
+
+def run(tmpdir, args, batched):
+    log = os.path.join(tmpdir, 'batched.log' if batched else 'line.log')
+    open(log, 'w').close()
+    options = {'publish_file': [{'file': log, 'topic': 'platform/log'}],
+               'checkpoint_file': os.path.join(tmpdir, log + '.checkpoint')}
+    if batched:
+        options['batch_lines'] = args.batch_lines
+        options['batch_bytes'] = args.batch_bytes
+    agent = FileWatchPublisher(options, address='inproc://benchmark',
+                               enable_store=False)
+    counter = MessageCounter()
+    agent.vip.pubsub.publish = counter.publish
+    agent.line_position = 0
+
+    line = 'x' * (args.line_bytes - 1) + '\n'
+    burst = line * (args.mb_per_minute * 1024 * 1024 // 60 // len(line))
+    cpu = 0.0
+    with open(log, 'a') as writer:
+        for _ in range(args.seconds):
+            writer.write(burst)
+            writer.flush()
+            start = time.clock()
+            if batched:
+                agent.read_file(log)
+            else:
+                read_file_by_line(agent, log)
+            cpu += time.clock() - start
+    start = time.clock()
+    agent.stopping(None)
+    cpu += time.clock() - start
+    return counter, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mb-per-minute', type=int, default=50,
+                        help='rate the log is written at')
+    parser.add_argument('--seconds', type=int, default=60,
+                        help='seconds of log to write')
+    parser.add_argument('--line-bytes', type=int, default=120,
+                        help='length of each log line')
+    parser.add_argument('--batch-lines', type=int, default=1000,
+                        help='most lines in a batched message')
+    parser.add_argument('--batch-bytes', type=int, default=64 * 1024,
+                        help='most bytes in a batched message')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    tmpdir = tempfile.mkdtemp()
+    # The agents write their keystores under VOLTTRON_HOME.
+    os.environ['VOLTTRON_HOME'] = tmpdir
+    try:
+        print('{} MB/min for {} s, {} byte lines'.format(
+            args.mb_per_minute, args.seconds, args.line_bytes))
+        print('{:>10} {:>12} {:>14} {:>12} {:>10}'.format(
+            'reader', 'messages', 'largest bytes', 'total MB', 'cpu s'))
+        for name, batched in (('line', False), ('batched', True)):
+            counter, cpu = run(tmpdir, args, batched)
+            print('{:>10} {:>12} {:>14} {:>12.1f} {:>10.2f}'.format(
+                name, counter.messages, counter.largest,
+                counter.bytes / 1024.0 / 1024.0, cpu))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+if __name__ == '__main__':
+    main()
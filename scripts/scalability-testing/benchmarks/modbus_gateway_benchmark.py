@@ -0,0 +1,237 @@
+#!python
+
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Measure how long one pass over every slave behind a Modbus TCP gateway
+takes.
+
+A gevent server stands in for the gateway. Every connection and request
+crosses a network link with a fixed round trip latency. Each request then
+waits its turn on the serial bus behind the gateway for a fixed turnaround
+time. The gateway serves a
+limited number of TCP connections at once, like most real ones. All slaves
+are scraped in one batch, as the master driver does for devices behind the
+same gateway. A pass is timed with a new connection for each slave, and
+with one shared gateway connection for each number of requests in flight::
+
+    python scripts/scalability-testing/benchmarks/modbus_gateway_benchmark.py
+    python scripts/scalability-testing/benchmarks/modbus_gateway_benchmark.py \
+        --slaves 30 --latency 0.02 --turnaround 0.002 --pipeline 1 4 8 16
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import struct
+import sys
+import time
+
+import gevent
+from gevent.lock import Semaphore
+from gevent.pool import Pool
+from gevent.server import StreamServer
+from pymodbus.factory import ServerDecoder
+from pymodbus.register_read_message import ReadHoldingRegistersResponse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '../../../services/core/MasterDriverAgent'))
+
+from master_driver import driver_locks
+from master_driver.interfaces.modbus import Interface, ModbusGateway
+
+MBAP = struct.Struct('>HHHB')
+
+
+class Gateway(object):
+    """Modbus TCP gateway where register n holds the value n."""
+    def __init__(self, latency, turnaround, max_connections):
+        self.latency = latency
+        self.turnaround = turnaround
+        self.bus = Semaphore()
+        self.decoder = ServerDecoder()
+        self.connections = 0
+        self.server = StreamServer(('127.0.0.1', 0), self.handle,
+                                   spawn=Pool(max_connections))
+        self.server.start()
+        self.port = self.server.server_port
+
+    def handle(self, sock, address):
+        self.connections += 1
+        # Opening the connection costs a round trip.
+        gevent.sleep(self.latency)
+        lock = Semaphore()
+        while True:
+            header = self.recv(sock, MBAP.size)
+            if header is None:
+                break
+            transaction_id, _, length, unit = MBAP.unpack(header)
+            request = self.decoder.decode(self.recv(sock, length - 1))
+            gevent.spawn(self.respond, sock, lock, transaction_id, unit, request)
+        sock.close()
+
+    def respond(self, sock, lock, transaction_id, unit, request):
+        gevent.sleep(self.latency / 2)
+        with self.bus:
+            gevent.sleep(self.turnaround)
+        gevent.sleep(self.latency / 2)
+        response = ReadHoldingRegistersResponse(
+            range(request.address, request.address + request.count))
+        pdu = chr(request.function_code) + response.encode()
+        with lock:
+            try:
+                sock.sendall(MBAP.pack(transaction_id, 0, len(pdu) + 1, unit) + pdu)
+            except IOError:
+                pass
+
+    @staticmethod
+    def recv(sock, size):
+        data = ''
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+
+def registry(count, cluster, spacing):
+    rows = []
+    for i in xrange(count):
+        address = (i // cluster) * spacing + i % cluster
+        rows.append({'Volttron Point Name': 'point{}'.format(i),
+                     'Modbus Register': '>H',
+                     'Writable': 'FALSE',
+                     'Point Address': str(address),
+                     'Units': 'units'})
+    return rows
+
+
+def make_interfaces(port, slaves, rows, **config):
+    interfaces = []
+    for slave_id in xrange(1, slaves + 1):
+        interface = Interface()
+        interface.configure(dict(config, device_address='127.0.0.1', port=port,
+                                 slave_id=slave_id), rows)
+        interfaces.append(interface)
+    return interfaces
+
+
+def connection_scrape(interface):
+    """Scrape over a new connection that only this slave uses, one request
+    at a time, as each device did before sharing the gateway connection."""
+    connection = ModbusGateway(interface.ip_address, interface.port, idle_timeout=0)
+    return connection.execute_many([request for request, _, _, _ in interface.read_requests()])
+
+
+def connection_pass(interfaces):
+    gevent.joinall([gevent.spawn(connection_scrape, interface)
+                    for interface in interfaces], raise_error=True)
+
+
+def gateway_pass(interfaces):
+    for result in Interface.scrape_group(interfaces):
+        if isinstance(result, Exception):
+            raise result
+
+
+def time_pass(scrape, interfaces):
+    t = time.time()
+    scrape(interfaces)
+    return time.time() - t
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--slaves', type=int, default=30,
+                        help='number of slave devices behind the gateway')
+    parser.add_argument('--registers', type=int, default=40,
+                        help='number of registers on each slave')
+    parser.add_argument('--latency', type=float, default=0.02,
+                        help='network round trip time to the gateway in seconds')
+    parser.add_argument('--turnaround', type=float, default=0.002,
+                        help='seconds each request occupies the serial bus')
+    parser.add_argument('--max-connections', type=int, default=4,
+                        help='TCP connections the gateway serves at once')
+    parser.add_argument('--pipeline', type=int, nargs='+', default=[1, 4, 8, 16],
+                        help='max_pipelined_requests for each shared connection pass')
+    args = parser.parse_args()
+
+    driver_locks.configure_socket_lock()
+    rows = registry(args.registers, 10, 500)
+    results = []
+    passes = [('connection per slave', connection_pass, {})]
+    for depth in args.pipeline:
+        passes.append(('shared, {} in flight'.format(depth), gateway_pass,
+                       {'max_pipelined_requests': depth}))
+    for name, scrape, config in passes:
+        gateway = Gateway(args.latency, args.turnaround, args.max_connections)
+        interfaces = make_interfaces(gateway.port, args.slaves, rows, **config)
+        elapsed = time_pass(scrape, interfaces)
+        for interface in interfaces:
+            interface.close()
+        gateway.server.stop()
+        results.append((name, elapsed, gateway.connections))
+
+    requests = args.slaves * len(interfaces[0].read_requests())
+    print("{} slaves, {} requests per pass, {:.1f}ms latency, {:.1f}ms turnaround".format(
+        args.slaves, requests, args.latency * 1000, args.turnaround * 1000))
+    for name, elapsed, connections in results:
+        print("{:<22} {:>3} connections {:>8.3f}s per pass".format(name, connections, elapsed))
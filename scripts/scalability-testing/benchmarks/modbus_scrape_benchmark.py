@@ -0,0 +1,214 @@
+#!python
+
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Measure how long the Modbus driver interface takes to scrape a device with
+sparse registers.
+
+A pymodbus TCP server running in a child process stands in for the device
+and can add a fixed turnaround delay to every request, like a real
+controller. The registers are spread over the address space in small
+clusters. Each scrape is timed the old way, reading the whole address span
+in fixed size requests over a new connection, and with the register block
+planner over a persistent connection::
+
+    python scripts/scalability-testing/benchmarks/modbus_scrape_benchmark.py
+    python scripts/scalability-testing/benchmarks/modbus_scrape_benchmark.py \
+        --registers 200 --cluster 10 --spacing 500 --device-latency 0.005
+"""
+
+from __future__ import print_function
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+from pymodbus.datastore import (ModbusSequentialDataBlock, ModbusSlaveContext,
+                                ModbusServerContext)
+from pymodbus.server.sync import ModbusTcpServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '../../../services/core/MasterDriverAgent'))
+
+ADDRESS_SPACE = 65536
+
+
+class SlowDataBlock(ModbusSequentialDataBlock):
+    """Data block that takes latency seconds to answer each request."""
+    def __init__(self, latency):
+        super(SlowDataBlock, self).__init__(0, range(ADDRESS_SPACE))
+        self.latency = latency
+
+    def getValues(self, address, count=1):
+        if self.latency:
+            time.sleep(self.latency)
+        return super(SlowDataBlock, self).getValues(address, count)
+
+
+def serve(latency, ports):
+    store = ModbusSlaveContext(ir=SlowDataBlock(latency), zero_mode=True)
+    server = ModbusTcpServer(ModbusServerContext(slaves=store, single=True),
+                             address=('127.0.0.1', 0))
+    ports.put(server.socket.getsockname()[1])
+    server.serve_forever()
+
+
+def start_server(latency):
+    # The modbus interface patches the socket module for gevent, so the
+    # server is started in its own process before the interface is imported.
+    ports = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(latency, ports))
+    process.daemon = True
+    process.start()
+    return process, ports.get()
+
+
+def registry(count, cluster, spacing):
+    rows = []
+    for i in xrange(count):
+        address = (i // cluster) * spacing + i % cluster
+        rows.append({'Volttron Point Name': 'point{}'.format(i),
+                     'Modbus Register': '>H',
+                     'Writable': 'FALSE',
+                     'Point Address': str(address),
+                     'Units': 'units'})
+    return rows
+
+
+def make_interface(port, rows, **config):
+    from master_driver.interfaces.modbus import Interface
+    interface = Interface()
+    config.update(device_address='127.0.0.1', port=port)
+    interface.configure(config, rows)
+    return interface
+
+
+def span_scrape(interface):
+    """Scrape the input registers the way the interface used to: the whole
+    address span in MODBUS_READ_MAX sized requests over a new connection.
+    Returns the result and the number of requests made."""
+    from master_driver.interfaces.modbus import modbus_client, MODBUS_READ_MAX
+    start, end = interface.register_ranges[('byte', True)]
+    result = ''
+    requests = 0
+    with modbus_client(interface.ip_address, interface.port) as client:
+        for group in xrange(start, end + 1, MODBUS_READ_MAX):
+            count = min(end - group + 1, MODBUS_READ_MAX)
+            response = client.read_input_registers(group, count, unit=interface.slave_id)
+            result += response.encode()[1:]
+            requests += 1
+    values = dict((register.point_name, register.parse_value(start, result))
+                  for register in interface.registers[('byte', True)])
+    return values, requests
+
+
+def planned_scrape(interface):
+    requests = len(interface.get_read_blocks(('byte', True)))
+    return interface.scrape_all(), requests
+
+
+def time_scrapes(scrape, interface, scrapes):
+    t = time.time()
+    for _ in xrange(scrapes):
+        result, requests = scrape(interface)
+    elapsed = (time.time() - t) / scrapes
+    interface.close()
+    return elapsed, result, requests
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark Modbus driver scrapes of sparse registers.")
+    parser.add_argument('--registers', type=int, default=200,
+                        help='number of registers on the device')
+    parser.add_argument('--cluster', type=int, default=10,
+                        help='number of consecutive registers in each cluster')
+    parser.add_argument('--spacing', type=int, default=500,
+                        help='distance between the start of each cluster')
+    parser.add_argument('--device-latency', type=float, default=0.005,
+                        help='seconds the device takes to answer a request')
+    parser.add_argument('--scrapes', type=int, default=5,
+                        help='number of scrapes to average')
+    args = parser.parse_args()
+
+    if (args.registers - 1) // args.cluster * args.spacing + args.cluster > ADDRESS_SPACE:
+        parser.error("registers do not fit in the Modbus address space")
+
+    server, port = start_server(args.device_latency)
+
+    from master_driver import driver_locks
+    driver_locks.configure_socket_lock()
+    rows = registry(args.registers, args.cluster, args.spacing)
+
+    interface = make_interface(port, rows)
+
+    span_time, span_result, span_requests = time_scrapes(
+        span_scrape, interface, args.scrapes)
+    planned_time, planned_result, planned_requests = time_scrapes(
+        planned_scrape, interface, args.scrapes)
+    assert span_result == planned_result
+
+    server.terminate()
+
+    print("{} registers in clusters of {}, {} apart, {:.1f}ms device latency".format(
+        args.registers, args.cluster, args.spacing, args.device_latency * 1000))
+    print("span    {:>5} requests {:>10.3f}s per scrape".format(span_requests, span_time))
+    print("planned {:>5} requests {:>10.3f}s per scrape".format(planned_requests, planned_time))
@@ -0,0 +1,197 @@
+#!python
+
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Measure the cost of publishing to a protected topic.
+
+Every publish to a protected topic needs the capabilities of the publisher.
+The auth service and the pubsub subsystem run in this process and the
+get_capabilities RPC between them is made directly, with a fixed delay
+standing in for the message bus round trip. Lookups in an auth file of
+many entries are timed with a scan of every entry (the old behaviour) and
+with the auth entry index, then protected publishes are timed with and
+without the pubsub capability cache::
+
+    python scripts/scalability-testing/benchmarks/protected_publish_benchmark.py
+    python scripts/scalability-testing/benchmarks/protected_publish_benchmark.py \
+        --entries 1000 --publishes 2000 --rpc-latency 0.001
+"""
+
+from __future__ import print_function
+
+import argparse
+import time
+import weakref
+
+from gevent.event import AsyncResult
+
+from volttron.platform.auth import AuthEntry, AuthService, dump_user, load_user
+from volttron.platform.vip.agent.subsystems.pubsub import (
+    PrefixSubscriptions, ProtectedPubSubTopics, PubSub)
+
+
+def scan_authorizations(entries, user_id):
+    try:
+        domain, address, mechanism, credentials = load_user(user_id)
+    except ValueError:
+        domain = None
+    for entry in entries:
+        if entry.user_id == user_id:
+            return [entry.capabilities, entry.groups, entry.roles]
+        elif domain is not None:
+            if entry.match(domain, address, mechanism, [credentials]):
+                return [entry.capabilities, entry.groups, entry.roles]
+
+
+class Message(object):
+    peer = 'publisher'
+    user = None
+
+
+class Context(object):
+    vip_message = Message()
+
+
+class RPC(object):
+    """Answers get_capabilities from the auth service after a delay."""
+    context = Context()
+
+    def __init__(self, auth, latency):
+        self.auth = auth
+        self.latency = latency
+        self.calls = 0
+
+    def call(self, peer, method, user_id):
+        self.calls += 1
+        time.sleep(self.latency)
+        result = AsyncResult()
+        result.set(self.auth.get_capabilities(user_id))
+        return result
+
+
+class Socket(object):
+    def send_multipart(self, frames, copy=True):
+        pass
+
+
+class Core(object):
+    socket = Socket()
+
+
+def make_pubsub(rpc):
+    pubsub = PubSub.__new__(PubSub)
+    pubsub._rpc_obj, pubsub._core_obj = rpc, Core()
+    pubsub.rpc = weakref.ref(pubsub._rpc_obj)
+    pubsub.core = weakref.ref(pubsub._core_obj)
+    pubsub._peer_subscriptions = {'': PrefixSubscriptions()}
+    pubsub._user_capabilities = {}
+    pubsub._auth_generation = 0
+    pubsub.protected_topics = ProtectedPubSubTopics()
+    pubsub.protected_topics.add('devices/actuators/schedule/request', ['can_schedule'])
+    return pubsub
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=1000,
+                        help='entries in the auth file')
+    parser.add_argument('--publishes', type=int, default=2000)
+    parser.add_argument('--rpc-latency', type=float, default=0.001,
+                        help='seconds per RPC round trip')
+    args = parser.parse_args()
+
+    entries = [AuthEntry(credentials='key{:040d}'.format(i), capabilities=['can_schedule'])
+               for i in xrange(args.entries)]
+    auth = AuthService.__new__(AuthService)
+    auth.auth_entries = entries
+    auth._index_auth_entries()
+
+    # Publishers found at the end of the file are the slowest to scan.
+    users = [dump_user('vip', '127.0.0.1', 'CURVE', 'key{:040d}'.format(i))
+             for i in xrange(args.entries - 10, args.entries)]
+
+    print("{} auth entries, {} ms per RPC".format(args.entries, args.rpc_latency * 1000))
+    start = time.time()
+    for i in xrange(args.publishes):
+        scan_authorizations(entries, users[i % len(users)])
+    print("{:<22}{:>10.1f} us/lookup".format("scan auth entries",
+                                           (time.time() - start) * 1e6 / args.publishes))
+    start = time.time()
+    for i in xrange(args.publishes):
+        auth.get_authorizations(users[i % len(users)])
+    print("{:<22}{:>10.1f} us/lookup".format("indexed auth entries",
+                                           (time.time() - start) * 1e6 / args.publishes))
+
+    for name, cached in (("publish, no cache", False), ("publish, cached", True)):
+        rpc = RPC(auth, args.rpc_latency)
+        pubsub = make_pubsub(rpc)
+        start = time.time()
+        for i in xrange(args.publishes):
+            Message.user = users[i % len(users)]
+            if not cached:
+                pubsub._peer_auth_update()
+            pubsub._peer_publish('devices/actuators/schedule/request', {}, None)
+        elapsed = time.time() - start
+        print("{:<22}{:>10.0f} publishes/s {:>6} RPCs".format(name, args.publishes / elapsed,
+                                                            rpc.calls))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!python
+
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Measure how fast the pubsub subsystem finds the subscribers of a topic.
+
+Subscriptions are spread over device topics at every depth, the way agents
+subscribe to a whole campus, a building or a single device. Publishes go to
+device "all" topics. Matching is timed with a scan of every subscription
+prefix (the old behaviour) and with the
+:py:class:`PrefixSubscriptions` index. The scan is slow, so it is timed over
+fewer publishes and its rate is reported::
+
+    python scripts/scalability-testing/benchmarks/pubsub_match_benchmark.py
+    python scripts/scalability-testing/benchmarks/pubsub_match_benchmark.py \
+        --subscriptions 1000 --publishes 10000
+"""
+
+from __future__ import print_function
+
+import argparse
+import random
+import time
+
+from volttron.platform.vip.agent.subsystems.pubsub import PrefixSubscriptions
+
+
+def device_topic(rand):
+    return 'devices/campus{}/building{}/device{}'.format(
+        rand.randint(0, 9), rand.randint(0, 99), rand.randint(0, 99))
+
+
+def make_subscriptions(count, rand):
+    subscriptions = PrefixSubscriptions()
+    subscriptions['devices'] = {'historian'}
+    while len(subscriptions) < count:
+        parts = device_topic(rand).split('/')
+        prefix = '/'.join(parts[:rand.randint(2, len(parts))])
+        subscriptions.setdefault(prefix, set()).add(
+            'agent{}'.format(rand.randint(0, 49)))
+    return subscriptions
+
+
+def scan(subscriptions, topics):
+    matched = 0
+    for topic in topics:
+        subscribers = set()
+        for prefix, subscription in subscriptions.iteritems():
+            if subscription and topic.startswith(prefix):
+                subscribers |= subscription
+        matched += len(subscribers)
+    return matched
+
+
+def index(subscriptions, topics):
+    matched = 0
+    for topic in topics:
+        subscribers = set()
+        for prefix, subscription in subscriptions.match(topic):
+            if subscription:
+                subscribers |= subscription
+        matched += len(subscribers)
+    return matched
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark pubsub subscription matching.")
+    parser.add_argument('--subscriptions', type=int, default=10000,
+                        help='number of subscription prefixes')
+    parser.add_argument('--publishes', type=int, default=100000,
+                        help='number of topics published with the index')
+    parser.add_argument('--scan-publishes', type=int, default=1000,
+                        help='number of topics published with the scan')
+    args = parser.parse_args()
+
+    rand = random.Random(0)
+    subscriptions = make_subscriptions(args.subscriptions, rand)
+    topics = [device_topic(rand) + '/all' for _ in xrange(args.publishes)]
+
+    t = time.time()
+    scan_matched = scan(subscriptions, topics[:args.scan_publishes])
+    scan_time = time.time() - t
+    t = time.time()
+    index_matched = index(subscriptions, topics)
+    index_time = time.time() - t
+    assert index(subscriptions, topics[:args.scan_publishes]) == scan_matched
+
+    print("{} subscriptions, {} publishes: {} subscribers matched".format(
+        len(subscriptions), len(topics), index_matched))
+    print("scan  {:>12.0f} publishes/s".format(
+        args.scan_publishes / scan_time))
+    print("index {:>12.0f} publishes/s ({:.3f}s total)".format(
+        len(topics) / index_time, index_time))
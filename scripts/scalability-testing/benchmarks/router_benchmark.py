@@ -0,0 +1,204 @@
+#!python
+
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Measure the messages per second routed between peers by the VIP router.
+
+The platform router is run in a child process on an abstract ipc
+socket. The benchmark connects 2, 10 and 100 DEALER peers to it in a
+ring; every peer keeps a window of messages in flight to the next peer
+and forwards each message it receives on around the ring. Each router
+loop is run in turn: the old loop, which polls before every message and
+calls issue() on every message, and the current loop, which drains all
+queued messages after each poll and skips issue() while message
+tracking and debug logging are off. The routed messages per second and
+the router's CPU time per message are reported::
+
+    python scripts/scalability-testing/benchmarks/router_benchmark.py
+    python scripts/scalability-testing/benchmarks/router_benchmark.py \
+        --peers 2 10 100 --window 20 --seconds 5
+"""
+
+from __future__ import print_function
+
+import argparse
+import logging
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+import zmq
+
+from volttron.platform.main import Router
+
+
+class LegacyRouter(Router):
+    '''Router using the loop from before batched routing.'''
+
+    def run(self):
+        self.start()
+        try:
+            while self.poll():
+                self.route()
+        finally:
+            self.stop()
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def serve(router_class, address, conn):
+    router = router_class(address, developer_mode=True,
+                          default_user_id=b'vip.service')
+    start = cpu_seconds()
+    try:
+        router.run()
+    except KeyboardInterrupt:
+        pass
+    conn.send(cpu_seconds() - start)
+
+
+def connect(context, address, identity):
+    sock = context.socket(zmq.DEALER)
+    sock.identity = identity
+    sock.connect(address)
+    return sock
+
+
+def run(args, router_class, peers):
+    address = 'ipc://@/volttron-router-benchmark-{}'.format(os.getpid())
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(
+        target=serve, args=(router_class, address, child))
+    process.start()
+    context = zmq.Context()
+    names = [b'peer-{}'.format(i) for i in range(peers)]
+    sockets = [connect(context, address, name) for name in names]
+    following = dict(zip(names, names[1:] + names[:1]))
+    poller = zmq.Poller()
+    for sock in sockets:
+        poller.register(sock, zmq.POLLIN)
+    # Wait for every peer to be known to the router.
+    for sock in sockets:
+        sock.send_multipart([b'', b'VIP1', b'', b'', b'hello', b'hello'])
+        sock.recv_multipart()
+
+    payload = b'x' * args.size
+    for name, sock in zip(names, sockets):
+        for _ in range(args.window):
+            sock.send_multipart(
+                [following[name], b'VIP1', b'', b'', b'bench', payload])
+    received = 0
+    end = time.time() + args.seconds
+    while time.time() < end:
+        for sock, _ in poller.poll(100):
+            name = sock.identity
+            while True:
+                try:
+                    frames = sock.recv_multipart(zmq.NOBLOCK, copy=False)
+                except zmq.Again:
+                    break
+                received += 1
+                frames[0] = following[name]
+                sock.send_multipart(frames, copy=False)
+    control = connect(context, address, b'control')
+    control.send_multipart([b'', b'VIP1', b'', b'', b'quit'])
+    router_cpu = parent.recv()
+    process.join()
+    context.destroy(linger=0)
+    return received / args.seconds, router_cpu * 1e6 / received
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--peers', type=int, nargs='+', default=[2, 10, 100],
+                        help='numbers of connected peers to run with')
+    parser.add_argument('--window', type=int, default=20,
+                        help='messages each peer keeps in flight')
+    parser.add_argument('--size', type=int, default=64,
+                        help='bytes of payload in each message')
+    parser.add_argument('--seconds', type=float, default=5.0,
+                        help='seconds to route for at each peer count')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    home = tempfile.mkdtemp()
+    os.environ['VOLTTRON_HOME'] = home
+    try:
+        print('{:>6} {:>8} {:>14} {:>18}'.format(
+            'peers', 'loop', 'messages/s', 'router us/message'))
+        for peers in args.peers:
+            for name, router_class in (('old', LegacyRouter),
+                                       ('new', Router)):
+                rate, cost = run(args, router_class, peers)
+                print('{:>6} {:>8} {:>14.0f} {:>18.1f}'.format(
+                    peers, name, rate, cost))
+    finally:
+        shutil.rmtree(home)
+
+
+if __name__ == '__main__':
+    main()
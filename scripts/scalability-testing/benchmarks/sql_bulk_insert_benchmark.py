@@ -0,0 +1,169 @@
+#!python
+
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Compare the per record insert path of the SQL historian with
+:py:meth:`DbDriver.bulk_insert_data`.
+
+Each cycle inserts one `submit_size_limit` sized batch and commits it, the
+same way :py:meth:`SQLHistorian.publish_to_historian` does. SQLite is
+always benchmarked against a temporary database file. Pass a MySQL
+connection config (the "connection" section of a SQL historian config) to
+also benchmark a local MySQL server::
+
+    python scripts/scalability-testing/benchmarks/sql_bulk_insert_benchmark.py
+    python scripts/scalability-testing/benchmarks/sql_bulk_insert_benchmark.py \
+        --mysql-config mysql-connection.json
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+TABLE_NAMES = {'data_table': 'bench_data',
+               'topics_table': 'bench_topics',
+               'meta_table': 'bench_meta',
+               'agg_topics_table': 'bench_aggregate_topics',
+               'agg_meta_table': 'bench_aggregate_meta'}
+
+
+def single_insert(writer, rows):
+    for ts, topic_id, value in rows:
+        writer.insert_data(ts, topic_id, value)
+    writer.commit()
+
+
+def bulk_insert(writer, rows):
+    writer.bulk_insert_data(rows)
+    writer.commit()
+
+
+def run(name, writer, topics, batch_size, batches):
+    writer.setup_historian_tables()
+    topic_ids = []
+    for i in xrange(topics):
+        topic = 'bench/device/point{}'.format(i)
+        topic_ids.append(writer.insert_topic(topic)[0])
+    writer.commit()
+
+    start = datetime(2016, 1, 1, tzinfo=pytz.UTC)
+    cycle = [0]
+
+    def next_batch():
+        rows = []
+        while len(rows) < batch_size:
+            ts = start + timedelta(minutes=cycle[0])
+            cycle[0] += 1
+            rows.extend((ts, topic_id, float(cycle[0]))
+                        for topic_id in topic_ids)
+        return rows[:batch_size]
+
+    for label, insert in (('single', single_insert), ('bulk', bulk_insert)):
+        elapsed = 0.0
+        for _ in xrange(batches):
+            rows = next_batch()
+            t = time.time()
+            insert(writer, rows)
+            elapsed += time.time() - t
+        total = batch_size * batches
+        print("{:>6} {:>6}: {:8.3f}s {:>12.0f} rows/sec".format(
+            name, label, elapsed, total / elapsed))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark SQL historian single vs bulk inserts.")
+    parser.add_argument('--topics', type=int, default=100,
+                        help='number of topics written in each batch')
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help='rows per batch (submit_size_limit)')
+    parser.add_argument('--batches', type=int, default=50,
+                        help='number of batches to insert for each path')
+    parser.add_argument('--mysql-config', default=None,
+                        help='json file with MySQL connection parameters')
+    args = parser.parse_args()
+
+    from volttron.platform.dbutils.sqlitefuncts import SqlLiteFuncts
+    work_dir = tempfile.mkdtemp()
+    try:
+        database = os.path.join(work_dir, 'historian.sqlite')
+        run('sqlite', SqlLiteFuncts({'database': database}, TABLE_NAMES),
+            args.topics, args.batch_size, args.batches)
+    finally:
+        shutil.rmtree(work_dir)
+
+    if args.mysql_config:
+        from volttron.platform.dbutils.mysqlfuncts import MySqlFuncts
+        with open(args.mysql_config) as f:
+            params = json.load(f)
+        params = params.get('params', params)
+        writer = MySqlFuncts(params, TABLE_NAMES)
+        try:
+            run('mysql', writer, args.topics, args.batch_size, args.batches)
+        finally:
+            for table in ('data_table', 'topics_table', 'meta_table'):
+                writer.execute_stmt('DROP TABLE ' + TABLE_NAMES[table])
@@ -0,0 +1,153 @@
+#!python
+
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Measure multi topic queries against the SQLite historian tables.
+
+A database holding one minute data for the largest topic count is built
+first. Each topic count is then queried once with one
+:py:meth:`SqlLiteFuncts.query` call per topic (the old behaviour) and once
+with a single call for all topics::
+
+    python scripts/scalability-testing/benchmarks/sqlite_query_benchmark.py
+    python scripts/scalability-testing/benchmarks/sqlite_query_benchmark.py \
+        --days 7 --topics 1 10 100
+"""
+
+from __future__ import print_function
+
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+from volttron.platform.agent.utils import fix_sqlite3_datetime
+from volttron.platform.dbutils.sqlitefuncts import SqlLiteFuncts
+
+TABLE_NAMES = {'data_table': 'data',
+               'topics_table': 'topics',
+               'meta_table': 'meta',
+               'agg_topics_table': 'aggregate_topics',
+               'agg_meta_table': 'aggregate_meta'}
+
+
+def populate(functs, topics, days):
+    topic_ids = []
+    for i in xrange(topics):
+        topic = 'campus/building/device/point{}'.format(i)
+        topic_ids.append(functs.insert_topic(topic)[0])
+    functs.commit()
+
+    start = datetime(2016, 1, 1, tzinfo=pytz.UTC)
+    for minute in xrange(0, days * 24 * 60, 60):
+        rows = []
+        for m in xrange(minute, minute + 60):
+            ts = start + timedelta(minutes=m)
+            rows.extend((ts, topic_id, float(m)) for topic_id in topic_ids)
+        functs.bulk_insert_data(rows)
+        functs.commit()
+    return topic_ids
+
+
+def timed(fn):
+    t = time.time()
+    result = fn()
+    return time.time() - t, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark SQLite historian multi topic queries.")
+    parser.add_argument('--topics', type=int, nargs='+',
+                        default=[1, 10, 500],
+                        help='topic counts to query')
+    parser.add_argument('--days', type=int, default=30,
+                        help='days of one minute data for each topic')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    fix_sqlite3_datetime()
+    work_dir = tempfile.mkdtemp()
+    try:
+        database = os.path.join(work_dir, 'historian.sqlite')
+        functs = SqlLiteFuncts({'database': database}, TABLE_NAMES)
+        functs.setup_historian_tables()
+        print("Populating {} topics with {} days of data".format(
+            max(args.topics), args.days))
+        all_ids = populate(functs, max(args.topics), args.days)
+        id_name_map = dict((topic_id, str(topic_id)) for topic_id in all_ids)
+
+        for topics in args.topics:
+            topic_ids = all_ids[:topics]
+            per_topic, _ = timed(lambda: [functs.query([topic_id],
+                                                       id_name_map)
+                                          for topic_id in topic_ids])
+            single, values = timed(lambda: functs.query(topic_ids,
+                                                        id_name_map))
+            rows = sum(len(v) for v in values.values())
+            print("{:>4} topics {:>9} rows: per topic {:8.3f}s "
+                  "single statement {:8.3f}s".format(topics, rows,
+                                                     per_topic, single))
+    finally:
+        shutil.rmtree(work_dir)
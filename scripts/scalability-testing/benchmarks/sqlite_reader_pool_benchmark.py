@@ -0,0 +1,154 @@
+#!python
+
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Measure the latency of small dashboard style queries against the SQLite
+historian with and without the reader connection pool.
+
+Each request asks for the latest `count` values of one topic, which is
+what :py:meth:`SQLHistorian.query_historian` hands to
+:py:meth:`SqlLiteFuncts.query` for a VOLTTRON Central chart refresh::
+
+    python scripts/scalability-testing/benchmarks/sqlite_reader_pool_benchmark.py
+"""
+
+from __future__ import print_function
+
+import argparse
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+from volttron.platform.agent.utils import fix_sqlite3_datetime
+from volttron.platform.dbutils.sqlitefuncts import SqlLiteFuncts
+
+TABLE_NAMES = {'data_table': 'data',
+               'topics_table': 'topics',
+               'meta_table': 'meta',
+               'agg_topics_table': 'aggregate_topics',
+               'agg_meta_table': 'aggregate_meta'}
+
+
+def populate(functs, topics, rows_per_topic):
+    topic_ids = [functs.insert_topic('campus/building/device/point{}'.format(
+        i))[0] for i in xrange(topics)]
+    start = datetime(2016, 1, 1, tzinfo=pytz.UTC)
+    functs.bulk_insert_data([(start + timedelta(minutes=m), topic_id, m)
+                             for m in xrange(rows_per_topic)
+                             for topic_id in topic_ids])
+    functs.commit()
+    return topic_ids
+
+
+def percentile(samples, pct):
+    index = int(round(pct / 100.0 * (len(samples) - 1)))
+    return samples[index]
+
+
+def run(label, functs, topic_ids, requests, count):
+    id_name_map = dict((topic_id, str(topic_id)) for topic_id in topic_ids)
+    latencies = []
+    for _ in xrange(requests):
+        topic_id = random.choice(topic_ids)
+        start = time.time()
+        functs.query([topic_id], id_name_map, count=count,
+                     order='LAST_TO_FIRST')
+        latencies.append(time.time() - start)
+    latencies.sort()
+    print("{:>10}: p50 {:7.3f}ms p99 {:7.3f}ms".format(
+        label, percentile(latencies, 50) * 1000,
+        percentile(latencies, 99) * 1000))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark SQLite historian reader connection pooling.")
+    parser.add_argument('--topics', type=int, default=200)
+    parser.add_argument('--rows-per-topic', type=int, default=1440)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--count', type=int, default=60,
+                        help='values returned by each query')
+    parser.add_argument('--cache-size', type=int, default=None,
+                        help='reader_cache_size setting for the pool')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    fix_sqlite3_datetime()
+    work_dir = tempfile.mkdtemp()
+    try:
+        database = os.path.join(work_dir, 'historian.sqlite')
+        writer = SqlLiteFuncts({'database': database}, TABLE_NAMES)
+        writer.setup_historian_tables()
+        topic_ids = populate(writer, args.topics, args.rows_per_topic)
+
+        unpooled = SqlLiteFuncts({'database': database,
+                                  'reader_pool_size': 0}, TABLE_NAMES)
+        pooled = SqlLiteFuncts({'database': database,
+                                'reader_cache_size': args.cache_size},
+                               TABLE_NAMES)
+        run('unpooled', unpooled, topic_ids, args.requests, args.count)
+        run('pooled', pooled, topic_ids, args.requests, args.count)
+    finally:
+        shutil.rmtree(work_dir)
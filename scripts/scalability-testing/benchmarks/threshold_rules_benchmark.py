@@ -0,0 +1,242 @@
+#!python
+
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Measure the cost of checking point thresholds in the threshold detection
+agent.
+
+Rules are configured for every point of a set of devices. With the old
+agent each rule needs its own subscription to the point's topic and is
+run by the point publish. With the rule engine the rules for a device
+share one subscription to the device's all topic and are checked together
+when the all publish arrives. Both are fed one minute of scrapes through
+the agent's subscription index and the subscriptions needed, the CPU time
+per minute of scrapes and the alerts sent are reported::
+
+    python scripts/scalability-testing/benchmarks/threshold_rules_benchmark.py
+    python scripts/scalability-testing/benchmarks/threshold_rules_benchmark.py \
+        --devices 1000 --points 50 --minutes 5
+"""
+
+from __future__ import print_function
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir,
+                                os.pardir, os.pardir, 'services', 'core',
+                                'ThresholdDetectionAgent'))
+
+from thresholddetection.agent import ThresholdDetectionAgent
+from volttron.platform.vip.agent.subsystems.pubsub import PrefixSubscriptions
+
+
+class IndexedPubSub(object):
+    def __init__(self):
+        self.subscriptions = PrefixSubscriptions()
+
+    def subscribe(self, peer, prefix, callback):
+        self.subscriptions.setdefault(prefix, set()).add(callback)
+
+    def push(self, topic, message):
+        for prefix, callbacks in self.subscriptions.match(topic):
+            for callback in callbacks:
+                callback('pubsub', 'platform.driver', '', topic, {}, message)
+
+
+class CountingHealth(object):
+    def __init__(self):
+        self.alerts = 0
+
+    def send_alert(self, alert_key, status):
+        self.alerts += 1
+
+
+class VIP(object):
+    def __init__(self):
+        self.pubsub = IndexedPubSub()
+        self.health = CountingHealth()
+
+
+def subscribe_point_rules(vip, config):
+    """The previous agent's start(): one closure and subscription per
+    rule on a point topic, alerting on every sample past the threshold."""
+
+    def is_number(x):
+        try:
+            float(x)
+            return True
+        except ValueError:
+            return False
+
+    def generate_callback(message, threshold, comparator):
+        def callback(peer, sender, bus, topic, headers, data):
+            if is_number(data):
+                if comparator(data, threshold):
+                    vip.health.send_alert(topic, message)
+        return callback
+
+    comparators = {'watch_max': lambda x, y: x > y,
+                   'watch_min': lambda x, y: x < y}
+    for key, comparator in comparators.iteritems():
+        for item in config.get(key, []):
+            msg = item['message'].format(**item)
+            topic = '{}/{}'.format(item['topic'][:-4], item['point'])
+            vip.pubsub.subscribe('pubsub', topic,
+                                 generate_callback(msg, item['threshold'],
+                                                   comparator))
+
+
+def build_config(args):
+    devices = ['devices/campus/building{}/device{}/all'.format(i // 100, i)
+               for i in range(args.devices)]
+    points = ['Point{}'.format(i) for i in range(args.points)]
+    config = {'watch_max': [], 'watch_min': []}
+    for device in devices:
+        for index, point in enumerate(points):
+            key = 'watch_max' if index % 2 else 'watch_min'
+            threshold = 90 if index % 2 else 10
+            config[key].append({'topic': device,
+                                'point': point,
+                                'threshold': threshold,
+                                'deadband': 2,
+                                'message': '{point} past {threshold}'})
+    return devices, points, config
+
+
+def scrapes(devices, points, minutes, faulty):
+    """Yield each minute of all publishes. The first `faulty` devices
+    report one point past its maximum."""
+    rand = random.Random(0)
+    for _ in range(minutes):
+        minute = []
+        for index, device in enumerate(devices):
+            values = {point: rand.uniform(20.0, 80.0) for point in points}
+            if index < faulty:
+                values[points[1]] = 95.0
+            minute.append((device, [values, {}]))
+        yield minute
+
+
+def run_rule_engine(devices, points, config, args):
+    agent = ThresholdDetectionAgent.__new__(ThresholdDetectionAgent)
+    agent.config = config
+    agent.vip = VIP()
+    agent.start(None)
+
+    cpu = 0.0
+    for minute in scrapes(devices, points, args.minutes, args.faulty):
+        start = time.clock()
+        for topic, message in minute:
+            agent.vip.pubsub.push(topic, message)
+        cpu += time.clock() - start
+    return len(agent.vip.pubsub.subscriptions), cpu, agent.vip.health.alerts
+
+
+def run_point_subscriptions(devices, points, config, args):
+    vip = VIP()
+    subscribe_point_rules(vip, config)
+
+    cpu = 0.0
+    for minute in scrapes(devices, points, args.minutes, args.faulty):
+        # The driver publishes each point to its own topic as well.
+        publishes = [('{}/{}'.format(topic[:-4], point), value)
+                     for topic, message in minute
+                     for point, value in message[0].iteritems()]
+        start = time.clock()
+        for topic, value in publishes:
+            vip.pubsub.push(topic, value)
+        cpu += time.clock() - start
+    return len(vip.pubsub.subscriptions), cpu, vip.health.alerts
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--devices', type=int, default=1000,
+                        help='devices with rules')
+    parser.add_argument('--points', type=int, default=50,
+                        help='rules per device')
+    parser.add_argument('--minutes', type=int, default=5,
+                        help='one minute scrapes to check')
+    parser.add_argument('--faulty', type=int, default=10,
+                        help='devices reporting a point past its threshold')
+    args = parser.parse_args()
+
+    logging.getLogger('thresholddetection.agent').setLevel(logging.WARNING)
+    devices, points, config = build_config(args)
+
+    print('{} rules on {} devices, {} one minute scrapes'.format(
+        args.devices * args.points, args.devices, args.minutes))
+    print('{:>20} {:>14} {:>14} {:>10}'.format(
+        'agent', 'subscriptions', 'ms/minute', 'alerts'))
+    for name, run in (('point subscriptions', run_point_subscriptions),
+                      ('rule engine', run_rule_engine)):
+        subscriptions, cpu, alerts = run(devices, points, config, args)
+        print('{:>20} {:>14} {:>14.1f} {:>10}'.format(
+            name, subscriptions, cpu * 1000.0 / args.minutes, alerts))
+
+
+if __name__ == '__main__':
+    main()
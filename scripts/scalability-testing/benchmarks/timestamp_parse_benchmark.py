@@ -0,0 +1,159 @@
+#!python
+
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Measure the per message cost of formatting and parsing timestamps.
+
+A driver scraping a number of devices publishes one all message per
+device with the same Date header, formatted with format_timestamp. A
+historian calls process_timestamp on the header of every message it
+receives. The time per message is reported for formatting with strftime
+and parsing every header with dateutil, as before, and for the current
+format_timestamp and parse_timestamp_string, which parses that format
+directly and caches recent strings::
+
+    python scripts/scalability-testing/benchmarks/timestamp_parse_benchmark.py
+    python scripts/scalability-testing/benchmarks/timestamp_parse_benchmark.py \
+        --devices 100 --scrapes 200
+"""
+
+from __future__ import print_function
+
+import argparse
+import time
+from datetime import timedelta
+
+import pytz
+from dateutil.parser import parse
+
+from volttron.platform.agent import utils
+
+
+def old_format_timestamp(time_stamp):
+    time_str = time_stamp.strftime("%Y-%m-%dT%H:%M:%S.%f")
+    if time_stamp.tzinfo is not None:
+        sign = '+'
+        td = time_stamp.tzinfo.utcoffset(time_stamp)
+        if td.days < 0:
+            sign = '-'
+            td = -td
+        minutes, seconds = divmod(td.seconds, 60)
+        hours, minutes = divmod(minutes, 60)
+        time_str += "{sign}{HH:02}:{MM:02}".format(sign=sign, HH=hours,
+                                                   MM=minutes)
+    return time_str
+
+
+def old_process_timestamp(timestamp_string, topic=''):
+    timestamp = parse(timestamp_string)
+    if timestamp.tzinfo is None:
+        original_tz = None
+    else:
+        original_tz = timestamp.tzinfo
+        timestamp = timestamp.astimezone(pytz.UTC)
+    return timestamp, original_tz
+
+
+def run(args, format_timestamp, process_timestamp):
+    start_time = utils.get_aware_utc_now()
+    format_seconds = process_seconds = 0.0
+    for scrape in range(args.scrapes):
+        now = start_time + timedelta(seconds=scrape * 60)
+        start = time.time()
+        headers = [format_timestamp(now) for _ in range(args.devices)]
+        format_seconds += time.time() - start
+        start = time.time()
+        for header in headers:
+            process_timestamp(header, 'devices/campus/building/device/all')
+        process_seconds += time.time() - start
+    messages = float(args.devices * args.scrapes)
+    return format_seconds * 1e6 / messages, process_seconds * 1e6 / messages
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--devices', type=int, default=100,
+                        help='devices published per scrape')
+    parser.add_argument('--scrapes', type=int, default=200,
+                        help='number of scrapes, one minute apart')
+    args = parser.parse_args()
+
+    print('{} devices, {} scrapes'.format(args.devices, args.scrapes))
+    print('{:>8} {:>12} {:>12}'.format('parser', 'format us', 'process us'))
+    for name, format_timestamp, process_timestamp in (
+            ('dateutil', old_format_timestamp, old_process_timestamp),
+            ('fast', utils.format_timestamp, utils.process_timestamp)):
+        format_us, process_us = run(args, format_timestamp, process_timestamp)
+        print('{:>8} {:>12.1f} {:>12.1f}'.format(name, format_us, process_us))
+
+    # Every header differs, as when each publish has its own timestamp.
+    args.scrapes, args.devices = args.scrapes * args.devices, 1
+    print()
+    print('unique timestamps')
+    for name, format_timestamp, process_timestamp in (
+            ('dateutil', old_format_timestamp, old_process_timestamp),
+            ('fast', utils.format_timestamp, utils.process_timestamp)):
+        format_us, process_us = run(args, format_timestamp, process_timestamp)
+        print('{:>8} {:>12.1f} {:>12.1f}'.format(name, format_us, process_us))
+
+
+if __name__ == '__main__':
+    main()
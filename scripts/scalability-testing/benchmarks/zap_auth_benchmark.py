@@ -0,0 +1,161 @@
+#!python
+
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Measure how fast the auth service answers a storm of reconnecting agents.
+
+The ZAP loop of the auth service runs in this process on an inproc socket
+and a client sends the ZAP requests of many CURVE connections at once, as
+happens when every agent and remote platform reconnects after a platform
+restart. The auth file holds exact key entries for agents plus entries
+with key patterns for remote platforms. The time to answer every request
+is measured with a scan of every entry (the old behaviour) and with the
+auth entry index::
+
+    python scripts/scalability-testing/benchmarks/zap_auth_benchmark.py
+    python scripts/scalability-testing/benchmarks/zap_auth_benchmark.py \
+        --entries 1000 --patterns 100 --connects 1000
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import random
+import time
+
+import gevent
+import gevent.core
+from zmq import green as zmq
+
+from volttron.platform.auth import AuthEntry, AuthService, dump_user
+from volttron.platform.vip.socket import encode_key
+
+
+def scan_authenticate(entries):
+    def authenticate(domain, address, mechanism, credentials):
+        for entry in entries:
+            if entry.match(domain, address, mechanism, credentials):
+                return entry.user_id or dump_user(
+                    domain, address, mechanism, *credentials[:1])
+    return authenticate
+
+
+def run_storm(auth, keys, connects):
+    context = zmq.Context.instance()
+    address = 'inproc://zap-benchmark-{}'.format(random.random())
+    auth.zap_socket = context.socket(zmq.ROUTER)
+    auth.zap_socket.bind(address)
+    client = context.socket(zmq.DEALER)
+    client.connect(address)
+    loop = gevent.spawn(auth.zap_loop, None)
+
+    start = time.time()
+    for i in xrange(connects):
+        client.send_multipart([b'', b'1.0', str(i), b'vip', b'10.0.{}.{}'.format(i // 250, i % 250),
+                               b'', b'CURVE', keys[i % len(keys)]])
+    users = 0
+    for _ in xrange(connects):
+        response = client.recv_multipart()
+        users += response[3] == b'200'
+    elapsed = time.time() - start
+
+    loop.kill()
+    client.close(linger=0)
+    auth.zap_socket.close(linger=0)
+    return elapsed, users
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=1000,
+                        help='entries in the auth file')
+    parser.add_argument('--patterns', type=int, default=100,
+                        help='entries matching keys by regex')
+    parser.add_argument('--connects', type=int, default=1000,
+                        help='simultaneous connection attempts')
+    args = parser.parse_args()
+
+    rand = random.Random(0)
+    keys = [os.urandom(32) for _ in xrange(args.entries - args.patterns)]
+    entries = [AuthEntry(credentials=encode_key(key), user_id='agent{}'.format(i))
+               for i, key in enumerate(keys)]
+    entries.extend(AuthEntry(credentials='/{}.*/'.format(encode_key(os.urandom(32))[:8]),
+                             address='/10\\.0\\.{}\\..*/'.format(i))
+                   for i in xrange(args.patterns))
+    entries.sort()
+    rand.shuffle(keys)
+
+    print("{} auth entries ({} patterns), {} connects".format(args.entries, args.patterns,
+                                                              args.connects))
+    for name, indexed in (("scan", False), ("index", True)):
+        auth = AuthService.__new__(AuthService)
+        auth.auth_entries = entries
+        auth.allow_any = False
+        auth._index_auth_entries()
+        if not indexed:
+            auth.authenticate = scan_authenticate(entries)
+        elapsed, users = run_storm(auth, keys, args.connects)
+        print("{:<8}{:>10.3f} s {:>10.0f} connects/s {:>6} accepted".format(
+            name, elapsed, args.connects / elapsed, users))
+
+
+if __name__ == '__main__':
+    main()
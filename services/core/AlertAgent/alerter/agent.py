@@ -55,8 +55,9 @@
 # under Contract DE-AC05-76RL01830
 # }}}
 
+import heapq
 import logging
-from datetime import datetime
+import time
 
 from volttron.platform.vip.agent import Agent, Core, RPC
 from volttron.platform.agent import utils
@@ -66,16 +67,31 @@ from volttron.platform.agent.known_identities import PLATFORM_ALERTER
 utils.setup_logging()
 _log = logging.getLogger(__name__)
 
-__version__ = '0.2'
+__version__ = '0.3'
 
 
 class AlertAgent(Agent):
+    """Sends an alert when a watched topic, or a point in a watched
+    device's publishes, has not been seen within its timeout.
+
+    Publishes only record the time a topic and its points were seen. Each
+    watched topic has one entry in a heap of deadlines, the earliest time
+    one of its points could time out. Only topics whose deadline has
+    passed are checked, so a healthy watch list costs nothing between
+    publishes. An alert is sent once when a topic or point times out and,
+    if a re-alert interval is configured, again every interval until it
+    is seen.
+    """
     def __init__(self, config_path, **kwargs):
         super(AlertAgent, self).__init__(**kwargs)
         self.config = utils.load_config(config_path)
         self.wait_time = {}
-        self.topic_ttl = {}
-        self.point_ttl = {}
+        self.realert_time = {}
+        self.topic_seen = {}
+        self.point_seen = {}
+        self.alerting = {}
+        self._deadlines = []
+        self._scheduled = {}
 
     @Core.receiver('onstart')
     def onstart(self, sender, **kwargs):
@@ -88,7 +104,8 @@ class AlertAgent(Agent):
                 point_config = config[topic]
                 self.watch_device(topic,
                                   point_config["seconds"],
-                                  point_config["points"])
+                                  point_config.get("points", []),
+                                  point_config.get("realert"))
 
             # Default config option
             else:
@@ -96,7 +113,7 @@ class AlertAgent(Agent):
                 self.watch_topic(topic, timeout)
 
     @RPC.export
-    def watch_topic(self, topic, timeout):
+    def watch_topic(self, topic, timeout, realert=None):
         """RPC method
 
         Listen for a topic to be published within a given
@@ -106,17 +123,25 @@ class AlertAgent(Agent):
         :type topic: str
         :param timeout: Seconds before an alert is sent.
         :type timeout: int
+        :param realert: Seconds between repeated alerts while the topic
+                        is not published. By default only one alert is sent.
+        :type realert: int
         """
+        if topic not in self.wait_time:
+            self.vip.pubsub.subscribe(peer='pubsub',
+                                      prefix=topic,
+                                      callback=self.reset_time)
+        now = time.time()
         self.wait_time[topic] = timeout
-        self.topic_ttl[topic] = timeout
-        self.vip.pubsub.subscribe(peer='pubsub',
-                                  prefix=topic,
-                                  callback=self.reset_time)
+        self.realert_time[topic] = realert
+        self.topic_seen[topic] = now
+        self.alerting.pop(topic, None)
+        self._schedule(topic, now + timeout)
         _log.info("Expecting {} every {} seconds"
                    .format(topic, timeout))
 
     @RPC.export
-    def watch_device(self, topic, timeout, points):
+    def watch_device(self, topic, timeout, points, realert=None):
         """RPC method
         
         Watch a device's ALL topic and expect points. This
@@ -129,13 +154,14 @@ class AlertAgent(Agent):
         :type timeout: int
         :param points: Points to expect in the publish message.
         :type points: [str]
+        :param realert: Seconds between repeated alerts while the topic
+                        or a point is not published. By default only one
+                        alert is sent.
+        :type realert: int
         """
-        self.point_ttl[topic] = {}
-
-        for p in points:
-            self.point_ttl[topic][p] = timeout
+        self.point_seen[topic] = dict.fromkeys(points, time.time())
 
-        self.watch_topic(topic, timeout)
+        self.watch_topic(topic, timeout, realert)
 
     @RPC.export
     def ignore_topic(self, topic):
@@ -152,9 +178,13 @@ class AlertAgent(Agent):
         self.vip.pubsub.unsubscribe(peer='pubsub',
                                     prefix=topic,
                                     callback=self.reset_time)
-        self.point_ttl.pop(topic, None)
-        self.topic_ttl.pop(topic, None)
+        self.point_seen.pop(topic, None)
+        self.topic_seen.pop(topic, None)
+        self.alerting.pop(topic, None)
         self.wait_time.pop(topic, None)
+        self.realert_time.pop(topic, None)
+        # The heap entry is skipped when it comes due.
+        self._scheduled.pop(topic, None)
 
     def reset_time(self, peer, sender, bus, topic, headers, message):
         if topic not in self.wait_time:
@@ -162,35 +192,101 @@ class AlertAgent(Agent):
 
         _log.debug("Resetting timeout for {}".format(topic))
 
-        # Reset the standard topic timeout
-        self.topic_ttl[topic] = self.wait_time[topic]
+        now = time.time()
+        self.topic_seen[topic] = now
 
         # Reset timeouts on volatile points
-        if topic in self.point_ttl:
-            received_points = set(message[0].keys())
-            expected_points = self.point_ttl[topic].keys()
-            for point in expected_points:
-                if point in received_points:
-                    self.point_ttl[topic][point] = self.wait_time[topic]
+        seen = self.point_seen.get(topic)
+        if seen:
+            received = message[0].viewkeys()
+            if seen.viewkeys() <= received:
+                self.point_seen[topic] = dict.fromkeys(seen, now)
+            else:
+                for point in seen.viewkeys() & received:
+                    seen[point] = now
+
+        if topic in self.alerting:
+            self._clear_alerts(topic, now)
+
+    def _clear_alerts(self, topic, now):
+        alerts = self.alerting[topic]
+        for point in alerts.keys():
+            if self._last_seen(topic, point) == now:
+                del alerts[point]
+                _log.info("{} published again".format(
+                    self._describe(topic, point)))
+        if not alerts:
+            del self.alerting[topic]
+
+        # Topics with only unrepeated alerts are not in the heap.
+        deadline = now + self.wait_time[topic]
+        if self._scheduled.get(topic, deadline + 1) > deadline:
+            self._schedule(topic, deadline)
+
+    def _last_seen(self, topic, point):
+        if point is None:
+            return self.topic_seen[topic]
+        return self.point_seen[topic][point]
+
+    def _schedule(self, topic, deadline):
+        self._scheduled[topic] = deadline
+        heapq.heappush(self._deadlines, (deadline, topic))
 
     @Core.periodic(1)
-    def decrement_ttl(self):
-        for topic in self.wait_time.iterkeys():
-
-            # Send an alert if a topic hasn't been seen
-            self.topic_ttl[topic] -= 1
-            if self.topic_ttl[topic] <= 0:
-                self.send_alert(topic)
-
-            # Send an alert if a point hasn't been seen
-            try:
-                points = self.point_ttl[topic].keys()
-                for p in points:
-                    self.point_ttl[topic][p] -= 1
-                    if self.point_ttl[topic][p] <= 0:
-                        self.send_alert(topic, p)
-            except KeyError:
-                pass
+    def check_deadlines(self):
+        now = time.time()
+        deadlines = self._deadlines
+        while deadlines and deadlines[0][0] <= now:
+            deadline, topic = heapq.heappop(deadlines)
+            if self._scheduled.get(topic) != deadline:
+                # Replaced by a new entry or no longer watched.
+                continue
+            del self._scheduled[topic]
+
+            deadline = self._check_topic(topic, now)
+            if deadline is not None:
+                self._schedule(topic, deadline)
+
+    def _check_topic(self, topic, now):
+        """Send alerts for the topic and its points that have timed out
+        or are due to be re-sent and return the next time the topic needs
+        to be checked, or None if it only has unrepeated alerts.
+        """
+        timeout = self.wait_time[topic]
+        realert = self.realert_time[topic]
+        alerts = self.alerting.get(topic, {})
+
+        last_seen = [(None, self.topic_seen[topic])]
+        last_seen.extend(self.point_seen.get(topic, {}).iteritems())
+
+        next_check = None
+        for point, seen in last_seen:
+            if point in alerts:
+                if not realert:
+                    continue
+                due = alerts[point] + realert
+            else:
+                due = seen + timeout
+
+            if due <= now:
+                alerts[point] = now
+                self.send_alert(topic, point)
+                if not realert:
+                    continue
+                due = now + realert
+
+            if next_check is None or due < next_check:
+                next_check = due
+
+        if alerts:
+            self.alerting[topic] = alerts
+        return next_check
+
+    @staticmethod
+    def _describe(topic, point):
+        if point is None:
+            return topic
+        return "{}({})".format(topic, point)
 
     def send_alert(self, device, point=None):
         if point is not None:
@@ -117,11 +117,21 @@ def test_alert_agent(agent):
     gevent.sleep(6)
 
     assert len(alert_messages) == 3
+    assert all(count == 1 for count in alert_messages.values())
 
 
 def test_ignore_topic(agent):
     global alert_messages
 
+    # Alerts are sent once per timeout so publish both topics to clear
+    # the alerts from the previous test.
+    agent.vip.pubsub.publish(peer='pubsub',
+                             topic='fakedevice')
+    agent.vip.pubsub.publish(peer='pubsub',
+                             topic='fakedevice2',
+                             message=[{'point': 'value'}])
+    gevent.sleep(1)
+
     agent.vip.rpc.call(PLATFORM_ALERTER, 'ignore_topic', 'fakedevice2').get()
     alert_messages.clear()
     gevent.sleep(6)
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+import pytest
+
+from alerter import agent as alert_module
+from alerter.agent import AlertAgent
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+class FakePubSub(object):
+    def subscribe(self, peer, prefix, callback):
+        pass
+
+    def unsubscribe(self, peer, prefix, callback):
+        pass
+
+
+class FakeHealth(object):
+    def __init__(self):
+        self.alerts = []
+
+    def send_alert(self, alert_key, status):
+        self.alerts.append(alert_key)
+
+
+class FakeVIP(object):
+    def __init__(self):
+        self.pubsub = FakePubSub()
+        self.health = FakeHealth()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(alert_module.time, 'time', clock.time)
+    return clock
+
+
+def make_agent():
+    agent = AlertAgent.__new__(AlertAgent)
+    agent.wait_time = {}
+    agent.realert_time = {}
+    agent.topic_seen = {}
+    agent.point_seen = {}
+    agent.alerting = {}
+    agent._deadlines = []
+    agent._scheduled = {}
+    agent.vip = FakeVIP()
+    return agent
+
+
+def advance(agent, clock, seconds):
+    for _ in range(seconds):
+        clock.now += 1
+        agent.check_deadlines()
+
+
+def publish(agent, topic, points=None):
+    message = [dict.fromkeys(points or [], 0), {}]
+    agent.reset_time('pubsub', 'driver', None, topic, {}, message)
+
+
+def test_alert_sent_once_per_timeout(clock):
+    agent = make_agent()
+    agent.watch_topic('device', 5)
+
+    advance(agent, clock, 4)
+    assert agent.vip.health.alerts == []
+
+    advance(agent, clock, 10)
+    assert agent.vip.health.alerts == ['Timeout:device']
+
+    publish(agent, 'device')
+    advance(agent, clock, 4)
+    assert agent.vip.health.alerts == ['Timeout:device']
+
+    advance(agent, clock, 1)
+    assert agent.vip.health.alerts == ['Timeout:device'] * 2
+
+
+def test_publish_pushes_deadline_back(clock):
+    agent = make_agent()
+    agent.watch_topic('device', 5)
+
+    for _ in range(5):
+        advance(agent, clock, 3)
+        publish(agent, 'device')
+
+    assert agent.vip.health.alerts == []
+    # One heap entry per watched topic regardless of publish count.
+    assert len(agent._deadlines) == 1
+
+
+def test_realert_interval(clock):
+    agent = make_agent()
+    agent.watch_topic('device', 5, realert=3)
+
+    advance(agent, clock, 11)
+    assert agent.vip.health.alerts == ['Timeout:device'] * 3
+
+    publish(agent, 'device')
+    advance(agent, clock, 4)
+    assert len(agent.vip.health.alerts) == 3
+
+
+def test_missing_point(clock):
+    agent = make_agent()
+    agent.watch_device('device/all', 5, ['a', 'b'])
+
+    for _ in range(3):
+        advance(agent, clock, 3)
+        publish(agent, 'device/all', ['a', 'c'])
+
+    assert agent.vip.health.alerts == ['Timeout:device/all(b)']
+
+
+def test_ignore_topic(clock):
+    agent = make_agent()
+    agent.watch_device('device/all', 5, ['a'])
+    agent.watch_topic('other', 5)
+    agent.ignore_topic('device/all')
+
+    advance(agent, clock, 6)
+    assert agent.vip.health.alerts == ['Timeout:other']
+    assert 'device/all' not in agent.point_seen
+
+
+def test_rewatch_device_replaces_points(clock):
+    agent = make_agent()
+    agent.watch_device('device/all', 5, ['a'])
+    agent.watch_device('device/all', 5, ['b'])
+
+    advance(agent, clock, 6)
+    assert sorted(agent.vip.health.alerts) == ['Timeout:device/all',
+                                               'Timeout:device/all(b)']
@@ -82,6 +82,7 @@ from bacpypes.apdu import ConfirmedRequestSequence, WhoIsRequest
 import bacpypes.core
 
 import threading
+import gevent
 
 #Tweeks to BACpypes to make it play nice with Gevent.
 bacpypes.core.enable_sleeping()
@@ -103,7 +104,11 @@ from bacpypes.apdu import (ReadPropertyRequest,
                            ReadAccessSpecification,
                            encode_max_apdu_response,
                            WhoIsRequest,
-                           IAmRequest)
+                           IAmRequest,
+                           SubscribeCOVRequest,
+                           ConfirmedCOVNotificationRequest,
+                           UnconfirmedCOVNotificationRequest)
+from bacpypes.appservice import DeviceInfo
 from bacpypes.primitivedata import Null, Atomic, Enumerated, Integer, Unsigned, Real
 from bacpypes.constructeddata import Array, Any, Choice
 from bacpypes.basetypes import ServicesSupported
@@ -116,6 +121,78 @@ configFile = os.path.join(path, "bacnet_example_config.csv")
 #Make sure the TaskManager singleton exists...
 task_manager = TaskManager()
 
+#Estimated encoded sizes, in bytes, of the parts of a ReadPropertyMultiple
+# response. Used to fit requests into the APDU size a device accepts.
+RPM_ACK_HEADER_SIZE = 3
+RPM_OBJECT_SIZE = 7
+RPM_PROPERTY_SIZE = 16
+
+#Segments per response to plan for with devices that support segmentation.
+RPM_MAX_SEGMENTS = 8
+
+COV_LIFETIME = 1800
+
+
+class DeviceAbortError(RuntimeError):
+    pass
+
+
+def plan_read_requests(object_property_map, max_apdu_len=None, max_per_request=None):
+    """Split the properties to read from one device into ReadPropertyMultiple
+    requests.
+
+    object_property_map maps (object_type, instance_number) to a list of
+    (property_name, property_index). Each request holds at most
+    max_per_request objects and, if max_apdu_len is given, properties
+    whose response is estimated to fit in max_apdu_len bytes. The
+    properties of one object are split across requests if needed.
+
+    Returns a list of requests, each a list of (object, properties) pairs.
+    """
+    if max_per_request is None:
+        max_per_request = sys.maxint
+
+    requests = []
+    current = []
+    size = RPM_ACK_HEADER_SIZE
+    for obj in sorted(object_property_map):
+        remaining = list(object_property_map[obj])
+        while remaining:
+            if current and (len(current) >= max_per_request or
+                            (max_apdu_len is not None and
+                             size + RPM_OBJECT_SIZE + RPM_PROPERTY_SIZE > max_apdu_len)):
+                requests.append(current)
+                current = []
+                size = RPM_ACK_HEADER_SIZE
+
+            if max_apdu_len is None:
+                fit = len(remaining)
+            else:
+                fit = max((max_apdu_len - size - RPM_OBJECT_SIZE) // RPM_PROPERTY_SIZE, 1)
+            properties, remaining = remaining[:fit], remaining[fit:]
+            current.append((obj, properties))
+            size += RPM_OBJECT_SIZE + RPM_PROPERTY_SIZE * len(properties)
+
+    if current:
+        requests.append(current)
+    return requests
+
+
+def cast_property_value(object_type, property_name, property_index, property_value):
+    """Convert a property value from a response to a python value.
+    Returns None if the datatype of the property is unknown."""
+    datatype = get_datatype(object_type, property_name)
+    if not datatype:
+        return None
+    if issubclass(datatype, Array) and (property_index is not None):
+        if property_index == 0:
+            return property_value.cast_out(Unsigned)
+        return property_value.cast_out(datatype.subtype)
+    value = property_value.cast_out(datatype)
+    if issubclass(datatype, Enumerated):
+        value = datatype(value).get_long()
+    return value
+
 #IO callback
 # class IOCB:
 #
@@ -132,11 +209,17 @@ task_manager = TaskManager()
 #         self.ioCall.send(None, self.ioResult.set_exception, exception)
 
 class BACnet_application(BIPSimpleApplication, RecurringTask):
-    def __init__(self, i_am_callback, *args):
+    def __init__(self, i_am_callback, cov_callback, *args):
         BIPSimpleApplication.__init__(self, *args)
         RecurringTask.__init__(self, 250)
 
         self.i_am_callback = i_am_callback
+        self.cov_callback = cov_callback
+
+        # APDU size and segmentation support of devices that have sent
+        # an IAm, keyed by address.
+        self.device_info = {}
+        self.smap.get_device_info = self.get_device_info
 
         self.request_queue = Queue()
 
@@ -160,6 +243,12 @@ class BACnet_application(BIPSimpleApplication, RecurringTask):
     def submit_request(self, iocb):
         self.request_queue.put(iocb)
 
+    def get_device_info(self, address):
+        info = self.device_info.get(str(address))
+        if info is None:
+            info = DeviceInfo(address)
+        return info
+
     def get_next_invoke_id(self, addr):
         """Called to get an unused invoke ID."""
 
@@ -208,7 +297,7 @@ class BACnet_application(BIPSimpleApplication, RecurringTask):
         del self.iocb[invoke_key]
 
         if isinstance(apdu, AbortPDU):
-            iocb.set_exception(RuntimeError("Device communication aborted: " + str(apdu)))
+            iocb.set_exception(DeviceAbortError("Device communication aborted: " + str(apdu)))
             return
         
         if isinstance(apdu, Error):
@@ -235,7 +324,7 @@ class BACnet_application(BIPSimpleApplication, RecurringTask):
                     value = datatype(value).get_long()
             iocb.set(value)
             
-        elif (isinstance(iocb.ioRequest, WritePropertyRequest) and 
+        elif (isinstance(iocb.ioRequest, (WritePropertyRequest, SubscribeCOVRequest)) and 
               isinstance(apdu, SimpleAckPDU)):
             iocb.set(apdu)
             return
@@ -308,12 +397,20 @@ class BACnet_application(BIPSimpleApplication, RecurringTask):
             iocb.set_exception(TypeError('Unsupported Request Type'))
 
     def indication(self, apdu):
+        if isinstance(apdu, (UnconfirmedCOVNotificationRequest, ConfirmedCOVNotificationRequest)):
+            self.cov_notification(apdu)
+            return
+
         if isinstance(apdu, IAmRequest):
             device_type, device_instance = apdu.iAmDeviceIdentifier
             if device_type != 'device':
                 #Bail without an error.
                 return
 
+            self.device_info[str(apdu.pduSource)] = DeviceInfo(apdu.pduSource,
+                                                               str(apdu.segmentationSupported),
+                                                               apdu.maxAPDULengthAccepted)
+
             _log.debug("Calling IAm callback.")
 
             self.i_am_callback(str(apdu.pduSource),
@@ -325,6 +422,24 @@ class BACnet_application(BIPSimpleApplication, RecurringTask):
         # forward it along
         BIPSimpleApplication.indication(self, apdu)
 
+    def cov_notification(self, apdu):
+        object_type, instance_number = apdu.monitoredObjectIdentifier
+        values = {}
+        for element in apdu.listOfValues:
+            try:
+                value = cast_property_value(object_type, element.propertyIdentifier,
+                                            element.propertyArrayIndex, element.value)
+            except StandardError as e:
+                _log.error("Unable to read COV value of {} {} {}: {}".format(object_type, instance_number,
+                                                                             element.propertyIdentifier, e))
+                continue
+            values[element.propertyIdentifier] = value
+
+        if isinstance(apdu, ConfirmedCOVNotificationRequest):
+            self.response(SimpleAckPDU(context=apdu))
+
+        self.cov_callback(apdu.subscriberProcessIdentifier, values)
+
 
 
 write_debug_str = "Writing: {target} {type} {instance} {property} (Priority: {priority}, Index: {index}): {value}"
@@ -372,6 +487,10 @@ class BACnetProxyAgent(Agent):
 
         self.iocb_class = IOCB
 
+        # Active COV subscriptions by subscriber process identifier.
+        self.cov_subscriptions = {}
+        self.next_cov_process_id = 1
+
         self.setup_device(async_call, device_address,
                          max_apdu_len, seg_supported,
                          obj_id, obj_name, ven_id)
@@ -416,9 +535,14 @@ class BACnetProxyAgent(Agent):
         def i_am_callback(address, device_id, max_apdu_len, seg_supported, vendor_id):
             async_call.send(None, self.i_am, address, device_id, max_apdu_len, seg_supported, vendor_id)
 
+        def cov_callback(process_id, values):
+            async_call.send(None, self.cov_notification, process_id, values)
+
         #i_am_callback('foo', 'bar', 'baz', 'foobar', 'foobaz')
         
-        self.this_application = BACnet_application(i_am_callback, this_device, address)
+        self.max_apdu_len = max_apdu_len
+        self.seg_supported = seg_supported
+        self.this_application = BACnet_application(i_am_callback, cov_callback, this_device, address)
       
         server_thread = threading.Thread(target=bacpypes.core.run)
     
@@ -445,6 +569,25 @@ class BACnetProxyAgent(Agent):
 
         self.vip.pubsub.publish('pubsub', topics.BACNET_I_AM, header, message=value)
 
+    def cov_notification(self, process_id, values):
+        """Called by the BACnet application when a COV notification is
+        received. Publishes the changed points of the device."""
+        subscription = self.cov_subscriptions.get(process_id)
+        if subscription is None:
+            _log.debug("COV notification for unknown subscription {}".format(process_id))
+            return
+        target_address, _, point_properties = subscription
+
+        message = {}
+        for name, property_name in point_properties:
+            if property_name in values:
+                message[name] = values[property_name]
+        if not message:
+            return
+
+        header = {headers.TIMESTAMP: utils.format_timestamp(datetime.datetime.utcnow())}
+        self.vip.pubsub.publish('pubsub', topics.BACNET_COV(address=target_address), header, message=message)
+
 
     @RPC.export
     def who_is(self, low_device_id=None, high_device_id=None, target_address=None):
@@ -530,6 +673,18 @@ class BACnetProxyAgent(Agent):
         raise RuntimeError("Failed to set value: " + str(result))
         
     
+    def get_read_budget(self, target_address):
+        """Returns the number of bytes a ReadPropertyMultiple response from
+        the device may take, or None if the device has not sent an IAm."""
+        info = self.this_application.device_info.get(str(Address(target_address)))
+        if info is None:
+            return None
+        max_apdu_len = min(info.maxApduLengthAccepted, self.max_apdu_len)
+        if (info.segmentationSupported == 'segmentedBoth' and
+                self.seg_supported in ('segmentedBoth', 'segmentedReceive')):
+            max_apdu_len *= RPM_MAX_SEGMENTS
+        return max_apdu_len
+
     @RPC.export
     def read_properties(self, target_address, point_map, max_per_request=None):
         """Read a set of points and return the results"""
@@ -566,18 +721,15 @@ class BACnetProxyAgent(Agent):
                                 instance_number].append((property_name, property_index))
                                 
         result_dict={}
-        finished = False
-                        
-        while not finished:        
+        pending = plan_read_requests(object_property_map,
+                                     self.get_read_budget(target_address),
+                                     max_per_request)
+
+        while pending:
+            read_request = pending.pop()
             read_access_spec_list = []
             count = 0
-            for _ in xrange(max_per_request):
-                try:
-                    obj_data, properties = object_property_map.popitem()
-                except KeyError:
-                    finished = True
-                    break
-                obj_type, obj_inst = obj_data
+            for (obj_type, obj_inst), properties in read_request:
                 prop_ref_list = []
                 for prop, prop_index in properties:
                     prop_ref = PropertyReference(propertyIdentifier=prop)
@@ -589,22 +741,30 @@ class BACnetProxyAgent(Agent):
                                                            listOfPropertyReferences=prop_ref_list)
                 read_access_spec_list.append(read_access_spec)    
                 
-            if read_access_spec_list:
-                _log.debug("Requesting {count} properties from {target}".format(count=count,
-                                                                                target=target_address))
-                request = ReadPropertyMultipleRequest(listOfReadAccessSpecs=read_access_spec_list)
-                request.pduDestination = Address(target_address)
-                
-                iocb = self.iocb_class(request)
-                self.this_application.submit_request(iocb)   
+            _log.debug("Requesting {count} properties from {target}".format(count=count,
+                                                                            target=target_address))
+            request = ReadPropertyMultipleRequest(listOfReadAccessSpecs=read_access_spec_list)
+            request.pduDestination = Address(target_address)
+            
+            iocb = self.iocb_class(request)
+            self.this_application.submit_request(iocb)   
+            try:
                 bacnet_results = iocb.ioResult.get(10)
-                
-                _log.debug("Received read response from {target}".format(count=count,
-                                                                         target=target_address))
+            except DeviceAbortError:
+                if count < 2:
+                    raise
+                #Most likely the response did not fit. Try again in halves.
+                _log.debug("Read of {count} properties from {target} aborted, "
+                           "splitting request".format(count=count, target=target_address))
+                pending.extend(split_read_request(read_request))
+                continue
             
-                for prop_tuple, value in bacnet_results.iteritems():
-                    name = reverse_point_map[prop_tuple]
-                    result_dict[name] = value        
+            _log.debug("Received read response from {target}".format(count=count,
+                                                                     target=target_address))
+        
+            for prop_tuple, value in bacnet_results.iteritems():
+                name = reverse_point_map[prop_tuple]
+                result_dict[name] = value        
         
         return result_dict
         
@@ -613,6 +773,64 @@ class BACnetProxyAgent(Agent):
             
     
     
+    @RPC.export
+    def subscribe_cov(self, target_address, point_map, lifetime=COV_LIFETIME):
+        """Subscribe to change of value notifications for the presentValue
+        of the objects of the points in point_map.
+
+        Changed values are published to bacnet/cov/<target_address> as a
+        dictionary of point name to value. Subscribing again renews the
+        subscription. Returns the names of the points subscribed to."""
+        object_points = defaultdict(list)
+        for name, properties in point_map.iteritems():
+            object_type, instance_number, property_name = properties[:3]
+            if property_name != 'presentValue' or (len(properties) > 3 and properties[3] is not None):
+                continue
+            object_points[object_type, instance_number].append((name, property_name))
+
+        process_ids = dict(((address, obj), process_id)
+                           for process_id, (address, obj, _) in self.cov_subscriptions.iteritems())
+
+        requests = []
+        for obj, point_properties in object_points.iteritems():
+            process_id = process_ids.get((target_address, obj))
+            if process_id is None:
+                process_id = self.next_cov_process_id
+                self.next_cov_process_id += 1
+
+            request = SubscribeCOVRequest(subscriberProcessIdentifier=process_id,
+                                          monitoredObjectIdentifier=obj,
+                                          issueConfirmedNotifications=False,
+                                          lifetime=lifetime)
+            request.pduDestination = Address(target_address)
+            iocb = self.iocb_class(request)
+            self.this_application.submit_request(iocb)
+            requests.append((process_id, obj, point_properties, iocb))
+
+        subscribed = []
+        for process_id, obj, point_properties, iocb in requests:
+            try:
+                iocb.ioResult.get(10)
+            except (RuntimeError, gevent.Timeout) as e:
+                _log.warning("Unable to subscribe to COV of {} on {}: {}".format(obj, target_address, e))
+                self.cov_subscriptions.pop(process_id, None)
+                continue
+            self.cov_subscriptions[process_id] = (target_address, obj, point_properties)
+            subscribed.extend(name for name, _ in point_properties)
+
+        return subscribed
+    
+    
+def split_read_request(read_request):
+    """Split a request planned by plan_read_requests in two."""
+    if len(read_request) > 1:
+        half = len(read_request) // 2
+        return [read_request[:half], read_request[half:]]
+    obj, properties = read_request[0]
+    half = len(properties) // 2
+    return [[(obj, properties[:half])], [(obj, properties[half:])]]
+
+
 def main(argv=sys.argv):
     '''Main method called to start the agent.'''
     utils.vip_main(bacnet_proxy_agent, identity="platform.bacnet_proxy")
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+#
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation are those
+# of the authors and should not be interpreted as representing official policies,
+# either expressed or implied, of the FreeBSD Project.
+#
+
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization
+# that has cooperated in the development of these materials, makes
+# any warranty, express or implied, or assumes any legal liability
+# or responsibility for the accuracy, completeness, or usefulness or
+# any information, apparatus, product, software, or process disclosed,
+# or represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does
+# not necessarily constitute or imply its endorsement, recommendation,
+# r favoring by the United States Government or any agency thereof,
+# or Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+
+#}}}
+
+import pytest
+
+from bacpypes.apdu import (APDU, ReadPropertyMultipleACK, ReadAccessResult,
+                           ReadAccessResultElement, ReadAccessResultElementChoice)
+from bacpypes.constructeddata import Any
+from bacpypes.primitivedata import Real
+
+from bacnet_proxy.agent import (plan_read_requests, split_read_request,
+                                RPM_ACK_HEADER_SIZE)
+
+
+def object_map(count, properties=('presentValue',)):
+    return dict((('analogInput', i), [(p, None) for p in properties])
+                for i in xrange(count))
+
+
+def encoded_ack_size(read_request):
+    results = []
+    for obj, properties in read_request:
+        elements = []
+        for prop, _ in properties:
+            value = Any()
+            value.cast_in(Real(72.5))
+            elements.append(ReadAccessResultElement(
+                propertyIdentifier=prop,
+                readResult=ReadAccessResultElementChoice(propertyValue=value)))
+        results.append(ReadAccessResult(objectIdentifier=obj, listOfResults=elements))
+    apdu = APDU()
+    ReadPropertyMultipleACK(listOfReadAccessResults=results).encode(apdu)
+    return RPM_ACK_HEADER_SIZE + len(apdu.pduData)
+
+
+@pytest.mark.parametrize("max_apdu_len", [50, 128, 206, 480, 1024, 1476])
+def test_planned_responses_fit_apdu(max_apdu_len):
+    requests = plan_read_requests(object_map(200), max_apdu_len)
+
+    assert sum(len(request) for request in requests) == 200
+    for request in requests:
+        assert encoded_ack_size(request) <= max_apdu_len
+
+
+def test_object_properties_split_across_requests():
+    properties = ['presentValue', 'statusFlags', 'outOfService', 'units']
+    requests = plan_read_requests(object_map(1, properties), 50)
+
+    assert [len(request[0][1]) for request in requests] == [2, 2]
+    assert [p for request in requests for p, _ in request[0][1]] == properties
+
+
+def test_max_per_request_limits_objects():
+    requests = plan_read_requests(object_map(50), None, 24)
+
+    assert [len(request) for request in requests] == [24, 24, 2]
+    assert len(plan_read_requests(object_map(50))) == 1
+
+
+def test_split_read_request():
+    request = plan_read_requests(object_map(5))[0]
+    assert [len(half) for half in split_read_request(request)] == [2, 3]
+
+    request = plan_read_requests(object_map(1, ['presentValue', 'statusFlags', 'units']))[0]
+    assert [half[0][1] for half in split_read_request(request)] == [
+        [('presentValue', None)], [('statusFlags', None), ('units', None)]]
@@ -57,19 +57,26 @@
 #}}}
 
 import gevent
+import io
 import logging
-import os.path
+import os
 import sys
 
 from datetime import datetime
 from volttron.platform.agent.utils import watch_file_with_fullpath
 from volttron.platform.vip.agent import Agent, RPC, Core
 from volttron.platform.agent import utils
+from volttron.utils.persistance import LogStructuredDict
 
 
 utils.setup_logging()
 _log = logging.getLogger(__name__)
-__version__ = '3.6'
+__version__ = '3.7'
+
+DEFAULT_READ_BUFFER = 64 * 1024
+DEFAULT_BATCH_BYTES = 64 * 1024
+DEFAULT_BATCH_WINDOW = 1.0
+DEFAULT_CHECKPOINT_FILE = 'filewatchpublisher.checkpoint'
 
 
 def file_watch_publisher(config_path, **kwargs):
@@ -93,8 +100,20 @@ class FileWatchPublisher(Agent):
     in configuration with an error message.
     Exists if all files does not exist.
 
-    :param config: Configuration dict
-    :type config: dict
+    Files are read from an open handle, so lines written to a file that
+    is renamed by log rotation are still published before the new file at
+    the watched path is opened. The offset of the last published line of
+    each file is saved in a checkpoint file and reading resumes from it
+    after a restart if the file has not been replaced.
+
+    With ``batch_lines`` set, lines are collected and published as one
+    message holding up to ``batch_lines`` lines or ``batch_bytes`` bytes.
+    Lines are held for at most ``batch_window`` seconds. Lines longer than
+    ``batch_bytes`` are split.
+
+    :param config: Configuration list of files, or dict with the list in
+                   "publish_file" and the options below.
+    :type config: list or dict
 
     Example configuration:
 
@@ -110,21 +129,49 @@ class FileWatchPublisher(Agent):
                     "file": "/home/volttron/tempfile.txt",
                     "topic": "temp/filepublisher",
                 }
-	        ]
+	        ],
+            "batch_lines": 1000,
+            "batch_bytes": 65536,
+            "batch_window": 1.0,
+            "read_buffer": 65536,
+            "checkpoint_file": "filewatchpublisher.checkpoint"
         }
     """
     def __init__(self, config, **kwargs):
         super(FileWatchPublisher, self).__init__(**kwargs)
-        self.config = config
+        if isinstance(config, dict):
+            options = config
+            config = config.get("publish_file", [])
+        else:
+            options = {}
+        self.read_buffer = int(options.get("read_buffer",
+                                           DEFAULT_READ_BUFFER))
+        self.batch_lines = int(options.get("batch_lines", 0))
+        self.batch_bytes = int(options.get("batch_bytes",
+                                           DEFAULT_BATCH_BYTES))
+        self.batch_window = float(options.get("batch_window",
+                                              DEFAULT_BATCH_WINDOW))
+        checkpoint_file = options.get("checkpoint_file",
+                                      DEFAULT_CHECKPOINT_FILE)
+        if checkpoint_file:
+            self.checkpoints = LogStructuredDict(checkpoint_file)
+        else:
+            self.checkpoints = {}
+
         items = config[:]
         self.file_topic = {}
-        self.file_end_position = {}
-        for item in self.config:
+        self.file_handle = {}
+        # Offset of the first byte of each file not yet read as a line.
+        self.file_offset = {}
+        self.partial_line = {}
+        self.pending_lines = {}
+        self.pending_bytes = {}
+        self.flush_timer = {}
+        for item in config:
             file =  item["file"]
             self.file_topic[file] = item["topic"]
             if os.path.isfile(file):
-                with open(file, 'r') as f:
-                    self.file_end_position[file] = self.get_end_position(f)
+                self.open_file(file)
             else:
                 _log.error("File " + file + " does not exists. Ignoring this file.")
                 items.remove(item)
@@ -141,13 +188,137 @@ class FileWatchPublisher(Agent):
                 file = item["file"]
                 self.core.spawn(watch_file_with_fullpath, file, self.read_file)
 
-    def read_file(self,file):
+    @Core.receiver('onstop')
+    def stopping(self, sender, **kwargs):
+        for file in self.file_handle.keys():
+            self.flush(file)
+            self.file_handle.pop(file).close()
+        if hasattr(self.checkpoints, 'close'):
+            self.checkpoints.close()
+
+    def open_file(self, file, from_start=False):
+        """Open a watched file and seek to where publishing resumes: the
+        saved checkpoint if it is for this file, the start of a file that
+        replaced a rotated one or the end of the file otherwise."""
+        # io files keep reading data appended after end of file is hit.
+        f = io.open(file, 'rb')
+        stat = os.fstat(f.fileno())
+        checkpoint = self.checkpoints.get(file)
+        if from_start:
+            offset = 0
+        elif (checkpoint and checkpoint[0] == stat.st_ino and
+                checkpoint[1] <= stat.st_size):
+            offset = checkpoint[1]
+        else:
+            offset = stat.st_size
+        f.seek(offset)
+        self.file_handle[file] = f
+        self.file_offset[file] = offset
+        self.partial_line[file] = ''
+
+    def read_file(self, file):
         _log.debug('loading file %s', file)
-        with open(file, 'r') as f:
-            f.seek(self.file_end_position[file])
-            for line in f:
-                self.publish_file(line.strip(),self.file_topic[file])
-            self.file_end_position[file] = self.get_end_position(f)
+        f = self.file_handle.get(file)
+        if f is None:
+            if not os.path.isfile(file):
+                return
+            self.open_file(file, from_start=True)
+            self.save_checkpoint(file, 0)
+            f = self.file_handle[file]
+        self.read_lines(file)
+
+        try:
+            stat = os.stat(file)
+        except OSError:
+            # Rotated away, the new file is opened when it is written.
+            self.close_file(file)
+            return
+
+        if stat.st_ino != os.fstat(f.fileno()).st_ino:
+            _log.info('{} was rotated, following the new file'.format(file))
+            self.close_file(file)
+            self.open_file(file, from_start=True)
+            self.save_checkpoint(file, 0)
+            self.read_lines(file)
+        elif stat.st_size < f.tell():
+            _log.info('{} was truncated, reading from the start'.format(file))
+            self.flush(file)
+            f.seek(0)
+            self.file_offset[file] = 0
+            self.partial_line[file] = ''
+            self.read_lines(file)
+
+    def close_file(self, file):
+        """Publish the rest of a file that is no longer at the watched
+        path and close it."""
+        partial = self.partial_line[file]
+        if partial:
+            self.file_offset[file] += len(partial)
+            self.partial_line[file] = ''
+            self.add_line(file, partial.strip())
+        self.flush(file)
+        self.file_handle.pop(file).close()
+
+    def read_lines(self, file):
+        """Read the new lines of a file in read_buffer sized chunks."""
+        f = self.file_handle[file]
+        topic = self.file_topic[file]
+        while True:
+            data = f.read(self.read_buffer)
+            if not data:
+                break
+            lines = (self.partial_line[file] + data).split('\n')
+            partial = lines.pop()
+            # Each line with the number of bytes it takes in the file.
+            lines = [(line, len(line) + 1) for line in lines]
+            if self.batch_lines and len(partial) >= self.batch_bytes:
+                # Split lines longer than a message to bound memory. The
+                # piece split off has no newline.
+                lines.append((partial, len(partial)))
+                partial = ''
+            self.partial_line[file] = partial
+
+            if not self.batch_lines:
+                for line, size in lines:
+                    self.file_offset[file] += size
+                    self.publish_file(line.strip(), topic)
+                self.save_checkpoint(file, self.file_offset[file])
+                continue
+
+            for line, size in lines:
+                self.file_offset[file] += size
+                self.add_line(file, line.strip())
+
+        if self.pending_lines.get(file) and file not in self.flush_timer:
+            self.flush_timer[file] = gevent.spawn_later(
+                self.batch_window, self.flush, file)
+
+    def add_line(self, file, line):
+        if not self.batch_lines:
+            self.publish_file(line, self.file_topic[file])
+            self.save_checkpoint(file, self.file_offset[file])
+            return
+        lines = self.pending_lines.setdefault(file, [])
+        lines.append(line)
+        self.pending_bytes[file] = self.pending_bytes.get(file, 0) + len(line)
+        if (len(lines) >= self.batch_lines or
+                self.pending_bytes[file] >= self.batch_bytes):
+            self.flush(file)
+
+    def flush(self, file):
+        """Publish the lines collected for a file as one message."""
+        timer = self.flush_timer.pop(file, None)
+        if timer is not None and timer is not gevent.getcurrent():
+            timer.kill(block=False)
+        lines = self.pending_lines.pop(file, None)
+        self.pending_bytes.pop(file, None)
+        if lines:
+            self.publish_lines(lines, self.file_topic[file])
+            self.save_checkpoint(file, self.file_offset[file])
+
+    def save_checkpoint(self, file, offset):
+        f = self.file_handle[file]
+        self.checkpoints[file] = [os.fstat(f.fileno()).st_ino, offset]
 
     def publish_file(self, line, topic):
         message = {'timestamp':  datetime.utcnow().isoformat() + 'Z',
@@ -156,9 +327,12 @@ class FileWatchPublisher(Agent):
         self.vip.pubsub.publish(peer="pubsub", topic=topic,
                                 message=message)
 
-    def get_end_position(self, f):
-        f.seek(0,2)
-        return f.tell()
+    def publish_lines(self, lines, topic):
+        message = {'timestamp':  datetime.utcnow().isoformat() + 'Z',
+                   'lines': lines}
+        _log.debug('publishing {} lines on topic {}'.format(len(lines), topic))
+        self.vip.pubsub.publish(peer="pubsub", topic=topic,
+                                message=message)
 
 
 def main(argv=sys.argv):
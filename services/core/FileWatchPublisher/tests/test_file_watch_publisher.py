@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""
+Pytest test cases for reading and publishing files in FileWatchPublisher
+"""
+
+import os
+
+import gevent
+import pytest
+
+from filewatchpublisher.agent import FileWatchPublisher
+
+
+class Published(list):
+    def publish(self, peer, topic, headers=None, message=None, bus=''):
+        self.append((topic, message))
+
+
+def make_agent(tmpdir, log, **options):
+    options.setdefault('checkpoint_file', str(tmpdir.join('checkpoint')))
+    options['publish_file'] = [{'file': str(log), 'topic': 'logs'}]
+    agent = FileWatchPublisher(options, address='inproc://test',
+                               enable_store=False)
+    published = Published()
+    agent.vip.pubsub.publish = published.publish
+    return agent, published
+
+
+def lines(published):
+    result = []
+    for topic, message in published:
+        assert topic == 'logs'
+        if 'lines' in message:
+            result.extend(message['lines'])
+        else:
+            result.append(message['line'])
+    return result
+
+
+@pytest.fixture
+def log(tmpdir):
+    log = tmpdir.join('app.log')
+    log.write('old line\n')
+    return log
+
+
+def test_line_per_message(tmpdir, log):
+    agent, published = make_agent(tmpdir, log, read_buffer=8)
+    log.write('first\nsecond line\nthi', mode='a')
+    agent.read_file(str(log))
+    assert lines(published) == ['first', 'second line']
+
+    log.write('rd\n', mode='a')
+    agent.read_file(str(log))
+    assert lines(published) == ['first', 'second line', 'third']
+    assert len(published) == 3
+
+
+def test_batched_by_count_and_window(tmpdir, log):
+    agent, published = make_agent(tmpdir, log, batch_lines=3,
+                                  batch_window=0.05)
+    log.write(''.join('line{}\n'.format(i) for i in range(7)), mode='a')
+    agent.read_file(str(log))
+    assert len(published) == 2
+    assert published[1][1]['lines'] == ['line3', 'line4', 'line5']
+
+    gevent.sleep(0.1)
+    assert len(published) == 3
+    assert lines(published) == ['line{}'.format(i) for i in range(7)]
+
+
+def test_batched_by_size(tmpdir, log):
+    agent, published = make_agent(tmpdir, log, batch_lines=1000,
+                                  batch_bytes=10)
+    log.write('12345\n12345\n12345\n', mode='a')
+    agent.read_file(str(log))
+    assert [message['lines'] for topic, message in published] == \
+        [['12345', '12345']]
+    agent.flush(str(log))
+    assert len(lines(published)) == 3
+
+
+def test_resume_from_checkpoint(tmpdir, log):
+    agent, published = make_agent(tmpdir, log)
+    log.write('published\n', mode='a')
+    agent.read_file(str(log))
+    agent.stopping(None)
+
+    log.write('while stopped\n', mode='a')
+    agent, published = make_agent(tmpdir, log)
+    log.write('after restart\n', mode='a')
+    agent.read_file(str(log))
+    assert lines(published) == ['while stopped', 'after restart']
+
+
+def test_resume_after_split_line(tmpdir, log):
+    agent, published = make_agent(tmpdir, log, read_buffer=10,
+                                  batch_lines=100, batch_bytes=10)
+    log.write('x' * 10 + 'y' * 10 + 'zz', mode='a')
+    agent.read_file(str(log))
+    assert lines(published) == ['x' * 10, 'y' * 10]
+    agent.stopping(None)
+
+    log.write('end\nnext\n', mode='a')
+    agent, restarted = make_agent(tmpdir, log, read_buffer=10,
+                                  batch_lines=100, batch_bytes=10)
+    agent.read_file(str(log))
+    agent.flush(str(log))
+    assert lines(restarted) == ['zzend', 'next']
+    assert ''.join(lines(published) + lines(restarted)[:1]) == \
+        log.read().split('\n')[1]
+
+
+def test_long_line_not_split_without_batching(tmpdir, log):
+    agent, published = make_agent(tmpdir, log, read_buffer=10, batch_bytes=10)
+    log.write('x' * 25 + '\n', mode='a')
+    agent.read_file(str(log))
+    assert lines(published) == ['x' * 25]
+
+
+def test_rotation(tmpdir, log):
+    agent, published = make_agent(tmpdir, log)
+    log.write('before\nend of old', mode='a')
+    os.rename(str(log), str(tmpdir.join('app.log.1')))
+    log.write('new file\n')
+    agent.read_file(str(log))
+    assert lines(published) == ['before', 'end of old', 'new file']
+
+    # Restarting after rotation resumes in the new file.
+    agent.stopping(None)
+    log.write('more\n', mode='a')
+    agent, published = make_agent(tmpdir, log)
+    agent.read_file(str(log))
+    assert lines(published) == ['more']
+
+
+def test_truncation(tmpdir, log):
+    agent, published = make_agent(tmpdir, log)
+    log.write('new\n')
+    agent.read_file(str(log))
+    assert lines(published) == ['new']
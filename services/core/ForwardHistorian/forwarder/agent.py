@@ -90,6 +90,9 @@ def historian(config_path, **kwargs):
 
     required_target_agents = config.get('required_target_agents', [])
     backup_storage_limit_gb = config.get('backup_storage_limit_gb', None)
+    backup_journal_mode = config.get('backup_journal_mode', None)
+    backup_synchronous = config.get('backup_synchronous', None)
+    capture_device_frames = config.get('capture_device_frames', False)
     origin = config.get('origin', None)
     overwrite_origin = config.get('overwrite_origin', False)
     include_origin_in_header = config.get('include_origin_in_header', False)
@@ -333,6 +336,9 @@ def historian(config_path, **kwargs):
 
     ForwardHistorian.__name__ = 'ForwardHistorian'
     return ForwardHistorian(backup_storage_limit_gb=backup_storage_limit_gb,
+                            backup_journal_mode=backup_journal_mode,
+                            backup_synchronous=backup_synchronous,
+                            capture_device_frames=capture_device_frames,
                             **kwargs)
 
 
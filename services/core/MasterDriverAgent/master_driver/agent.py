@@ -107,6 +107,10 @@ def master_driver_agent(config_path, **kwargs):
     #TODO: update the default after scalability testing.
     max_concurrent_publishes = get_config('max_concurrent_publishes', 10000)
 
+    max_pending_scrapes = get_config('max_pending_scrapes', 2)
+    max_publish_credits = get_config('max_publish_credits', 8)
+    publish_target_latency = get_config('publish_target_latency', 1.0)
+
     driver_config_list = get_config('driver_config_list')
     
     scalability_test = get_config('scalability_test', False)
@@ -125,6 +129,9 @@ def master_driver_agent(config_path, **kwargs):
                              max_open_sockets,
                              max_concurrent_publishes,
                              system_socket_limit,
+                             max_pending_scrapes,
+                             max_publish_credits,
+                             publish_target_latency,
                              heartbeat_autostart=True, **kwargs)
 
 class MasterDriverAgent(Agent):
@@ -134,6 +141,9 @@ class MasterDriverAgent(Agent):
                  max_open_sockets = None,
                  max_concurrent_publishes = 10000,
                  system_socket_limit = None,
+                 max_pending_scrapes = 2,
+                 max_publish_credits = 8,
+                 publish_target_latency = 1.0,
                  **kwargs):
         super(MasterDriverAgent, self).__init__(**kwargs)
         self.instances = {}
@@ -144,8 +154,13 @@ class MasterDriverAgent(Agent):
         except ValueError:
             self.driver_scrape_interval = 0.05
         self.system_socket_limit = system_socket_limit
+        self.max_pending_scrapes = max_pending_scrapes
+        self.max_publish_credits = max_publish_credits
+        self.publish_target_latency = publish_target_latency
         self.freed_time_slots = []
         self._name_map = {}
+        # Drivers scraped together, keyed by scrape group and interval.
+        self.scrape_groups = {}
 
 
         if scalability_test:
@@ -158,6 +173,9 @@ class MasterDriverAgent(Agent):
                                "scalability_test_iterations": scalability_test_iterations,
                                "max_open_sockets": max_open_sockets,
                                "max_concurrent_publishes": max_concurrent_publishes,
+                               "max_pending_scrapes": max_pending_scrapes,
+                               "max_publish_credits": max_publish_credits,
+                               "publish_target_latency": publish_target_latency,
                                "driver_scrape_interval": driver_scrape_interval}
 
         self.vip.config.set_default("config", self.default_config)
@@ -196,6 +214,10 @@ class MasterDriverAgent(Agent):
                     _log.info("maximum concurrent driver publishes limited to " + str(max_concurrent_publishes))
                 configure_publish_lock(max_concurrent_publishes)
 
+                self.max_pending_scrapes = int(config["max_pending_scrapes"])
+                self.max_publish_credits = int(config["max_publish_credits"])
+                self.publish_target_latency = float(config["publish_target_latency"])
+
                 self.scalability_test = bool(config["scalability_test"])
                 self.scalability_test_iterations = int(config["scalability_test_iterations"])
 
@@ -217,6 +239,20 @@ class MasterDriverAgent(Agent):
             if self.max_concurrent_publishes != config["max_concurrent_publishes"]:
                 _log.info("The master driver must be restarted for changes to the max_concurrent_publishes setting to take effect")
 
+            try:
+                queue_settings = (int(config["max_pending_scrapes"]),
+                                  int(config["max_publish_credits"]),
+                                  float(config["publish_target_latency"]))
+            except ValueError as e:
+                _log.error("ERROR PROCESSING CONFIGURATION: {}".format(e))
+            else:
+                if queue_settings != (self.max_pending_scrapes,
+                                      self.max_publish_credits,
+                                      self.publish_target_latency):
+                    (self.max_pending_scrapes, self.max_publish_credits,
+                     self.publish_target_latency) = queue_settings
+                    _log.info("Publish queue settings take effect for drivers started or updated from now on")
+
             if self.scalability_test != bool(config["scalability_test"]):
                 if not self.scalability_test:
                     _log.info(
@@ -280,6 +316,16 @@ class MasterDriverAgent(Agent):
         bisect.insort(self.freed_time_slots, driver.time_slot)
 
 
+    def join_scrape_group(self, driver, group):
+        self.scrape_groups.setdefault(group, []).append(driver)
+
+    def leave_scrape_group(self, driver, group):
+        drivers = self.scrape_groups.get(group, [])
+        if driver in drivers:
+            drivers.remove(driver)
+        if not drivers:
+            self.scrape_groups.pop(group, None)
+
     def update_driver(self, config_name, action, contents):
         topic = self.derive_device_topic(config_name)
         self.stop_driver(topic)
@@ -364,6 +410,13 @@ class MasterDriverAgent(Agent):
         for device in self.instances.values():
             device.heart_beat()
             
+    @RPC.export
+    def get_publish_metrics(self):
+        """Queue depth, publish latency and counters of each driver's
+        publish queue keyed by device topic."""
+        return {topic: driver.publish_queue.metrics()
+                for topic, driver in self.instances.iteritems()}
+
     @RPC.export
     def revert_point(self, path, point_name, **kwargs):
         self.instances[path].revert_point(point_name, **kwargs)
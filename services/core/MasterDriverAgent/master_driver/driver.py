@@ -59,7 +59,6 @@ from volttron.platform.agent import utils
 from zmq.utils import jsonapi
 import logging
 import sys
-import random
 import gevent
 from volttron.platform.messaging import headers as headers_mod
 from volttron.platform.messaging.topics import (DRIVER_TOPIC_BASE, 
@@ -69,8 +68,7 @@ from volttron.platform.messaging.topics import (DRIVER_TOPIC_BASE,
 
 from volttron.platform.messaging import topics
 
-from volttron.platform.vip.agent.errors import VIPError, Again
-from driver_locks import publish_lock
+from publish_queue import PublishQueue
 import datetime
 
 utils.setup_logging()
@@ -99,6 +97,13 @@ class DriverAgent(BasicAgent):
 
         self.interval = interval
         self.periodic_read_event = None
+        self.scrape_group = None
+
+        self.publish_queue = PublishQueue(
+            self._publish_batch, device_path,
+            max_pending=parent.max_pending_scrapes,
+            max_credits=parent.max_publish_credits,
+            target_latency=parent.publish_target_latency)
 
         self.update_scrape_schedule(time_slot, driver_scrape_interval)
 
@@ -158,6 +163,11 @@ class DriverAgent(BasicAgent):
     @Core.receiver('onstart')
     def starting(self, sender, **kwargs):
         self.setup_device()
+
+        group = self.interface.get_scrape_group()
+        if group is not None:
+            self.scrape_group = (group, self.interval)
+            self.parent.join_scrape_group(self, self.scrape_group)
         
         # interval = self.config.get("interval", 60)
         # self.core.periodic(interval, self.periodic_read, wait=None)
@@ -168,6 +178,17 @@ class DriverAgent(BasicAgent):
             
         self.all_path_depth, self.all_path_breadth = self.get_paths_for_point(DRIVER_TOPIC_ALL)
 
+    @Core.receiver('onstop')
+    def stopping(self, sender, **kwargs):
+        if self.scrape_group is not None:
+            self.parent.leave_scrape_group(self, self.scrape_group)
+            self.scrape_group = None
+        self.publish_queue.stop()
+        # Interfaces that hold connections open between scrapes close them here.
+        close = getattr(getattr(self, 'interface', None), 'close', None)
+        if close is not None:
+            close()
+
 
     def setup_device(self):
 
@@ -236,14 +257,42 @@ class DriverAgent(BasicAgent):
 
         self.periodic_read_event = self.core.schedule(next_scrape_time, self.periodic_read, next_scrape_time)
 
-        _log.debug("scraping device: " + self.device_name)
-        
-        self.parent.scrape_starting(self.device_name)
-        
+        group = self.scrape_group
+        if group is None:
+            _log.debug("scraping device: " + self.device_name)
+
+            self.parent.scrape_starting(self.device_name)
+
+            try:
+                results = self.interface.scrape_all()
+            except Exception as ex:
+                results = ex
+            self.publish_scrape(results)
+            return
+
+        drivers = list(self.parent.scrape_groups.get(group, [self]))
+        if drivers[0] is not self:
+            # The first device in the group scrapes the others with it.
+            return
+
+        _log.debug("scraping devices: " + ', '.join(d.device_name for d in drivers))
+
+        for driver in drivers:
+            self.parent.scrape_starting(driver.device_name)
+
         try:
-            results = self.interface.scrape_all()
+            results = self.interface.scrape_group([d.interface for d in drivers])
         except Exception as ex:
-            _log.error('Failed to scrape ' + self.device_name + ': ' + str(ex))
+            results = [ex] * len(drivers)
+
+        for driver, result in zip(drivers, results):
+            # Skip devices stopped during the scrape.
+            if driver.scrape_group == group:
+                driver.publish_scrape(result)
+
+    def publish_scrape(self, results):
+        if isinstance(results, Exception):
+            _log.error('Failed to scrape ' + self.device_name + ': ' + str(results))
             return
         
         # XXX: Does a warning need to be printed?
@@ -260,57 +309,36 @@ class DriverAgent(BasicAgent):
         
             
 
+        messages = []
         if self.publish_depth_first or self.publish_breadth_first:
             for point, value in results.iteritems():
                 depth_first_topic, breadth_first_topic = self.get_paths_for_point(point)
                 message = [value, self.meta_data[point]]
-                   
-                if self.publish_depth_first:  
-                    self._publish_wrapper(depth_first_topic, 
-                                          headers=headers, 
-                                          message=message)
-                
+
+                if self.publish_depth_first:
+                    messages.append((depth_first_topic, headers, message))
+
                 if self.publish_breadth_first:
-                    self._publish_wrapper(breadth_first_topic, 
-                                          headers=headers, 
-                                          message=message)
-         
-        message = [results, self.meta_data] 
+                    messages.append((breadth_first_topic, headers, message))
+
+        message = [results, self.meta_data]
         if self.publish_depth_first_all:
-            self._publish_wrapper(self.all_path_depth, 
-                                  headers=headers, 
-                                  message=message)
-        
-        if self.publish_breadth_first_all: 
-            self._publish_wrapper(self.all_path_breadth, 
-                                  headers=headers, 
-                                  message=message)
+            messages.append((self.all_path_depth, headers, message))
+
+        if self.publish_breadth_first_all:
+            messages.append((self.all_path_breadth, headers, message))
+
+        if messages:
+            # Queued so a busy message bus does not hold up scrapes.
+            self.publish_queue.put(messages)
 
         self.parent.scrape_ending(self.device_name)
         
         
-    def _publish_wrapper(self, topic, headers, message):
-        while True:
-            try:
-                with publish_lock():
-                    _log.debug("publishing: " + topic)
-                    self.vip.pubsub.publish('pubsub', 
-                                        topic, 
-                                        headers=headers, 
-                                        message=message).get(timeout=10.0)
-                                        
-                    _log.debug("finish publishing: " + topic)
-            except gevent.Timeout:
-                _log.warn("Did not receive confirmation of publish to "+topic)
-                break                           
-            except Again:
-                _log.warn("publish delayed: " + topic + " pubsub is busy")
-                gevent.sleep(random.random())
-            except VIPError as ex:
-                _log.warn("driver failed to publish " + topic + ": " + str(ex))
-                break
-            else:
-                break
+    def _publish_batch(self, messages):
+        _log.debug("publishing {} topics for {}".format(
+            len(messages), self.device_name))
+        return self.vip.pubsub.publish_batch('pubsub', messages)
             
     
     def heart_beat(self):
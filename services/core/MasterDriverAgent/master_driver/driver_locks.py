@@ -57,15 +57,18 @@ from gevent.lock import BoundedSemaphore, DummySemaphore
 from contextlib import contextmanager
 
 _socket_lock = None
+_persistent_socket_lock = None
 
 def configure_socket_lock(max_connections=0):
-    global _socket_lock
+    global _socket_lock, _persistent_socket_lock
     if _socket_lock is not None:
         raise RuntimeError("socket_lock already configured!")
     if max_connections < 1:
         _socket_lock = DummySemaphore()
+        _persistent_socket_lock = DummySemaphore()
     else:
         _socket_lock = BoundedSemaphore(max_connections)
+        _persistent_socket_lock = BoundedSemaphore(max_connections // 2)
 
 @contextmanager        
 def socket_lock():
@@ -77,7 +80,37 @@ def socket_lock():
         yield 
     finally:
         _socket_lock.release()
+
+def acquire_socket():
+    """Claim a socket slot, waiting for one to be free. Used by connections
+    that outlive a single with block. Release with release_socket."""
+    if _socket_lock is None:
+        raise RuntimeError("socket_lock not configured!")
+    _socket_lock.acquire()
+
+def release_socket():
+    _socket_lock.release()
         
+def acquire_persistent_socket():
+    """Try to claim a socket slot to hold open between requests.
+
+    At most half of the socket limit may be held by persistent connections
+    so that devices without one can still open a socket for each request.
+    Never blocks. Returns True if a slot was claimed.
+    """
+    if _socket_lock is None:
+        raise RuntimeError("socket_lock not configured!")
+    if not _persistent_socket_lock.acquire(blocking=False):
+        return False
+    if not _socket_lock.acquire(blocking=False):
+        _persistent_socket_lock.release()
+        return False
+    return True
+
+def release_persistent_socket():
+    _socket_lock.release()
+    _persistent_socket_lock.release()
+
 _publish_lock = None
 
 def configure_publish_lock(max_connections=0):
@@ -129,6 +129,11 @@ the Master Driver Agent. When a scrape starts the Master Driver Agent calls the
 :py:meth:`BaseInterface.scrape_all`. It will take the results of the
 call and attach meta data and and publish as needed.
 
+Devices that share a connection can be scraped together. If
+:py:meth:`BaseInterface.get_scrape_group` returns the same key for several
+devices with the same scrape interval the Master Driver Agent scrapes them
+all at once with :py:meth:`BaseInterface.scrape_group`.
+
 Device Interaction
 ------------------
 
@@ -379,6 +384,35 @@ class BaseInterface(object):
         :return: Point names to values for device.
         :rtype: dict
         """
+
+    def get_scrape_group(self):
+        """
+        Get the key shared by devices that should be scraped together.
+
+        :return: A hashable key, or None to scrape this device by itself.
+        """
+        return None
+
+    @classmethod
+    def scrape_group(cls, interfaces):
+        """
+        Method the Master Driver Agent calls to get the current state of
+        several devices in the same scrape group.
+
+        The default calls :py:meth:`BaseInterface.scrape_all` on each one.
+
+        :param interfaces: Interfaces with the same scrape group.
+        :type interfaces: list
+        :return: Point names to values, or the exception raised, for each device.
+        :rtype: list
+        """
+        results = []
+        for interface in interfaces:
+            try:
+                results.append(interface.scrape_all())
+            except Exception as e:
+                results.append(e)
+        return results
     
     @abc.abstractmethod        
     def revert_all(self, **kwargs):
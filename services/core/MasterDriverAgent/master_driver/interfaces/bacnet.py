@@ -58,12 +58,17 @@ import logging
 
 from datetime import datetime, timedelta
 
+import gevent
+
 from master_driver.driver_exceptions import DriverConfigError
 from volttron.platform.vip.agent import errors
+from volttron.platform.messaging import topics
 
 #Logging is completely configured by now.
 _log = logging.getLogger(__name__)
 
+COV_LIFETIME = 1800
+
 
 
 class Register(BaseRegister):
@@ -94,8 +99,52 @@ class Interface(BaseInterface):
         
         self.ping_retry_interval = timedelta(seconds=config_dict.get("ping_retry_interval", 5.0))   
         self.scheduled_ping = None
+
+        self.use_cov = bool(config_dict.get("use_cov", False))
+        self.cov_lifetime = int(config_dict.get("cov_lifetime", COV_LIFETIME))
+        self.cov_topic = topics.BACNET_COV(address=self.target_address)
+        self.cov_points = set()
+        self.cov_values = {}
+        self.scheduled_cov = None
         
         self.ping_target()
+
+        if self.use_cov:
+            self.vip.pubsub.subscribe('pubsub', self.cov_topic, self.cov_update).get(timeout=10.0)
+            self.subscribe_cov()
+
+    def close(self):
+        if self.scheduled_cov is not None:
+            self.scheduled_cov.cancel()
+            self.scheduled_cov = None
+        if self.use_cov:
+            self.vip.pubsub.unsubscribe('pubsub', self.cov_topic, self.cov_update)
+
+    def subscribe_cov(self):
+        """Subscribe, or renew the subscription, to value changes of the
+        points on the device. Points that are subscribed to are served from
+        the values pushed by the proxy instead of being polled."""
+        self.scheduled_cov = None
+        try:
+            subscribed = self.vip.rpc.call(self.proxy_address, 'subscribe_cov',
+                                           self.target_address, self.get_point_map(),
+                                           self.cov_lifetime).get(timeout=30.0)
+        except (errors.VIPError, gevent.Timeout) as e:
+            _log.warning("Unable to subscribe to value changes on {}: {}".format(self.target_address, e))
+            subscribed = []
+
+        for point_name in self.cov_points.difference(subscribed):
+            self.cov_values.pop(point_name, None)
+        self.cov_points = set(subscribed)
+
+        next_try = datetime.now() + timedelta(seconds=self.cov_lifetime / 2.0)
+        self.scheduled_cov = self.core.schedule(next_try, self.subscribe_cov)
+
+    def cov_update(self, peer, sender, bus, topic, headers, message):
+        #Subscriptions match on prefix, so this may be another device.
+        if topic != self.cov_topic:
+            return
+        self.cov_values.update(message)
         
     def schedule_ping(self):
         if self.scheduled_ping is None:
@@ -153,7 +202,7 @@ class Interface(BaseInterface):
         result = self.vip.rpc.call(self.proxy_address, 'write_property', *args).get(timeout=10.0)
         return result
         
-    def scrape_all(self):
+    def get_point_map(self):
         #TODO: support reading from an array.
         point_map = {}
         read_registers = self.get_registers_by_type("byte", True)
@@ -162,11 +211,25 @@ class Interface(BaseInterface):
             point_map[register.point_name] = [register.object_type, 
                                               register.instance_number, 
                                               register.property]
+        return point_map
+        
+    def scrape_all(self):
+        point_map = self.get_point_map()
+        result = {}
+
+        #Serve points with a subscription from the last pushed value.
+        for point_name in self.cov_points:
+            if point_name in self.cov_values:
+                result[point_name] = self.cov_values[point_name]
+                point_map.pop(point_name, None)
+
+        if not point_map:
+            return result
         
         try:
-            result = self.vip.rpc.call(self.proxy_address, 'read_properties', 
-                                           self.target_address, point_map,
-                                           self.max_per_request).get(timeout=10.0)
+            result.update(self.vip.rpc.call(self.proxy_address, 'read_properties', 
+                                            self.target_address, point_map,
+                                            self.max_per_request).get(timeout=10.0))
         except errors.Unreachable:
             _log.warning("Unable to reach BACnet proxy.")
             self.schedule_ping()
@@ -55,6 +55,10 @@ from pymodbus.client.sync import ModbusTcpClient as SyncModbusClient
 from pymodbus.exceptions import ConnectionException, ModbusIOException, ModbusException
 from pymodbus.pdu import ExceptionResponse
 from pymodbus.constants import Defaults
+from pymodbus.client.common import ModbusClientMixin
+from pymodbus.factory import ClientDecoder
+from pymodbus.bit_read_message import ReadCoilsRequest, ReadDiscreteInputsRequest
+from pymodbus.register_read_message import ReadHoldingRegistersRequest, ReadInputRegistersRequest
 from volttron.platform.agent import utils
 
 from master_driver.interfaces import BaseInterface, BaseRegister, BasicRevert, DriverInterfaceError
@@ -64,9 +68,16 @@ import logging
 from csv import DictReader
 from StringIO import StringIO
 import os.path
+import socket
+from operator import attrgetter
+
+import gevent
+from gevent.event import AsyncResult
+from gevent.lock import BoundedSemaphore, Semaphore
 
 from contextlib import contextmanager, closing
-from master_driver.driver_locks import socket_lock
+from master_driver.driver_locks import (socket_lock, acquire_socket, release_socket,
+                                        acquire_persistent_socket, release_persistent_socket)
 
 @contextmanager
 def modbus_client(address, port):
@@ -82,7 +93,16 @@ _log = logging.getLogger(__name__)
 
 MODBUS_REGISTER_SIZE = 2
 MODBUS_READ_MAX = 100
+MODBUS_READ_GAP = 10
+MODBUS_IDLE_TIMEOUT = 120
+MODBUS_PIPELINE_DEPTH = 16
 PYMODBUS_REGISTER_STRUCT = struct.Struct('>H')
+MBAP_HEADER_STRUCT = struct.Struct('>HHHB')
+
+READ_REQUESTS = ((('byte', True), ReadInputRegistersRequest),
+                 (('byte', False), ReadHoldingRegistersRequest),
+                 (('bit', True), ReadDiscreteInputsRequest),
+                 (('bit', False), ReadCoilsRequest))
 
 path = os.path.dirname(os.path.abspath(__file__))
 configFile = os.path.join(path, "example.csv")
@@ -91,6 +111,220 @@ configFile = os.path.join(path, "example.csv")
 class ModbusInterfaceException(ModbusException):
     pass
 
+
+def plan_read_blocks(registers, max_gap=MODBUS_READ_GAP, max_count=MODBUS_READ_MAX):
+    """Group registers into as few read requests as possible.
+
+    Registers are merged into one block while the unused addresses between
+    them number no more than max_gap and the block spans no more than
+    max_count addresses.
+
+    Returns a list of (start, count, registers) tuples.
+    """
+    blocks = []
+    for register in sorted(registers, key=attrgetter('address')):
+        start = register.address
+        end = start + register.get_register_count()
+        if blocks:
+            block = blocks[-1]
+            block_start, block_end = block[0], block[1]
+            new_end = max(block_end, end)
+            if start - block_end <= max_gap and new_end - block_start <= max_count:
+                block[1] = new_end
+                block[2].append(register)
+                continue
+        blocks.append([start, end, [register]])
+
+    return [(start, end - start, members) for start, end, members in blocks]
+
+
+class ModbusGateway(ModbusClientMixin):
+    """Connection to a Modbus TCP address shared by every device (slave ID)
+    behind it.
+
+    Requests from all devices are written to one socket, up to
+    max_pipelined at a time, and matched to their responses by transaction
+    ID. The socket is closed after idle_timeout seconds without requests.
+    If idle_timeout is 0, or no persistent socket slot is free, it is
+    closed as soon as no requests are outstanding.
+    """
+    def __init__(self, address, port, idle_timeout=MODBUS_IDLE_TIMEOUT,
+                 max_pipelined=MODBUS_PIPELINE_DEPTH, timeout=Defaults.Timeout):
+        self.address = address
+        self.port = port
+        self.idle_timeout = idle_timeout
+        self.max_pipelined = max_pipelined
+        self.timeout = timeout
+        self.references = 0
+        self._decoder = ClientDecoder()
+        self._socket = None
+        self._reader = None
+        self._persistent = False
+        self._pending = {}
+        self._transaction_id = 0
+        self._users = 0
+        self._idle_timer = None
+        self._send_lock = Semaphore()
+        self._window = BoundedSemaphore(max_pipelined)
+
+    def execute(self, request):
+        return self.execute_many([request])[0]
+
+    def execute_many(self, requests):
+        """Send requests without waiting for each response in turn.
+        Returns the responses in request order."""
+        self._users += 1
+        self._cancel_idle_timer()
+        try:
+            results = []
+            for request in requests:
+                self._window.acquire()
+                try:
+                    result = self._send(request)
+                except Exception:
+                    self._window.release()
+                    raise
+                results.append(result)
+                if result.ready() and not result.successful():
+                    # The connection failed. Don't reconnect for the rest.
+                    break
+            return [self._wait(result) for result in results]
+        finally:
+            self._users -= 1
+            if not self._users:
+                self._release_idle()
+
+    def _send(self, request):
+        with self._send_lock:
+            if self._socket is None:
+                self._connect()
+            self._transaction_id = (self._transaction_id + 1) & 0xFFFF
+            transaction_id = self._transaction_id
+            request.transaction_id = transaction_id
+            result = AsyncResult()
+            self._pending[transaction_id] = result
+            pdu = chr(request.function_code) + request.encode()
+            frame = MBAP_HEADER_STRUCT.pack(transaction_id, 0, len(pdu) + 1, request.unit_id) + pdu
+            try:
+                self._socket.sendall(frame)
+            except socket.error as e:
+                self._fail(ConnectionException(str(e)))
+            return result
+
+    def _wait(self, result):
+        result.wait(self.timeout)
+        if not result.ready():
+            self._fail(ConnectionException("No response from {}:{} after {} seconds".format(
+                self.address, self.port, self.timeout)))
+        return result.get()
+
+    def _connect(self):
+        self._persistent = self.idle_timeout > 0 and acquire_persistent_socket()
+        if not self._persistent:
+            acquire_socket()
+        try:
+            sock = socket.create_connection((self.address, self.port), self.timeout)
+        except socket.error as e:
+            self._release_slot()
+            raise ConnectionException("Failed to connect to {}:{} {}".format(self.address, self.port, e))
+        sock.settimeout(None)
+        self._socket = sock
+        self._reader = gevent.spawn(self._read, sock)
+
+    def _read(self, sock):
+        try:
+            while True:
+                header = self._recv_exactly(sock, MBAP_HEADER_STRUCT.size)
+                transaction_id, _, length, unit = MBAP_HEADER_STRUCT.unpack(header)
+                pdu = self._recv_exactly(sock, length - 1)
+                result = self._pending.pop(transaction_id, None)
+                if result is None:
+                    continue
+                self._window.release()
+                response = self._decoder.decode(pdu)
+                if response is None:
+                    result.set_exception(ModbusIOException("Unable to decode response"))
+                else:
+                    response.transaction_id = transaction_id
+                    response.unit_id = unit
+                    result.set(response)
+        except (socket.error, ModbusException) as e:
+            if sock is self._socket:
+                self._fail(ConnectionException(str(e)))
+
+    @staticmethod
+    def _recv_exactly(sock, size):
+        data = ''
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionException("Connection closed by device")
+            data += chunk
+        return data
+
+    def _fail(self, exc):
+        """Close the socket and fail every outstanding request with exc."""
+        sock, self._socket = self._socket, None
+        reader, self._reader = self._reader, None
+        if sock is not None:
+            if reader is not None and reader is not gevent.getcurrent():
+                reader.kill(block=False)
+            sock.close()
+            self._release_slot()
+        pending, self._pending = self._pending, {}
+        for result in pending.itervalues():
+            self._window.release()
+            result.set_exception(exc)
+
+    def _release_slot(self):
+        if self._persistent:
+            release_persistent_socket()
+        else:
+            release_socket()
+        self._persistent = False
+
+    def _release_idle(self):
+        if self._socket is None:
+            return
+        if self._persistent:
+            self._idle_timer = gevent.spawn_later(self.idle_timeout, self._idle_close)
+        else:
+            self.close()
+
+    def _cancel_idle_timer(self):
+        if self._idle_timer is not None:
+            self._idle_timer.kill(block=False)
+            self._idle_timer = None
+
+    def _idle_close(self):
+        self._idle_timer = None
+        if not self._users:
+            self.close()
+
+    def close(self):
+        self._cancel_idle_timer()
+        self._fail(ConnectionException("Connection closed"))
+
+
+_gateways = {}
+
+def get_gateway(address, port, **kwargs):
+    """Returns the ModbusGateway for address and port, creating it with
+    kwargs if no other device uses it yet."""
+    key = (address, port)
+    gateway = _gateways.get(key)
+    if gateway is None:
+        gateway = _gateways[key] = ModbusGateway(address, port, **kwargs)
+    gateway.references += 1
+    return gateway
+
+def release_gateway(gateway):
+    gateway.references -= 1
+    if gateway.references < 1:
+        gateway.close()
+        _gateways.pop((gateway.address, gateway.port), None)
+
+
 class ModbusRegisterBase(BaseRegister):
     def __init__(self, address, register_type, read_only, pointName, units, description = '', slave_id=0):
         super(ModbusRegisterBase, self).__init__(register_type, read_only, pointName, units, description = '')
@@ -186,12 +420,31 @@ class Interface(BasicRevert, BaseInterface):
     def __init__(self, **kwargs):
         super(Interface, self).__init__(**kwargs)
         self.build_ranges_map()
+        self.read_blocks = {}
+        self.max_read_gap = MODBUS_READ_GAP
+        self.max_read_count = MODBUS_READ_MAX
+        self.gateway = None
         
     def configure(self, config_dict, registry_config_str):
         self.slave_id=config_dict.get("slave_id", 0)
         self.ip_address = config_dict["device_address"]
         self.port = config_dict.get("port", Defaults.Port)
+        self.max_read_gap = int(config_dict.get("max_read_gap", MODBUS_READ_GAP))
+        self.max_read_count = int(config_dict.get("max_read_count", MODBUS_READ_MAX))
+        idle_timeout = float(config_dict.get("connection_idle_timeout", MODBUS_IDLE_TIMEOUT))
+        max_pipelined = int(config_dict.get("max_pipelined_requests", MODBUS_PIPELINE_DEPTH))
+        self.gateway = get_gateway(self.ip_address, self.port,
+                                   idle_timeout=idle_timeout, max_pipelined=max_pipelined)
         self.parse_config(registry_config_str) 
+
+    def close(self):
+        if self.gateway is not None:
+            release_gateway(self.gateway)
+            self.gateway = None
+
+    def get_scrape_group(self):
+        # Devices behind the same gateway are scraped in one batch.
+        return self.gateway
         
     def build_ranges_map(self):
         self.register_ranges = {('byte',True):[None,None],
@@ -203,6 +456,7 @@ class Interface(BasicRevert, BaseInterface):
         super(Interface, self).insert_register(register)
         
         register_type = register.get_register_type()
+        self.read_blocks.pop(register_type, None)
         
         register_range = self.register_ranges[register_type]    
         register_count = register.get_register_count()
@@ -217,90 +471,115 @@ class Interface(BasicRevert, BaseInterface):
             if register_range[1] < end:
                 register_range[1] = end        
         
+    @contextmanager
+    def client(self):
+        if self.gateway is None:
+            with modbus_client(self.ip_address, self.port) as client:
+                yield client
+        else:
+            yield self.gateway
+
+    def get_read_blocks(self, register_type):
+        blocks = self.read_blocks.get(register_type)
+        if blocks is None:
+            blocks = plan_read_blocks(self.registers[register_type],
+                                      self.max_read_gap, self.max_read_count)
+            self.read_blocks[register_type] = blocks
+        return blocks
+        
     def get_point(self, point_name):    
         register = self.get_register_by_name(point_name)
-        with modbus_client(self.ip_address, self.port) as client:
-            try:
+        try:
+            with self.client() as client:
                 result = register.get_state(client)
-            except (ConnectionException, ModbusIOException, ModbusInterfaceException):
-                result = None
+        except (ConnectionException, ModbusIOException, ModbusInterfaceException):
+            result = None
         return result
     
     def _set_point(self, point_name, value):    
         register = self.get_register_by_name(point_name)
-        with modbus_client(self.ip_address, self.port) as client:
-            try:
+        try:
+            with self.client() as client:
                 result = register.set_state(client, value)
-            except (ConnectionException, ModbusIOException, ModbusInterfaceException):
-                result = None
+        except (ConnectionException, ModbusIOException, ModbusInterfaceException):
+            result = None
         return result
     
-    def scrape_byte_registers(self, client, read_only):
-        result_dict = {}
-        start, end = self.register_ranges[('byte',read_only)]
-        registers = self.registers[('byte',read_only)]
-        
-        if not registers:
-            return result_dict
-        
-        result = ''
+    def read_requests(self):
+        """Returns the requests for one scrape of the device, each paired
+        with the register type, block start and registers it reads."""
+        requests = []
+        for register_type, request_class in READ_REQUESTS:
+            for start, count, registers in self.get_read_blocks(register_type):
+                request = request_class(start, count, unit=self.slave_id)
+                requests.append((request, register_type, start, registers))
+        return requests
         
-        for group in xrange(start, end + 1, MODBUS_READ_MAX):
-            count = min(end - group + 1, MODBUS_READ_MAX)            
-            response = client.read_input_registers(group, count, unit=self.slave_id) if read_only else client.read_holding_registers(group, count, unit=self.slave_id)
-            if response is None:
-                raise ModbusInterfaceException("pymodbus returned None")
-            response_bytes = response.encode()
-            result += response_bytes[1:]
-            
-        for register in registers:
-            point = register.point_name
-            value = register.parse_value(start, result)
-            result_dict[point] = value
-            
-        return result_dict
-    
-    def scrape_bit_registers(self, client, read_only):
+    def _scrape_all(self):
+        requests = self.read_requests()
+        try:
+            with self.client() as client:
+                execute_many = getattr(client, 'execute_many', None)
+                pdus = [request for request, _, _, _ in requests]
+                if execute_many is not None:
+                    responses = execute_many(pdus)
+                else:
+                    responses = [client.execute(request) for request in pdus]
+            return self.parse_responses(requests, responses)
+        except (ConnectionException, ModbusIOException, ModbusInterfaceException) as e:
+            raise self.scrape_error(e)
+
+    @classmethod
+    def scrape_group(cls, interfaces):
+        """Scrapes devices behind the same gateway with one execute_many
+        call for the read requests of all of them."""
+        requests = [interface.read_requests() for interface in interfaces]
+        pdus = [request for device_requests in requests
+                for request, _, _, _ in device_requests]
+        try:
+            responses = interfaces[0].gateway.execute_many(pdus)
+        except (ConnectionException, ModbusIOException, ModbusInterfaceException) as e:
+            return [interface.scrape_error(e) for interface in interfaces]
+
+        results = []
+        index = 0
+        for interface, device_requests in zip(interfaces, requests):
+            device_responses = responses[index:index + len(device_requests)]
+            index += len(device_requests)
+            try:
+                result = interface.parse_responses(device_requests, device_responses)
+            except ModbusInterfaceException as e:
+                results.append(interface.scrape_error(e))
+                continue
+            interface._update_clean_values(result)
+            results.append(result)
+        return results
+
+    def parse_responses(self, requests, responses):
+        """Returns the point values read by the responses to read_requests()."""
         result_dict = {}
-        start, end = self.register_ranges[('bit',read_only)]
-        registers = self.registers[('bit',read_only)]
-        
-        if not registers:
-            return result_dict
-        
-        result = []
-        
-        for group in xrange(start, end + 1, MODBUS_READ_MAX):
-            count = min(end - group + 1, MODBUS_READ_MAX)            
-            response = client.read_discrete_inputs(group, count, unit=self.slave_id) if read_only else client.read_coils(group, count, unit=self.slave_id)
+        for (_, register_type, start, registers), response in zip(requests, responses):
             if response is None:
                 raise ModbusInterfaceException("pymodbus returned None")
-            result += response.bits
-            
-        for register in registers:
-            point = register.point_name
-            value = register.parse_value(start, result)
-            result_dict[point] = value
-            
-        return result_dict
-        
-    def _scrape_all(self):
-        result_dict={}
-        with modbus_client(self.ip_address, self.port) as client:
-            try:
-                
-                result_dict.update(self.scrape_byte_registers(client, True))
-                result_dict.update(self.scrape_byte_registers(client, False))
-                
-                result_dict.update(self.scrape_bit_registers(client, True))
-                result_dict.update(self.scrape_bit_registers(client, False))
-            except (ConnectionException, ModbusIOException, ModbusInterfaceException) as e:
-                raise DriverInterfaceError ("Failed to scrape device at " + 
-                           self.ip_address + ":" + str(self.port) + " " + 
-                           "ID: " + str(self.slave_id) + str(e))
-                
+            if isinstance(response, (ExceptionResponse, ModbusException)):
+                raise ModbusInterfaceException(str(response))
+            if register_type[0] == 'bit':
+                result = response.bits
+            else:
+                #skip the result count
+                result = response.encode()[1:]
+
+            for register in registers:
+                point = register.point_name
+                value = register.parse_value(start, result)
+                result_dict[point] = value
         return result_dict
-    
+
+    def scrape_error(self, e):
+        return DriverInterfaceError("Failed to scrape device at " +
+                                    self.ip_address + ":" + str(self.port) + " " +
+                                    "ID: " + str(self.slave_id) + str(e))
+
     def parse_config(self, configDict):
         if configDict is None:
             return
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+#
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation are those
+# of the authors and should not be interpreted as representing official policies,
+# either expressed or implied, of the FreeBSD Project.
+#
+
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization
+# that has cooperated in the development of these materials, makes
+# any warranty, express or implied, or assumes any legal liability
+# or responsibility for the accuracy, completeness, or usefulness or
+# any information, apparatus, product, software, or process disclosed,
+# or represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does
+# not necessarily constitute or imply its endorsement, recommendation,
+# r favoring by the United States Government or any agency thereof,
+# or Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+
+#}}}
+
+
+import logging
+import random
+import time
+from collections import deque, OrderedDict
+
+import gevent
+from gevent.event import Event
+
+from volttron.platform.vip.agent.errors import VIPError, Again
+from driver_locks import publish_lock
+
+_log = logging.getLogger(__name__)
+
+
+class PublishQueue(object):
+    """Outbound publish queue for a single driver.
+
+    Scrapes are queued with put() and never wait on the message bus. A
+    sender greenlet publishes queued scrapes as soon as credits allow. The
+    number of credits is the number of publishes that may wait for an
+    acknowledgement from the pubsub service at the same time. Credits grow
+    slowly while acknowledgements arrive within target_latency and are
+    halved when they are late or lost.
+
+    If the bus cannot keep up and max_pending scrapes are already queued,
+    a new scrape is merged into the newest queued scrape. Newer values
+    replace older values of the same topic, so stale scrapes are dropped
+    instead of piling up.
+    """
+
+    def __init__(self, publish, name, max_pending=2, max_credits=8,
+                 target_latency=1.0, timeout=10.0):
+        self._publish = publish
+        self.name = name
+        self.max_pending = max(1, int(max_pending))
+        self.max_credits = max(1, int(max_credits))
+        self.target_latency = float(target_latency)
+        self.timeout = float(timeout)
+
+        self._pending = deque()
+        self._window = 1.0
+        self._in_flight = 0
+        self._wake = Event()
+        self._sender = None
+
+        self.published = 0
+        self.merged = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.last_latency = None
+        self.average_latency = None
+        self.max_latency = None
+
+    @property
+    def credits(self):
+        return min(int(self._window), self.max_credits)
+
+    def put(self, messages):
+        """Queue the (topic, headers, message) tuples of one scrape."""
+        if len(self._pending) >= self.max_pending:
+            self._pending[-1] = self._merge(self._pending[-1], messages)
+            self.merged += 1
+            if self.merged == 1 or not self.merged % 100:
+                _log.warning("{}: message bus is saturated, merged {} stale "
+                             "scrapes".format(self.name, self.merged))
+        else:
+            self._pending.append(messages)
+        if self._sender is None:
+            self._sender = gevent.spawn(self._run)
+        self._wake.set()
+
+    def stop(self):
+        if self._sender is not None:
+            self._sender.kill()
+            self._sender = None
+        self._pending.clear()
+
+    def metrics(self):
+        return {'queue_depth': len(self._pending),
+                'in_flight': self._in_flight,
+                'credits': self.credits,
+                'published': self.published,
+                'merged': self.merged,
+                'timeouts': self.timeouts,
+                'errors': self.errors,
+                'last_latency': self.last_latency,
+                'average_latency': self.average_latency,
+                'max_latency': self.max_latency}
+
+    @staticmethod
+    def _merge(older, newer):
+        merged = OrderedDict((topic, (topic, headers, message))
+                             for topic, headers, message in older)
+        for topic, headers, message in newer:
+            merged.pop(topic, None)
+            merged[topic] = (topic, headers, message)
+        return merged.values()
+
+    def _run(self):
+        while True:
+            self._wake.clear()
+            while self._pending and self._in_flight < self.credits:
+                self._in_flight += 1
+                gevent.spawn(self._send, self._pending.popleft())
+            self._wake.wait()
+
+    def _send(self, messages):
+        try:
+            with publish_lock():
+                start = time.time()
+                self._publish(messages).get(timeout=self.timeout)
+                latency = time.time() - start
+        except gevent.Timeout:
+            self.timeouts += 1
+            self._window = max(1.0, self._window / 2)
+            _log.warn("Did not receive confirmation of publish for " +
+                      self.name)
+        except Again:
+            _log.warn("publish delayed: " + self.name + " pubsub is busy")
+            self._window = max(1.0, self._window / 2)
+            gevent.sleep(random.random())
+            self._requeue(messages)
+        except VIPError as ex:
+            self.errors += 1
+            _log.warn("driver failed to publish " + self.name + ": " +
+                      str(ex))
+        else:
+            self.published += 1
+            self._record_latency(latency)
+        finally:
+            self._in_flight -= 1
+            self._wake.set()
+
+    def _requeue(self, messages):
+        if len(self._pending) >= self.max_pending:
+            self._pending[0] = self._merge(messages, self._pending[0])
+            self.merged += 1
+        else:
+            self._pending.appendleft(messages)
+
+    def _record_latency(self, latency):
+        self.last_latency = latency
+        if self.average_latency is None:
+            self.average_latency = latency
+        else:
+            self.average_latency += (latency - self.average_latency) / 8
+        self.max_latency = max(self.max_latency, latency)
+        if latency > self.target_latency:
+            self._window = max(1.0, self._window / 2)
+        else:
+            self._window = min(float(self.max_credits),
+                               self._window + 1 / self._window)
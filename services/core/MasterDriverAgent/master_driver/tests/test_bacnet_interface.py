@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+#
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation are those
+# of the authors and should not be interpreted as representing official policies,
+# either expressed or implied, of the FreeBSD Project.
+#
+
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization
+# that has cooperated in the development of these materials, makes
+# any warranty, express or implied, or assumes any legal liability
+# or responsibility for the accuracy, completeness, or usefulness or
+# any information, apparatus, product, software, or process disclosed,
+# or represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does
+# not necessarily constitute or imply its endorsement, recommendation,
+# r favoring by the United States Government or any agency thereof,
+# or Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+
+#}}}
+
+from gevent.event import AsyncResult
+import pytest
+
+from master_driver.interfaces.bacnet import Interface
+from volttron.platform.messaging import topics
+from volttron.platform.vip.agent.core import ScheduledEvent
+
+ADDRESS = '10.0.0.2'
+POINTS = ['ZoneTemperature', 'SupplyFanStatus', 'DamperCommand']
+
+
+def result(value=None):
+    async_result = AsyncResult()
+    async_result.set(value)
+    return async_result
+
+
+class FakeProxy(object):
+    """Records the RPC calls an interface makes to the BACnet proxy."""
+    def __init__(self, subscribed):
+        self.subscribed = subscribed
+        self.calls = []
+        self.callbacks = []
+        self.scheduled = []
+        self.rpc = self
+        self.pubsub = self
+
+    def call(self, peer, method, *args):
+        self.calls.append((method, args))
+        if method == 'subscribe_cov':
+            return result(self.subscribed)
+        if method == 'read_properties':
+            return result(dict((name, 0.0) for name in args[1]))
+        return result()
+
+    def subscribe(self, peer, prefix, callback):
+        self.callbacks.append((prefix, callback))
+        return result()
+
+    def unsubscribe(self, peer, prefix, callback):
+        self.callbacks.remove((prefix, callback))
+        return result()
+
+    def schedule(self, deadline, func):
+        self.scheduled.append(func)
+        return ScheduledEvent(func)
+
+    def publish(self, topic, message):
+        for prefix, callback in self.callbacks:
+            if topic.startswith(prefix):
+                callback('pubsub', 'platform.bacnet_proxy', '', topic, {}, message)
+
+    def read_calls(self):
+        return [args for method, args in self.calls if method == 'read_properties']
+
+
+def make_interface(proxy, use_cov=True):
+    interface = Interface(vip=proxy, core=proxy)
+    registry = [{'BACnet Object Type': 'analogInput',
+                 'Writable': 'FALSE',
+                 'Volttron Point Name': name,
+                 'Index': str(index),
+                 'Units': '',
+                 'Property': 'presentValue'} for index, name in enumerate(POINTS)]
+    interface.configure({'device_address': ADDRESS,
+                         'device_id': 500,
+                         'use_cov': use_cov}, registry)
+    return interface
+
+
+@pytest.mark.driver
+def test_cov_points_served_from_cache():
+    proxy = FakeProxy(POINTS[:2])
+    interface = make_interface(proxy)
+
+    # Nothing pushed yet, so every point is polled.
+    assert sorted(interface.scrape_all()) == sorted(POINTS)
+    assert sorted(proxy.read_calls()[-1][1]) == sorted(POINTS)
+
+    proxy.publish(topics.BACNET_COV(address=ADDRESS), {'ZoneTemperature': 71.5,
+                                                       'SupplyFanStatus': 1})
+    scrape = interface.scrape_all()
+
+    assert scrape['ZoneTemperature'] == 71.5
+    assert scrape['SupplyFanStatus'] == 1
+    assert proxy.read_calls()[-1][1].keys() == ['DamperCommand']
+
+
+@pytest.mark.driver
+def test_all_cov_points_cached_skips_read():
+    proxy = FakeProxy(POINTS)
+    interface = make_interface(proxy)
+    proxy.publish(topics.BACNET_COV(address=ADDRESS), dict((name, 1.0) for name in POINTS))
+
+    assert interface.scrape_all() == dict((name, 1.0) for name in POINTS)
+    assert proxy.read_calls() == []
+
+
+@pytest.mark.driver
+def test_cov_renewal_drops_lost_points():
+    proxy = FakeProxy(POINTS[:2])
+    interface = make_interface(proxy)
+    proxy.publish(topics.BACNET_COV(address=ADDRESS), {'ZoneTemperature': 71.5,
+                                                       'SupplyFanStatus': 1})
+
+    proxy.subscribed = ['SupplyFanStatus']
+    proxy.scheduled[-1]()
+    interface.scrape_all()
+
+    assert sorted(proxy.read_calls()[-1][1]) == ['DamperCommand', 'ZoneTemperature']
+    assert len(proxy.scheduled) == 2
+
+
+@pytest.mark.driver
+def test_cov_ignores_other_devices():
+    proxy = FakeProxy(POINTS)
+    interface = make_interface(proxy)
+    proxy.publish(topics.BACNET_COV(address=ADDRESS + '0'), {'ZoneTemperature': 50.0})
+
+    assert interface.cov_values == {}
+    interface.close()
+    assert proxy.callbacks == []
+
+
+@pytest.mark.driver
+def test_polling_without_cov():
+    proxy = FakeProxy(POINTS)
+    interface = make_interface(proxy, use_cov=False)
+
+    assert sorted(interface.scrape_all()) == sorted(POINTS)
+    assert [method for method, _ in proxy.calls] == ['ping_device', 'read_properties']
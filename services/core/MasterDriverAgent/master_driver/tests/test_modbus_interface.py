@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+#
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation are those
+# of the authors and should not be interpreted as representing official policies,
+# either expressed or implied, of the FreeBSD Project.
+#
+
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization
+# that has cooperated in the development of these materials, makes
+# any warranty, express or implied, or assumes any legal liability
+# or responsibility for the accuracy, completeness, or usefulness or
+# any information, apparatus, product, software, or process disclosed,
+# or represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does
+# not necessarily constitute or imply its endorsement, recommendation,
+# r favoring by the United States Government or any agency thereof,
+# or Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+
+#}}}
+
+import struct
+
+import gevent
+from gevent.lock import Semaphore
+from gevent.server import StreamServer
+import pytest
+from pymodbus.bit_read_message import ReadCoilsResponse
+from pymodbus.factory import ServerDecoder
+from pymodbus.register_read_message import ReadHoldingRegistersResponse
+
+from master_driver import driver_locks
+from master_driver.interfaces import DriverInterfaceError
+from master_driver.interfaces import modbus
+from master_driver.interfaces.modbus import (ModbusByteRegister, ModbusBitRegister,
+                                             Interface, plan_read_blocks)
+
+if driver_locks._socket_lock is None:
+    driver_locks.configure_socket_lock()
+
+MBAP = struct.Struct('>HHHB')
+
+
+class FakeGateway(object):
+    """Modbus TCP server where register n holds the value n and odd coils
+    are on. Each response is sent delay seconds after its request."""
+    def __init__(self, delay=0.0, drop=False):
+        self.delay = delay
+        self.drop = drop
+        self.connections = 0
+        self.requests = []
+        self.outstanding = 0
+        self.max_outstanding = 0
+        self.decoder = ServerDecoder()
+        self.server = StreamServer(('127.0.0.1', 0), self.handle)
+        self.server.start()
+        self.port = self.server.server_port
+
+    def handle(self, sock, address):
+        self.connections += 1
+        lock = Semaphore()
+        while True:
+            header = self.recv(sock, MBAP.size)
+            if not header or self.drop:
+                break
+            transaction_id, _, length, unit = MBAP.unpack(header)
+            request = self.decoder.decode(self.recv(sock, length - 1))
+            self.requests.append((unit, request.function_code, request.address, request.count))
+            self.outstanding += 1
+            self.max_outstanding = max(self.max_outstanding, self.outstanding)
+            gevent.spawn(self.respond, sock, lock, transaction_id, unit, request)
+        sock.close()
+
+    def respond(self, sock, lock, transaction_id, unit, request):
+        gevent.sleep(self.delay)
+        addresses = range(request.address, request.address + request.count)
+        if request.function_code in (1, 2):
+            response = ReadCoilsResponse([a % 2 == 1 for a in addresses])
+        else:
+            response = ReadHoldingRegistersResponse(addresses)
+        pdu = chr(request.function_code) + response.encode()
+        self.outstanding -= 1
+        with lock:
+            sock.sendall(MBAP.pack(transaction_id, 0, len(pdu) + 1, unit) + pdu)
+
+    @staticmethod
+    def recv(sock, size):
+        data = ''
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    def stop(self):
+        self.server.stop()
+
+
+@pytest.fixture
+def gateway():
+    server = FakeGateway()
+    yield server
+    server.stop()
+
+
+def byte_register(address, type_string='>H', read_only=False, slave_id=0):
+    return ModbusByteRegister(address, type_string, 'point{}'.format(address), 'units',
+                              read_only, slave_id=slave_id)
+
+
+def make_interface(port, registers, **config):
+    interface = Interface()
+    interface.configure(dict(config, device_address='127.0.0.1', port=port), None)
+    for register in registers:
+        interface.insert_register(register)
+    return interface
+
+
+@pytest.mark.driver
+def test_plan_read_blocks_merges_nearby_registers():
+    registers = [byte_register(a) for a in (0, 1, 2, 5, 40, 41)]
+    registers.append(byte_register(43, '>f'))
+
+    blocks = plan_read_blocks(registers, max_gap=4, max_count=100)
+
+    assert [(start, count) for start, count, _ in blocks] == [(0, 6), (40, 5)]
+    assert [r.address for r in blocks[1][2]] == [40, 41, 43]
+
+
+@pytest.mark.driver
+def test_plan_read_blocks_respects_max_count():
+    registers = [byte_register(a) for a in xrange(0, 10)]
+
+    blocks = plan_read_blocks(registers, max_gap=10, max_count=4)
+
+    assert [(start, count) for start, count, _ in blocks] == [(0, 4), (4, 4), (8, 2)]
+
+
+@pytest.mark.driver
+def test_scrape_reads_only_planned_blocks(gateway):
+    registers = [byte_register(a) for a in (10, 11, 5000)]
+    registers.append(byte_register(7, read_only=True))
+    registers.append(ModbusBitRegister(3, 'bool', 'coil3', 'units', False))
+    interface = make_interface(gateway.port, registers, max_read_gap=2, slave_id=4)
+
+    result = interface.scrape_all()
+    interface.close()
+
+    assert result == {'point10': 10, 'point11': 11, 'point5000': 5000,
+                      'point7': 7, 'coil3': True}
+    assert sorted(gateway.requests) == [(4, 1, 3, 1), (4, 3, 10, 2),
+                                        (4, 3, 5000, 1), (4, 4, 7, 1)]
+
+
+@pytest.mark.driver
+def test_slaves_share_one_connection(gateway):
+    interfaces = [make_interface(gateway.port, [byte_register(1, slave_id=slave_id)],
+                                 slave_id=slave_id)
+                  for slave_id in (1, 2, 3)]
+
+    results = [g.get() for g in gevent.joinall(
+        [gevent.spawn(interface.scrape_all) for interface in interfaces])]
+    value = interfaces[0].get_point('point1')
+    for interface in interfaces:
+        interface.close()
+
+    assert results == [{'point1': 1}] * 3
+    assert value == 1
+    assert gateway.connections == 1
+    assert sorted(unit for unit, _, _, _ in gateway.requests) == [1, 1, 2, 3]
+    assert not modbus._gateways
+
+
+@pytest.mark.driver
+def test_requests_are_pipelined():
+    server = FakeGateway(delay=0.05)
+    registers = [byte_register(a) for a in xrange(0, 800, 100)]
+    interface = make_interface(server.port, registers, max_read_gap=0,
+                               max_pipelined_requests=4)
+
+    result = interface.scrape_all()
+    interface.close()
+    server.stop()
+
+    assert len(result) == 8
+    assert server.max_outstanding == 4
+
+
+@pytest.mark.driver
+def test_connection_closed_after_idle_timeout(gateway):
+    interface = make_interface(gateway.port, [byte_register(1)], connection_idle_timeout=0.05)
+
+    interface.scrape_all()
+    gevent.sleep(0.02)
+    interface.scrape_all()
+    assert gateway.connections == 1
+
+    gevent.sleep(0.1)
+    interface.scrape_all()
+    assert gateway.connections == 2
+    interface.close()
+
+
+@pytest.mark.driver
+def test_connection_per_scrape_without_idle_timeout(gateway):
+    interface = make_interface(gateway.port, [byte_register(1)], connection_idle_timeout=0)
+
+    interface.scrape_all()
+    interface.scrape_all()
+    interface.close()
+
+    assert gateway.connections == 2
+
+
+@pytest.mark.driver
+def test_dropped_connection_fails_scrape_and_reconnects():
+    server = FakeGateway(drop=True)
+    interface = make_interface(server.port, [byte_register(1)])
+
+    with pytest.raises(DriverInterfaceError):
+        interface.scrape_all()
+    server.drop = False
+    assert interface.scrape_all() == {'point1': 1}
+    interface.close()
+    server.stop()
+
+    assert server.connections == 2
+
+
+@pytest.mark.driver
+def test_scrape_group_sends_one_batch(gateway):
+    interfaces = [make_interface(gateway.port, [byte_register(1, slave_id=slave_id),
+                                                byte_register(500, slave_id=slave_id)],
+                                 slave_id=slave_id)
+                  for slave_id in (1, 2, 3)]
+    group = interfaces[0].get_scrape_group()
+    assert all(interface.get_scrape_group() is group for interface in interfaces)
+
+    batches = []
+    execute_many = group.execute_many
+    group.execute_many = lambda requests: batches.append(len(requests)) or execute_many(requests)
+    results = Interface.scrape_group(interfaces)
+    for interface in interfaces:
+        interface.close()
+
+    assert results == [{'point1': 1, 'point500': 500}] * 3
+    assert batches == [6]
+    assert gateway.connections == 1
+    assert sorted(unit for unit, _, _, _ in gateway.requests) == [1, 1, 2, 2, 3, 3]
+
+
+@pytest.mark.driver
+def test_scrape_group_connection_failure():
+    server = FakeGateway(drop=True)
+    interfaces = [make_interface(server.port, [byte_register(1, slave_id=slave_id)],
+                                 slave_id=slave_id)
+                  for slave_id in (1, 2)]
+
+    results = Interface.scrape_group(interfaces)
+    for interface in interfaces:
+        interface.close()
+    server.stop()
+
+    assert [type(result) for result in results] == [DriverInterfaceError] * 2
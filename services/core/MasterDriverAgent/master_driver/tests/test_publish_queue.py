@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+#
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+# 1. Redistributions of source code must retain the above copyright notice, this
+#    list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright notice,
+#    this list of conditions and the following disclaimer in the documentation
+#    and/or other materials provided with the distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR
+# ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation are those
+# of the authors and should not be interpreted as representing official policies,
+# either expressed or implied, of the FreeBSD Project.
+#
+
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization
+# that has cooperated in the development of these materials, makes
+# any warranty, express or implied, or assumes any legal liability
+# or responsibility for the accuracy, completeness, or usefulness or
+# any information, apparatus, product, software, or process disclosed,
+# or represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does
+# not necessarily constitute or imply its endorsement, recommendation,
+# r favoring by the United States Government or any agency thereof,
+# or Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+
+#}}}
+
+import gevent
+from gevent.event import AsyncResult
+import pytest
+
+from master_driver import driver_locks
+from master_driver.publish_queue import PublishQueue
+
+if driver_locks._publish_lock is None:
+    driver_locks.configure_publish_lock()
+
+
+class FakePubSub(object):
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.published = []
+        self.blocked = False
+
+    def publish(self, messages):
+        result = AsyncResult()
+        def ack():
+            self.published.append(messages)
+            result.set(None)
+        if not self.blocked:
+            gevent.spawn_later(self.delay, ack)
+        return result
+
+
+def scrape(value):
+    return [('devices/a/point', {}, [value, {}]),
+            ('devices/a/all', {}, [{'point': value}, {}])]
+
+
+@pytest.mark.driver
+def test_publish_queue_publishes_in_order():
+    pubsub = FakePubSub()
+    queue = PublishQueue(pubsub.publish, 'a', max_pending=10)
+    for i in range(5):
+        queue.put(scrape(i))
+    gevent.sleep(0.1)
+    assert pubsub.published == [scrape(i) for i in range(5)]
+    metrics = queue.metrics()
+    assert metrics['published'] == 5
+    assert metrics['queue_depth'] == 0
+    assert metrics['credits'] > 1
+    queue.stop()
+
+
+@pytest.mark.driver
+def test_publish_queue_merges_stale_scrapes():
+    pubsub = FakePubSub()
+    pubsub.blocked = True
+    queue = PublishQueue(pubsub.publish, 'a', max_pending=2, timeout=0.1)
+    for i in range(6):
+        queue.put(scrape(i))
+    # Scrapes beyond max_pending are merged into the newest one.
+    assert queue.metrics()['queue_depth'] == 2
+    assert queue.metrics()['merged'] == 4
+
+    gevent.sleep(0.01)
+    assert queue.metrics()['in_flight'] == 1
+    pubsub.blocked = False
+    gevent.sleep(0.3)
+    # The first scrape was lost, the merged one carries the latest values.
+    assert queue.metrics()['timeouts'] == 1
+    assert pubsub.published == [scrape(5)]
+    queue.stop()
+
+
+@pytest.mark.driver
+def test_publish_queue_backs_off_when_slow():
+    pubsub = FakePubSub()
+    queue = PublishQueue(pubsub.publish, 'a', max_pending=10,
+                         target_latency=0.05)
+    for i in range(6):
+        queue.put(scrape(i))
+    gevent.sleep(0.1)
+    assert queue.credits > 1
+
+    pubsub.delay = 0.1
+    queue.put(scrape(6))
+    gevent.sleep(0.2)
+    assert queue.credits == 1
+    assert queue.metrics()['max_latency'] >= 0.1
+    queue.stop()
@@ -78,6 +78,8 @@ class SQLAggregateHistorian(AggregateHistorian):
     This aggregate historian aggregates data collected by SQLHistorian.
     """
 
+    bulk_aggregation = True
+
     def __init__(self, config_path, **kwargs):
         """
         Validate configuration, create connection to historian, create
@@ -160,6 +162,22 @@ class SQLAggregateHistorian(AggregateHistorian):
                                              value,
                                              topic_ids)
 
+    def collect_aggregate_buckets(self, topic_ids, start_time, end_time,
+                                  period):
+        return self.dbfuncts_class.collect_aggregate_buckets(topic_ids,
+                                                             start_time,
+                                                             end_time,
+                                                             period)
+
+    def insert_aggregates(self, agg_type, agg_time_period, rows):
+        self.dbfuncts_class.bulk_insert_aggregates(agg_type,
+                                                   agg_time_period,
+                                                   rows)
+
+    def get_aggregate_watermarks(self, agg_type, agg_time_period):
+        return self.dbfuncts_class.get_aggregate_watermarks(agg_type,
+                                                            agg_time_period)
+
 
 def main(argv=sys.argv):
     """Main method called by the eggsecutable."""
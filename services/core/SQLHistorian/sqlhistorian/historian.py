@@ -58,9 +58,11 @@ from __future__ import absolute_import, print_function
 import logging
 import sys
 import threading
+from itertools import izip
 
 from volttron.platform.agent import utils
-from volttron.platform.agent.base_historian import BaseHistorian
+from volttron.platform.agent.base_historian import BaseHistorian, \
+    is_device_frame
 from volttron.platform.dbutils import sqlutils
 from volttron.platform.vip.agent import *
 
@@ -117,10 +119,17 @@ def historian(config_path, **kwargs):
     if topic_replace_list:
         _log.debug("topic replace list is: {}".format(topic_replace_list))
 
+    backup_journal_mode = config_dict.get('backup_journal_mode', None)
+    backup_synchronous = config_dict.get('backup_synchronous', None)
+    capture_device_frames = config_dict.get('capture_device_frames', False)
 
     SQLHistorian.__name__ = 'SQLHistorian'
     return SQLHistorian(config_dict, identity=identity,
-                        topic_replace_list=topic_replace_list, **kwargs)
+                        topic_replace_list=topic_replace_list,
+                        backup_journal_mode=backup_journal_mode,
+                        backup_synchronous=backup_synchronous,
+                        capture_device_frames=capture_device_frames,
+                        **kwargs)
 
 class SQLHistorian(BaseHistorian):
     """This is a historian agent that writes data to a SQLite or Mysql
@@ -133,6 +142,8 @@ class SQLHistorian(BaseHistorian):
 
     """
 
+    publish_device_frames = True
+
     def __init__(self, config, **kwargs):
         """Initialise the historian.
 
@@ -168,49 +179,22 @@ class SQLHistorian(BaseHistorian):
                 len(to_publish_list), thread_name))
 
         try:
-            real_published = []
+            rows = []
             for x in to_publish_list:
-                ts = x['timestamp']
-                topic = x['topic']
-                value = x['value']
-                meta = x['meta']
-
-                # look at the topics that are stored in the database
-                # already to see if this topic has a value
-                lowercase_name = topic.lower()
-                topic_id = self.topic_id_map.get(lowercase_name, None)
-                db_topic_name = self.topic_name_map.get(lowercase_name,
-                                                        None)
-                _log.debug('topic is {}, db topic is {}'.format(
-                    topic, db_topic_name))
-                if topic_id is None:
-                    _log.debug('Inserting topic: {}'.format(topic))
-                    # Insert topic name as is in db
-                    row = self.writer.insert_topic(topic)
-                    topic_id = row[0]
-                    # user lower case topic name when storing in map
-                    # for case insensitive comparison
-                    self.topic_id_map[lowercase_name] = topic_id
-                    self.topic_name_map[lowercase_name] = topic
-                    _log.debug('TopicId: {} => {}'.format(topic_id, topic))
-                elif db_topic_name != topic:
-                    _log.debug('Updating topic: {}'.format(topic))
-                    self.writer.update_topic(topic, topic_id)
-                    self.topic_name_map[lowercase_name] = topic
-
-                old_meta = self.topic_meta.get(topic_id, {})
-                if set(old_meta.items()) != set(meta.items()):
-                    _log.debug(
-                        'Updating meta for topic: {} {}'.format(topic,
-                                                                meta))
-                    self.writer.insert_meta(topic_id, meta)
-                    self.topic_meta[topic_id] = meta
-
-                if self.writer.insert_data(ts, topic_id, value):
-                    # _log.debug('item was inserted')
-                    real_published.append(x)
-
-            if len(real_published) > 0:
+                if is_device_frame(x):
+                    ts = x['timestamp']
+                    prefix = x['device'] + '/'
+                    frame_meta = x['meta']
+                    for point, value in izip(x['points'], x['values']):
+                        topic_id = self._get_topic_id(
+                            prefix + point, frame_meta.get(point, {}))
+                        rows.append((ts, topic_id, value))
+                    continue
+
+                topic_id = self._get_topic_id(x['topic'], x['meta'])
+                rows.append((x['timestamp'], topic_id, x['value']))
+
+            if rows and self.writer.bulk_insert_data(rows):
                 if self.writer.commit():
                     _log.debug('published {} data values'.format(
                         len(to_publish_list)))
@@ -227,6 +211,42 @@ class SQLHistorian(BaseHistorian):
             # Raise to the platform so it is logged properly.
             raise
 
+    def _get_topic_id(self, topic, meta):
+        """Return the topic id of `topic`, inserting or renaming the topic
+        and updating its meta data in the database as needed."""
+        # look at the topics that are stored in the database
+        # already to see if this topic has a value
+        lowercase_name = topic.lower()
+        topic_id = self.topic_id_map.get(lowercase_name, None)
+        db_topic_name = self.topic_name_map.get(lowercase_name,
+                                                None)
+        _log.debug('topic is {}, db topic is {}'.format(
+            topic, db_topic_name))
+        if topic_id is None:
+            _log.debug('Inserting topic: {}'.format(topic))
+            # Insert topic name as is in db
+            row = self.writer.insert_topic(topic)
+            topic_id = row[0]
+            # user lower case topic name when storing in map
+            # for case insensitive comparison
+            self.topic_id_map[lowercase_name] = topic_id
+            self.topic_name_map[lowercase_name] = topic
+            _log.debug('TopicId: {} => {}'.format(topic_id, topic))
+        elif db_topic_name != topic:
+            _log.debug('Updating topic: {}'.format(topic))
+            self.writer.update_topic(topic, topic_id)
+            self.topic_name_map[lowercase_name] = topic
+
+        old_meta = self.topic_meta.get(topic_id, {})
+        if set(old_meta.items()) != set(meta.items()):
+            _log.debug(
+                'Updating meta for topic: {} {}'.format(topic,
+                                                        meta))
+            self.writer.insert_meta(topic_id, meta)
+            self.topic_meta[topic_id] = meta
+
+        return topic_id
+
     def query_topic_list(self):
 
         _log.debug("query_topic_list Thread is: {}".format(
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+
+#}}}
+
+"""
+Unit tests for the ThresholdDetectionAgent rule evaluation
+"""
+
+from thresholddetection.agent import ThresholdDetectionAgent
+
+DEVICE = 'devices/campus/building/ahu1/all'
+
+_test_config = {
+    "watch_max": [
+        {
+            "topic": "test1",
+            "threshold": 10,
+            "message": "{topic} > {threshold}"
+        },
+        {
+            "topic": DEVICE,
+            "point": "temp",
+            "threshold": 80,
+            "deadband": 2,
+            "message": "{point} > {threshold}"
+        },
+        {
+            "topic": DEVICE,
+            "point": "pressure",
+            "threshold": 5,
+            "message": "{point} > {threshold}",
+            "enabled": False
+        }
+    ],
+    "watch_min": [
+        {
+            "topic": DEVICE,
+            "point": "temp",
+            "threshold": 50,
+            "message": "{point} < {threshold}"
+        }
+    ]
+}
+
+
+class FakePubSub(object):
+    def __init__(self):
+        self.callbacks = {}
+
+    def subscribe(self, peer, prefix, callback):
+        assert prefix not in self.callbacks
+        self.callbacks[prefix] = callback
+
+    def publish(self, topic, message):
+        self.callbacks[topic]('pubsub', 'driver', '', topic, {}, message)
+
+
+class FakeHealth(object):
+    def __init__(self):
+        self.alerts = []
+
+    def send_alert(self, alert_key, status):
+        self.alerts.append(alert_key)
+
+
+class FakeVIP(object):
+    def __init__(self):
+        self.pubsub = FakePubSub()
+        self.health = FakeHealth()
+
+
+def make_agent(config=_test_config):
+    agent = ThresholdDetectionAgent.__new__(ThresholdDetectionAgent)
+    agent.config = config
+    agent.vip = FakeVIP()
+    agent.start(None)
+    return agent
+
+
+def publish_device(agent, **values):
+    agent.vip.pubsub.publish(DEVICE, [values, {}])
+
+
+def test_one_subscription_per_topic():
+    agent = make_agent()
+    assert sorted(agent.vip.pubsub.callbacks) == sorted(['test1', DEVICE])
+
+
+def test_scalar_topic():
+    agent = make_agent()
+    agent.vip.pubsub.publish('test1', 5)
+    agent.vip.pubsub.publish('test1', 'not a number')
+    agent.vip.pubsub.publish('test1', 11)
+    assert agent.vip.health.alerts == ['test1']
+
+
+def test_points_in_all_message():
+    agent = make_agent()
+    publish_device(agent, temp=85, pressure=10, other='x')
+    publish_device(agent, temp=40)
+    assert agent.vip.health.alerts == ['devices/campus/building/ahu1/temp'] * 2
+
+
+def test_alert_once_until_back_past_deadband():
+    agent = make_agent()
+    for value in (81, 90, 79, 81, 78, 82):
+        publish_device(agent, temp=value)
+    # 79 is inside the deadband so 81 does not alert again, 78 clears it.
+    assert len(agent.vip.health.alerts) == 2
+
+
+def test_missing_point_ignored():
+    agent = make_agent()
+    publish_device(agent, pressure=1)
+    agent.vip.pubsub.publish(DEVICE, 'not a device publish')
+    assert agent.vip.health.alerts == []
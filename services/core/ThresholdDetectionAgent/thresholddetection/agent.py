@@ -82,6 +82,54 @@ def thresholddetection_agent(config_path, **kwargs):
     return ThresholdDetectionAgent(config, **kwargs)
 
 
+class ThresholdRule(object):
+    """A threshold on the value published to a topic, or on one point of
+    a device's all publish when `point` is set.
+
+    `direction` is 1 for a maximum and -1 for a minimum. An alert is only
+    raised when the value first crosses the threshold. Another alert is
+    not raised for that topic until the value has come back past the
+    threshold by at least `deadband`.
+    """
+    def __init__(self, message, threshold, direction, deadband=0,
+                 point=None):
+        self.message = message
+        self.threshold = threshold
+        self.direction = direction
+        self.deadband = deadband
+        self.point = point
+        self.alerting = set()
+
+    def check(self, topic, value):
+        """Return True if the value crosses the threshold. Non-numeric
+        values are ignored."""
+        try:
+            excess = (float(value) - self.threshold) * self.direction
+        except (TypeError, ValueError):
+            return False
+
+        if topic in self.alerting:
+            if excess <= -self.deadband:
+                self.alerting.remove(topic)
+                _log.info("{} back within threshold ({})".format(
+                    point_topic(topic, self.point), self.threshold))
+            return False
+
+        if excess > 0:
+            self.alerting.add(topic)
+            return True
+        return False
+
+
+def point_topic(topic, point):
+    """Return the topic of a point in a device's all publish."""
+    if point is None:
+        return topic
+    if topic.endswith('/all'):
+        topic = topic[:-4]
+    return '{}/{}'.format(topic, point)
+
+
 class ThresholdDetectionAgent(Agent):
     """
     Listen to topics and publish alerts when thresholds are passed.
@@ -94,6 +142,14 @@ class ThresholdDetectionAgent(Agent):
     less than the specified threshold. Non-numberic data will be
     ignored.
 
+    An item with a `point` checks that point in the messages published
+    to a device's all topic. All of the items for a topic share one
+    subscription and are checked together for each message.
+
+    An alert is sent when the data first pass the threshold. No more
+    alerts are sent for the topic until the data come back past the
+    threshold by the item's `deadband` (default 0).
+
     Example configuration:
 
     .. code-block:: python
@@ -105,6 +161,13 @@ class ThresholdDetectionAgent(Agent):
               "threshold": 99,
               "message": "CPU ({topic}) exceeded {threshold} percent",
               "enabled": true
+            },
+            {
+              "topic": "devices/campus/building/ahu1/all",
+              "point": "ZoneTemperature",
+              "threshold": 80,
+              "deadband": 2,
+              "message": "{point} exceeded {threshold}"
             }
           ]
           "watch_min": [
@@ -124,37 +187,50 @@ class ThresholdDetectionAgent(Agent):
 
     @Core.receiver('onstart')
     def start(self, sender, **kwargs):
+        directions = {'watch_max': 1,
+                      'watch_min': -1}
 
-        def is_number(x):
-            try:
-                float(x)
-                return True
-            except ValueError:
-                return False
-
-        def generate_callback(message, threshold, comparator):
-            """Generate callback function for pubsub.subscribe"""
-            def callback(peer, sender, bus, topic, headers, data):
-                if is_number(data):
-                    if comparator(data, threshold):
-                        alert_message = '{} ({} published {})\n'.format(
-                            message, topic, data)
-                        self.alert(alert_message, topic)
-            return callback
-
-        comparators = {'watch_max': lambda x, y: x > y,
-                       'watch_min': lambda x, y: x < y}
-
-        for key, comparator in comparators.iteritems():
+        rules = {}
+        for key, direction in directions.iteritems():
             for item in self.config.get(key, []):
                 if item.get('enabled', True):
                     # replaces keywords ({topic}, {threshold})
                     # with values in the message:
                     msg = item['message'].format(**item)
-                    callback = generate_callback(
-                        msg, item['threshold'], comparator)
-                    self.vip.pubsub.subscribe(
-                        'pubsub', item['topic'], callback)
+                    rule = ThresholdRule(msg, item['threshold'], direction,
+                                         item.get('deadband', 0),
+                                         item.get('point'))
+                    rules.setdefault(item['topic'], []).append(rule)
+
+        for topic, topic_rules in rules.iteritems():
+            self.vip.pubsub.subscribe(
+                'pubsub', topic, self.generate_callback(topic_rules))
+
+    def generate_callback(self, rules):
+        """Generate callback function for pubsub.subscribe that checks
+        all of the rules for a topic"""
+        topic_rules = [rule for rule in rules if rule.point is None]
+        point_rules = [rule for rule in rules if rule.point is not None]
+
+        def callback(peer, sender, bus, topic, headers, data):
+            for rule in topic_rules:
+                if rule.check(topic, data):
+                    self.alert('{} ({} published {})\n'.format(
+                        rule.message, topic, data), topic)
+
+            if not point_rules:
+                return
+            values = data[0] if isinstance(data, (list, tuple)) else data
+            if not isinstance(values, dict):
+                return
+            for rule in point_rules:
+                value = values.get(rule.point)
+                if value is not None and rule.check(topic, value):
+                    alert_topic = point_topic(topic, rule.point)
+                    self.alert('{} ({} published {})\n'.format(
+                        rule.message, alert_topic, value), alert_topic)
+
+        return callback
 
     def alert(self, message, topic):
         """
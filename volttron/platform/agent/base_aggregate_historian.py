@@ -64,6 +64,7 @@ from __future__ import absolute_import
 import copy
 import logging
 from abc import abstractmethod
+from collections import defaultdict
 from datetime import datetime, timedelta
 
 import pytz
@@ -75,6 +76,60 @@ _log = logging.getLogger(__name__)
 __version__ = '1.0'
 
 
+def merge_aggregate_buckets(rows, topic_ids):
+    """
+    Combine the per topic partial aggregates returned by
+    :py:meth:`AggregateHistorian.collect_aggregate_buckets` into partial
+    aggregates across the given topics.
+
+    :param rows: list of (topic_id, bucket, count, sum, min, max) tuples
+    :param topic_ids: topic ids to combine
+    :return: dictionary of {bucket: [count, sum, min, max]}
+    """
+    topic_ids = set(topic_ids)
+    merged = {}
+    for topic_id, bucket, count, total, minimum, maximum in rows:
+        if topic_id not in topic_ids or not count:
+            continue
+        partial = merged.get(bucket)
+        if partial is None:
+            merged[bucket] = [count, total, minimum, maximum]
+        else:
+            partial[0] += count
+            partial[1] += total
+            partial[2] = min(partial[2], minimum)
+            partial[3] = max(partial[3], maximum)
+    return merged
+
+
+#: Aggregation types that can be computed from count/sum/min/max partials.
+BULK_AGGREGATION_TYPES = frozenset(['avg', 'sum', 'min', 'max', 'count'])
+
+
+def compute_aggregate_value(agg_type, partial):
+    """
+    Compute the final aggregate from a [count, sum, min, max] partial
+    aggregate
+
+    :param agg_type: type of aggregation (avg, min, max, sum or count)
+    :param partial: partial aggregate
+    :return: aggregate value
+    """
+    count, total, minimum, maximum = partial
+    agg_type = agg_type.lower()
+    if agg_type == 'avg':
+        return float(total) / count
+    elif agg_type == 'sum':
+        return total
+    elif agg_type == 'min':
+        return minimum
+    elif agg_type == 'max':
+        return maximum
+    elif agg_type == 'count':
+        return count
+    raise ValueError("Invalid aggregation type {}".format(agg_type))
+
+
 class AggregateHistorian(Agent):
     """
     Base agent to aggregate data in historian based on a specific time period.
@@ -90,8 +145,26 @@ class AggregateHistorian(Agent):
     - :py:meth:`insert_aggregate() <AggregateHistorian.insert_aggregate>`
     - :py:meth:`get_aggregation_list() <AggregateHistorian.get_aggregation_list>`
 
+    Subclasses whose data store can group data by time period should also
+    set :py:attr:`bulk_aggregation` to True and implement
+
+    - :py:meth:`collect_aggregate_buckets() <AggregateHistorian.collect_aggregate_buckets>`
+    - :py:meth:`insert_aggregates() <AggregateHistorian.insert_aggregates>`
+    - :py:meth:`get_aggregate_watermarks() <AggregateHistorian.get_aggregate_watermarks>`
+
+    Bulk aggregation computes every configured point of an aggregation
+    group for every time period that is due in one scan of the data store.
+    After downtime, collection resumes from the latest recorded aggregate of
+    each point, so the missed periods are caught up in a single pass.
+    Monthly periods are not of fixed length and are always collected one
+    period at a time. So are groups with a point whose aggregation type is
+    not one of avg, sum, min, max or count.
+
     """
 
+    #: Set to True if the subclass implements the bulk aggregation methods.
+    bulk_aggregation = False
+
     def __init__(self, config_path, **kwargs):
         """
         Call super init class. Loads config file
@@ -164,6 +237,27 @@ class AggregateHistorian(Agent):
             else:
                 utc_collection_start_time = datetime.utcnow().replace(
                     tzinfo=pytz.utc)
+            if self._use_bulk_aggregation(agg_time_period,
+                                          agg_group['points']):
+                resume_time = self._compute_resume_time(
+                    agg_time_period, agg_group['points'])
+                if resume_time is not None:
+                    if agg_group.get('utc_collection_start_time'):
+                        utc_collection_start_time = max(
+                            utc_collection_start_time, resume_time)
+                    else:
+                        utc_collection_start_time = resume_time
+                if utc_collection_start_time > datetime.utcnow().replace(
+                        tzinfo=pytz.utc):
+                    # The aggregates that are due have already been
+                    # recorded.
+                    self.core.schedule(utc_collection_start_time,
+                                       self.collect_aggregate_data,
+                                       utc_collection_start_time,
+                                       agg_time_period,
+                                       use_calendar_periods,
+                                       agg_group['points'])
+                    continue
             self.collect_aggregate_data(
                 utc_collection_start_time,
                 agg_time_period,
@@ -326,73 +420,15 @@ class AggregateHistorian(Agent):
             "{} use_calendar={}".format(agg_time_period, use_calendar_periods))
         _log.debug("points passed as arg  {} ".format(points))
 
-        start_time, end_time = \
-            AggregateHistorian.compute_aggregation_time_slice(
-                collection_time, agg_time_period, use_calendar_periods)
         try:
-            _log.debug(
-                "After  compute agg_time_period = {} start_time {} end_time "
-                "{} ".format(agg_time_period, start_time, end_time))
-            for data in points:
-                _log.debug("data in loop {}".format(data))
-                topic_ids = data.get('topic_ids', None)
-                _log.debug("topic ids configured {} ".format(topic_ids))
-                topic_pattern = data.get('topic_name_pattern', None)
-                if topic_pattern:
-                    # Find topic ids that match the pattern at runtime
-                    topic_map = self.find_topics_by_pattern(topic_pattern)
-                    _log.debug("Found topics for pattern {}".format(topic_map))
-                    if topic_map:
-                        topic_ids = topic_map.values()
-                        _log.debug("topic ids loaded {} ".format(topic_ids))
-                    else:
-                        _log.warn(
-                            "Skipping recording of aggregate data for {topic} "
-                            "between {start_time} and {end_time} as ".format(
-                                topic=topic_pattern,
-                                start_time=start_time,
-                                end_time=end_time))
-                        return
-
-                agg_value, count = self.collect_aggregate(
-                    topic_ids,
-                    data['aggregation_type'],
-                    start_time,
-                    end_time)
-                if count == 0:
-                    _log.warn(
-                        "No records found for topic {topic} between "
-                        "{start_time} and {end_time}".format(
-                            topic=topic_pattern if topic_pattern else
-                            data['topic_names'],
-                            start_time=start_time,
-                            end_time=end_time))
-                elif count < data.get('min_count', 0):
-                    _log.warn(
-                        "Skipping recording of aggregate data for {topic} "
-                        "between {start_time} and {end_time} as number of "
-                        "records is less than minimum allowed("
-                        "{count})".format(
-                            topic=topic_pattern if topic_pattern
-                            else data['topic_names'],
-                            start_time=start_time,
-                            end_time=end_time,
-                            count=data.get('min_count', 0)))
-                else:
-                    aggregate_topic_id = \
-                        self.agg_topic_id_map[
-                            data['aggregation_topic_name'].lower(),
-                            data['aggregation_type'].lower(),
-                            agg_time_period]
-                    _log.debug(
-                        "agg_topic_id {} and topic ids sent to insert {} "
-                        "".format(aggregate_topic_id, topic_ids))
-                    self.insert_aggregate(aggregate_topic_id,
-                                          data['aggregation_type'],
-                                          agg_time_period,
-                                          end_time,
-                                          agg_value,
-                                          topic_ids)
+            if self._use_bulk_aggregation(agg_time_period, points):
+                collection_time = self._collect_aggregate_buckets(
+                    collection_time, agg_time_period, use_calendar_periods,
+                    points)
+            else:
+                self._collect_aggregate_slice(collection_time,
+                                              agg_time_period,
+                                              use_calendar_periods, points)
         finally:
             collection_time = AggregateHistorian.compute_next_collection_time(
                 collection_time, agg_time_period, use_calendar_periods)
@@ -406,6 +442,210 @@ class AggregateHistorian(Agent):
                                        points)
             _log.debug("After Scheduling next collection.{}".format(event))
 
+    def _collect_aggregate_slice(self, collection_time, agg_time_period,
+                                 use_calendar_periods, points):
+        """
+        Compute and record the aggregates of the single time period that
+        ends at collection_time.
+        """
+        start_time, end_time = \
+            AggregateHistorian.compute_aggregation_time_slice(
+                collection_time, agg_time_period, use_calendar_periods)
+        _log.debug(
+            "After  compute agg_time_period = {} start_time {} end_time "
+            "{} ".format(agg_time_period, start_time, end_time))
+        for data in points:
+            _log.debug("data in loop {}".format(data))
+            topic_ids = data.get('topic_ids', None)
+            _log.debug("topic ids configured {} ".format(topic_ids))
+            topic_pattern = data.get('topic_name_pattern', None)
+            if topic_pattern:
+                # Find topic ids that match the pattern at runtime
+                topic_map = self.find_topics_by_pattern(topic_pattern)
+                _log.debug("Found topics for pattern {}".format(topic_map))
+                if topic_map:
+                    topic_ids = topic_map.values()
+                    _log.debug("topic ids loaded {} ".format(topic_ids))
+                else:
+                    _log.warn(
+                        "Skipping recording of aggregate data for {topic} "
+                        "between {start_time} and {end_time} as ".format(
+                            topic=topic_pattern,
+                            start_time=start_time,
+                            end_time=end_time))
+                    return
+
+            agg_value, count = self.collect_aggregate(
+                topic_ids,
+                data['aggregation_type'],
+                start_time,
+                end_time)
+            if count == 0:
+                _log.warn(
+                    "No records found for topic {topic} between "
+                    "{start_time} and {end_time}".format(
+                        topic=topic_pattern if topic_pattern else
+                        data['topic_names'],
+                        start_time=start_time,
+                        end_time=end_time))
+            elif count < data.get('min_count', 0):
+                _log.warn(
+                    "Skipping recording of aggregate data for {topic} "
+                    "between {start_time} and {end_time} as number of "
+                    "records is less than minimum allowed("
+                    "{count})".format(
+                        topic=topic_pattern if topic_pattern
+                        else data['topic_names'],
+                        start_time=start_time,
+                        end_time=end_time,
+                        count=data.get('min_count', 0)))
+            else:
+                aggregate_topic_id = \
+                    self.agg_topic_id_map[
+                        data['aggregation_topic_name'].lower(),
+                        data['aggregation_type'].lower(),
+                        agg_time_period]
+                _log.debug(
+                    "agg_topic_id {} and topic ids sent to insert {} "
+                    "".format(aggregate_topic_id, topic_ids))
+                self.insert_aggregate(aggregate_topic_id,
+                                      data['aggregation_type'],
+                                      agg_time_period,
+                                      end_time,
+                                      agg_value,
+                                      topic_ids)
+
+    def _use_bulk_aggregation(self, agg_time_period, points):
+        return (self.bulk_aggregation and agg_time_period[-1:] != 'M' and
+                all(data['aggregation_type'].lower() in BULK_AGGREGATION_TYPES
+                    for data in points))
+
+    def _compute_resume_time(self, agg_time_period, points):
+        """
+        Find the collection time that follows the oldest of the latest
+        aggregates recorded for the given points. Returns None if none of the
+        points has recorded aggregates yet.
+        """
+        watermarks = {}
+        resume_time = None
+        for data in points:
+            agg_type = data['aggregation_type']
+            if agg_type.lower() not in watermarks:
+                watermarks[agg_type.lower()] = self.get_aggregate_watermarks(
+                    agg_type, agg_time_period)
+            agg_id = self.agg_topic_id_map[
+                data['aggregation_topic_name'].lower(), agg_type.lower(),
+                agg_time_period]
+            watermark = watermarks[agg_type.lower()].get(agg_id)
+            if watermark is not None and (resume_time is None or
+                                          watermark < resume_time):
+                resume_time = watermark
+        if resume_time is None:
+            return None
+        _log.debug("Resuming {} aggregation after {}".format(
+            agg_time_period, resume_time))
+        return AggregateHistorian.compute_next_collection_time(
+            resume_time, agg_time_period, False)
+
+    def _collect_aggregate_buckets(self, collection_time, agg_time_period,
+                                   use_calendar_periods, points):
+        """
+        Compute and record the aggregates of every time period due between
+        collection_time and now with one scan of the data store.
+
+        :return: collection time of the last period that was computed
+        """
+        period = AggregateHistorian.compute_aggregation_period_seconds(
+            agg_time_period)
+        # Periods are bucketed by whole seconds.
+        collection_time = collection_time.replace(microsecond=0)
+        start_time, end_time = \
+            AggregateHistorian.compute_aggregation_time_slice(
+                collection_time, agg_time_period, use_calendar_periods)
+        now = datetime.utcnow().replace(tzinfo=pytz.utc)
+        num_periods = 1
+        if now > collection_time:
+            num_periods += int(
+                (now - collection_time).total_seconds() // period)
+        last_end_time = end_time + timedelta(seconds=period * (num_periods - 1))
+        _log.debug("Collecting {} aggregates for {} periods between {} and "
+                   "{}".format(agg_time_period, num_periods, start_time,
+                               last_end_time))
+
+        point_topic_ids = []
+        all_topic_ids = set()
+        for data in points:
+            topic_ids = data.get('topic_ids', None)
+            topic_pattern = data.get('topic_name_pattern', None)
+            if topic_pattern:
+                # Find topic ids that match the pattern at runtime
+                topic_map = self.find_topics_by_pattern(topic_pattern)
+                if not topic_map:
+                    _log.warn(
+                        "Skipping recording of aggregate data for {topic} "
+                        "between {start_time} and {end_time} as no topics "
+                        "match the pattern".format(
+                            topic=topic_pattern, start_time=start_time,
+                            end_time=last_end_time))
+                    point_topic_ids.append(None)
+                    continue
+                topic_ids = topic_map.values()
+            point_topic_ids.append(topic_ids)
+            all_topic_ids.update(topic_ids)
+
+        if all_topic_ids:
+            rows = self.collect_aggregate_buckets(
+                list(all_topic_ids), start_time, last_end_time, period)
+        else:
+            rows = []
+
+        table_rows = defaultdict(list)
+        for data, topic_ids in zip(points, point_topic_ids):
+            if topic_ids is None:
+                continue
+            agg_type = data['aggregation_type']
+            agg_topic_id = self.agg_topic_id_map[
+                data['aggregation_topic_name'].lower(), agg_type.lower(),
+                agg_time_period]
+            min_count = data.get('min_count', 0)
+            skipped = 0
+            buckets = merge_aggregate_buckets(rows, topic_ids)
+            for bucket, partial in sorted(buckets.items()):
+                if partial[0] < min_count:
+                    skipped += 1
+                    continue
+                table_rows[agg_type].append((
+                    start_time + timedelta(seconds=period * (bucket + 1)),
+                    agg_topic_id,
+                    compute_aggregate_value(agg_type, partial),
+                    topic_ids))
+            if skipped:
+                _log.warn(
+                    "Skipping recording of aggregate data for {topic} for "
+                    "{skipped} of {total} periods between {start_time} and "
+                    "{end_time} as number of records is less than minimum "
+                    "allowed({count})".format(
+                        topic=data.get('topic_name_pattern') or
+                        data['topic_names'],
+                        skipped=skipped, total=num_periods,
+                        start_time=start_time, end_time=last_end_time,
+                        count=min_count))
+            if len(buckets) < num_periods:
+                _log.debug(
+                    "No records found for topic {topic} in {missing} of "
+                    "{total} periods between {start_time} and "
+                    "{end_time}".format(
+                        topic=data.get('topic_name_pattern') or
+                        data['topic_names'],
+                        missing=num_periods - len(buckets),
+                        total=num_periods, start_time=start_time,
+                        end_time=last_end_time))
+
+        for agg_type, agg_rows in table_rows.items():
+            self.insert_aggregates(agg_type, agg_time_period, agg_rows)
+
+        return collection_time + timedelta(seconds=period * (num_periods - 1))
+
     @abstractmethod
     def get_topic_map(self):
         """
@@ -508,6 +748,47 @@ class AggregateHistorian(Agent):
         """
         pass
 
+    def collect_aggregate_buckets(self, topic_ids, start_time, end_time,
+                                  period):
+        """
+        Collect partial aggregates for consecutive time periods with a single
+        scan of the historian's data store. Bucket ``n`` covers
+        ``[start_time + n * period, start_time + (n + 1) * period)``.
+        Required if :py:attr:`bulk_aggregation` is True.
+
+        :param topic_ids: list of topic ids to aggregate
+        :param start_time: start time of the first period (inclusive)
+        :param end_time: end time of the last period (exclusive)
+        :param period: length of each period in seconds
+        :return: list of (topic_id, bucket, count, sum, min, max) tuples
+        """
+        raise NotImplementedError()
+
+    def insert_aggregates(self, agg_type, agg_time_period, rows):
+        """
+        Insert aggregates for many time periods into the
+        <agg_type>_<period> table. Required if :py:attr:`bulk_aggregation`
+        is True.
+
+        :param agg_type: type of aggregation
+        :param agg_time_period: The time period of aggregation
+        :param rows: list of (end time, aggregate topic id, computed
+                     aggregate, topic ids) tuples
+        """
+        raise NotImplementedError()
+
+    def get_aggregate_watermarks(self, agg_type, agg_time_period):
+        """
+        Find the end time of the latest aggregate recorded for each
+        aggregate topic of the given aggregation type and period. Required
+        if :py:attr:`bulk_aggregation` is True.
+
+        :param agg_type: type of aggregation
+        :param agg_time_period: The time period of aggregation
+        :return: dictionary of {agg_topic_id: end time in utc}
+        """
+        raise NotImplementedError()
+
     def is_supported_aggregation(self, agg_type):
         """
         Checks if the given aggregation is supported by the historian's
@@ -578,6 +859,28 @@ class AggregateHistorian(Agent):
 
         return str(period) + unit
 
+    @staticmethod
+    def compute_aggregation_period_seconds(agg_period):
+        """
+        Length of an aggregation time period in seconds. Monthly periods are
+        not of fixed length and raise a ValueError.
+
+        :param agg_period: period string from AggregateHistorian config
+        :return: length of the period in seconds
+        """
+        period_int = int(agg_period[:-1])
+        unit = agg_period[-1:]
+        if unit == 'm':
+            return period_int * 60
+        elif unit == 'h':
+            return period_int * 3600
+        elif unit == 'd':
+            return period_int * 86400
+        elif unit == 'w':
+            return period_int * 604800
+        raise ValueError(
+            "Aggregation period {} is not of fixed length".format(agg_period))
+
     @staticmethod
     def compute_next_collection_time(collection_time, agg_period,
                                      use_calendar_periods):
@@ -206,6 +206,39 @@ As records are published to the data store
 records that was published or :py:meth:`BaseHistorianAgent.report_all_handled`
 if everything was published.
 
+Device Frames
+-------------
+
+By default every device scrape is split into one record per point before
+it is queued for the publishing thread. A historian created with
+`capture_device_frames=True` instead queues the whole scrape as a single
+device frame record. The frame shares one timestamp, source and meta
+dictionary between all points of the device:
+
+.. code-block:: python
+
+    {
+        'source': 'scrape',
+        'device': "pnnl/isb1/hvac1",
+        'timestamp': timestamp1.replace(tzinfo=pytz.UTC),
+        'points': ("thermostat", "temperature"),
+        'values': [73.0, 74.1],
+        'meta': {"thermostat": {"units": "F", "tz": "UTC", "type": "float"},
+                 "temperature": {"units": "F", "tz": "UTC", "type": "float"}}
+    }
+
+The backup cache stores frames natively, without building a record per
+point. Historians that set the class attribute
+:py:attr:`BaseHistorianAgent.publish_device_frames` to True will also
+receive device frames in `to_publish_list`. Cached rows that share a
+timestamp, source and device are grouped into one frame with an `_ids`
+list in place of `_id`. Records that do not come from a device (log,
+record and actuator data) are still passed as individual records so
+these historians must handle both forms. :py:func:`is_device_frame`
+tells them apart and :py:func:`expand_device_frame` turns a frame back
+into individual records. A frame may be split over two batches when the
+batch reaches `submit_size_limit`.
+
 Querying Data
 -------------
 
@@ -217,6 +250,10 @@ Querying Data
   :py:meth:`BaseQueryHistorianAgent.query_topics_metadata` will be called.
 - When a request is made for the list of aggregate topics available
   :py:meth:`BaseQueryHistorianAgent.query_aggregate_topics` will be called
+- Large results can be read in chunks by opening a cursor with the
+  `query_open` RPC call and reading it with `query_next`. Each chunk is
+  read with :py:meth:`BaseQueryHistorianAgent.query_historian` when it is
+  requested so implemented Historians get paging for free.
 
 
 Other Notes
@@ -235,19 +272,21 @@ from __future__ import absolute_import, print_function
 import logging
 import sqlite3
 import threading
+import time
+import uuid
 import weakref
 from Queue import Queue, Empty
 from abc import abstractmethod
 from collections import defaultdict
 from datetime import datetime, timedelta
+from itertools import izip
 from threading import Thread
 
 import pytz
 import re
-from dateutil.parser import parse
 from volttron.platform.agent.base_aggregate_historian import AggregateHistorian
 from volttron.platform.agent.utils import process_timestamp, \
-    fix_sqlite3_datetime, get_aware_utc_now
+    fix_sqlite3_datetime, get_aware_utc_now, parse_timestamp_string
 from volttron.platform.messaging import topics, headers as headers_mod
 from volttron.platform.vip.agent import *
 from volttron.platform.vip.agent import compat
@@ -261,6 +300,58 @@ ALL_REX = re.compile('.*/all$')
 # Register a better datetime parser in sqlite3.
 fix_sqlite3_datetime()
 
+BACKUP_JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL')
+BACKUP_SYNCHRONOUS_LEVELS = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+# Statements used by the backup cache write path. Keeping the text
+# identical between calls lets sqlite3 reuse the prepared statements.
+_INSERT_TOPIC = '''INSERT INTO topics values (?,?)'''
+_INSERT_METADATA = '''INSERT OR REPLACE INTO metadata
+                      values(?, ?, ?, ?)'''
+_INSERT_OUTSTANDING = '''INSERT OR REPLACE INTO outstanding
+                         values(NULL, ?, ?, ?, ?)'''
+
+
+# Sources of records captured from device or analysis "all" publishes.
+DEVICE_FRAME_SOURCES = ('scrape', 'analysis')
+
+
+def is_device_frame(record):
+    """Return True if `record` is a device frame rather than a single
+    topic record."""
+    return 'points' in record
+
+
+def expand_device_frame(frame):
+    """Generate the individual records for each point of a device frame
+    as returned by :py:meth:`BackupDatabase.get_outstanding_to_publish`.
+    """
+    device = frame['device']
+    meta = frame['meta']
+    for _id, point, value in izip(frame['_ids'], frame['points'],
+                                  frame['values']):
+        yield {'_id': _id,
+               'timestamp': frame['timestamp'],
+               'source': frame['source'],
+               'topic': device + '/' + point,
+               'value': value,
+               'meta': meta.get(point, {})}
+
+
+def _validate_pragma(name, value, allowed):
+    """Normalize a backup database PRAGMA setting.
+
+    :returns: Upper cased value or None if `value` is None.
+    :raises ValueError: If `value` is not one of `allowed`.
+    """
+    if value is None:
+        return None
+    value = str(value).upper()
+    if value not in allowed:
+        raise ValueError("Invalid backup {} {!r}. Must be one of {}".format(
+            name, value, ", ".join(allowed)))
+    return value
+
 
 class BaseHistorianAgent(Agent):
     """This is the base agent for historian Agents.
@@ -289,11 +380,19 @@ class BaseHistorianAgent(Agent):
     historian.
     """
 
+    #: Set to True in a subclass whose
+    #: :py:meth:`BaseHistorianAgent.publish_to_historian` accepts device
+    #: frame records in addition to individual records.
+    publish_device_frames = False
+
     def __init__(self,
                  retry_period=300.0,
                  submit_size_limit=1000,
                  max_time_publishing=30,
                  backup_storage_limit_gb=None,
+                 backup_journal_mode=None,
+                 backup_synchronous=None,
+                 capture_device_frames=False,
                  topic_replace_list=None,
                  **kwargs):
 
@@ -308,6 +407,9 @@ class BaseHistorianAgent(Agent):
 
         self.volttron_table_defs = 'volttron_table_definitions'
         self._backup_storage_limit_gb = backup_storage_limit_gb
+        self._backup_journal_mode = backup_journal_mode
+        self._backup_synchronous = backup_synchronous
+        self._capture_device_frames = capture_device_frames
         self._started = False
         self._retry_period = retry_period
         self._submit_size_limit = submit_size_limit
@@ -572,6 +674,15 @@ class BaseHistorianAgent(Agent):
             "Queuing {topic} from {source} for publish".format(topic=topic,
                                                                source=source))
 
+        if self._capture_device_frames:
+            self._event_queue.put({'source': source,
+                                   'device': device,
+                                   'timestamp': timestamp,
+                                   'points': tuple(values.keys()),
+                                   'values': values.values(),
+                                   'meta': meta})
+            return
+
         for key, value in values.iteritems():
             point_topic = device + '/' + key
             self._event_queue.put({'source': source,
@@ -590,7 +701,7 @@ class BaseHistorianAgent(Agent):
                 "message for {topic} missing timetamp".format(topic=topic))
             return
         try:
-            timestamp = parse(timestamp_string)
+            timestamp = parse_timestamp_string(timestamp_string)
         except (ValueError, TypeError) as e:
             _log.error("message for {} bad timetamp string: "
                        "{}".format(topic, timestamp_string))
@@ -629,7 +740,9 @@ class BaseHistorianAgent(Agent):
 
         _log.debug("Starting process loop.")
 
-        backupdb = BackupDatabase(self, self._backup_storage_limit_gb)
+        backupdb = BackupDatabase(self, self._backup_storage_limit_gb,
+                                  journal_mode=self._backup_journal_mode,
+                                  synchronous=self._backup_synchronous)
 
         # Sets up the concrete historian
         self.historian_setup()
@@ -671,7 +784,8 @@ class BaseHistorianAgent(Agent):
 
             while True:
                 to_publish_list = backupdb.get_outstanding_to_publish(
-                    self._submit_size_limit)
+                    self._submit_size_limit,
+                    device_frames=self.publish_device_frames)
                 if not to_publish_list or not self._started:
                     break
 
@@ -707,7 +821,13 @@ class BaseHistorianAgent(Agent):
         """
         if isinstance(record, list):
             for x in record:
-                self._successful_published.add(x['_id'])
+                self._add_handled(x)
+        else:
+            self._add_handled(record)
+
+    def _add_handled(self, record):
+        if is_device_frame(record):
+            self._successful_published.update(record['_ids'])
         else:
             self._successful_published.add(record['_id'])
 
@@ -760,6 +880,10 @@ class BaseHistorianAgent(Agent):
         the way the cache
         treats meta data.
 
+        If :py:attr:`publish_device_frames` is True the list may also
+        contain device frame records. See the Device Frames section of
+        :py:mod:`volttron.platform.agent.base_historian` for their format.
+
         Once one or more records are published either
         :py:meth:`BaseHistorianAgent.report_handled` or
         :py:meth:`BaseHistorianAgent.report_handled` must be called to
@@ -794,15 +918,31 @@ class BackupDatabase:
 
     Historian implementors do not need to use this class. It is for internal
     use only.
+
+    New data is written in bulk. Readings and metadata changes for a whole
+    batch are collected and written with a single ``executemany`` per table
+    inside one transaction. The insert statements are module level
+    constants so the statement cache of the sqlite3 connection reuses the
+    prepared plans across calls to :py:meth:`backup_new_data`.
+
+    `journal_mode` and `synchronous` are passed to the matching sqlite
+    PRAGMAs when set. ``journal_mode='WAL'`` with ``synchronous='NORMAL'``
+    gives the highest ingest rate at the cost of possibly losing the last
+    few committed batches on power failure (the cache is never corrupted).
     """
 
-    def __init__(self, owner, backup_storage_limit_gb):
+    def __init__(self, owner, backup_storage_limit_gb, journal_mode=None,
+                 synchronous=None):
         # The topic cache is only meant as a local lookup and should not be
         # accessed via the implemented historians.
         self._backup_cache = {}
         self._meta_data = defaultdict(dict)
         self._owner = weakref.ref(owner)
         self._backup_storage_limit_gb = backup_storage_limit_gb
+        self._journal_mode = _validate_pragma('journal_mode', journal_mode,
+                                              BACKUP_JOURNAL_MODES)
+        self._synchronous = _validate_pragma('synchronous', synchronous,
+                                             BACKUP_SYNCHRONOUS_LEVELS)
         self._setupdb()
 
     def backup_new_data(self, new_publish_list):
@@ -827,42 +967,62 @@ class BackupDatabase:
                     (SELECT ROWID FROM outstanding
                     ORDER BY ROWID ASC LIMIT 100)''')
 
+        meta_rows = []
+        outstanding_rows = []
+        dumps = jsonapi.dumps
         for item in new_publish_list:
             source = item['source']
-            topic = item['topic']
-            meta = item.get('meta', {})
-            values = item['readings']
-
-            topic_id = self._backup_cache.get(topic)
-
-            if topic_id is None:
-                c.execute('''INSERT INTO topics values (?,?)''',
-                          (None, topic))
-                c.execute('''SELECT last_insert_rowid()''')
-                row = c.fetchone()
-                topic_id = row[0]
-                self._backup_cache[topic_id] = topic
-                self._backup_cache[topic] = topic_id
-
-            meta_dict = self._meta_data[(source, topic_id)]
-            for name, value in meta.iteritems():
-                current_meta_value = meta_dict.get(name)
-                if current_meta_value != value:
-                    c.execute('''INSERT OR REPLACE INTO metadata
-                                 values(?, ?, ?, ?)''',
-                              (source, topic_id, name, value))
-                    meta_dict[name] = value
-
-            for timestamp, value in values:
+
+            if is_device_frame(item):
+                timestamp = item['timestamp']
                 if timestamp is None:
                     timestamp = get_aware_utc_now()
-                c.execute(
-                    '''INSERT OR REPLACE INTO outstanding
-                    values(NULL, ?, ?, ?, ?)''',
-                    (timestamp, source, topic_id, jsonapi.dumps(value)))
+                prefix = item['device'] + '/'
+                frame_meta = item.get('meta', {})
+                for point, value in izip(item['points'], item['values']):
+                    topic_id = self._get_topic_id(c, prefix + point)
+                    self._update_meta(source, topic_id,
+                                      frame_meta.get(point, {}), meta_rows)
+                    outstanding_rows.append(
+                        (timestamp, source, topic_id, dumps(value)))
+                continue
+
+            topic_id = self._get_topic_id(c, item['topic'])
+            self._update_meta(source, topic_id, item.get('meta', {}),
+                              meta_rows)
+
+            for timestamp, value in item['readings']:
+                if timestamp is None:
+                    timestamp = get_aware_utc_now()
+                outstanding_rows.append(
+                    (timestamp, source, topic_id, dumps(value)))
+
+        if meta_rows:
+            c.executemany(_INSERT_METADATA, meta_rows)
+        if outstanding_rows:
+            c.executemany(_INSERT_OUTSTANDING, outstanding_rows)
 
         self._connection.commit()
 
+    def _get_topic_id(self, cursor, topic):
+        topic_id = self._backup_cache.get(topic)
+
+        if topic_id is None:
+            cursor.execute(_INSERT_TOPIC, (None, topic))
+            topic_id = cursor.lastrowid
+            self._backup_cache[topic_id] = topic
+            self._backup_cache[topic] = topic_id
+
+        return topic_id
+
+    def _update_meta(self, source, topic_id, meta, meta_rows):
+        meta_dict = self._meta_data[(source, topic_id)]
+        for name, value in meta.iteritems():
+            current_meta_value = meta_dict.get(name)
+            if current_meta_value != value:
+                meta_rows.append((source, topic_id, name, value))
+                meta_dict[name] = value
+
     def remove_successfully_published(self, successful_publishes,
                                       submit_size):
         """
@@ -897,12 +1057,15 @@ class BackupDatabase:
 
         self._connection.commit()
 
-    def get_outstanding_to_publish(self, size_limit):
+    def get_outstanding_to_publish(self, size_limit, device_frames=False):
         """
         Retrieve up to `size_limit` records from the cache.
 
         :param size_limit: Max number of records to retrieve.
+        :param device_frames: Group device data sharing a timestamp into
+                              device frame records.
         :type size_limit: int
+        :type device_frames: bool
         :returns: List of records for publication.
         :rtype: list
         """
@@ -912,17 +1075,40 @@ class BackupDatabase:
                   (size_limit,))
 
         results = []
+        frames = {}
         for row in c:
             _id = row[0]
-            timestamp = row[1]
+            timestamp = row[1].replace(tzinfo=pytz.UTC)
             source = row[2]
             topic_id = row[3]
             value = jsonapi.loads(row[4])
+            topic = self._backup_cache[topic_id]
             meta = self._meta_data[(source, topic_id)].copy()
+
+            if device_frames and source in DEVICE_FRAME_SOURCES:
+                device, point = topic.rsplit('/', 1)
+                key = (timestamp, source, device)
+                frame = frames.get(key)
+                if frame is None:
+                    frame = {'_ids': [],
+                             'timestamp': timestamp,
+                             'source': source,
+                             'device': device,
+                             'points': [],
+                             'values': [],
+                             'meta': {}}
+                    frames[key] = frame
+                    results.append(frame)
+                frame['_ids'].append(_id)
+                frame['points'].append(point)
+                frame['values'].append(value)
+                frame['meta'][point] = meta
+                continue
+
             results.append({'_id': _id,
-                            'timestamp': timestamp.replace(tzinfo=pytz.UTC),
+                            'timestamp': timestamp,
                             'source': source,
-                            'topic': self._backup_cache[topic_id],
+                            'topic': topic,
                             'value': value,
                             'meta': meta})
 
@@ -939,6 +1125,12 @@ class BackupDatabase:
 
         c = self._connection.cursor()
 
+        if self._journal_mode is not None:
+            c.execute('PRAGMA journal_mode = {}'.format(self._journal_mode))
+            _log.debug("Backup DB journal mode: {}".format(c.fetchone()[0]))
+        if self._synchronous is not None:
+            c.execute('PRAGMA synchronous = {}'.format(self._synchronous))
+
         if self._backup_storage_limit_gb is not None:
             c.execute('''PRAGMA page_size''')
             page_size = c.fetchone()[0]
@@ -998,6 +1190,13 @@ class BaseQueryHistorianAgent(Agent):
     their data stores.
     """
 
+    #: Seconds after which an unused query cursor is closed.
+    query_cursor_timeout = 300
+
+    def __init__(self, **kwargs):
+        self._query_cursors = {}
+        super(BaseQueryHistorianAgent, self).__init__(**kwargs)
+
     @RPC.export
     def get_topic_list(self):
         """RPC call to get a list of topics in data store
@@ -1138,6 +1337,19 @@ class BaseQueryHistorianAgent(Agent):
 
         """
 
+        start, end, agg_period = self._parse_query_args(topic, start, end,
+                                                        agg_type, agg_period)
+
+        results = self.query_historian(topic, start, end, agg_type,
+                                       agg_period, skip, count, order)
+        metadata = results.get("metadata", None)
+        values = results.get("values", None)
+        if values and metadata is None:
+            results['metadata'] = {}
+
+        return results
+
+    def _parse_query_args(self, topic, start, end, agg_type, agg_period):
         if topic is None:
             raise TypeError('"Topic" required')
 
@@ -1157,28 +1369,102 @@ class BaseQueryHistorianAgent(Agent):
                 agg_period)
         if start is not None:
             try:
-                start = parse(start)
+                start = parse_timestamp_string(start)
             except TypeError:
                 start = time_parser.parse(start)
 
         if end is not None:
             try:
-                end = parse(end)
+                end = parse_timestamp_string(end)
             except TypeError:
                 end = time_parser.parse(end)
 
         if start:
             _log.debug("start={}".format(start))
 
-        results = self.query_historian(topic, start, end, agg_type,
-                                       agg_period, skip, count, order)
-        metadata = results.get("metadata", None)
-        values = results.get("values", None)
-        if values and metadata is None:
-            results['metadata'] = {}
+        return start, end, agg_period
+
+    @RPC.export
+    def query_open(self, topic=None, start=None, end=None, agg_type=None,
+                   agg_period=None, skip=0, count=None, order="FIRST_TO_LAST",
+                   chunk_size=1000):
+        """RPC call to open a cursor over the results of a query.
+
+        Takes the same arguments as :py:meth:`BaseQueryHistorianAgent.query`
+        plus `chunk_size`. The results are read with
+        :py:meth:`BaseQueryHistorianAgent.query_next` in chunks of at most
+        `chunk_size` values, so neither the historian nor the caller needs
+        to hold the whole result in memory. Each chunk is fetched from the
+        data store when it is requested and no database cursor is held
+        between calls.
+
+        A cursor that is not used for `query_cursor_timeout` seconds is
+        closed.
+
+        :param chunk_size: Maximum number of values returned by each call
+                           to :py:meth:`BaseQueryHistorianAgent.query_next`
+        :type chunk_size: int
+        :return: Id of the cursor to pass to
+                 :py:meth:`BaseQueryHistorianAgent.query_next`
+        :rtype: str
+        """
+        start, end, agg_period = self._parse_query_args(topic, start, end,
+                                                        agg_type, agg_period)
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be greater than 0")
+
+        self._expire_query_cursors()
+        cursor_id = str(uuid.uuid4())
+        self._query_cursors[cursor_id] = _QueryCursor(
+            topic, start, end, agg_type, agg_period, skip, count, order,
+            chunk_size)
+        return cursor_id
+
+    @RPC.export
+    def query_next(self, cursor_id):
+        """RPC call to read the next chunk of results from a cursor opened
+        with :py:meth:`BaseQueryHistorianAgent.query_open`.
+
+        The cursor is closed after the last chunk is returned.
+
+        :param cursor_id: Id returned by
+                          :py:meth:`BaseQueryHistorianAgent.query_open`
+        :type cursor_id: str
+        :return: The next chunk in the same form as the results of
+                 :py:meth:`BaseQueryHistorianAgent.query` with an additional
+                 "more" entry that is False once the results are exhausted.
+        :rtype: dict
+        """
+        self._expire_query_cursors()
+        cursor = self._query_cursors.get(cursor_id)
+        if cursor is None:
+            raise ValueError(
+                "Unknown or expired query cursor {}".format(cursor_id))
 
+        results = cursor.next_chunk(self.query_historian)
+        if not results['more']:
+            del self._query_cursors[cursor_id]
         return results
 
+    @RPC.export
+    def query_close(self, cursor_id):
+        """RPC call to close a cursor opened with
+        :py:meth:`BaseQueryHistorianAgent.query_open` before all results
+        are read.
+
+        :param cursor_id: Id returned by
+                          :py:meth:`BaseQueryHistorianAgent.query_open`
+        :type cursor_id: str
+        """
+        self._query_cursors.pop(cursor_id, None)
+
+    def _expire_query_cursors(self):
+        expire_before = time.time() - self.query_cursor_timeout
+        for cursor_id, cursor in self._query_cursors.items():
+            if cursor.last_used < expire_before:
+                _log.debug("Closing idle query cursor {}".format(cursor_id))
+                del self._query_cursors[cursor_id]
+
     @abstractmethod
     def query_historian(self, topic, start=None, end=None, agg_type=None,
                         agg_period=None, skip=0, count=None, order=None):
@@ -1248,6 +1534,85 @@ class BaseQueryHistorianAgent(Agent):
         """
 
 
+class _QueryCursor(object):
+    """
+    Paging state of a query opened with
+    :py:meth:`BaseQueryHistorianAgent.query_open`.
+
+    Topics are read one after the other. Each chunk is read from the data
+    store with :py:meth:`BaseQueryHistorianAgent.query_historian`, starting
+    (or ending, for "LAST_TO_FIRST" queries) at the timestamp of the last
+    value returned for the topic and skipping that value. Timestamps are
+    unique per topic in every data store so no value is repeated or lost.
+    """
+
+    def __init__(self, topic, start, end, agg_type, agg_period, skip, count,
+                 order, chunk_size):
+        self.multi_topic = isinstance(topic, list)
+        self.topics = topic if self.multi_topic else [topic]
+        self.start = start
+        self.end = end
+        self.agg_type = agg_type
+        self.agg_period = agg_period
+        self.skip = skip
+        self.count = count
+        self.order = order
+        self.chunk_size = chunk_size
+        self.last_used = time.time()
+
+        self._topic_index = 0
+        self._last_ts = None
+        self._returned = 0
+
+    def _next_topic(self):
+        self._topic_index += 1
+        self._last_ts = None
+        self._returned = 0
+
+    def next_chunk(self, query_historian):
+        self.last_used = time.time()
+        values = {} if self.multi_topic else []
+        metadata = {}
+        remaining = self.chunk_size
+
+        while remaining > 0 and self._topic_index < len(self.topics):
+            topic = self.topics[self._topic_index]
+            limit = remaining
+            if self.count is not None:
+                limit = min(limit, self.count - self._returned)
+
+            start, end, skip = self.start, self.end, self.skip
+            if self._last_ts is not None:
+                if self.order == "LAST_TO_FIRST":
+                    end = parse_timestamp_string(self._last_ts)
+                else:
+                    start = parse_timestamp_string(self._last_ts)
+                skip = 1
+
+            results = query_historian(topic, start, end, self.agg_type,
+                                      self.agg_period, skip, limit,
+                                      self.order)
+            rows = results.get('values') or []
+            if not self.multi_topic:
+                metadata = results.get('metadata') or {}
+
+            if rows:
+                self._last_ts = rows[-1][0]
+                self._returned += len(rows)
+                remaining -= len(rows)
+                if self.multi_topic:
+                    values.setdefault(topic, []).extend(rows)
+                else:
+                    values.extend(rows)
+
+            if len(rows) < limit or self._returned == self.count:
+                self._next_topic()
+
+        return {'values': values,
+                'metadata': metadata,
+                'more': self._topic_index < len(self.topics)}
+
+
 class BaseHistorian(BaseHistorianAgent, BaseQueryHistorianAgent):
     def __init__(self, **kwargs):
         _log.debug('Constructor of BaseHistorian thread: {}'.format(
@@ -0,0 +1,156 @@
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+from volttron.platform.agent.base_aggregate_historian import (
+    AggregateHistorian, compute_aggregate_value, merge_aggregate_buckets)
+from volttron.platform.agent.utils import fix_sqlite3_datetime
+from volttron.platform.dbutils.sqlitefuncts import SqlLiteFuncts
+
+fix_sqlite3_datetime()
+
+TABLE_NAMES = {'data_table': 'data',
+               'topics_table': 'topics',
+               'meta_table': 'meta',
+               'agg_topics_table': 'aggregate_topics',
+               'agg_meta_table': 'aggregate_meta'}
+
+
+class BulkHistorian(AggregateHistorian):
+    bulk_aggregation = True
+
+    def __init__(self, functs):
+        # Skip agent setup, only the aggregation methods are exercised.
+        self.functs = functs
+        self.agg_topic_id_map = {('average', 'avg', '5m'): 1,
+                                 ('count', 'count', '5m'): 2,
+                                 ('total', 'total', '5m'): 3}
+        self.core = self
+        self.scheduled = []
+
+    def schedule(self, deadline, *args):
+        self.scheduled.append(deadline)
+
+    def collect_aggregate(self, topic_ids, agg_type, start_time, end_time):
+        return self.functs.collect_aggregate(topic_ids, agg_type,
+                                             start_time, end_time)
+
+    def insert_aggregate(self, agg_topic_id, agg_type, period, end_time,
+                         value, topic_ids):
+        self.functs.insert_aggregate(agg_topic_id, agg_type, period,
+                                     end_time, value, topic_ids)
+
+    def collect_aggregate_buckets(self, topic_ids, start_time, end_time,
+                                  period):
+        return self.functs.collect_aggregate_buckets(topic_ids, start_time,
+                                                     end_time, period)
+
+    def insert_aggregates(self, agg_type, agg_time_period, rows):
+        self.functs.bulk_insert_aggregates(agg_type, agg_time_period, rows)
+
+    def get_aggregate_watermarks(self, agg_type, agg_time_period):
+        return self.functs.get_aggregate_watermarks(agg_type,
+                                                    agg_time_period)
+
+
+def test_merge_aggregate_buckets():
+    rows = [(1, 0, 2, 10.0, 4.0, 6.0),
+            (2, 0, 1, 1.0, 1.0, 1.0),
+            (3, 0, 5, 50.0, 0.0, 20.0),
+            (1, 1, 1, 7.0, 7.0, 7.0)]
+    merged = merge_aggregate_buckets(rows, [1, 2])
+    assert merged == {0: [3, 11.0, 1.0, 6.0], 1: [1, 7.0, 7.0, 7.0]}
+    assert compute_aggregate_value('AVG', merged[0]) == 11.0 / 3
+    assert compute_aggregate_value('count', merged[0]) == 3
+    with pytest.raises(ValueError):
+        compute_aggregate_value('median', merged[0])
+
+
+def test_catch_up_in_one_pass(tmpdir):
+    functs = SqlLiteFuncts({'database': str(tmpdir.join('hist.sqlite'))},
+                           TABLE_NAMES)
+    functs.setup_historian_tables()
+    topic_ids = [functs.insert_topic('device/point{}'.format(i))[0]
+                 for i in range(2)]
+    functs.commit()
+    functs.create_aggregate_store('avg', '5m')
+    functs.create_aggregate_store('count', '5m')
+
+    now = datetime.utcnow().replace(tzinfo=pytz.utc)
+    start = now.replace(minute=0, second=0, microsecond=0) - \
+        timedelta(hours=2)
+    # Leave the first half hour of the second point empty so min_count
+    # skips those periods.
+    functs.bulk_insert_data([(start + timedelta(minutes=m), topic_id, m)
+                             for m in range(120) for topic_id in topic_ids
+                             if m >= 30 or topic_id == topic_ids[0]])
+    functs.commit()
+
+    historian = BulkHistorian(functs)
+    points = [{'aggregation_type': 'avg',
+               'aggregation_topic_name': 'average',
+               'topic_ids': topic_ids,
+               'topic_names': ['device/point0', 'device/point1'],
+               'min_count': 6},
+              {'aggregation_type': 'count',
+               'aggregation_topic_name': 'count',
+               'topic_ids': topic_ids[1:],
+               'topic_names': ['device/point1']}]
+    collection_time = start + timedelta(minutes=5)
+    last_collection_time = historian._collect_aggregate_buckets(
+        collection_time, '5m', True, points)
+    assert last_collection_time <= now < \
+        last_collection_time + timedelta(minutes=5)
+
+    averages = functs.select('SELECT ts, value_string FROM avg_5m', None)
+    assert len(averages) == 18
+    for ts, value in averages:
+        expected, count = functs.collect_aggregate(
+            topic_ids, 'avg', ts - timedelta(minutes=5), ts)
+        assert float(value) == expected
+        assert count == 10
+
+    counts = functs.select('SELECT ts, value_string FROM count_5m', None)
+    assert sorted(int(v) for _, v in counts) == [5] * 18
+
+    assert historian._compute_resume_time('5m', points) == \
+        start + timedelta(minutes=125)
+
+
+def test_unsupported_type_uses_per_period_path(tmpdir):
+    functs = SqlLiteFuncts({'database': str(tmpdir.join('hist.sqlite'))},
+                           TABLE_NAMES)
+    functs.setup_historian_tables()
+    topic_id = functs.insert_topic('device/point')[0]
+    functs.commit()
+    functs.create_aggregate_store('avg', '5m')
+    functs.create_aggregate_store('total', '5m')
+
+    end = datetime.utcnow().replace(tzinfo=pytz.utc, second=0,
+                                    microsecond=0)
+    start = end - timedelta(minutes=5)
+    functs.bulk_insert_data([(start + timedelta(minutes=m), topic_id, m)
+                             for m in range(5)])
+    functs.commit()
+
+    historian = BulkHistorian(functs)
+    points = [{'aggregation_type': 'avg',
+               'aggregation_topic_name': 'average',
+               'topic_ids': [topic_id],
+               'topic_names': ['device/point']},
+              # Types come from the JSON configuration as unicode.
+              {'aggregation_type': u'TOTAL',
+               'aggregation_topic_name': 'total',
+               'topic_ids': [topic_id],
+               'topic_names': ['device/point']}]
+    assert historian._use_bulk_aggregation('5m', points) is False
+    assert historian._use_bulk_aggregation('5m', points[:1])
+
+    historian.collect_aggregate_data(end, '5m', False, points)
+
+    assert [float(v) for _, v in functs.select(
+        'SELECT ts, value_string FROM avg_5m', None)] == [2.0]
+    assert [float(v) for _, v in functs.select(
+        'SELECT ts, value_string FROM total_5m', None)] == [10.0]
+    assert len(historian.scheduled) == 1
@@ -0,0 +1,72 @@
+import pytest
+
+from volttron.platform.agent.base_historian import BackupDatabase, \
+    is_device_frame, expand_device_frame
+from volttron.platform.agent.utils import get_aware_utc_now
+
+
+class Owner(object):
+    pass
+
+
+@pytest.fixture
+def backupdb(tmpdir):
+    with tmpdir.as_cwd():
+        owner = Owner()
+        db = BackupDatabase(owner, None, journal_mode='wal',
+                            synchronous='normal')
+        yield db
+
+
+def make_frame(timestamp):
+    return {'source': 'scrape',
+            'device': 'campus/building/unit',
+            'timestamp': timestamp,
+            'points': ('Heat', 'Cool'),
+            'values': [1.5, 2.5],
+            'meta': {'Heat': {'units': 'F'}, 'Cool': {'units': 'C'}}}
+
+
+def test_invalid_pragma(tmpdir):
+    with tmpdir.as_cwd():
+        with pytest.raises(ValueError):
+            BackupDatabase(Owner(), None, journal_mode='bogus')
+
+
+def test_frame_backed_up_as_points(backupdb):
+    now = get_aware_utc_now()
+    backupdb.backup_new_data([make_frame(now)])
+
+    records = backupdb.get_outstanding_to_publish(10)
+    assert len(records) == 2
+    by_topic = dict((r['topic'], r) for r in records)
+    assert by_topic['campus/building/unit/Heat']['value'] == 1.5
+    assert by_topic['campus/building/unit/Cool']['meta'] == {'units': 'C'}
+    assert not any(is_device_frame(r) for r in records)
+
+
+def test_frames_grouped_for_publish(backupdb):
+    now = get_aware_utc_now()
+    backupdb.backup_new_data([
+        make_frame(now),
+        {'source': 'log',
+         'topic': 'datalogger/campus/point',
+         'readings': [(now, 42)],
+         'meta': {}}])
+
+    records = backupdb.get_outstanding_to_publish(10, device_frames=True)
+    frames = [r for r in records if is_device_frame(r)]
+    assert len(records) == 2
+    assert len(frames) == 1
+
+    frame = frames[0]
+    assert frame['device'] == 'campus/building/unit'
+    assert sorted(zip(frame['points'], frame['values'])) == \
+        [('Cool', 2.5), ('Heat', 1.5)]
+
+    expanded = list(expand_device_frame(frame))
+    assert sorted(r['_id'] for r in expanded) == sorted(frame['_ids'])
+
+    backupdb.remove_successfully_published(set(frame['_ids']), 10)
+    remaining = backupdb.get_outstanding_to_publish(10, device_frames=True)
+    assert [r['topic'] for r in remaining] == ['datalogger/campus/point']
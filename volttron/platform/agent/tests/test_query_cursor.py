@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+import pytz
+
+from volttron.platform.agent.base_historian import _QueryCursor
+from volttron.platform.agent.utils import format_timestamp
+
+START = datetime(2016, 1, 1, tzinfo=pytz.UTC)
+DATA = {'a': [(START + timedelta(minutes=m), m) for m in range(10)],
+        'b': [(START + timedelta(minutes=m), 100 + m) for m in range(3)]}
+
+
+def query_historian(topic, start=None, end=None, agg_type=None,
+                    agg_period=None, skip=0, count=None, order=None):
+    rows = [(ts, v) for ts, v in DATA[topic]
+            if (start is None or ts >= start) and (end is None or ts <= end)]
+    if order == 'LAST_TO_FIRST':
+        rows.reverse()
+    rows = rows[skip:]
+    if count is not None:
+        rows = rows[:count]
+    return {'values': [(format_timestamp(ts), v) for ts, v in rows],
+            'metadata': {'units': 'F'}}
+
+
+def read_all(cursor):
+    chunks = []
+    while True:
+        results = cursor.next_chunk(query_historian)
+        chunks.append(results)
+        if not results['more']:
+            return chunks
+
+
+def test_single_topic_chunks():
+    cursor = _QueryCursor('a', None, None, None, None, 0, None,
+                          'FIRST_TO_LAST', 4)
+    chunks = read_all(cursor)
+    assert [len(c['values']) for c in chunks] == [4, 4, 2]
+    assert [v for c in chunks for _, v in c['values']] == range(10)
+    assert chunks[0]['metadata'] == {'units': 'F'}
+
+
+def test_single_topic_skip_count_reversed():
+    cursor = _QueryCursor('a', None, None, None, None, 1, 5,
+                          'LAST_TO_FIRST', 2)
+    chunks = read_all(cursor)
+    assert [v for c in chunks for _, v in c['values']] == [8, 7, 6, 5, 4]
+
+
+def test_multi_topic_chunks():
+    cursor = _QueryCursor(['a', 'b'], None, None, None, None, 0, 4,
+                          'FIRST_TO_LAST', 3)
+    chunks = read_all(cursor)
+    values = {}
+    for c in chunks:
+        for topic, rows in c['values'].items():
+            values.setdefault(topic, []).extend(v for _, v in rows)
+    assert values == {'a': [0, 1, 2, 3], 'b': [100, 101, 102]}
+    assert all(sum(len(r) for r in c['values'].values()) <= 3
+               for c in chunks)
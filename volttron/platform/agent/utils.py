@@ -61,9 +61,12 @@ import argparse
 import calendar
 import errno
 import logging
+import struct
 import sys
 import syslog
+import threading
 import traceback
+from collections import OrderedDict
 from datetime import datetime
 
 import gevent
@@ -74,7 +77,7 @@ import stat
 import string
 from volttron.platform import get_home, get_address
 from dateutil.parser import parse
-from dateutil.tz import tzutc
+from dateutil.tz import tzoffset, tzutc
 from tzlocal import get_localzone
 from zmq.utils import jsonapi
 
@@ -303,6 +306,92 @@ class JsonFormatter(logging.Formatter):
         return jsonapi.dumps(dct)
 
 
+#: First byte of a framed log record written to stderr by agents
+LOG_FRAME_MARKER = b'\x1e'
+#: Size of a log frame's payload, which follows the marker
+LOG_FRAME_SIZE = struct.Struct('!I')
+
+# levelno, created, lineno and the size of each string field
+_LOG_RECORD = struct.Struct('!HdI6I')
+_LOG_RECORD_FIELDS = ('name', 'msg', 'pathname', 'funcName', 'threadName',
+                      'exc_text')
+
+
+def _utf8(value):
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    return value if isinstance(value, str) else str(value)
+
+
+def encode_log_record(record):
+    """Pack a log record into the payload of a log frame.
+
+    The message is formatted with its arguments and any exception is
+    formatted into the exc_text field.
+    """
+    exc_text = record.exc_text
+    if record.exc_info and not exc_text:
+        exc_text = ''.join(traceback.format_exception(*record.exc_info))
+    fields = [_utf8(record.name), _utf8(record.getMessage()),
+              _utf8(record.pathname), _utf8(record.funcName or ''),
+              _utf8(record.threadName or ''), _utf8(exc_text or '')]
+    header = _LOG_RECORD.pack(record.levelno, record.created,
+                              record.lineno or 0,
+                              *[len(field) for field in fields])
+    return b''.join([header] + fields)
+
+
+def decode_log_record_header(payload):
+    """Return the level and logger name from a log frame payload."""
+    values = _LOG_RECORD.unpack_from(payload)
+    return values[0], payload[_LOG_RECORD.size:_LOG_RECORD.size + values[3]]
+
+
+def decode_log_record(payload):
+    """Unpack a log frame payload into a dictionary of record attributes.
+
+    The result may be passed to logging.makeLogRecord().
+    """
+    values = _LOG_RECORD.unpack_from(payload)
+    levelno, created, lineno = values[:3]
+    dct = {}
+    offset = _LOG_RECORD.size
+    for name, size in zip(_LOG_RECORD_FIELDS, values[3:]):
+        dct[name] = payload[offset:offset + size].decode('utf-8', 'replace')
+        offset += size
+    filename = os.path.basename(dct['pathname'])
+    dct.update(levelno=levelno, levelname=logging.getLevelName(levelno),
+               created=created, msecs=(created - int(created)) * 1000,
+               lineno=lineno, args=(), filename=filename,
+               module=os.path.splitext(filename)[0],
+               exc_text=dct['exc_text'] or None)
+    return dct
+
+
+class LogFrameHandler(logging.Handler):
+    """Write log records to a stream as length prefixed binary frames.
+
+    Used by agents started by the platform, which reads the frames from
+    the agent's stderr. Other output to the stream is passed through as
+    lines of text.
+    """
+
+    def __init__(self, stream=None):
+        super(LogFrameHandler, self).__init__()
+        self.stream = sys.stderr if stream is None else stream
+
+    def emit(self, record):
+        try:
+            payload = encode_log_record(record)
+            self.stream.write(LOG_FRAME_MARKER +
+                              LOG_FRAME_SIZE.pack(len(payload)) + payload)
+            self.stream.flush()
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except Exception:
+            self.handleError(record)
+
+
 class AgentFormatter(logging.Formatter):
     def __init__(self, fmt=None, datefmt=None):
         if fmt is None:
@@ -330,15 +419,27 @@ class AgentFormatter(logging.Formatter):
 
 
 def setup_logging(level=logging.DEBUG):
+    """Configure the root logger for an agent.
+
+    Agents started by the platform write framed log records to stderr.
+    The platform passes the lowest level it will keep in AGENT_LOG_LEVEL,
+    and records below it are dropped before they are created.
+    """
     root = logging.getLogger()
-    if not root.handlers:
+    if isapipe(sys.stderr) and '_LAUNCHED_BY_PLATFORM' in os.environ:
+        try:
+            platform_level = int(os.environ['AGENT_LOG_LEVEL'])
+        except (KeyError, ValueError):
+            platform_level = logging.NOTSET
+        level = max(level, platform_level)
+        if not root.handlers:
+            handler = LogFrameHandler()
+            handler.setLevel(platform_level)
+            root.addHandler(handler)
+    elif not root.handlers:
         handler = logging.StreamHandler()
-        if isapipe(sys.stderr) and '_LAUNCHED_BY_PLATFORM' in os.environ:
-            handler.setFormatter(JsonFormatter())
-        else:
-            fmt = '%(asctime)s %(name)s %(levelname)s: %(message)s'
-            handler.setFormatter(logging.Formatter(fmt))
-
+        fmt = '%(asctime)s %(name)s %(levelname)s: %(message)s'
+        handler.setFormatter(logging.Formatter(fmt))
         root.addHandler(handler)
     root.setLevel(level)
 
@@ -356,7 +457,9 @@ def format_timestamp(time_stamp):
     :rtype: str
     """
 
-    time_str = time_stamp.strftime("%Y-%m-%dT%H:%M:%S.%f")
+    time_str = '%04d-%02d-%02dT%02d:%02d:%02d.%06d' % (
+        time_stamp.year, time_stamp.month, time_stamp.day, time_stamp.hour,
+        time_stamp.minute, time_stamp.second, time_stamp.microsecond)
 
     if time_stamp.tzinfo is not None:
         sign = '+'
@@ -365,26 +468,90 @@ def format_timestamp(time_stamp):
             sign = '-'
             td = -td
 
-        seconds = td.seconds
-        minutes, seconds = divmod(seconds, 60)
-        hours, minutes = divmod(minutes, 60)
-        time_str += "{sign}{HH:02}:{MM:02}".format(sign=sign,
-                                                   HH=hours,
-                                                   MM=minutes)
+        minutes = td.seconds // 60
+        time_str += '%s%02d:%02d' % ((sign,) + divmod(minutes, 60))
 
     return time_str
 
 
+# Matches the strings written by format_timestamp and other ISO 8601
+# timestamps with a T or space separator and an optional fraction and
+# UTC offset.
+_ISO8601_RE = re.compile(
+    r'(\d{4})-(\d\d)-(\d\d)[T ](\d\d):(\d\d):(\d\d)(?:\.(\d{1,6}))?'
+    r'(?:(Z)|([+-])(\d\d):?(\d\d))?$')
+_UTC = tzutc()
+_tz_offsets = {0: _UTC}
+
+#: Number of recently parsed timestamp strings kept by
+#: parse_timestamp_string()
+TIMESTAMP_CACHE_SIZE = 1024
+_timestamp_cache = OrderedDict()
+_timestamp_cache_lock = threading.Lock()
+
+
+def _parse_iso8601(time_stamp_str):
+    match = _ISO8601_RE.match(time_stamp_str)
+    if match is None:
+        return None
+    (year, month, day, hour, minute, second, fraction,
+     zulu, sign, offset_hours, offset_minutes) = match.groups()
+    microsecond = int(fraction.ljust(6, '0')) if fraction else 0
+    if zulu:
+        tzinfo = _UTC
+    elif sign:
+        offset = int(offset_hours) * 3600 + int(offset_minutes) * 60
+        if sign == '-':
+            offset = -offset
+        try:
+            tzinfo = _tz_offsets[offset]
+        except KeyError:
+            tzinfo = _tz_offsets[offset] = tzoffset(None, offset)
+    else:
+        tzinfo = None
+    try:
+        return datetime(int(year), int(month), int(day), int(hour),
+                        int(minute), int(second), microsecond, tzinfo)
+    except ValueError:
+        return None
+
+
 def parse_timestamp_string(time_stamp_str):
     """
     Create a datetime object from the supplied date/time string.
-    Uses dateutil.parse with no extra parameters.
+
+    Strings in the ISO 8601 form written by format_timestamp are parsed
+    directly; anything else is passed to dateutil.parse with no extra
+    parameters. Zero UTC offsets give a tzutc timezone and others a
+    tzoffset, as dateutil does. The most recently parsed ISO 8601
+    strings are cached, as every point of a device publish shares one
+    timestamp. Other strings are not cached because dateutil fills in
+    missing fields from the current date.
 
     @param time_stamp_str:
     @return: value to convert
     """
-
-    return parse(time_stamp_str)
+    try:
+        with _timestamp_cache_lock:
+            time_stamp = _timestamp_cache.pop(time_stamp_str)
+            _timestamp_cache[time_stamp_str] = time_stamp
+        return time_stamp
+    except KeyError:
+        pass
+    except TypeError:
+        # Not a string; let dateutil raise the usual error.
+        return parse(time_stamp_str)
+
+    if not isinstance(time_stamp_str, basestring):
+        return parse(time_stamp_str)
+    time_stamp = _parse_iso8601(time_stamp_str)
+    if time_stamp is None:
+        return parse(time_stamp_str)
+    with _timestamp_cache_lock:
+        _timestamp_cache[time_stamp_str] = time_stamp
+        if len(_timestamp_cache) > TIMESTAMP_CACHE_SIZE:
+            _timestamp_cache.popitem(last=False)
+    return time_stamp
 
 
 def get_aware_utc_now():
@@ -431,7 +598,7 @@ def process_timestamp(timestamp_string, topic=''):
         return
 
     try:
-        timestamp = parse(timestamp_string)
+        timestamp = parse_timestamp_string(timestamp_string)
     except (ValueError, TypeError):
         _log.error("message for {topic} bad timetamp string: {ts_string}"
                    .format(topic=topic, ts_string=timestamp_string))
@@ -504,8 +671,8 @@ def fix_sqlite3_datetime(sql=None):
     """Primarily for fixing the base historian cache on certain versions
     of python.
     
-    Registers a new datetime converter to that uses dateutil parse. This
-    should
+    Registers a new datetime converter to that uses
+    parse_timestamp_string. This should
     better resolve #216, #174, and #91 without the goofy workarounds that
     change data.
     
@@ -513,4 +680,4 @@ def fix_sqlite3_datetime(sql=None):
     """
     if sql is None:
         import sqlite3 as sql
-    sql.register_converter("timestamp", parse)
+    sql.register_converter("timestamp", parse_timestamp_string)
@@ -61,10 +61,12 @@
 
 import contextlib
 import errno
+import itertools
 import logging
 import os
 import shutil
 import signal
+import struct
 import sys
 import uuid
 
@@ -83,12 +85,15 @@ except ImportError:
     import json as jsonapi
 
 from . import messaging
-from .agent.utils import is_valid_identity
+from .agent.utils import (is_valid_identity, LOG_FRAME_MARKER,
+                          LOG_FRAME_SIZE, decode_log_record,
+                          decode_log_record_header)
 from .messaging import topics
 from .packages import UnpackedPackage
 from .vip.agent import Agent
 from .keystore import KeyStore
 from .auth import AuthFile, AuthEntry
+from .launcher import AgentLauncher
 
 try:
     from volttron.restricted import auth
@@ -123,10 +128,74 @@ _level_map = {7: logging.DEBUG,      # LOG_DEBUG
               0: logging.CRITICAL,}  # LOG_EMERG
 
 
+def agent_log_level():
+    '''Return the lowest level of agent log record the platform keeps.
+
+    Records are checked against the agents.log logger, or the platform
+    logger of the same name if there is one, and are then handled by
+    the handlers of agents.log and its parents.
+    '''
+    log = logging.getLogger('agents.log')
+    loggers = [logger for logger in log.manager.loggerDict.itervalues()
+               if isinstance(logger, logging.Logger)]
+    level = min(logger.getEffectiveLevel() for logger in loggers + [log])
+    handlers = []
+    logger = log
+    while logger:
+        handlers.extend(logger.handlers)
+        logger = logger.parent if logger.propagate else None
+    if handlers:
+        level = max(level, min(handler.level for handler in handlers))
+    return level
+
+
+def read_log_stream(stream):
+    '''Read framed log records and lines of text from an agent's stderr.
+
+    Yields (payload, None) for each log frame and (None, line) for all
+    other output.
+    '''
+    read, readline = stream.read, stream.readline
+    while True:
+        first = read(1)
+        if not first:
+            return
+        if first == LOG_FRAME_MARKER:
+            header = read(LOG_FRAME_SIZE.size)
+            if len(header) < LOG_FRAME_SIZE.size:
+                return
+            size, = LOG_FRAME_SIZE.unpack(header)
+            yield read(size), None
+        else:
+            yield None, first + readline()
+
+
 def log_entries(name, agent, pid, level, stream):
     log = logging.getLogger(name)
     extra = {'processName': agent, 'process': pid}
-    for line in (l.rstrip('\r\n') for l in stream):
+    loggers = log.manager.loggerDict
+    for payload, line in read_log_stream(stream):
+        if payload is not None:
+            # Only the level and logger name are unpacked until the
+            # record is known to be kept.
+            try:
+                levelno, logger_name = decode_log_record_header(payload)
+            except struct.error:
+                continue
+            if logger_name in loggers:
+                if not logging.getLogger(logger_name).isEnabledFor(levelno):
+                    continue
+            elif not log.isEnabledFor(levelno):
+                continue
+            try:
+                record = logging.makeLogRecord(decode_log_record(payload))
+            except (struct.error, UnicodeError):
+                continue
+            record.remote_name, record.name = record.name, name
+            record.__dict__.update(extra)
+            log.handle(record)
+            continue
+        line = line.rstrip('\r\n')
         if line[0:1] == '{' and line[-1:] == '}':
             try:
                 obj = jsonapi.loads(line)
@@ -204,6 +273,11 @@ class ExecutionEnvironment(object):
                 raise
             raise OSError(*(e.args + (args[0],)))
 
+    def launch(self, launcher, *args, **kwargs):
+        '''Start the process by forking it from an AgentLauncher.'''
+        self.env = kwargs.get('env', None)
+        self.process = launcher.launch(*args, **kwargs)
+
     def __call__(self, *args, **kwargs):
         self.execute(*args, **kwargs)
 
@@ -214,6 +288,7 @@ class AIPplatform(object):
     def __init__(self, env, **kwargs):
         self.env = env
         self.agents = {}
+        self.launcher = None
 
     def setup(self):
         '''Creates paths for used directories for the instance.'''
@@ -231,6 +306,8 @@ class AIPplatform(object):
         for exeenv in self.agents.itervalues():
             if exeenv.process.poll() is None:
                 exeenv.process.kill()
+        if self.launcher is not None:
+            self.launcher.stop()
 
     def shutdown(self):
         for agent_uuid in self.agents.iterkeys():
@@ -265,11 +342,17 @@ class AIPplatform(object):
             if priority is not None:
                 agents.append((priority, agent_uuid))
         agents.sort(reverse=True)
-        for _, agent_uuid in agents:
+
+        def start(agent_uuid):
             try:
                 self.start_agent(agent_uuid)
             except Exception as exc:
                 errors.append((agent_uuid, str(exc)))
+
+        # Agents of the same priority are started together.
+        for _, group in itertools.groupby(agents, lambda agent: agent[0]):
+            gevent.joinall([gevent.spawn(start, agent_uuid)
+                            for _, agent_uuid in group])
         return errors
 
     def land_agent(self, agent_wheel):
@@ -582,6 +665,13 @@ class AIPplatform(object):
         _log.warning('missing execution requirements: %s', execreqs_json)
         return {}
 
+    def _get_launcher(self):
+        if getattr(self.env, 'agent_launcher', 'exec') != 'zygote':
+            return None
+        if self.launcher is None:
+            self.launcher = AgentLauncher(self.run_dir)
+        return self.launcher
+
     def start_agent(self, agent_uuid):
         name = self.agent_name(agent_uuid)
         agent_path = os.path.join(self.install_dir, agent_uuid, name)
@@ -629,6 +719,7 @@ class AIPplatform(object):
         environ['AGENT_PUB_ADDR'] = self.publish_address
         environ['AGENT_UUID'] = agent_uuid
         environ['_LAUNCHED_BY_PLATFORM'] = '1'
+        environ['AGENT_LOG_LEVEL'] = str(agent_log_level())
         if self.env.developer_mode:
             environ['_DEVELOPER_MODE'] = '1'
 
@@ -660,8 +751,12 @@ class AIPplatform(object):
         _log.info('starting agent %s', agent_path)
 
         data_dir = self._get_data_dir(agent_path)
-        execenv.execute(argv, cwd=data_dir, env=environ, close_fds=True,
-                        stdin=open(os.devnull), stdout=PIPE, stderr=PIPE)
+        launcher = self._get_launcher() if resmon is None else None
+        if launcher is None:
+            execenv.execute(argv, cwd=data_dir, env=environ, close_fds=True,
+                            stdin=open(os.devnull), stdout=PIPE, stderr=PIPE)
+        else:
+            execenv.launch(launcher, module, func, cwd=data_dir, env=environ)
         self.agents[agent_uuid] = execenv
         proc = execenv.process
         _log.info('agent %s has PID %s', agent_path, proc.pid)
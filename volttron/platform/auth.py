@@ -61,6 +61,8 @@ from __future__ import absolute_import, print_function
 
 import bisect
 import errno
+import heapq
+from collections import defaultdict
 import logging
 import os
 import random
@@ -74,6 +76,7 @@ from zmq.utils import jsonapi
 
 from .agent.utils import strip_comments, create_file_if_missing, watch_file
 from .vip.agent import Agent, Core, RPC
+from .vip.agent import errors
 from .vip.socket import encode_key, BASE64_ENCODED_CURVE_KEY_LEN
 
 _log = logging.getLogger(__name__)
@@ -117,6 +120,7 @@ class AuthService(Agent):
         self.zap_socket = None
         self._zap_greenlet = None
         self.auth_entries = []
+        self._index_auth_entries()
 
     @Core.receiver('onsetup')
     def setup_zap(self, sender, **kwargs):
@@ -125,7 +129,7 @@ class AuthService(Agent):
         if self.allow_any:
             _log.warn('insecure permissive authentication enabled')
         self.read_auth_file()
-        self.core.spawn(watch_file, self.auth_file_path, self.read_auth_file)
+        self.core.spawn(watch_file, self.auth_file_path, self._auth_file_changed)
 
     def read_auth_file(self):
         _log.info('loading auth file %s', self.auth_file_path)
@@ -134,8 +138,76 @@ class AuthService(Agent):
         # sort the entries so the regex credentails follow the concrete creds
         entries.sort()
         self.auth_entries = entries
+        self._index_auth_entries()
         _log.info('auth file %s loaded', self.auth_file_path)
 
+    def _auth_file_changed(self):
+        self.read_auth_file()
+        # The pubsub service caches capabilities for protected topics.
+        try:
+            self.vip.rpc.call('pubsub', 'pubsub.auth_update').get(timeout=5)
+        except (errors.VIPError, gevent.Timeout) as e:
+            _log.warning('unable to send auth update to pubsub: %s', e)
+
+    def _index_auth_entries(self):
+        """Index the entries by user id and by exact credentials.
+
+        Entries with regex credentials are kept in a list with one combined
+        regex of all their credentials, so connections that match none of
+        them skip the list. NULL mechanism entries are always checked. Each
+        entry is stored with its position so the first matching entry
+        still wins. Called whenever the auth file is read."""
+        self._entries_by_user_id = {}
+        self._entries_by_credentials = defaultdict(list)
+        self._entries_to_scan = []
+        self._pattern_entries = []
+        patterns = []
+        for position, entry in enumerate(self.auth_entries):
+            if entry.user_id is not None:
+                self._entries_by_user_id.setdefault(entry.user_id, (position, entry))
+            credentials = entry.credentials
+            if entry.mechanism == 'NULL' or credentials is None:
+                self._entries_to_scan.append((position, entry))
+                continue
+            if not isinstance(credentials, List):
+                credentials = [credentials]
+            if any(hasattr(credential, 'regex') for credential in credentials):
+                self._pattern_entries.append((position, entry))
+                patterns.extend(credential[1:-1] if hasattr(credential, 'regex')
+                                else re.escape(credential) for credential in credentials)
+            else:
+                for credential in credentials:
+                    self._entries_by_credentials[entry.mechanism, credential].append((position, entry))
+
+        self._pattern_regex = None
+        if patterns:
+            try:
+                self._pattern_regex = re.compile(
+                    '^(?:' + '|'.join('(?:{})'.format(pattern) for pattern in patterns) + ')$')
+            except (re.error, AssertionError, OverflowError):
+                # Too many groups for one regex, check every pattern entry.
+                _log.debug('unable to combine credential patterns, they will be checked one by one')
+
+    def _find_entry(self, domain, address, mechanism, credentials, before=None):
+        """Returns (position, entry) of the first entry matching the
+        connection, or None. Only entries before position before are
+        considered."""
+        if not credentials:
+            candidates = [self._entries_to_scan]
+        else:
+            candidates = [self._entries_by_credentials.get((mechanism, credentials[0]), []),
+                          self._entries_to_scan]
+            if self._pattern_entries and (self._pattern_regex is None or
+                                          self._pattern_regex.match(credentials[0])):
+                candidates.append(self._pattern_entries)
+        # The lists are in position order.
+        for position, entry in heapq.merge(*candidates):
+            if before is not None and position >= before:
+                break
+            if entry.match(domain, address, mechanism, credentials):
+                return position, entry
+        return None
+
     @Core.receiver('onstop')
     def stop_zap(self, sender, **kwargs):
         if self._zap_greenlet is not None:
@@ -194,7 +266,7 @@ class AuthService(Agent):
                             if delay > 100:
                                 delay = 100
                     expire = now + delay
-                    bisect.bisect(wait_list, (expire, address, response))
+                    bisect.insort(wait_list, (expire, address, response))
                     blocked[address] = expire, delay
             while wait_list:
                 expire, address, response = wait_list[0]
@@ -211,10 +283,11 @@ class AuthService(Agent):
             timeout = (wait_list[0][0] - now) if wait_list else None
 
     def authenticate(self, domain, address, mechanism, credentials):
-        for entry in self.auth_entries:
-            if entry.match(domain, address, mechanism, credentials):
-                return entry.user_id or dump_user(
-                    domain, address, mechanism, *credentials[:1])
+        found = self._find_entry(domain, address, mechanism, credentials)
+        if found:
+            entry = found[1]
+            return entry.user_id or dump_user(
+                domain, address, mechanism, *credentials[:1])
         if mechanism == 'NULL' and address.startswith('localhost:'):
             parts = address.split(':')[1:]
             if len(parts) > 2:
@@ -239,17 +312,17 @@ class AuthService(Agent):
         :returns: tuple of capabiliy-list, group-list, role-list
         :rtype: tuple
         """
-        use_parts = True
+        found = self._entries_by_user_id.get(user_id)
         try:
             domain, address, mechanism, credentials = load_user(user_id)
         except ValueError:
-            use_parts = False
-        for entry in self.auth_entries:
-            if entry.user_id == user_id:
-                return [entry.capabilities, entry.groups, entry.roles]
-            elif use_parts:
-                if entry.match(domain, address, mechanism, [credentials]):
-                    return entry.capabilities, entry.groups, entry.roles
+            pass
+        else:
+            before = found[0] if found else None
+            found = self._find_entry(domain, address, mechanism, [credentials], before) or found
+        if found:
+            entry = found[1]
+            return [entry.capabilities, entry.groups, entry.roles]
 
     def _get_authorizations(self, user_id, index):
         """Convenience method for getting authorization component by index"""
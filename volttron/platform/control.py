@@ -1111,10 +1111,35 @@ def add_config_to_store(opts):
     opts.connection.peer = "config.store"
     call = opts.connection.call
 
+    if opts.bulk is not None:
+        add_configs_to_store(opts, call)
+        return
+
+    if opts.name is None:
+        _stderr.write('ERROR: must specify a configuration name when not storing in bulk\n')
+        return
+
     file_contents = opts.infile.read()
 
     call("manage_store", opts.identity, opts.name, file_contents, config_type=opts.config_type)
 
+def add_configs_to_store(opts, call):
+    """Store every file under the bulk directory with one call. Files are
+    named by their path relative to the directory and the type is taken
+    from the file extension."""
+    configs = []
+    for dir_path, _, files in os.walk(opts.bulk):
+        for file_name in sorted(files):
+            path = os.path.join(dir_path, file_name)
+            name = os.path.relpath(path, opts.bulk)
+            ext = os.path.splitext(file_name)[1].lower()
+            config_type = {'.json': 'json', '.csv': 'csv'}.get(ext, opts.config_type)
+            with open(path) as f:
+                configs.append((name, f.read(), config_type))
+
+    call("manage_store_bulk", opts.identity, configs)
+    _stdout.write("Stored {} configurations\n".format(len(configs)))
+
 def delete_config_from_store(opts):
     opts.connection.peer = "config.store"
     call = opts.connection.call
@@ -1473,7 +1498,7 @@ def main(argv=sys.argv):
 
     config_store_store.add_argument('identity',
                                     help='VIP IDENTITY of the store')
-    config_store_store.add_argument('name',
+    config_store_store.add_argument('name', nargs='?',
                                     help='name used to reference the configuration by in the store')
     config_store_store.add_argument('infile', nargs='?', type=argparse.FileType('r'), default=sys.stdin,
                                     help='file containing the contents of the configuration')
@@ -1483,6 +1508,10 @@ def main(argv=sys.argv):
                                     help='interpret the input file as json')
     config_store_store.add_argument('--csv', const="csv", dest="config_type", action="store_const",
                                     help='interpret the input file as csv')
+    config_store_store.add_argument('--bulk', metavar='DIRECTORY',
+                                    help='store every file under DIRECTORY in one operation, named by its '
+                                         'path relative to DIRECTORY. Files ending in .json or .csv are '
+                                         'interpreted as such, others by the type option')
 
     config_store_store.set_defaults(func=add_config_to_store,
                                     config_type="json")
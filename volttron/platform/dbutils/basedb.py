@@ -296,6 +296,40 @@ class DbDriver(object):
                               (ts, topic_id, jsonapi.dumps(data)))
         return True
 
+    def insert_many_stmt(self, stmt, seq_args):
+        """
+        Executes an insert statement once for each set of arguments
+
+        :param stmt: insert statement
+        :param seq_args: sequence of insert arguments
+        :return: True if execution completes. False if unable to connect to
+                 database
+        """
+        if not self.__connect():
+            return False
+
+        self.__cursor.executemany(stmt, seq_args)
+        return True
+
+    def bulk_insert_data(self, rows):
+        """
+        Inserts data for many topics in one database operation. Rows are
+        part of the current transaction and are persisted by
+        :py:meth:`commit`.
+
+        The default implementation uses executemany with
+        :py:meth:`insert_data_query`. Drivers override this if the database
+        has a faster way of inserting many rows.
+
+        :param rows: list of (timestamp, topic id, value) tuples
+        :return: True if execution completes. False if unable to connect to
+                 database
+        """
+        return self.insert_many_stmt(
+            self.insert_data_query(),
+            [(ts, topic_id, jsonapi.dumps(data))
+             for ts, topic_id, data in rows])
+
     def insert_topic(self, topic):
         """
         Insert a new topic
@@ -582,6 +616,27 @@ class DbDriver(object):
         self.commit()
         return True
 
+    def bulk_insert_aggregates(self, agg_type, period, rows):
+        """
+        Insert aggregates for many time periods into the <agg_type>_<period>
+        table in one database operation and commit them.
+
+        :param agg_type: type of aggregation
+        :param period: time period of aggregation
+        :param rows: list of (end time, aggregate topic id, computed
+                     aggregate, topic ids) tuples
+        :return: True if execution was successful, False otherwise
+        """
+        table_name = agg_type + '_' + period
+        _log.debug("Inserting {} aggregates into table {}".format(
+            len(rows), table_name))
+        if not self.insert_many_stmt(
+                self.insert_aggregate_stmt(table_name),
+                [(ts, agg_topic_id, jsonapi.dumps(data), str(topic_ids))
+                 for ts, agg_topic_id, data, topic_ids in rows]):
+            return False
+        return self.commit()
+
     @abstractmethod
     def collect_aggregate(self, topic_ids, agg_type, start=None, end=None):
         """
@@ -596,3 +651,33 @@ class DbDriver(object):
                  this aggregation was computed)
         """
         pass
+
+    @abstractmethod
+    def collect_aggregate_buckets(self, topic_ids, start, end, period):
+        """
+        Collect partial aggregates for consecutive time periods with a
+        single scan of the historian's data store. Rows are grouped by topic
+        and by the bucket index of the period they fall in, where bucket
+        ``n`` covers ``[start + n * period, start + (n + 1) * period)``.
+
+        :param topic_ids: list of topic ids to aggregate
+        :param start: start time of the first period (inclusive). Must fall
+                      on a whole second
+        :param end: end time of the last period (exclusive)
+        :param period: length of each period in seconds
+        :return: list of (topic_id, bucket, count, sum, min, max) tuples.
+                 Periods without data are not returned
+        """
+        pass
+
+    @abstractmethod
+    def get_aggregate_watermarks(self, agg_type, period):
+        """
+        Find the end time of the latest aggregate recorded for each
+        aggregate topic in the <agg_type>_<period> table.
+
+        :param agg_type: type of aggregation
+        :param period: time period of aggregation
+        :return: dictionary of {agg_topic_id: end time in utc}
+        """
+        pass
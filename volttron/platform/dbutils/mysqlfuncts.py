@@ -77,6 +77,9 @@ For method details please refer to base class
 :py:class:`volttron.platform.dbutils.basedb.DbDriver`
 """
 class MySqlFuncts(DbDriver):
+    # Keeps multi row inserts well below the default max_allowed_packet.
+    MAX_BULK_INSERT_ROWS = 1000
+
     def __init__(self, connect_params, table_names):
         # kwargs['dbapimodule'] = 'mysql.connector'
         super(MySqlFuncts, self).__init__('mysql.connector', **connect_params)
@@ -300,6 +303,25 @@ class MySqlFuncts(DbDriver):
         return '''REPLACE INTO ''' + self.data_table + \
                '''  values(%s, %s, %s)'''
 
+    def bulk_insert_data(self, rows):
+        """
+        Inserts data rows using multi row REPLACE statements of up to
+        MAX_BULK_INSERT_ROWS rows each.
+        """
+        for i in xrange(0, len(rows), self.MAX_BULK_INSERT_ROWS):
+            chunk = rows[i:i + self.MAX_BULK_INSERT_ROWS]
+            args = []
+            for ts, topic_id, data in chunk:
+                args.extend((ts, topic_id, jsonapi.dumps(data)))
+            if not self.insert_stmt(self.bulk_insert_data_query(len(chunk)),
+                                    args):
+                return False
+        return True
+
+    def bulk_insert_data_query(self, num_rows):
+        return '''REPLACE INTO ''' + self.data_table + \
+               '''  values''' + ', '.join(['(%s, %s, %s)'] * num_rows)
+
     def insert_topic_query(self):
         _log.debug("In insert_topic_query - self.topic_table "
                    "{}".format(self.topics_table))
@@ -462,3 +484,40 @@ class MySqlFuncts(DbDriver):
             return rows[0][0], rows[0][1]
         else:
             return 0, 0
+
+    def collect_aggregate_buckets(self, topic_ids, start, end, period):
+        if self.MICROSECOND_SUPPORT is None:
+            self.init_microsecond_support()
+
+        args = []
+        for t in (start, end):
+            if self.MICROSECOND_SUPPORT:
+                args.append(t)
+            else:
+                t_str = t.isoformat()
+                args.append(t_str[:t_str.rfind('.')])
+        # TIMESTAMPDIFF truncates to whole seconds, which is exact as long
+        # as start falls on a whole second.
+        real_query = '''SELECT topic_id,
+                        TIMESTAMPDIFF(SECOND, %s, ts) DIV %s AS bucket,
+                        count(value_string), sum(value_string),
+                        min(value_string), max(value_string)
+                        FROM ''' + self.data_table + '''
+                        WHERE topic_id IN (''' + \
+                     ", ".join(["%s"] * len(topic_ids)) + ''')
+                        AND ts >= %s AND ts < %s
+                        GROUP BY topic_id, bucket'''
+        args = [args[0], period] + list(topic_ids) + args
+        _log.debug("Real Query: " + real_query)
+
+        rows = self.select(real_query, args)
+        _log.debug("Collected {} aggregate buckets for {} topics".format(
+            len(rows), len(topic_ids)))
+        return rows
+
+    def get_aggregate_watermarks(self, agg_type, period):
+        table_name = agg_type + '''_''' + period
+        rows = self.select('''SELECT topic_id, max(ts) FROM ''' + table_name +
+                           ''' GROUP BY topic_id''', None)
+        return {topic_id: ts.replace(tzinfo=pytz.utc)
+                for topic_id, ts in rows}
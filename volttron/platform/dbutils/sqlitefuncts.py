@@ -55,14 +55,18 @@
 # under Contract DE-AC05-76RL01830
 # }}}
 import ast
+import calendar
 import errno
 import logging
 import sqlite3
 import threading
+import time
 from collections import defaultdict
+from contextlib import contextmanager
 from datetime import datetime
 
 import os
+import pytz
 import re
 from basedb import DbDriver
 from volttron.platform.agent import utils
@@ -73,6 +77,75 @@ _log = logging.getLogger(__name__)
 
 
 
+class _ReaderPool(object):
+    """
+    Pool of read only connections to a sqlite database. Each thread gets
+    its own connection, which is kept open between queries so the
+    connection setup and schema load are only paid once.
+
+    At most `max_size` connections are kept. Connections unused for
+    `idle_timeout` seconds are closed. A `max_size` of 0 disables pooling
+    and a new connection is made for every query.
+    """
+
+    def __init__(self, database, max_size=8, idle_timeout=300,
+                 cache_size=None):
+        self._database = database
+        self._max_size = max_size
+        self._idle_timeout = idle_timeout
+        self._cache_size = cache_size
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        # Connections are only ever used by one thread at a time but may
+        # be closed by whichever thread evicts them.
+        conn = sqlite3.connect(
+            self._database,
+            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+            check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        if self._cache_size is not None:
+            conn.execute("PRAGMA cache_size = {:d}".format(self._cache_size))
+        conn.create_function("REGEXP", 2, SqlLiteFuncts.regexp)
+        return conn
+
+    def _evict_idle(self, now):
+        expired = [ident for ident, (_, last_used) in
+                   self._connections.iteritems()
+                   if now - last_used > self._idle_timeout]
+        for ident in expired:
+            conn, _ = self._connections.pop(ident)
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        ident = threading.current_thread().ident
+        with self._lock:
+            self._evict_idle(time.time())
+            # Checked out connections are removed from the pool so nested
+            # use within one thread gets its own connection.
+            entry = self._connections.pop(ident, None)
+
+        conn = entry[0] if entry is not None else self._connect()
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                if ident not in self._connections and \
+                        len(self._connections) < self._max_size:
+                    self._connections[ident] = (conn, time.time())
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def close(self):
+        with self._lock:
+            for conn, _ in self._connections.itervalues():
+                conn.close()
+            self._connections.clear()
+
+
 """
 Implementation of SQLite3 database operation for
 :py:class:`sqlhistorian.historian.SQLHistorian` and
@@ -81,7 +154,21 @@ For method details please refer to base class
 :py:class:`volttron.platform.dbutils.basedb.DbDriver`
 """
 class SqlLiteFuncts(DbDriver):
+    # SQLite allows at most 999 parameters in a statement.
+    MAX_QUERY_TOPICS = 900
+    # Topics per UNION ALL query. Each takes up to five parameters and one
+    # of the 500 terms SQLite allows in a compound select.
+    MAX_UNION_TOPICS = 100
+
     def __init__(self, connect_params, table_names):
+        # Reader pool settings are not sqlite3.connect arguments.
+        connect_params = dict(connect_params)
+        reader_pool_size = connect_params.pop('reader_pool_size', 8)
+        reader_idle_timeout = connect_params.pop('reader_idle_timeout', 300)
+        reader_cache_size = connect_params.pop('reader_cache_size', None)
+        if connect_params.pop('shared_cache', False):
+            sqlite3.enable_shared_cache(True)
+
         database = connect_params['database']
         thread_name = threading.currentThread().getName()
         _log.debug(
@@ -125,6 +212,11 @@ class SqlLiteFuncts(DbDriver):
             self.agg_topics_table = table_names['agg_topics_table']
             self.agg_meta_table = table_names['agg_meta_table']
 
+        self._readers = _ReaderPool(self.__database,
+                                    max_size=reader_pool_size,
+                                    idle_timeout=reader_idle_timeout,
+                                    cache_size=reader_cache_size)
+
         super(SqlLiteFuncts, self).__init__('sqlite3', **connect_params)
 
     def setup_historian_tables(self):
@@ -232,8 +324,8 @@ class SqlLiteFuncts(DbDriver):
         @param end:
         @param agg_type:
         @param agg_period:
-        @param skip:
-        @param count:
+        @param skip: number of results to skip for each topic
+        @param count: maximum number of results for each topic
         @param order:
         """
         table_name = self.data_table
@@ -247,8 +339,8 @@ class SqlLiteFuncts(DbDriver):
                    {limit}
                    {offset}'''
 
-        where_clauses = ["WHERE topic_id = ?"]
-        args = [topic_ids[0]]
+        where_clauses = []
+        args = []
 
         if start is not None:
             start_str = start.isoformat(' ')
@@ -264,11 +356,11 @@ class SqlLiteFuncts(DbDriver):
                 end_str += "+00:00"
             args.append(end_str)
 
-        where_statement = ' AND '.join(where_clauses)
-
         order_by = 'ORDER BY topic_id ASC, ts ASC'
+        ts_order = 'ASC'
         if order == 'LAST_TO_FIRST':
             order_by = ' ORDER BY topic_id DESC, ts DESC'
+            ts_order = 'DESC'
 
         # can't have an offset without a limit
         # -1 = no limit and allows the user to
@@ -276,32 +368,86 @@ class SqlLiteFuncts(DbDriver):
         if count is None:
             count = -1
 
-        limit_statement = 'LIMIT ?'
-        args.append(count)
-
-        offset_statement = ''
-        if skip > 0:
-            offset_statement = 'OFFSET ?'
-            args.append(skip)
-
-        real_query = query.format(where=where_statement,
-                                  limit=limit_statement,
-                                  offset=offset_statement,
-                                  order_by=order_by)
-        _log.debug("Real Query: " + real_query)
-        _log.debug("args: " + str(args))
-
-        c = sqlite3.connect(
-            self.__database,
-            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
         values = defaultdict(list)
-        for topic_id in topic_ids:
-            rows = c.execute(real_query, args)
-            for _id, ts, value in rows:
-                values[id_name_map[topic_id]].append(
-                    (utils.format_timestamp(ts), jsonapi.loads(value)))
 
-        _log.debug("QueryResults: " + str(values))
+        with self._readers.connection() as c:
+            if len(topic_ids) == 1:
+                # skip and count can be handed to sqlite directly.
+                where_statement = ' AND '.join(["WHERE topic_id = ?"] +
+                                               where_clauses)
+                limit_statement = 'LIMIT ?'
+                offset_statement = ''
+                query_args = [topic_ids[0]] + args + [count]
+                if skip > 0:
+                    offset_statement = 'OFFSET ?'
+                    query_args.append(skip)
+
+                real_query = query.format(where=where_statement,
+                                          limit=limit_statement,
+                                          offset=offset_statement,
+                                          order_by=order_by)
+                _log.debug("Real Query: " + real_query)
+                _log.debug("args: " + str(query_args))
+
+                topic_values = values[id_name_map[topic_ids[0]]]
+                for _id, ts, value in c.execute(real_query, query_args):
+                    topic_values.append(
+                        (utils.format_timestamp(ts), jsonapi.loads(value)))
+            elif count >= 0:
+                # Each topic gets its own LIMIT so sqlite reads only the
+                # rows that are returned, not the whole time range.
+                topic_query = '(SELECT topic_id, ts, value_string FROM ' + \
+                    table_name + ' ' + ' AND '.join(
+                        ["WHERE topic_id = ?"] + where_clauses) + \
+                    ' ORDER BY ts ' + ts_order + ' LIMIT ? OFFSET ?)'
+                for i in xrange(0, len(topic_ids), self.MAX_UNION_TOPICS):
+                    chunk = topic_ids[i:i + self.MAX_UNION_TOPICS]
+                    real_query = ' UNION ALL '.join(
+                        ['SELECT * FROM ' + topic_query] * len(chunk))
+                    query_args = []
+                    for topic_id in chunk:
+                        query_args.extend([topic_id] + args + [count, skip])
+                    _log.debug("Real Query: " + real_query)
+                    _log.debug("args: " + str(query_args))
+
+                    for topic_id, ts, value in c.execute(real_query,
+                                                         query_args):
+                        values[id_name_map[topic_id]].append(
+                            (utils.format_timestamp(ts), jsonapi.loads(value)))
+            else:
+                # Scan all topics in one statement over the (topic_id, ts)
+                # index. Rows arrive grouped by topic so skip is applied per
+                # topic while streaming.
+                for i in xrange(0, len(topic_ids), self.MAX_QUERY_TOPICS):
+                    chunk = topic_ids[i:i + self.MAX_QUERY_TOPICS]
+                    where_statement = ' AND '.join(
+                        ["WHERE topic_id IN (" + ", ".join("?" * len(chunk)) +
+                         ")"] + where_clauses)
+                    real_query = query.format(where=where_statement,
+                                              limit='',
+                                              offset='',
+                                              order_by=order_by)
+                    _log.debug("Real Query: " + real_query)
+                    _log.debug("args: " + str(chunk + args))
+
+                    current_id = None
+                    topic_values = None
+                    row_num = 0
+                    for topic_id, ts, value in c.execute(real_query,
+                                                         chunk + args):
+                        if topic_id != current_id:
+                            current_id = topic_id
+                            topic_values = values[id_name_map[topic_id]]
+                            row_num = 0
+                        row_num += 1
+                        if row_num <= skip:
+                            continue
+                        topic_values.append(
+                            (utils.format_timestamp(ts), jsonapi.loads(value)))
+
+        # Logging every row of a large result costs more than the query.
+        _log.debug("QueryResults: {} rows for {} topics".format(
+            sum(len(v) for v in values.itervalues()), len(values)))
         return values
 
     def insert_meta_query(self):
@@ -445,24 +591,15 @@ class SqlLiteFuncts(DbDriver):
         return re.search(expr, item, re.IGNORECASE) is not None
 
     def regex_select(self, query, args):
-        conn = sqlite3.connect(
-            self.__database,
-            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
-
-        if conn is None:
-            _log.error("Unable to connect to sqlite database {} ".format(
-                self.__database))
-            return []
-
-        conn.create_function("REGEXP", 2, SqlLiteFuncts.regexp)
         _log.debug(" REGEXP query {}  ARGS: {}".format(query, args))
-        cursor = conn.cursor()
-        if args is not None:
-            cursor.execute(query, args)
-        else:
-            cursor.execute(query)
-        rows = cursor.fetchall()
-        conn.close()
+        with self._readers.connection() as conn:
+            cursor = conn.cursor()
+            if args is not None:
+                cursor.execute(query, args)
+            else:
+                cursor.execute(query)
+            rows = cursor.fetchall()
+            cursor.close()
         return rows
 
     def find_topics_by_pattern(self, topic_pattern):
@@ -554,17 +691,62 @@ class SqlLiteFuncts(DbDriver):
         _log.debug("Real Query: " + real_query)
         _log.debug("args: " + str(args))
 
-        c = sqlite3.connect(
-            self.__database,
-            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES)
-        cursor = c.execute(real_query, args)
-        results = cursor.fetchone()
+        with self._readers.connection() as c:
+            cursor = c.execute(real_query, args)
+            results = cursor.fetchone()
+            # Finish the statement so the pooled connection does not keep
+            # holding a read lock.
+            cursor.close()
         if results:
             _log.debug("results got {}, {}".format(results[0], results[1]))
             return results[0], results[1]
         else:
             return 0, 0
 
+    def collect_aggregate_buckets(self, topic_ids, start, end, period):
+        start_str = start.isoformat(' ')
+        if start_str[-6:] != "+00:00":
+            start_str += "+00:00"
+        end_str = end.isoformat(' ')
+        if end_str[-6:] != "+00:00":
+            end_str += "+00:00"
+        origin = calendar.timegm(start.utctimetuple())
+
+        # strftime('%s') truncates to whole seconds, which is exact as long
+        # as start falls on a whole second.
+        query = '''SELECT topic_id,
+                   (CAST(strftime('%s', ts) AS INTEGER) - ?) / ? AS bucket,
+                   count(value_string), sum(value_string),
+                   min(value_string), max(value_string)
+                   FROM ''' + self.data_table + ''' {where}
+                   GROUP BY topic_id, bucket'''
+
+        results = []
+        topic_ids = list(topic_ids)
+        with self._readers.connection() as c:
+            for i in xrange(0, len(topic_ids), self.MAX_QUERY_TOPICS):
+                chunk = topic_ids[i:i + self.MAX_QUERY_TOPICS]
+                where_statement = \
+                    "WHERE topic_id IN (" + ", ".join("?" * len(chunk)) + \
+                    ") AND ts >= ? AND ts < ?"
+                real_query = query.format(where=where_statement)
+                args = [origin, period] + chunk + [start_str, end_str]
+                _log.debug("Real Query: " + real_query)
+                results.extend(c.execute(real_query, args))
+        _log.debug("Collected {} aggregate buckets for {} topics".format(
+            len(results), len(topic_ids)))
+        return results
+
+    def get_aggregate_watermarks(self, agg_type, period):
+        table_name = agg_type + '''_''' + period
+        query = '''SELECT topic_id, CAST(strftime('%s', max(ts)) AS INTEGER)
+                   FROM ''' + table_name + ''' GROUP BY topic_id'''
+        with self._readers.connection() as c:
+            rows = c.execute(query).fetchall()
+        return {topic_id: datetime.utcfromtimestamp(ts).replace(
+                    tzinfo=pytz.utc)
+                for topic_id, ts in rows}
+
 
 if __name__ == '__main__':
     con = {
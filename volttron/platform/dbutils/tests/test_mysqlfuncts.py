@@ -0,0 +1,29 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip('mysql.connector')
+
+from volttron.platform.dbutils.mysqlfuncts import MySqlFuncts
+
+TABLE_NAMES = {'data_table': 'data',
+               'topics_table': 'topics',
+               'meta_table': 'meta'}
+
+
+def test_bulk_insert_data_chunks(monkeypatch):
+    functs = MySqlFuncts({}, TABLE_NAMES)
+    functs.MAX_BULK_INSERT_ROWS = 2
+    executed = []
+    monkeypatch.setattr(functs, 'insert_stmt',
+                        lambda stmt, args: executed.append((stmt, args)) or
+                        True)
+
+    ts = datetime(2016, 1, 1)
+    assert functs.bulk_insert_data([(ts, 1, 1.0), (ts, 2, 2.0),
+                                    (ts, 3, 3.0)])
+
+    assert len(executed) == 2
+    assert executed[0][0].count('(%s, %s, %s)') == 2
+    assert executed[0][1] == [ts, 1, '1.0', ts, 2, '2.0']
+    assert executed[1][0].count('(%s, %s, %s)') == 1
@@ -0,0 +1,201 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+from volttron.platform.agent import utils
+from volttron.platform.agent.utils import (fix_sqlite3_datetime,
+                                           parse_timestamp_string)
+from volttron.platform.dbutils.sqlitefuncts import SqlLiteFuncts
+
+# The historian registers this converter for timestamps stored with an
+# offset.
+fix_sqlite3_datetime()
+
+TABLE_NAMES = {'data_table': 'data',
+               'topics_table': 'topics',
+               'meta_table': 'meta',
+               'agg_topics_table': 'aggregate_topics',
+               'agg_meta_table': 'aggregate_meta'}
+
+
+@pytest.fixture
+def functs(tmpdir):
+    database = str(tmpdir.join('historian.sqlite'))
+    writer = SqlLiteFuncts({'database': database}, TABLE_NAMES)
+    writer.setup_historian_tables()
+    return writer
+
+
+def test_bulk_insert_data(functs):
+    start = datetime(2016, 1, 1, tzinfo=pytz.UTC)
+    topic_ids = [functs.insert_topic('device/point{}'.format(i))[0]
+                 for i in range(3)]
+    functs.commit()
+
+    rows = [(start + timedelta(minutes=m), topic_id, float(m))
+            for m in range(10) for topic_id in topic_ids]
+    assert functs.bulk_insert_data(rows)
+    assert functs.commit()
+
+    stored = functs.select('SELECT count(*) FROM data', None)
+    assert stored[0][0] == 30
+
+    # Replacing existing rows must not create duplicates.
+    assert functs.bulk_insert_data(rows[:5])
+    assert functs.commit()
+    stored = functs.select('SELECT count(*) FROM data', None)
+    assert stored[0][0] == 30
+
+
+def test_bulk_insert_rollback(functs):
+    topic_id = functs.insert_topic('device/point')[0]
+    functs.commit()
+
+    ts = datetime(2016, 1, 1, tzinfo=pytz.UTC)
+    assert functs.bulk_insert_data([(ts, topic_id, 1)])
+    assert functs.rollback()
+    stored = functs.select('SELECT count(*) FROM data', None)
+    assert stored[0][0] == 0
+
+
+def test_multi_topic_query(functs):
+    start = datetime(2016, 1, 1, tzinfo=pytz.UTC)
+    names = ['device/point{}'.format(i) for i in range(3)]
+    topic_ids = [functs.insert_topic(name)[0] for name in names]
+    functs.commit()
+    id_name_map = dict(zip(topic_ids, names))
+
+    functs.bulk_insert_data([(start + timedelta(minutes=m), topic_id,
+                              topic_id * 100 + m)
+                             for m in range(10) for topic_id in topic_ids])
+    functs.commit()
+
+    values = functs.query(topic_ids, id_name_map)
+    for topic_id, name in id_name_map.items():
+        assert [v for _, v in values[name]] == \
+            [topic_id * 100 + m for m in range(10)]
+
+    values = functs.query(topic_ids, id_name_map, skip=2, count=3,
+                          order='LAST_TO_FIRST')
+    for topic_id, name in id_name_map.items():
+        assert [v for _, v in values[name]] == \
+            [topic_id * 100 + m for m in (7, 6, 5)]
+
+    values = functs.query(topic_ids[:2], id_name_map,
+                          start=start + timedelta(minutes=8))
+    assert set(values) == set(names[:2])
+    assert all(len(v) == 2 for v in values.values())
+
+    single = functs.query(topic_ids[2:], id_name_map, skip=8)
+    assert [v for _, v in single[names[2]]] == \
+        [topic_ids[2] * 100 + m for m in (8, 9)]
+
+
+def test_limited_multi_topic_query_reads_only_limit(functs):
+    start = datetime(2016, 1, 1, tzinfo=pytz.UTC)
+    names = ['device/point{}'.format(i) for i in range(3)]
+    topic_ids = [functs.insert_topic(name)[0] for name in names]
+    functs.commit()
+    id_name_map = dict(zip(topic_ids, names))
+
+    functs.bulk_insert_data([(start + timedelta(minutes=m), topic_id, m)
+                             for m in range(100) for topic_id in topic_ids])
+    functs.commit()
+
+    # Every timestamp sqlite hands back goes through the converter.
+    converted = []
+    def convert(value):
+        converted.append(value)
+        return parse_timestamp_string(value)
+    sqlite3.register_converter("timestamp", convert)
+    try:
+        values = functs.query(topic_ids, id_name_map, count=1,
+                              order='LAST_TO_FIRST')
+    finally:
+        fix_sqlite3_datetime()
+
+    assert values == {name: [(utils.format_timestamp(
+        start + timedelta(minutes=99)), 99)] for name in names}
+    assert len(converted) == 3
+
+
+def test_reader_pool_reuses_connection(functs):
+    with functs._readers.connection() as first:
+        pass
+    with functs._readers.connection() as second:
+        assert second is first
+        # Nested use in the same thread must not share the connection.
+        with functs._readers.connection() as nested:
+            assert nested is not second
+
+
+def test_reader_pool_is_read_only(functs):
+    with functs._readers.connection() as conn:
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM data")
+
+
+def test_reader_pool_settings(tmpdir):
+    database = str(tmpdir.join('historian.sqlite'))
+    functs = SqlLiteFuncts({'database': database,
+                            'reader_pool_size': 0,
+                            'reader_cache_size': -2000},
+                           TABLE_NAMES)
+    functs.setup_historian_tables()
+    with functs._readers.connection() as first:
+        assert first.execute("PRAGMA cache_size").fetchone()[0] == -2000
+    with functs._readers.connection() as second:
+        assert second is not first
+
+
+def test_reader_pool_idle_eviction(tmpdir):
+    database = str(tmpdir.join('historian.sqlite'))
+    functs = SqlLiteFuncts({'database': database,
+                            'reader_idle_timeout': -1},
+                           TABLE_NAMES)
+    functs.setup_historian_tables()
+    with functs._readers.connection() as first:
+        pass
+    with functs._readers.connection() as second:
+        assert second is not first
+
+
+def test_collect_aggregate_buckets(functs):
+    start = datetime(2016, 1, 1, tzinfo=pytz.UTC)
+    topic_ids = [functs.insert_topic('device/point{}'.format(i))[0]
+                 for i in range(2)]
+    functs.commit()
+    functs.bulk_insert_data([(start + timedelta(seconds=s), topic_id,
+                              topic_id * 1000 + s)
+                             for s in range(0, 1800, 30)
+                             for topic_id in topic_ids])
+    functs.commit()
+
+    end = start + timedelta(minutes=30)
+    rows = functs.collect_aggregate_buckets(topic_ids, start, end, 300)
+    assert len(rows) == 12
+    for topic_id, bucket, count, total, minimum, maximum in rows:
+        period_start = start + timedelta(seconds=bucket * 300)
+        period_end = period_start + timedelta(seconds=300)
+        assert (total, count) == (
+            functs.collect_aggregate([topic_id], 'sum', period_start,
+                                     period_end))
+        assert minimum == functs.collect_aggregate(
+            [topic_id], 'min', period_start, period_end)[0]
+        assert maximum == functs.collect_aggregate(
+            [topic_id], 'max', period_start, period_end)[0]
+
+
+def test_aggregate_watermarks(functs):
+    start = datetime(2016, 1, 1, tzinfo=pytz.UTC)
+    functs.create_aggregate_store('avg', '5m')
+    assert functs.get_aggregate_watermarks('avg', '5m') == {}
+
+    rows = [(start + timedelta(minutes=m), agg_id, float(m), [1, 2])
+            for m in range(0, 30, 5) for agg_id in (1, 2)]
+    assert functs.bulk_insert_aggregates('avg', '5m', rows[:-1])
+    assert functs.get_aggregate_watermarks('avg', '5m') == {
+        1: start + timedelta(minutes=25),
+        2: start + timedelta(minutes=20)}
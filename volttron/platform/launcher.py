@@ -0,0 +1,444 @@
+# -*- coding: utf-8 -*- {{{
+# vim: set fenc=utf-8 ft=python sw=4 ts=4 sts=4 et:
+
+# Copyright (c) 2016, Battelle Memorial Institute
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# 1. Redistributions of source code must retain the above copyright
+#    notice, this list of conditions and the following disclaimer.
+# 2. Redistributions in binary form must reproduce the above copyright
+#    notice, this list of conditions and the following disclaimer in
+#    the documentation and/or other materials provided with the
+#    distribution.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+# A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+# OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+# SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+# LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+# DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+# THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+# OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+#
+# The views and conclusions contained in the software and documentation
+# are those of the authors and should not be interpreted as representing
+# official policies, either expressed or implied, of the FreeBSD
+# Project.
+#
+# This material was prepared as an account of work sponsored by an
+# agency of the United States Government.  Neither the United States
+# Government nor the United States Department of Energy, nor Battelle,
+# nor any of their employees, nor any jurisdiction or organization that
+# has cooperated in the development of these materials, makes any
+# warranty, express or implied, or assumes any legal liability or
+# responsibility for the accuracy, completeness, or usefulness or any
+# information, apparatus, product, software, or process disclosed, or
+# represents that its use would not infringe privately owned rights.
+#
+# Reference herein to any specific commercial product, process, or
+# service by trade name, trademark, manufacturer, or otherwise does not
+# necessarily constitute or imply its endorsement, recommendation, or
+# favoring by the United States Government or any agency thereof, or
+# Battelle Memorial Institute. The views and opinions of authors
+# expressed herein do not necessarily state or reflect those of the
+# United States Government or any agency thereof.
+#
+# PACIFIC NORTHWEST NATIONAL LABORATORY
+# operated by BATTELLE for the UNITED STATES DEPARTMENT OF ENERGY
+# under Contract DE-AC05-76RL01830
+# }}}
+
+"""Pre-warmed launcher which forks agent processes.
+
+Starting an agent normally runs a new interpreter which must import
+gevent, zmq and the VOLTTRON platform before the agent can run. The
+launcher is a single long running process (run with ``python -m
+volttron.platform.launcher``) which imports those modules once and then
+forks a child for each agent it is asked to start. The child takes on the
+environment, working directory and Python path the agent would have been
+executed with, connects its stdout and stderr to FIFOs read by the
+platform and then runs the agent's entry point.
+
+Requests and replies are exchanged as JSON lines over the launcher's
+stdin and stdout. The platform side is managed by AgentLauncher, which
+returns a Popen-like LaunchedProcess for each agent.
+"""
+
+
+from __future__ import absolute_import
+
+import atexit
+import errno
+import fcntl
+import json
+import logging
+import os
+import random
+import select
+import shutil
+import signal
+import sys
+import tempfile
+import traceback
+
+import gevent
+import gevent.event
+import gevent.lock
+from gevent import subprocess
+from gevent.fileobject import FileObject
+from gevent.subprocess import PIPE
+
+
+__all__ = ['AgentLauncher', 'LaunchedProcess', 'PRELOAD_MODULES']
+
+
+_log = logging.getLogger(__name__)
+
+#: Modules imported by the launcher before it forks any agents
+PRELOAD_MODULES = [
+    'gevent', 'gevent.event', 'gevent.subprocess', 'zmq', 'zmq.green',
+    'dateutil.parser', 'dateutil.tz', 'pytz', 'tzlocal',
+    'volttron.platform.agent.utils', 'volttron.platform.messaging',
+    'volttron.platform.messaging.topics', 'volttron.platform.vip.agent',
+]
+
+
+class LaunchedProcess(object):
+    '''Popen-like handle on an agent process forked by the launcher.
+
+    The agent is a child of the launcher rather than of the platform, so
+    its exit status is delivered by the launcher.
+    '''
+
+    def __init__(self, pid, stdout, stderr):
+        self.pid = pid
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = None
+        self._exited = gevent.event.Event()
+
+    def _set_returncode(self, returncode):
+        self.returncode = returncode
+        self._exited.set()
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self, timeout=None):
+        self._exited.wait(timeout)
+        return self.returncode
+
+    def send_signal(self, sig):
+        if self.returncode is None:
+            try:
+                os.kill(self.pid, sig)
+            except OSError as exc:
+                if exc.errno != errno.ESRCH:
+                    raise
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+
+class AgentLauncher(object):
+    '''Start and talk to the launcher process from the platform.
+
+    The launcher is started on the first call to launch() and restarted
+    if it has exited. The environment given to the launcher's own
+    interpreter is the platform's, with PYTHONPATH set from sys.path.
+    '''
+
+    def __init__(self, run_dir):
+        self.run_dir = run_dir
+        self.process = None
+        self._requests = 0
+        self._pending = {}
+        self._children = {}
+        # Exit statuses which arrived before launch() saw the pid
+        self._returncodes = {}
+        # Serializes starting the launcher and writing requests
+        self._lock = gevent.lock.Semaphore()
+
+    def start(self):
+        environ = os.environ.copy()
+        environ['PYTHONPATH'] = ':'.join(sys.path)
+        self.process = proc = subprocess.Popen(
+            [sys.executable, '-m', __name__], env=environ, close_fds=True,
+            stdin=PIPE, stdout=PIPE, stderr=PIPE)
+        _log.info('agent launcher has PID %s', proc.pid)
+        gevent.spawn(self._read_replies, proc)
+        gevent.spawn(self._log_errors, proc)
+
+    def stop(self):
+        proc, self.process = self.process, None
+        if proc is not None and proc.poll() is None:
+            proc.stdin.close()
+            try:
+                gevent.with_timeout(3, proc.wait)
+            except gevent.Timeout:
+                proc.kill()
+
+    def launch(self, module, func, cwd, env):
+        '''Fork an agent and return a LaunchedProcess for it.
+
+        If func is empty, module is run as __main__ as with the -m
+        interpreter option. Otherwise func is imported from module and
+        called with no arguments.
+        '''
+        self._requests += 1
+        request_id = self._requests
+        fifo_dir = tempfile.mkdtemp(prefix='launch-', dir=self.run_dir)
+        try:
+            streams = []
+            for name in ('stdout', 'stderr'):
+                path = os.path.join(fifo_dir, name)
+                os.mkfifo(path, 0o600)
+                streams.append(os.open(path, os.O_RDONLY | os.O_NONBLOCK))
+            result = self._pending[request_id] = gevent.event.AsyncResult()
+            request = {'id': request_id, 'module': module, 'func': func,
+                       'cwd': cwd, 'env': env,
+                       'stdout': os.path.join(fifo_dir, 'stdout'),
+                       'stderr': os.path.join(fifo_dir, 'stderr')}
+            with self._lock:
+                if self.process is None or self.process.poll() is not None:
+                    self.start()
+                self.process.stdin.write(json.dumps(request) + '\n')
+                self.process.stdin.flush()
+            try:
+                reply = result.get(timeout=60)
+            except Exception:
+                for fd in streams:
+                    os.close(fd)
+                raise
+            finally:
+                self._pending.pop(request_id, None)
+        finally:
+            shutil.rmtree(fifo_dir, True)
+        if 'error' in reply:
+            for fd in streams:
+                os.close(fd)
+            raise OSError(reply.get('errno') or errno.EIO, reply['error'])
+        stdout, stderr = [FileObject(fd, 'rb') for fd in streams]
+        proc = LaunchedProcess(reply['pid'], stdout, stderr)
+        try:
+            proc._set_returncode(self._returncodes.pop(proc.pid))
+        except KeyError:
+            self._children[proc.pid] = proc
+        return proc
+
+    def _read_replies(self, proc):
+        for line in proc.stdout:
+            reply = json.loads(line)
+            if 'id' in reply:
+                result = self._pending.get(reply['id'])
+                if result is not None:
+                    result.set(reply)
+            else:
+                child = self._children.pop(reply['pid'], None)
+                if child is None:
+                    self._returncodes[reply['pid']] = reply['returncode']
+                else:
+                    child._set_returncode(reply['returncode'])
+        returncode = proc.wait()
+        if proc is not self.process:
+            # Stopped by stop()
+            return
+        _log.error('agent launcher exited with status %s', returncode)
+        error = RuntimeError('agent launcher exited')
+        for result in self._pending.values():
+            result.set_exception(error)
+        # Agents outlive the launcher, but their status can no longer
+        # be reported, so they are treated as exited.
+        for child in self._children.values():
+            child._set_returncode(-1)
+        self._children.clear()
+
+    def _log_errors(self, proc):
+        for line in proc.stderr:
+            _log.error('launcher: %s', line.rstrip('\r\n'))
+
+
+def _returncode(status):
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _exit_status(code):
+    if code is None:
+        return 0
+    if isinstance(code, (int, long)):
+        return code
+    sys.stderr.write('{}\n'.format(code))
+    return 1
+
+
+def _open_streams(request):
+    '''Open the write ends of the agent's stdout and stderr FIFOs.'''
+    streams = []
+    try:
+        for name in ('stdout', 'stderr'):
+            # Fail rather than block if the platform is not reading.
+            fd = os.open(request[name], os.O_WRONLY | os.O_NONBLOCK)
+            streams.append(fd)
+            flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+            fcntl.fcntl(fd, fcntl.F_SETFL, flags & ~os.O_NONBLOCK)
+    except OSError:
+        for fd in streams:
+            os.close(fd)
+        raise
+    return streams
+
+
+def _run_agent(request, streams):
+    '''Set up the forked child as the agent and run it. Never returns.'''
+    status = 1
+    try:
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.close(devnull)
+        os.dup2(streams[0], 1)
+        os.dup2(streams[1], 2)
+        os.closerange(3, subprocess.MAXFD)
+        env = {key.encode('utf-8'): value.encode('utf-8')
+               for key, value in request['env'].iteritems()}
+        os.environ.clear()
+        os.environ.update(env)
+        os.chdir(request['cwd'])
+        path = [p for p in env.get('PYTHONPATH', '').split(':') if p]
+        sys.path[:] = [''] + path + [p for p in sys.path
+                                     if p and p not in path]
+        random.seed()
+        gevent.reinit()
+        module = request['module'].encode('utf-8')
+        func = request['func'].encode('utf-8')
+        try:
+            if func:
+                sys.argv = ['-c']
+                getattr(__import__(module, fromlist=[func]), func)()
+            else:
+                import runpy
+                runpy.run_module(module, run_name='__main__', alter_sys=True)
+            status = 0
+        except SystemExit as exc:
+            status = _exit_status(exc.code)
+        except BaseException:
+            traceback.print_exc()
+        atexit._run_exitfuncs()
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(status)
+
+
+def _ignore_signal(signum, frame):
+    pass
+
+
+def main():
+    '''Run the launcher, reading requests from stdin until it closes.'''
+    for name in PRELOAD_MODULES:
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+    # Keep the request and reply pipes and give stdin and stdout to
+    # /dev/null and stderr so stray output cannot corrupt the replies.
+    requests = os.dup(0)
+    replies = os.dup(1)
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.close(devnull)
+    os.dup2(2, 1)
+    # Agents are interrupted by the platform, not by the terminal.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # SIGCHLD writes to the wakeup pipe so an agent exiting just before
+    # select() is called still wakes the loop to report it.
+    wakeup, wakeup_write = os.pipe()
+    for fd in (wakeup, wakeup_write):
+        fcntl.fcntl(fd, fcntl.F_SETFL,
+                    fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+    signal.set_wakeup_fd(wakeup_write)
+    signal.signal(signal.SIGCHLD, _ignore_signal)
+
+    def reply(obj):
+        os.write(replies, json.dumps(obj) + '\n')
+
+    buf = ''
+    while True:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except OSError as exc:
+                if exc.errno != errno.ECHILD:
+                    raise
+                break
+            if not pid:
+                break
+            reply({'pid': pid, 'returncode': _returncode(status)})
+        try:
+            readable, _, _ = select.select([requests, wakeup], [], [])
+        except select.error as exc:
+            if exc.args[0] == errno.EINTR:
+                continue
+            raise
+        if wakeup in readable:
+            try:
+                os.read(wakeup, 4096)
+            except OSError as exc:
+                if exc.errno != errno.EAGAIN:
+                    raise
+        if requests not in readable:
+            continue
+        try:
+            data = os.read(requests, 65536)
+        except OSError as exc:
+            if exc.errno == errno.EINTR:
+                continue
+            raise
+        if not data:
+            break
+        buf += data
+        while '\n' in buf:
+            line, buf = buf.split('\n', 1)
+            request = json.loads(line)
+            try:
+                # The FIFOs are opened before forking so they are held
+                # open for the platform once it has the reply.
+                streams = _open_streams(request)
+                try:
+                    pid = os.fork()
+                except OSError:
+                    for fd in streams:
+                        os.close(fd)
+                    raise
+            except OSError as exc:
+                reply({'id': request['id'], 'error': str(exc),
+                       'errno': exc.errno})
+                continue
+            if not pid:
+                _run_agent(request, streams)
+            for fd in streams:
+                os.close(fd)
+            reply({'id': request['id'], 'pid': pid})
+
+
+if __name__ == '__main__':
+    main()
@@ -332,6 +332,11 @@ class Router(BaseRouter):
         if self._tracker:
             self._tracker.hit(topic, frames, extra)
 
+    def tracing(self):
+        if self._tracker is not None and self._tracker.enabled:
+            return True
+        return self.logger.isEnabledFor(logging.DEBUG)
+
     def handle_subsystem(self, frames, user_id):
         subsystem = bytes(frames[5])
         if subsystem == b'quit':
@@ -699,6 +704,10 @@ def main(argv=sys.argv):
     agents.add_argument(
         '--no-autostart', action='store_false', dest='autostart',
         help=argparse.SUPPRESS)
+    agents.add_argument(
+        '--agent-launcher', choices=['exec', 'zygote'],
+        help='start agents in new interpreters (exec) or fork them '
+             'from a launcher with platform modules preloaded (zygote)')
     agents.add_argument(
         '--publish-address', metavar='ZMQADDR',
         help='ZeroMQ URL used for pre-3.x agent publishing (deprecated)')
@@ -788,6 +797,7 @@ def main(argv=sys.argv):
         verboseness=logging.WARNING,
         volttron_home=volttron_home,
         autostart=True,
+        agent_launcher='exec',
         publish_address=ipc + 'publish',
         subscribe_address=ipc + 'subscribe',
         vip_address=[],
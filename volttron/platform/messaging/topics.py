@@ -204,3 +204,4 @@ WEATHER_REQUEST = 'weather/request'
 
 BACNET_INFO_BASE = _('bacnet/{indication}')
 BACNET_I_AM = _(BACNET_INFO_BASE.replace('{indication}', 'i_am'))
+BACNET_COV = _(BACNET_INFO_BASE.replace('{indication}', 'cov') + '//{address}')
@@ -68,7 +68,7 @@ from StringIO import StringIO
 from zmq.utils import jsonapi
 from gevent.lock import Semaphore
 
-from volttron.utils.persistance import PersistentDict
+from volttron.utils.persistance import LogStructuredDict
 from volttron.platform.agent.utils import parse_json_config
 from volttron.platform.vip.agent import errors
 from volttron.platform.jsonrpc import RemoteError, MethodNotFound
@@ -79,6 +79,9 @@ from .vip.agent import Agent, Core, RPC
 
 _log = logging.getLogger(__name__)
 
+#Agents may run many configuration callbacks for one bulk update.
+BULK_UPDATE_TIMEOUT = 120.0
+
 def process_store(identity, store):
     """Parses raw store data and returns contents.
     Called at startup to initialize the parsed version of the store."""
@@ -157,7 +160,7 @@ class ConfigStoreService(Agent):
             root, ext = os.path.splitext(store_path)
             agent_identity = os.path.basename(root)
             _log.info("Processing store for agent {}".format(agent_identity))
-            store = PersistentDict(filename=store_path, flag='c', format='json')
+            store = LogStructuredDict(store_path)
             parsed_configs, name_map = process_store(agent_identity, store)
             self.store[agent_identity] = {"configs": parsed_configs,
                                           "store": store,
@@ -173,6 +176,22 @@ class ConfigStoreService(Agent):
         self._add_config_to_store(identity, config_name, raw_contents, contents, config_type,
                                   trigger_callback=True)
 
+    @RPC.export
+    def manage_store_bulk(self, identity, configs):
+        """Store many configurations for an agent at once.
+
+        configs is a list of (config_name, raw_contents, config_type). Every
+        configuration is parsed before any are stored and the agent is sent
+        one update with all of the changes."""
+        processed = []
+        for config_name, raw_contents, config_type in configs:
+            try:
+                contents = process_raw_config(raw_contents, config_type)
+            except ValueError as e:
+                raise ValueError("Configuration {}: {}".format(config_name, e))
+            processed.append((config_name, raw_contents, contents, config_type))
+        self._add_configs_to_store(identity, processed, trigger_callback=True)
+
     @RPC.export
     def manage_delete_config(self, identity, config_name):
         self.delete(identity, config_name, trigger_callback=True)
@@ -189,12 +208,10 @@ class ConfigStoreService(Agent):
         agent_name_map = agent_store["name_map"]
 
         agent_configs.clear()
+        # Clearing the disk store deletes the file.
         agent_disk_store.clear()
         agent_name_map.clear()
 
-        # Sync will delete the file if the store is empty.
-        agent_disk_store.async_sync()
-
         with agent_store_lock:
             try:
                 self.vip.rpc.call(identity, "config.update", "DELETE_ALL", None, trigger_callback=True).get(
@@ -268,7 +285,7 @@ class ConfigStoreService(Agent):
         if agent_store is None:
             # Initialize a new store.
             store_path = os.path.join(self.store_path, identity + store_ext)
-            store = PersistentDict(filename=store_path, flag='c', format='json')
+            store = LogStructuredDict(store_path)
             agent_store = {"configs": {}, "store": store, "name_map": {}, "lock": Semaphore()}
             self.store[identity] = agent_store
 
@@ -318,12 +335,10 @@ class ConfigStoreService(Agent):
         real_config_name = agent_name_map[config_name_lower]
 
         agent_configs.pop(real_config_name)
+        #The file is deleted along with the last config.
         agent_disk_store.pop(real_config_name)
         agent_name_map.pop(config_name_lower)
 
-        #Sync will delete the file if the store is empty.
-        agent_disk_store.async_sync()
-
         with agent_store_lock:
             try:
                 self.vip.rpc.call(identity, "config.update", "DELETE", config_name, trigger_callback=trigger_callback).get(timeout=10.0)
@@ -364,7 +379,7 @@ class ConfigStoreService(Agent):
         if agent_store is None:
             #Initialize a new store.
             store_path = os.path.join(self.store_path, identity+ store_ext)
-            store = PersistentDict(filename=store_path, flag='c', format='json')
+            store = LogStructuredDict(store_path)
             agent_store = {"configs": {}, "store": store, "name_map": {}, "lock": Semaphore()}
             self.store[identity] = agent_store
 
@@ -385,13 +400,14 @@ class ConfigStoreService(Agent):
         if config_name_lower in agent_name_map:
             old_config_name = agent_name_map[config_name_lower]
             del agent_configs[old_config_name]
+            if old_config_name != config_name:
+                agent_disk_store.pop(old_config_name)
 
         agent_configs[config_name] = parsed
         agent_name_map[config_name_lower] = config_name
+        #Only the changed config is written to disk.
         agent_disk_store[config_name] = {"type": config_type, "data": raw}
 
-        agent_disk_store.async_sync()
-
         _log.info("Agent {} config {} stored.".format(identity, config_name))
 
         with agent_store_lock:
@@ -404,3 +420,88 @@ class ConfigStoreService(Agent):
             except MethodNotFound as e:
                 _log.error(
                     "Agent {} failure when adding/updating configuration {}: {}".format(identity, config_name, e))
+
+    def _add_configs_to_store(self, identity, configs, trigger_callback=False):
+        """Adds a list of processed configurations to the store with a single
+        disk write and a single update to the agent."""
+        agent_store = self.store.get(identity)
+
+        if agent_store is None:
+            #Initialize a new store.
+            store_path = os.path.join(self.store_path, identity+ store_ext)
+            store = LogStructuredDict(store_path)
+            agent_store = {"configs": {}, "store": store, "name_map": {}, "lock": Semaphore()}
+            self.store[identity] = agent_store
+
+        agent_configs = agent_store["configs"]
+        agent_disk_store = agent_store["store"]
+        agent_store_lock = agent_store["lock"]
+        agent_name_map = agent_store["name_map"]
+
+        #Work on copies so nothing is stored if any configuration is rejected.
+        new_configs = agent_configs.copy()
+        new_name_map = agent_name_map.copy()
+        disk_entries = {}
+        renamed = []
+        updates = []
+        link_cache = {}
+
+        for config_name, raw, parsed, config_type in configs:
+            config_name = strip_config_name(config_name)
+            config_name_lower = config_name.lower()
+
+            action = "NEW"
+
+            link_cache.pop(config_name_lower, None)
+            if check_for_recursion(config_name, parsed, new_configs, link_cache):
+                raise ValueError("Recursive configuration references detected in {}.".format(config_name))
+
+            if config_name_lower in new_name_map:
+                action = "UPDATE"
+                old_config_name = new_name_map[config_name_lower]
+                del new_configs[old_config_name]
+                disk_entries.pop(old_config_name, None)
+                if old_config_name != config_name:
+                    renamed.append(old_config_name)
+
+            new_configs[config_name] = parsed
+            new_name_map[config_name_lower] = config_name
+            disk_entries[config_name] = {"type": config_type, "data": raw}
+            updates.append((action, config_name, parsed))
+
+        if not updates:
+            return
+
+        agent_configs.clear()
+        agent_configs.update(new_configs)
+        agent_name_map.clear()
+        agent_name_map.update(new_name_map)
+        for old_config_name in renamed:
+            if old_config_name not in disk_entries:
+                agent_disk_store.pop(old_config_name, None)
+        agent_disk_store.update(disk_entries)
+
+        _log.info("Agent {} {} configs stored.".format(identity, len(updates)))
+
+        with agent_store_lock:
+            try:
+                self.vip.rpc.call(identity, "config.update_bulk", updates,
+                                  trigger_callback=trigger_callback).get(timeout=BULK_UPDATE_TIMEOUT)
+            except errors.Unreachable:
+                _log.debug("Agent {} not currently running. Configuration update not sent.".format(identity))
+            except RemoteError as e:
+                _log.error("Agent {} failure when adding/updating configurations: {}".format(identity, e))
+            except MethodNotFound:
+                #Agent predates bulk updates.
+                self._send_updates(identity, updates, trigger_callback)
+
+    def _send_updates(self, identity, updates, trigger_callback):
+        for action, config_name, parsed in updates:
+            try:
+                self.vip.rpc.call(identity, "config.update", action, config_name, contents=parsed,
+                                  trigger_callback=trigger_callback).get(timeout=10.0)
+            except RemoteError as e:
+                _log.error("Agent {} failure when adding/updating configuration {}: {}".format(identity, config_name, e))
+            except (errors.Unreachable, MethodNotFound) as e:
+                _log.error("Agent {} failure when adding/updating configuration {}: {}".format(identity, config_name, e))
+                return
@@ -96,11 +96,21 @@ def list_unique_links(config):
     return results
 
 
-def check_for_recursion(new_config_name, new_config, existing_configs):
-    return _follow_links(set(), new_config_name.lower(), new_config_name.lower(), new_config, existing_configs)
+def check_for_recursion(new_config_name, new_config, existing_configs, link_cache=None):
+    """Returns True if new_config links back to itself through existing_configs.
 
-def _follow_links(seen, new_config_name, current_config_name, current_config, existing_configs):
-    children = list_unique_links(current_config)
+    link_cache may be shared between calls to only list the links of each
+    existing config once. Entries must be removed when a config changes."""
+    return _follow_links(set(), new_config_name.lower(), new_config_name.lower(), new_config, existing_configs,
+                         link_cache)
+
+def _follow_links(seen, new_config_name, current_config_name, current_config, existing_configs, link_cache=None):
+    if link_cache is None:
+        children = list_unique_links(current_config)
+    else:
+        children = link_cache.get(current_config_name)
+        if children is None:
+            children = link_cache[current_config_name] = list_unique_links(current_config)
 
     if new_config_name in children:
         return True
@@ -113,7 +123,7 @@ def _follow_links(seen, new_config_name, current_config_name, current_config, ex
             #Link to a non-existing config, skip in the future.
             seen.add(child_config_name)
             continue
-        if _follow_links(seen, new_config_name, child_config_name, child_config, existing_configs):
+        if _follow_links(seen, new_config_name, child_config_name, child_config, existing_configs, link_cache):
             return True
 
     return False
\ No newline at end of file
@@ -64,6 +64,7 @@ from .core import *
 from .errors import *
 from .decorators import *
 from .subsystems import *
+from .subsystems.rpc import DEFAULT_THREAD_POOL_SIZE
 from .... import platform
 from .... platform.agent.utils import is_valid_identity
 
@@ -71,12 +72,14 @@ from .... platform.agent.utils import is_valid_identity
 class Agent(object):
     class Subsystems(object):
         def __init__(self, owner, core, heartbeat_autostart,
-                     heartbeat_period, enable_store, enable_channel):
+                     heartbeat_period, enable_store, enable_channel,
+                     rpc_pool_size, thread_pool_size, ordered_callbacks):
             self.peerlist = PeerList(core)
             self.ping = Ping(core)
-            self.rpc = RPC(core, owner)
+            self.rpc = RPC(core, owner, rpc_pool_size, thread_pool_size)
             self.hello = Hello(core)
-            self.pubsub = PubSub(core, self.rpc, self.peerlist, owner)
+            self.pubsub = PubSub(core, self.rpc, self.peerlist, owner,
+                                 ordered_callbacks)
             if enable_channel:
                 self.channel = Channel(core)
             self.health = Health(owner, core, self.rpc)
@@ -90,7 +93,10 @@ class Agent(object):
                  heartbeat_autostart=False, heartbeat_period=60,
                  volttron_home=os.path.abspath(platform.get_home()),
                  agent_uuid=None, enable_store=True, developer_mode=False,
-                 enable_channel=False, reconnect_interval=None):
+                 enable_channel=False, reconnect_interval=None,
+                 rpc_pool_size=None,
+                 thread_pool_size=DEFAULT_THREAD_POOL_SIZE,
+                 ordered_callbacks=True):
         if identity is not None and not is_valid_identity(identity):
             _log.warn('Deprecation warning')
             _log.warn(
@@ -104,7 +110,9 @@ class Agent(object):
                          developer_mode=developer_mode,
                          reconnect_interval=reconnect_interval)
         self.vip = Agent.Subsystems(self, self.core, heartbeat_autostart,
-                                    heartbeat_period, enable_store, enable_channel)
+                                    heartbeat_period, enable_store, enable_channel,
+                                    rpc_pool_size, thread_pool_size,
+                                    ordered_callbacks)
         self.core.setup()
 
 
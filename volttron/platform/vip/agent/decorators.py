@@ -63,7 +63,7 @@ from types import MethodType
 import gevent
 
 
-__all__ = ['annotate', 'annotations', 'dualmethod', 'spawn']
+__all__ = ['annotate', 'annotations', 'dualmethod', 'spawn', 'threaded']
 
 
 def annotate(obj, kind, name, value):
@@ -113,6 +113,17 @@ def spawn(method):
     return wrapper
 
 
+def threaded(method):
+    '''Run a decorated RPC method or pubsub callback in a thread.
+
+    The agent runs it in its thread pool instead of on the gevent hub, so
+    CPU bound work does not hold up other messages. The method must not
+    use the agent's VIP subsystems and cannot read the RPC context.
+    '''
+    annotate(method, set, 'dispatch.threaded', True)
+    return method
+
+
 class dualmethod(object):
     '''Descriptor to allow class and instance methods of the same name.
 
@@ -57,10 +57,17 @@
 
 from __future__ import absolute_import, print_function
 
+from collections import deque
+import logging
+import time
 import weakref
 
+import gevent
 
-__all__ = ['Signal']
+
+__all__ = ['Signal', 'WorkQueue', 'DispatchStats']
+
+_log = logging.getLogger(__name__)
 
 
 class Signal(object):
@@ -91,3 +98,96 @@ class Signal(object):
 
     def __nonzero__(self):
         return bool(self._receivers)
+
+
+class DispatchStats(object):
+    '''Queue depth and latency counters of a WorkQueue.
+
+    Wait is the time a call spent queued and run the time it took to
+    return, both in seconds.
+    '''
+
+    def __init__(self):
+        self.depth = 0
+        self.max_depth = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_total = 0.0
+        self.run_max = 0.0
+
+    def record(self, wait, run, failed=False):
+        self.completed += 1
+        if failed:
+            self.failed += 1
+        self.wait_total += wait
+        self.run_total += run
+        if wait > self.wait_max:
+            self.wait_max = wait
+        if run > self.run_max:
+            self.run_max = run
+
+    def as_dict(self):
+        completed = self.completed or 1
+        return {'depth': self.depth,
+                'max_depth': self.max_depth,
+                'completed': self.completed,
+                'failed': self.failed,
+                'wait_avg': self.wait_total / completed,
+                'wait_max': self.wait_max,
+                'run_avg': self.run_total / completed,
+                'run_max': self.run_max}
+
+
+class WorkQueue(object):
+    '''Run submitted calls in submission order on at most size greenlets.
+
+    With a size of 1 the calls run one at a time, in order. With a size of
+    None every call gets its own greenlet as soon as it is submitted. If a
+    gevent thread pool is given the calls are run in its threads while the
+    greenlet waits, leaving the hub free to handle other messages.
+    Exceptions raised by calls are logged.
+    '''
+
+    def __init__(self, name, size=None, threadpool=None):
+        self.name = name
+        self.size = size
+        self.threadpool = threadpool
+        self.stats = DispatchStats()
+        self._pending = deque()
+        self._workers = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def submit(self, func, *args, **kwargs):
+        self._pending.append((time.time(), func, args, kwargs))
+        stats = self.stats
+        stats.depth = len(self._pending)
+        if stats.depth > stats.max_depth:
+            stats.max_depth = stats.depth
+        if self.size is None or self._workers < self.size:
+            self._workers += 1
+            gevent.spawn(self._work)
+
+    def _work(self):
+        pending = self._pending
+        stats = self.stats
+        try:
+            while pending:
+                queued, func, args, kwargs = pending.popleft()
+                stats.depth = len(pending)
+                start = time.time()
+                failed = False
+                try:
+                    if self.threadpool is None:
+                        func(*args, **kwargs)
+                    else:
+                        self.threadpool.apply(func, args, kwargs)
+                except Exception:   # pylint: disable=broad-except
+                    failed = True
+                    _log.exception('unhandled exception in %s', self.name)
+                stats.record(start - queued, time.time() - start, failed)
+        finally:
+            self._workers -= 1
@@ -103,6 +103,7 @@ class ConfigStore(SubsystemBase):
 
         def onsetup(sender, **kwargs):
             rpc.export(self._update_config, 'config.update')
+            rpc.export(self._update_configs, 'config.update_bulk')
             rpc.export(self._initial_update, 'config.initial_update')
 
         core.onsetup.connect(onsetup, self)
@@ -204,7 +205,12 @@ class ConfigStore(SubsystemBase):
         return config_contents
 
 
-    def _gather_config(self, config_name):
+    def _gather_config(self, config_name, resolved=None):
+        """Returns the contents of a configuration with links replaced by
+        the contents of the configurations they reference.
+
+        resolved may be shared between calls to resolve each configuration
+        only once. Every call still returns its own copy of the contents."""
         config_contents = self._store.get(config_name)
         if config_contents is None:
             config_contents = self._default_store.get(config_name)
@@ -212,9 +218,10 @@ class ConfigStore(SubsystemBase):
         if config_contents is None:
             raise KeyError("{} not in store".format(config_name))
 
-        already_configured = {}
+        if resolved is None:
+            return self._gather_child_configs(config_name, {})
 
-        return self._gather_child_configs(config_name, already_configured)
+        return deepcopy(self._gather_child_configs(config_name, resolved))
 
 
 
@@ -228,12 +235,35 @@ class ConfigStore(SubsystemBase):
 
     def _update_config(self, action, config_name, contents=None, trigger_callback=False):
         """Called by the platform to push out configuration changes."""
+        self._update_configs([(action, config_name, contents)], trigger_callback=trigger_callback)
+
+    def _update_configs(self, updates, trigger_callback=False):
+        """Called by the platform to push out a batch of configuration changes.
+
+        updates is a list of (action, config_name, contents). The changes are
+        applied in order and callbacks are triggered once for every affected
+        configuration."""
         #If we haven't yet grabbed the initial callback state we just bail.
         if not self._initialized:
             return
 
         affected_configs = {}
+        deleted_names = set()
 
+        for action, config_name, contents in updates:
+            self._apply_update(action, config_name, contents, affected_configs, deleted_names)
+
+        if trigger_callback and self._initial_callbacks_called:
+            self._process_callbacks(affected_configs)
+
+        for config_name_lower in deleted_names:
+            self._name_map.pop(config_name_lower, None)
+
+    def _apply_update(self, action, config_name, contents, affected_configs, deleted_names):
+        """Update the local store and references for one change and add the
+        configurations it affects to affected_configs. Names of deleted
+        configurations are added to deleted_names so they can be removed from
+        the name map after callbacks are called."""
         #Update local store.
         if action == "DELETE":
             config_name_lower = config_name.lower()
@@ -248,6 +278,7 @@ class ConfigStore(SubsystemBase):
                     affected_configs[config_name_lower] = "UPDATE"
                     self._gather_affected(config_name_lower, affected_configs)
                     self._update_refs(config_name_lower, self._default_store[config_name_lower])
+            deleted_names.add(config_name_lower)
 
         if action == "DELETE_ALL":
             for name in self._store:
@@ -258,44 +289,43 @@ class ConfigStore(SubsystemBase):
             self._ref_map = {}
             self._reverse_ref_map = defaultdict(set)
             self._initial_update({}, False)
+            deleted_names.update(self._name_map)
 
         if action in ("NEW", "UPDATE"):
             config_name_lower = config_name.lower()
             self._store[config_name_lower] = contents
             self._name_map[config_name_lower] = config_name
+            deleted_names.discard(config_name_lower)
             if config_name_lower in self._default_store:
                 action = "UPDATE"
+            elif affected_configs.get(config_name_lower) == "NEW":
+                #Callbacks have not seen this config yet.
+                action = "NEW"
+            elif affected_configs.get(config_name_lower) == "DELETE":
+                #Replaced after a delete, callbacks only see the new contents.
+                action = "UPDATE"
             affected_configs[config_name_lower] = action
             self._update_refs(config_name_lower, self._store[config_name_lower])
             self._gather_affected(config_name_lower, affected_configs)
 
 
-        if trigger_callback and self._initial_callbacks_called:
-            self._process_callbacks(affected_configs)
-
-        if action == "DELETE":
-            del self._name_map[config_name_lower]
-
-        if action == "DELETE_ALL":
-            self._name_map.clear()
-
-
 
     def _process_callbacks(self, affected_configs):
         _log.debug("Processing callbacks for affected files: {}".format(affected_configs))
         all_map = self._default_name_map.copy()
         all_map.update(self._name_map)
+        resolved = {}
         #Always process "config" first.
         if "config" in affected_configs:
-            self._process_callbacks_one_config("config", affected_configs["config"], all_map)
+            self._process_callbacks_one_config("config", affected_configs["config"], all_map, resolved)
 
         for config_name, action in affected_configs.iteritems():
             if config_name == "config":
                 continue
-            self._process_callbacks_one_config(config_name, action, all_map)
+            self._process_callbacks_one_config(config_name, action, all_map, resolved)
 
 
-    def _process_callbacks_one_config(self, config_name, action, name_map):
+    def _process_callbacks_one_config(self, config_name, action, name_map, resolved=None):
         callbacks = set()
         for pattern, actions in self._subscriptions.iteritems():
             if fnmatch.fnmatchcase(config_name, pattern) and action in actions:
@@ -306,7 +336,7 @@ class ConfigStore(SubsystemBase):
                 if action == "DELETE":
                     contents = None
                 else:
-                    contents = self._gather_config(config_name)
+                    contents = self._gather_config(config_name, resolved)
                 callback(name_map[config_name], action, contents)
             except StandardError as e:
                 tb_str = traceback.format_exc()
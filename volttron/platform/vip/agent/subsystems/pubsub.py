@@ -65,11 +65,11 @@ import re
 import weakref
 
 from zmq import green as zmq
-from zmq import SNDMORE
 from zmq.utils import jsonapi
 
 from .base import SubsystemBase
 from ..decorators import annotate, annotations, dualmethod, spawn
+from ..dispatch import WorkQueue
 from ..errors import Unreachable
 from .... import jsonrpc
 from volttron.platform.agent import utils
@@ -93,13 +93,24 @@ def decode_peer(peer):
 
 
 class PubSub(SubsystemBase):
-    def __init__(self, core, rpc_subsys, peerlist_subsys, owner):
+    def __init__(self, core, rpc_subsys, peerlist_subsys, owner,
+                 ordered_callbacks=True):
         self.core = weakref.ref(core)
         self.rpc = weakref.ref(rpc_subsys)
         self.peerlist = weakref.ref(peerlist_subsys)
         self._peer_subscriptions = {}
         self._my_subscriptions = {}
         self.protected_topics = ProtectedPubSubTopics()
+        # Capabilities of publishers to protected topics by user id. Cleared
+        # by the auth service when the auth file changes.
+        self._user_capabilities = {}
+        self._auth_generation = 0
+        # With ordered callbacks each subscription's callback runs from its
+        # own queue, in publish order, so a slow subscriber only delays
+        # its own messages.
+        self._ordered_callbacks = ordered_callbacks
+        self._callback_queues = {}
+        rpc_subsys.route('pubsub', WorkQueue('pubsub'))
 
         def setup(sender, **kwargs):
             # pylint: disable=unused-argument
@@ -108,7 +119,10 @@ class PubSub(SubsystemBase):
             rpc_subsys.export(self._peer_unsubscribe, 'pubsub.unsubscribe')
             rpc_subsys.export(self._peer_list, 'pubsub.list')
             rpc_subsys.export(self._peer_publish, 'pubsub.publish')
+            rpc_subsys.export(self._peer_publish_batch,
+                              'pubsub.publish_batch')
             rpc_subsys.export(self._peer_push, 'pubsub.push')
+            rpc_subsys.export(self._peer_auth_update, 'pubsub.auth_update')
             core.onconnected.connect(self._connected)
             core.onviperror.connect(self._viperror)
             peerlist_subsys.onadd.connect(self._peer_add)
@@ -123,7 +137,7 @@ class PubSub(SubsystemBase):
         core.onsetup.connect(setup, self)
 
     def add_bus(self, name):
-        self._peer_subscriptions.setdefault(name, {})
+        self._peer_subscriptions.setdefault(name, PrefixSubscriptions())
 
     def remove_bus(self, name):
         del self._peer_subscriptions[name]
@@ -223,25 +237,36 @@ class PubSub(SubsystemBase):
 
     def _peer_publish(self, topic, headers, message=None, bus=''):
         peer = bytes(self.rpc().context.vip_message.peer)
+        self._check_if_protected_topic(topic)
         self._distribute(peer, topic, headers, message, bus)
 
+    def _peer_publish_batch(self, messages, bus=''):
+        peer = bytes(self.rpc().context.vip_message.peer)
+        # Check every topic first so an unauthorized topic rejects the
+        # whole batch.
+        for topic, _, _ in messages:
+            self._check_if_protected_topic(topic)
+        for topic, headers, message in messages:
+            self._distribute(peer, topic, headers, message, bus)
+
     def _distribute(self, peer, topic, headers, message=None, bus=''):
-        self._check_if_protected_topic(topic)
         subscriptions = self._peer_subscriptions[bus]
         subscribers = set()
-        for prefix, subscription in subscriptions.iteritems():
-            if subscription and topic.startswith(prefix):
+        for prefix, subscription in subscriptions.match(topic):
+            if subscription:
                 subscribers |= subscription
         if subscribers:
             sender = encode_peer(peer)
             json_msg = jsonapi.dumps(jsonrpc.json_method(
                 None, 'pubsub.push',
                 [sender, bus, topic, headers, message], None))
-            frames = [zmq.Frame(b''), zmq.Frame(b''),
+            # The same frames are sent to every subscriber, only the
+            # recipient changes.
+            frames = [None, zmq.Frame(b''), zmq.Frame(b''),
                       zmq.Frame(b'RPC'), zmq.Frame(json_msg)]
             socket = self.core().socket
             for subscriber in subscribers:
-                socket.send(subscriber, flags=SNDMORE)
+                frames[0] = subscriber
                 socket.send_multipart(frames, copy=False)
         return len(subscribers)
 
@@ -255,15 +280,48 @@ class PubSub(SubsystemBase):
             pass
         else:
             sender = decode_peer(sender)
-            for prefix, callbacks in subscriptions.iteritems():
-                if topic.startswith(prefix):
-                    handled += 1
-                    for callback in callbacks:
+            for prefix, callbacks in subscriptions.match(topic):
+                handled += 1
+                for callback in callbacks:
+                    if self._ordered_callbacks:
+                        queue = self._callback_queue(peer, bus, prefix,
+                                                     callback)
+                        queue.submit(callback, peer, sender, bus, topic,
+                                     headers, message)
+                    else:
                         callback(peer, sender, bus, topic, headers, message)
         if not handled:
             # No callbacks for topic; synchronize with sender
             self.synchronize(peer)
 
+    def _callback_queue(self, peer, bus, prefix, callback):
+        key = (peer, bus, prefix, callback)
+        try:
+            return self._callback_queues[key]
+        except KeyError:
+            pass
+        name = 'pubsub {} {!r} {!r} {}'.format(
+            peer, bus, prefix, getattr(callback, '__name__', callback))
+        threadpool = None
+        if annotations(callback, set, 'dispatch.threaded'):
+            threadpool = self.rpc().threadpool
+        queue = self._callback_queues[key] = WorkQueue(name, 1, threadpool)
+        self.rpc().dispatch_queues.add(queue)
+        return queue
+
+    def _drop_callback_queues(self):
+        '''Forget the queues of callbacks that are no longer subscribed.
+        Messages already queued are still delivered.'''
+        for key in self._callback_queues.keys():
+            peer, bus, prefix, callback = key
+            try:
+                subscribed = callback in self._my_subscriptions[peer][bus][prefix]
+            except KeyError:
+                subscribed = False
+            if not subscribed:
+                queue = self._callback_queues.pop(key)
+                self.rpc().dispatch_queues.discard(queue)
+
     def synchronize(self, peer):
         '''Unsubscribe from stale/forgotten/unsolicited subscriptions.'''
         if peer is None:
@@ -291,7 +349,7 @@ class PubSub(SubsystemBase):
         try:
             subscriptions = buses[bus]
         except KeyError:
-            buses[bus] = subscriptions = {}
+            buses[bus] = subscriptions = PrefixSubscriptions()
         try:
             callbacks = subscriptions[prefix]
         except KeyError:
@@ -360,6 +418,8 @@ class PubSub(SubsystemBase):
                 del buses[bus]
         if not buses:
             del self._my_subscriptions[peer]
+        if self._callback_queues:
+            self._drop_callback_queues()
         return topics
 
     def unsubscribe(self, peer, prefix, callback, bus=''):
@@ -384,10 +444,7 @@ class PubSub(SubsystemBase):
         #    headers))
         #_log.debug("In pusub.publsih. topic {}".format(topic))
         #_log.debug("In pusub.publsih. Message {}".format(message))
-        if headers is None:
-            headers = {}
-        headers['min_compatible_version'] = min_compatible_version
-        headers['max_compatible_version'] = max_compatible_version
+        headers = self._add_version_headers(headers)
 
         if peer is None:
             peer = 'pubsub'
@@ -395,18 +452,150 @@ class PubSub(SubsystemBase):
             peer, 'pubsub.publish', topic=topic, headers=headers,
             message=message, bus=bus)
 
+    def publish_nowait(self, peer, topic, headers=None, message=None,
+                       bus=''):
+        '''Publish a message to a given topic via a peer without waiting
+        for a reply.
+
+        Works like publish() but nothing is returned, so the publisher
+        does not wait for a round trip to the peer. Errors, such as
+        publishing to a protected topic without the required
+        capabilities, are not reported back.
+        '''
+        headers = self._add_version_headers(headers)
+        if peer is None:
+            peer = 'pubsub'
+        self.rpc().notify(
+            peer, 'pubsub.publish', topic=topic, headers=headers,
+            message=message, bus=bus)
+
+    def publish_batch(self, peer, messages, bus=''):
+        '''Publish many messages via a peer with a single request.
+
+        messages is a list of (topic, headers, message) tuples, which are
+        published in order to the subscribers of each topic on bus at
+        peer. If any topic is protected and the publisher lacks the
+        required capabilities none of the messages are published. If peer
+        is None, use self.
+        '''
+        messages = [(topic, self._add_version_headers(headers), message)
+                    for topic, headers, message in messages]
+        if peer is None:
+            peer = 'pubsub'
+        return self.rpc().call(
+            peer, 'pubsub.publish_batch', messages=messages, bus=bus)
+
+    @staticmethod
+    def _add_version_headers(headers):
+        if headers is None:
+            headers = {}
+        headers['min_compatible_version'] = min_compatible_version
+        headers['max_compatible_version'] = max_compatible_version
+        return headers
+
+    def _peer_auth_update(self):
+        self._user_capabilities.clear()
+        self._auth_generation += 1
+
+    def _get_capabilities(self, user):
+        caps = self._user_capabilities.get(user)
+        if caps is None:
+            generation = self._auth_generation
+            caps = self.rpc().call('auth', 'get_capabilities',
+                                   user_id=user).get(timeout=5)
+            # Don't cache an answer that raced with an auth update.
+            if generation == self._auth_generation:
+                self._user_capabilities[user] = caps
+        return caps
+
     def _check_if_protected_topic(self, topic):
         required_caps = self.protected_topics.get(topic)
         if required_caps:
             user = str(self.rpc().context.vip_message.user)
-            caps = self.rpc().call('auth', 'get_capabilities',
-                                   user_id=user).get(timeout=5)
+            caps = self._get_capabilities(user)
             if not set(required_caps) <= set(caps):
                 msg = ('to publish to topic "{}" requires capabilities {},'
                       ' but capability list {} was'
                       ' provided').format(topic, required_caps, caps)
                 raise jsonrpc.exception_from_json(jsonrpc.UNAUTHORIZED, msg)
 
+class PrefixSubscriptions(dict):
+    '''Dictionary of subscriptions keyed by topic prefix.
+
+    Subscription prefixes are plain string prefixes, so a topic matches
+    every prefix that equals one of its leading slices. The number of
+    subscriptions of each prefix length is tracked as prefixes are added
+    and removed, letting match() find the subscriptions for a topic with
+    one lookup per distinct prefix length instead of testing every prefix.
+    '''
+
+    def __init__(self, *args, **kwargs):
+        super(PrefixSubscriptions, self).__init__()
+        self._length_counts = {}
+        self._lengths = []
+        self.update(*args, **kwargs)
+
+    def _add_length(self, length):
+        count = self._length_counts.get(length, 0)
+        self._length_counts[length] = count + 1
+        if not count:
+            self._lengths = sorted(self._length_counts)
+
+    def _remove_length(self, length):
+        count = self._length_counts.pop(length) - 1
+        if count:
+            self._length_counts[length] = count
+        else:
+            self._lengths = sorted(self._length_counts)
+
+    def __setitem__(self, prefix, value):
+        if prefix not in self:
+            self._add_length(len(prefix))
+        super(PrefixSubscriptions, self).__setitem__(prefix, value)
+
+    def __delitem__(self, prefix):
+        super(PrefixSubscriptions, self).__delitem__(prefix)
+        self._remove_length(len(prefix))
+
+    def pop(self, prefix, *default):
+        if prefix in self:
+            self._remove_length(len(prefix))
+        return super(PrefixSubscriptions, self).pop(prefix, *default)
+
+    def popitem(self):
+        prefix, value = super(PrefixSubscriptions, self).popitem()
+        self._remove_length(len(prefix))
+        return prefix, value
+
+    def setdefault(self, prefix, default=None):
+        if prefix not in self:
+            self[prefix] = default
+        return self[prefix]
+
+    def update(self, *args, **kwargs):
+        for prefix, value in dict(*args, **kwargs).iteritems():
+            self[prefix] = value
+
+    def clear(self):
+        super(PrefixSubscriptions, self).clear()
+        self._length_counts.clear()
+        self._lengths = []
+
+    def match(self, topic):
+        '''Return (prefix, value) pairs for prefixes of topic.'''
+        results = []
+        size = len(topic)
+        for length in self._lengths:
+            if length > size:
+                break
+            prefix = topic[:length]
+            try:
+                results.append((prefix, self[prefix]))
+            except KeyError:
+                pass
+        return results
+
+
 class ProtectedPubSubTopics(object):
     '''Simple class to contain protected pubsub topics'''
     def __init__(self):
@@ -66,12 +66,14 @@ import weakref
 
 import gevent.local
 from gevent.event import AsyncResult
+from gevent.threadpool import ThreadPool
 from zmq.utils import jsonapi
 
 from .base import SubsystemBase
 from ..errors import VIPError
 from ..results import counter, ResultsDictionary
-from ..decorators import annotate, annotations, dualmethod, spawn
+from ..decorators import annotate, annotations, dualmethod
+from ..dispatch import WorkQueue
 from .... import jsonrpc
 
 
@@ -83,18 +85,24 @@ _ROOT_PACKAGE_PATH = os.path.dirname(
 
 _log = logging.getLogger(__name__)
 
+DEFAULT_THREAD_POOL_SIZE = 4
+
 
 class Dispatcher(jsonrpc.Dispatcher):
-    def __init__(self, methods, local):
+    def __init__(self, methods, local, run_threaded=None):
         super(Dispatcher, self).__init__()
         self.methods = methods
         self.local = local
+        self.run_threaded = run_threaded
         self._results = ResultsDictionary()
 
     def serialize(self, json_obj):
         return jsonapi.dumps(json_obj)
 
     def deserialize(self, json_string):
+        # RPC._handle_subsystem parses messages to route them.
+        if isinstance(json_string, (dict, list)):
+            return json_string
         return jsonapi.loads(json_string)
 
     def batch_call(self, requests):
@@ -165,6 +173,9 @@ class Dispatcher(jsonrpc.Dispatcher):
         local.request = request
         local.batch = batch
         try:
+            if (self.run_threaded is not None and
+                    annotations(method, set, 'dispatch.threaded')):
+                return self.run_threaded(method, args, kwargs)
             return method(*args, **kwargs)
         except Exception as exc:   # pylint: disable=broad-except
             exc_tb = traceback.format_exc()
@@ -205,13 +216,22 @@ class Dispatcher(jsonrpc.Dispatcher):
 
 
 class RPC(SubsystemBase):
-    def __init__(self, core, owner):
+    def __init__(self, core, owner, pool_size=None,
+                 thread_pool_size=DEFAULT_THREAD_POOL_SIZE):
         self.core = weakref.ref(core)
         self.context = None
         self._exports = {}
         self._dispatcher = None
         self._counter = counter()
         self._outstanding = weakref.WeakValueDictionary()
+        # Requests run on work queues, chosen by the method name's prefix,
+        # so that slow methods do not hold up the VIP receive loop.
+        self.dispatch_queues = set()
+        self._routes = {}
+        self._requests = WorkQueue('rpc', pool_size)
+        self.dispatch_queues.add(self._requests)
+        self._thread_pool_size = thread_pool_size
+        self._threadpool = None
         core.register('RPC', self._handle_subsystem, self._handle_error)
 
         def export(member):   # pylint: disable=redefined-outer-name
@@ -222,7 +242,9 @@ class RPC(SubsystemBase):
         def setup(sender, **kwargs):
             # pylint: disable=unused-argument
             self.context = gevent.local.local()
-            self._dispatcher = Dispatcher(self._exports, self.context)
+            self._dispatcher = Dispatcher(self._exports, self.context,
+                                          self.run_threaded)
+            self.export(self._dispatch_stats, 'dispatch.stats')
         core.onsetup.connect(setup, self)
         self._iterate_exports()
 
@@ -240,6 +262,7 @@ class RPC(SubsystemBase):
         '''Adds an authorization check to verify the calling agent has the
         required capabilities.
         '''
+        threaded = annotations(method, set, 'dispatch.threaded')
         def checked_method(*args, **kwargs):
             user = str(self.context.vip_message.user)
             caps = self.call('auth', 'get_capabilities', user_id=user).get(timeout=5)
@@ -248,14 +271,70 @@ class RPC(SubsystemBase):
                       ' but capability list {} was'
                       ' provided').format(method.__name__, required_caps, caps)
                 raise jsonrpc.exception_from_json(jsonrpc.UNAUTHORIZED, msg)
+            if threaded:
+                return self.run_threaded(method, args, kwargs)
             return method(*args, **kwargs)
         return checked_method
 
-    @spawn
+    @property
+    def threadpool(self):
+        '''Thread pool for methods and callbacks marked @threaded.'''
+        if self._threadpool is None:
+            self._threadpool = ThreadPool(self._thread_pool_size)
+        return self._threadpool
+
+    def run_threaded(self, method, args, kwargs):
+        return self.threadpool.apply(method, args, kwargs)
+
+    def route(self, prefix, queue):
+        '''Run requests for methods named prefix.* on queue.'''
+        self._routes[prefix] = queue
+        self.dispatch_queues.add(queue)
+
+    def _dispatch_stats(self):
+        return sorted([dict(queue.stats.as_dict(), name=queue.name)
+                       for queue in self.dispatch_queues],
+                      key=lambda stats: stats['name'])
+
     def _handle_subsystem(self, message):
+        requests = []
+        for msg in message.args:
+            msg = bytes(msg)
+            try:
+                request = jsonapi.loads(msg)
+            except ValueError:
+                # Left for the dispatcher to report.
+                request = msg
+            if not isinstance(request, (dict, list)):
+                request = msg
+            requests.append(request)
+
+        queue = self._request_queue(requests)
+        if queue is None:
+            # Responses only wake the greenlets waiting on them.
+            self._dispatch(message, requests)
+        else:
+            queue.submit(self._dispatch, message, requests)
+
+    def _request_queue(self, requests):
+        '''Return the work queue for a message or None if it only holds
+        responses.'''
+        for request in requests:
+            for item in request if isinstance(request, list) else [request]:
+                if not isinstance(item, dict):
+                    return self._requests
+                method = item.get('method')
+                if isinstance(method, basestring):
+                    return self._routes.get(method.split('.', 1)[0],
+                                            self._requests)
+                elif 'result' not in item and 'error' not in item:
+                    return self._requests
+        return None
+
+    def _dispatch(self, message, requests):
         dispatch = self._dispatcher.dispatch
         responses = [response for response in (
-            dispatch(bytes(msg), message) for msg in message.args) if response]
+            dispatch(request, message) for request in requests) if response]
         if responses:
             message.user = ''
             message.args = responses
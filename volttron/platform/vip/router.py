@@ -61,7 +61,7 @@ from __future__ import absolute_import
 import os
 
 import zmq
-from zmq import Frame, NOBLOCK, ZMQError, EINVAL, EHOSTUNREACH
+from zmq import Frame, NOBLOCK, ZMQError, EAGAIN, EINVAL, EHOSTUNREACH
 
 
 __all__ = ['BaseRouter', 'OUTGOING', 'INCOMING', 'UNROUTABLE', 'ERROR']
@@ -85,6 +85,10 @@ _INVALID_SUBSYSTEM = (
 )
 
 
+def _no_issue(topic, frames, extra=None):
+    pass
+
+
 class BaseRouter(object):
     '''Abstract base class of VIP router implementation.
 
@@ -98,11 +102,19 @@ class BaseRouter(object):
     called to allow for debugging and logging. Custom subsystems may be
     implemented in the handle_subsystem() method. The socket will be
     closed when the stop() method is called.
+
+    The run() loop drains all queued messages after each poll, up to
+    batch_size, using route_pending(). The tracing() method is checked
+    once per batch and, if it returns False, issue() is skipped for the
+    whole batch.
     '''
 
     _context_class = zmq.Context
     _socket_class = zmq.Socket
 
+    #: Maximum number of messages routed per poll in run()
+    batch_size = 1000
+
     def __init__(self, context=None, default_user_id=None):
         '''Initialize the object instance.
 
@@ -118,8 +130,11 @@ class BaseRouter(object):
         '''Main router loop.'''
         self.start()
         try:
-            while self.poll():
-                self.route()
+            poll = self.poll
+            route_pending = self.route_pending
+            batch_size = self.batch_size
+            while poll():
+                route_pending(batch_size)
         finally:
             self.stop()
 
@@ -179,6 +194,15 @@ class BaseRouter(object):
     def issue(self, topic, frames, extra=None):
         pass
 
+    def tracing(self):
+        '''Return True if issue() should be called while routing.
+
+        Returns True by default. Subclasses implementing issue() only
+        for optional debugging or statistics should return False while
+        those are disabled so the routing loop can skip the calls.
+        '''
+        return True
+
     if zmq.zmq_version_info() >= (4, 1, 0):
         def lookup_user_id(self, sender, recipient, auth_token):
             '''Find and return a user identifier.
@@ -238,11 +262,35 @@ class BaseRouter(object):
         handle_subsystem() for processing. Messages destined for other
         entities are routed appropriately.
         '''
+        frames = self.socket.recv_multipart(copy=False)
+        self._route(frames, self.issue)
+
+    def route_pending(self, limit=None):
+        '''Route queued messages without blocking.
+
+        Messages are read from the socket until none are waiting or
+        limit messages have been routed. Returns the number of messages
+        routed. issue() is only called if tracing() returns True.
+        '''
+        recv_multipart = self.socket.recv_multipart
+        route = self._route
+        issue = self.issue if self.tracing() else _no_issue
+        count = 0
+        while limit is None or count < limit:
+            try:
+                frames = recv_multipart(NOBLOCK, copy=False)
+            except ZMQError as exc:
+                if exc.errno == EAGAIN:
+                    break
+                raise
+            route(frames, issue)
+            count += 1
+        return count
+
+    def _route(self, frames, issue):
         socket = self.socket
-        issue = self.issue
         # Expecting incoming frames:
         #   [SENDER, RECIPIENT, PROTO, USER_ID, MSG_ID, SUBSYS, ...]
-        frames = socket.recv_multipart(copy=False)
         issue(INCOMING, frames)
         if len(frames) < 6:
             # Cannot route if there are insufficient frames, such as
@@ -262,7 +310,9 @@ class BaseRouter(object):
         if user_id is None:
             user_id = b''
 
-        self._add_peer(sender.bytes)
+        peer = sender.bytes
+        if peer not in self._peers:
+            self._add_peer(peer)
         subsystem = frames[5]
         if not recipient.bytes:
             # Handle requests directed at the router
@@ -303,11 +353,12 @@ class BaseRouter(object):
         else:
             # Route all other requests to the recipient
             frames[:4] = [recipient, sender, proto, user_id]
-        for peer in self._send(frames):
+        for peer in self._send(frames, issue):
             self._drop_peer(peer)
 
-    def _send(self, frames):
-        issue = self.issue
+    def _send(self, frames, issue=None):
+        if issue is None:
+            issue = self.issue
         socket = self.socket
         drop = []
         recipient, sender = frames[:2]
@@ -123,6 +123,163 @@ class PersistentDict(dict):
         raise ValueError('File not in a supported format')
 
 
+class LogStructuredDict(dict):
+    """ Persistent dictionary that writes each change as it happens.
+
+    The dict is kept in memory. Every set or delete appends one JSON record
+    to the end of the file, so the bytes written for a change depend only
+    on the size of that entry, not on the size of the dictionary. When the
+    log holds more superseded records than live entries it is compacted by
+    rewriting the live entries to a new file. update() writes all of its
+    entries as one record so they are stored together or not at all.
+
+    A file written by PersistentDict in json format is read and converted
+    to a log the first time it is opened.
+    """
+
+    def __init__(self, filename, mode=None, compact_min_records=1000):
+        dict.__init__(self)
+        self.filename = filename
+        self.mode = mode
+        self.compact_min_records = compact_min_records
+        self._fileobj = None
+        self._records = 0
+
+        if os.access(filename, os.R_OK):
+            self._load()
+
+    def _load(self):
+        with open(self.filename, 'r') as fileobj:
+            data = fileobj.read()
+
+        if data.lstrip().startswith('{'):
+            dict.update(self, json.loads(data))
+            self.compact()
+            return
+
+        # A file not ending in a newline was cut off mid write.
+        damaged = bool(data) and not data.endswith('\n')
+        for line in data.splitlines():
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Only the last record can be partial, after a crash mid write.
+                _log.warning("Ignoring incomplete record in {}".format(self.filename))
+                damaged = True
+                continue
+            if record[0] == 'set':
+                dict.__setitem__(self, record[1], record[2])
+            elif record[0] == 'update':
+                dict.update(self, record[1])
+                self._records += len(record[1]) - 1
+            else:
+                dict.pop(self, record[1], None)
+            self._records += 1
+
+        if damaged:
+            # Rewrite the log so later appends do not land on the end of
+            # the partial record.
+            self.compact()
+
+    def _append(self, record, entries=1):
+        if self._fileobj is None:
+            self._fileobj = open(self.filename, 'a')
+            if self.mode is not None:
+                os.chmod(self.filename, self.mode)
+        self._fileobj.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self._fileobj.flush()
+        self._records += entries
+
+        if not self:
+            self._remove_file()
+        elif self._records > max(2 * len(self), self.compact_min_records):
+            self.compact()
+
+    def _remove_file(self):
+        self._close_file()
+        self._records = 0
+        try:
+            os.remove(self.filename)
+        except OSError:
+            pass
+
+    def _close_file(self):
+        if self._fileobj is not None:
+            self._fileobj.close()
+            self._fileobj = None
+
+    def compact(self):
+        """Rewrite the log with only the current entries."""
+        self._close_file()
+        if not self:
+            self._remove_file()
+            return
+
+        tempname = self.filename + '.tmp'
+        with open(tempname, 'w') as fileobj:
+            for key, value in self.iteritems():
+                fileobj.write(json.dumps(['set', key, value], separators=(',', ':')) + '\n')
+            fileobj.flush()
+            os.fsync(fileobj.fileno())
+        shutil.move(tempname, self.filename)  # atomic commit
+        if self.mode is not None:
+            os.chmod(self.filename, self.mode)
+        self._records = len(self)
+
+    def __setitem__(self, key, value):
+        dict.__setitem__(self, key, value)
+        self._append(['set', key, value])
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._append(['del', key])
+
+    def pop(self, key, *default):
+        if key not in self:
+            return dict.pop(self, key, *default)
+        value = dict.pop(self, key)
+        self._append(['del', key])
+        return value
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        self._append(['del', key])
+        return key, value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        entries = dict(*args, **kwargs)
+        if entries:
+            dict.update(self, entries)
+            self._append(['update', entries], len(entries))
+
+    def clear(self):
+        dict.clear(self)
+        self._remove_file()
+
+    def sync(self):
+        """ Write buffered changes to disk """
+        if self._fileobj is not None:
+            self._fileobj.flush()
+            os.fsync(self._fileobj.fileno())
+
+    def close(self):
+        self.sync()
+        self._close_file()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
 if __name__ == '__main__':
     import random
 
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import io
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+
+from volttron.platform.aip import agent_log_level, log_entries
+from volttron.platform.agent.utils import (LOG_FRAME_MARKER, LOG_FRAME_SIZE,
+                                           decode_log_record,
+                                           decode_log_record_header,
+                                           encode_log_record)
+
+
+def make_record(name='agent.module', level=logging.INFO, msg='value %s',
+                args=(42,), exc_info=None):
+    return logging.LogRecord(name, level, '/agents/module.py', 12, msg, args,
+                             exc_info, func='scrape')
+
+
+def frame(record):
+    payload = encode_log_record(record)
+    return LOG_FRAME_MARKER + LOG_FRAME_SIZE.pack(len(payload)) + payload
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super(Capture, self).__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def agents_log():
+    log = logging.getLogger('agents.log')
+    handler = Capture()
+    log.addHandler(handler)
+    log.propagate = False
+    yield log, handler.records
+    log.removeHandler(handler)
+    log.propagate = True
+    log.setLevel(logging.NOTSET)
+
+
+def test_record_round_trip():
+    try:
+        raise ValueError(u'caf\xe9')
+    except ValueError:
+        record = make_record(msg=u'caf\xe9 %s', exc_info=sys.exc_info())
+    payload = encode_log_record(record)
+
+    assert decode_log_record_header(payload) == (logging.INFO, 'agent.module')
+    dct = decode_log_record(payload)
+    assert dct['msg'] == u'caf\xe9 42'
+    assert dct['args'] == ()
+    assert dct['name'] == 'agent.module'
+    assert dct['levelname'] == 'INFO'
+    assert dct['lineno'] == 12
+    assert dct['funcName'] == 'scrape'
+    assert dct['filename'] == 'module.py'
+    assert dct['module'] == 'module'
+    assert dct['created'] == record.created
+    assert 'ValueError' in dct['exc_text']
+    assert logging.makeLogRecord(dct).getMessage() == u'caf\xe9 42'
+
+
+def test_log_entries_filters_frames_and_passes_lines(agents_log):
+    log, records = agents_log
+    log.setLevel(logging.INFO)
+    stream = io.BytesIO(b''.join([
+        frame(make_record(level=logging.DEBUG)),
+        b'plain text\n',
+        frame(make_record(level=logging.WARNING)),
+        b'<4>syslog warning\n',
+        frame(make_record(level=logging.INFO, msg='no newline', args=())),
+    ]))
+
+    lines = list(log_entries('agents.log', 'agent', 123, logging.ERROR,
+                             stream))
+
+    assert lines == [(logging.ERROR, 'plain text'),
+                     (logging.WARNING, 'syslog warning')]
+    assert [r.getMessage() for r in records] == ['value 42', 'no newline']
+    assert records[0].remote_name == 'agent.module'
+    assert records[0].name == 'agents.log'
+    assert records[0].process == 123
+
+
+def test_agent_log_level_follows_handler_levels(agents_log):
+    log, records = agents_log
+    log.setLevel(logging.DEBUG)
+    log.handlers[0].setLevel(logging.WARNING)
+    assert agent_log_level() == logging.WARNING
+    log.handlers[0].setLevel(logging.NOTSET)
+    assert agent_log_level() <= logging.DEBUG
+
+
+def test_agent_drops_records_below_platform_level():
+    code = ('import logging\n'
+            'from volttron.platform.agent import utils\n'
+            'utils.setup_logging()\n'
+            'log = logging.getLogger("agent")\n'
+            'log.debug("dropped")\n'
+            'log.info("kept")\n')
+    env = dict(os.environ, _LAUNCHED_BY_PLATFORM='1',
+               AGENT_LOG_LEVEL=str(logging.INFO),
+               PYTHONPATH=':'.join(sys.path))
+    proc = subprocess.Popen([sys.executable, '-c', code], env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    _, stderr = proc.communicate()
+
+    assert stderr[:1] == LOG_FRAME_MARKER
+    size, = LOG_FRAME_SIZE.unpack_from(stderr, 1)
+    assert len(stderr) == 1 + LOG_FRAME_SIZE.size + size
+    dct = decode_log_record(stderr[1 + LOG_FRAME_SIZE.size:])
+    assert (dct['name'], dct['msg']) == ('agent', 'kept')
@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+from volttron.platform.auth import AuthEntry, AuthService, dump_user, load_user
+
+
+def make_auth_service(entries):
+    auth = AuthService.__new__(AuthService)
+    auth.auth_entries = entries
+    auth.allow_any = False
+    auth._index_auth_entries()
+    return auth
+
+
+def linear_authorizations(entries, user_id):
+    """The scan get_authorizations used before entries were indexed."""
+    try:
+        domain, address, mechanism, credentials = load_user(user_id)
+    except ValueError:
+        domain = None
+    for entry in entries:
+        if entry.user_id == user_id:
+            return [entry.capabilities, entry.groups, entry.roles]
+        elif domain is not None:
+            if entry.match(domain, address, mechanism, [credentials]):
+                return [entry.capabilities, entry.groups, entry.roles]
+
+
+def key(index):
+    return 'key{:040d}'.format(index)
+
+
+@pytest.mark.auth
+def test_lookup_by_user_id_and_credentials():
+    auth = make_auth_service([
+        AuthEntry(credentials=key(1), user_id='historian', capabilities=['read']),
+        AuthEntry(credentials=key(2), capabilities=['write']),
+        AuthEntry(credentials='/key0+3/', capabilities=['regex'])])
+
+    assert auth.get_capabilities('historian') == ['read']
+    assert auth.get_capabilities(dump_user('vip', '127.0.0.1', 'CURVE', key(2))) == ['write']
+    assert auth.get_capabilities(dump_user('vip', '127.0.0.1', 'CURVE', key(3))) == ['regex']
+    assert auth.get_capabilities(dump_user('vip', '127.0.0.1', 'CURVE', key(4))) == []
+    assert auth.get_capabilities('unknown') == []
+
+
+@pytest.mark.auth
+def test_first_matching_entry_wins():
+    user = dump_user('vip', '127.0.0.1', 'CURVE', key(1))
+    auth = make_auth_service([
+        AuthEntry(credentials=key(1), capabilities=['first']),
+        AuthEntry(credentials=key(2), user_id=user, capabilities=['second'])])
+
+    assert auth.get_capabilities(user) == ['first']
+
+
+@pytest.mark.auth
+def test_index_agrees_with_scan():
+    rand = random.Random(3)
+    entries = []
+    for i in xrange(200):
+        if i % 20 == 0:
+            credentials = '/key0+{}[0-9]/'.format(i // 20)
+        else:
+            credentials = key(rand.randrange(150))
+        entries.append(AuthEntry(credentials=credentials,
+                                 address=rand.choice([None, '127.0.0.1', '/10\\..*/']),
+                                 user_id=rand.choice([None, 'agent{}'.format(i)]),
+                                 capabilities=['cap{}'.format(i)]))
+    auth = make_auth_service(entries)
+
+    users = ['agent{}'.format(i) for i in xrange(200)]
+    users.extend(dump_user('vip', address, 'CURVE', key(i))
+                 for i in xrange(160) for address in ('127.0.0.1', '10.0.0.5'))
+    for user in users:
+        assert auth.get_authorizations(user) == linear_authorizations(auth.auth_entries, user)
+
+
+def linear_authenticate(entries, domain, address, mechanism, credentials):
+    for entry in entries:
+        if entry.match(domain, address, mechanism, credentials):
+            return entry.user_id or dump_user(domain, address, mechanism, *credentials[:1])
+
+
+@pytest.mark.auth
+@pytest.mark.parametrize('group', ['', '(x)?'])
+def test_authenticate_agrees_with_scan(group):
+    # Patterns with groups are too many for one regex and are checked one by one.
+    entries = [AuthEntry(credentials='/key0+{}{}[0-9]/'.format(i, group), address=address,
+                         user_id='pattern{}'.format(i))
+               for i in xrange(150) for address in ('/10\\..*/', '127.0.0.1')]
+    entries.extend(AuthEntry(credentials=key(i), user_id=None if i % 2 else 'exact{}'.format(i))
+                   for i in xrange(2000, 2500))
+    entries.append(AuthEntry(mechanism='NULL', address='/192\\.168\\..*/', user_id='null'))
+    auth = make_auth_service(entries)
+    assert (auth._pattern_regex is None) == bool(group)
+
+    for i in range(0, 1500, 7) + range(2000, 2600, 7):
+        for address in ('10.0.0.1', '127.0.0.1', '192.168.0.1'):
+            connection = ('vip', address, 'CURVE', [key(i)])
+            assert auth.authenticate(*connection) == linear_authenticate(entries, *connection)
+    assert auth.authenticate('vip', '192.168.0.1', 'NULL', []) == 'null'
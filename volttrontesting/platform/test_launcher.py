@@ -0,0 +1,96 @@
+import os
+import signal
+import sys
+import textwrap
+
+import gevent
+import pytest
+
+from volttron.platform.aip import AIPplatform
+from volttron.platform.launcher import AgentLauncher
+
+AGENT = textwrap.dedent('''\
+    import os
+    import sys
+    import time
+
+
+    def main():
+        print(os.getcwd())
+        print(os.environ['AGENT_UUID'])
+        print(sys.path[1])
+        sys.stderr.write('started\\n')
+        sys.stdout.flush()
+        if os.environ.get('AGENT_WAIT'):
+            time.sleep(30)
+        sys.exit(3)
+    ''')
+
+
+@pytest.fixture
+def launcher(tmpdir):
+    tmpdir.join('launchedagent.py').write(AGENT)
+    launcher = AgentLauncher(str(tmpdir))
+    yield launcher
+    launcher.stop()
+
+
+def agent_env(tmpdir, **extra):
+    env = dict(os.environ, AGENT_UUID='launched-agent')
+    env['PYTHONPATH'] = ':'.join([str(tmpdir)] + sys.path)
+    env.update(extra)
+    return env
+
+
+def test_launch_runs_agent_with_environment(launcher, tmpdir):
+    cwd = tmpdir.mkdir('data')
+    proc = launcher.launch('launchedagent', 'main', cwd=str(cwd),
+                           env=agent_env(tmpdir))
+    assert [line.rstrip('\n') for line in proc.stdout] == [
+        str(cwd), 'launched-agent', str(tmpdir)]
+    assert list(proc.stderr) == ['started\n']
+    assert proc.wait(10) == 3
+    assert proc.poll() == 3
+    # The FIFOs are removed once the agent is connected to them.
+    assert tmpdir.listdir(lambda path: path.basename.startswith('launch-')) == []
+
+
+def test_launched_agent_is_interrupted_by_sigint(launcher, tmpdir):
+    proc = launcher.launch('launchedagent', 'main', cwd=str(tmpdir),
+                           env=agent_env(tmpdir, AGENT_WAIT='1'))
+    assert proc.stderr.readline() == 'started\n'
+    assert proc.poll() is None
+    proc.send_signal(signal.SIGINT)
+    assert proc.wait(10) == 1
+    assert 'KeyboardInterrupt' in proc.stderr.read()
+
+
+def test_launcher_is_restarted_after_exit(launcher, tmpdir):
+    proc = launcher.launch('launchedagent', 'main', cwd=str(tmpdir),
+                           env=agent_env(tmpdir))
+    assert proc.wait(10) == 3
+    launcher.stop()
+    proc = launcher.launch('launchedagent', 'main', cwd=str(tmpdir),
+                           env=agent_env(tmpdir))
+    assert proc.wait(10) == 3
+
+
+def test_autostart_starts_same_priority_together(tmpdir):
+    options = type('Options', (), {'volttron_home': str(tmpdir)})
+    aip = AIPplatform(options)
+    priorities = {'a': '90', 'b': '50', 'c': '50', 'd': None, 'e': '10'}
+    aip.list_agents = lambda: dict.fromkeys(priorities)
+    aip._agent_priority = priorities.get
+    events = []
+
+    def start_agent(agent_uuid):
+        events.append(('start', agent_uuid))
+        gevent.sleep(0.01)
+        events.append(('started', agent_uuid))
+    aip.start_agent = start_agent
+
+    assert aip.autostart() == []
+    assert events[:2] == [('start', 'a'), ('started', 'a')]
+    assert sorted(events[2:4]) == [('start', 'b'), ('start', 'c')]
+    assert sorted(events[4:6]) == [('started', 'b'), ('started', 'c')]
+    assert events[6:] == [('start', 'e'), ('started', 'e')]
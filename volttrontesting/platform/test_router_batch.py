@@ -0,0 +1,90 @@
+import zmq
+
+from volttron.platform.vip.router import BaseRouter, INCOMING, OUTGOING
+
+
+class InprocRouter(BaseRouter):
+    def __init__(self, address, tracing=True, **kwargs):
+        super(InprocRouter, self).__init__(**kwargs)
+        self.address = address
+        self.issued = []
+        self._tracing = tracing
+
+    def setup(self):
+        self.socket.bind(self.address)
+
+    def issue(self, topic, frames, extra=None):
+        self.issued.append(topic)
+
+    def tracing(self):
+        return self._tracing
+
+
+def make_peers(context, address, *identities):
+    peers = []
+    for identity in identities:
+        sock = context.socket(zmq.DEALER)
+        sock.identity = identity
+        sock.connect(address)
+        peers.append(sock)
+    return peers
+
+
+def route_all(router, expected):
+    routed = 0
+    while routed < expected and router.poll(1000):
+        routed += router.route_pending()
+    return routed
+
+
+def run_batch(address, tracing):
+    context = zmq.Context()
+    router = InprocRouter(address, tracing=tracing, context=context)
+    router.start()
+    try:
+        alpha, beta = make_peers(context, address, b'alpha', b'beta')
+        for i in range(5):
+            alpha.send_multipart([b'beta', b'VIP1', b'', str(i), b'echo', b'x'])
+        assert route_all(router, 5) == 5
+        received = [beta.recv_multipart() for i in range(5)]
+        for sock in (alpha, beta):
+            sock.close(0)
+        return router, received
+    finally:
+        router.stop(0)
+        context.term()
+
+
+def test_route_pending_routes_queued_messages():
+    router, received = run_batch('inproc://router-batch-1', True)
+    assert [frames[3] for frames in received] == [str(i) for i in range(5)]
+    assert received[0][:3] == [b'alpha', b'VIP1', b'']
+    assert received[0][4:] == [b'echo', b'x']
+    assert router.issued.count(INCOMING) == 5
+    assert router.issued.count(OUTGOING) >= 5
+
+
+def test_route_pending_skips_issue_when_not_tracing():
+    router, received = run_batch('inproc://router-batch-2', False)
+    assert len(received) == 5
+    assert router.issued == []
+
+
+def test_route_pending_respects_limit():
+    context = zmq.Context()
+    address = 'inproc://router-batch-3'
+    router = InprocRouter(address, context=context)
+    router.start()
+    try:
+        alpha, beta = make_peers(context, address, b'alpha', b'beta')
+        for i in range(4):
+            alpha.send_multipart([b'beta', b'VIP1', b'', str(i), b'echo'])
+        assert router.poll(1000)
+        assert router.route_pending(3) == 3
+        assert route_all(router, 1) == 1
+        assert router.route_pending() == 0
+        for sock in (alpha, beta):
+            sock.close(0)
+    finally:
+        router.stop(0)
+        context.term()
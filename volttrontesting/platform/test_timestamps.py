@@ -0,0 +1,79 @@
+from datetime import datetime
+
+import pytest
+import pytz
+from dateutil.parser import parse
+from dateutil.tz import tzoffset, tzutc
+
+from volttron.platform.agent import utils
+
+
+@pytest.mark.parametrize('time_stamp, expected', [
+    (datetime(2017, 3, 4, 5, 6, 7, 89),
+     '2017-03-04T05:06:07.000089'),
+    (pytz.UTC.localize(datetime(2017, 3, 4, 5, 6, 7)),
+     '2017-03-04T05:06:07.000000+00:00'),
+    (datetime(2017, 3, 4, 5, 6, 7, 123456, tzoffset(None, -5 * 3600 - 1800)),
+     '2017-03-04T05:06:07.123456-05:30'),
+    (pytz.timezone('US/Pacific').localize(datetime(2017, 7, 4, 5, 6, 7)),
+     '2017-07-04T05:06:07.000000-07:00'),
+])
+def test_format_timestamp(time_stamp, expected):
+    assert utils.format_timestamp(time_stamp) == expected
+
+
+@pytest.mark.parametrize('string', [
+    '2017-03-04T05:06:07.000089',
+    '2017-03-04T05:06:07.123456+00:00',
+    '2017-03-04T05:06:07.123456-05:30',
+    '2017-03-04T05:06:07+0200',
+    '2017-03-04T05:06:07.12Z',
+    '2017-03-04 05:06:07.5',
+    '2017-03-04T05:06:07',
+    'March 4 2017 5:06 PM',
+])
+def test_parse_timestamp_string_matches_dateutil(string):
+    time_stamp = utils.parse_timestamp_string(string)
+    expected = parse(string)
+    assert time_stamp == expected
+    assert time_stamp.utcoffset() == expected.utcoffset()
+
+
+def test_parse_timestamp_string_round_trips_format_timestamp():
+    time_stamp = datetime(2017, 3, 4, 5, 6, 7, 89, tzutc())
+    string = utils.format_timestamp(time_stamp)
+    assert utils.parse_timestamp_string(string) == time_stamp
+    assert utils.parse_timestamp_string(string).tzinfo == tzutc()
+
+
+def test_parse_timestamp_string_errors():
+    with pytest.raises(ValueError):
+        utils.parse_timestamp_string('2017-13-04T05:06:07')
+    with pytest.raises(ValueError):
+        utils.parse_timestamp_string('not a time')
+    with pytest.raises((TypeError, AttributeError)):
+        utils.parse_timestamp_string(None)
+
+
+def test_parse_timestamp_string_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(utils, 'TIMESTAMP_CACHE_SIZE', 3)
+    monkeypatch.setattr(utils, '_timestamp_cache', utils.OrderedDict())
+    strings = ['2017-03-04T05:06:0{}'.format(i) for i in range(5)]
+    first = utils.parse_timestamp_string(strings[0])
+    for string in strings[1:3]:
+        utils.parse_timestamp_string(string)
+    # A cache hit returns the same object and refreshes the entry.
+    assert utils.parse_timestamp_string(strings[0]) is first
+    for string in strings[3:]:
+        utils.parse_timestamp_string(string)
+    assert list(utils._timestamp_cache) == [strings[0]] + strings[3:]
+
+
+def test_process_timestamp():
+    time_stamp, original_tz = utils.process_timestamp(
+        '2017-03-04T05:06:07.000000-05:00', 'devices/a')
+    assert time_stamp == pytz.UTC.localize(datetime(2017, 3, 4, 10, 6, 7))
+    assert time_stamp.tzinfo is pytz.UTC
+    assert original_tz.utcoffset(None).total_seconds() == -5 * 3600
+    assert utils.process_timestamp('bad', 'devices/a') is None
+    assert utils.process_timestamp(None, 'devices/a') is None
@@ -0,0 +1,142 @@
+import json
+import os
+
+from gevent.event import AsyncResult
+import pytest
+
+from volttron.platform.jsonrpc import MethodNotFound
+from volttron.platform.store import ConfigStoreService
+from volttron.platform.vip.agent.subsystems.configstore import ConfigStore
+
+
+class FakeSignal(object):
+    def connect(self, receiver, owner=None):
+        pass
+
+
+class FakeCore(object):
+    onsetup = FakeSignal()
+    configuration = FakeSignal()
+
+
+class FakeRPC(object):
+    """Answers calls from the store service in place of an agent."""
+    def __init__(self, config_store=None, bulk=True):
+        self.config_store = config_store
+        self.bulk = bulk
+        self.calls = []
+
+    def call(self, peer, method, *args, **kwargs):
+        self.calls.append(method)
+        result = AsyncResult()
+        if method == "config.update_bulk" and not self.bulk:
+            result.set_exception(MethodNotFound(-32601, "Method not found"))
+        elif method == "config.update_bulk":
+            result.set(self.config_store._update_configs(*args, **kwargs))
+        else:
+            result.set(self.config_store._update_config(*args, **kwargs))
+        return result
+
+    def export(self, method, name=None):
+        pass
+
+
+class FakeVIP(object):
+    def __init__(self, rpc):
+        self.rpc = rpc
+
+
+def driver_config_store():
+    config_store = ConfigStore(None, FakeCore(), FakeRPC())
+    config_store._initial_update({})
+    config_store._initial_callbacks_called = True
+    callbacks = []
+    config_store.subscribe(lambda name, action, contents: callbacks.append((name, action, contents)),
+                           pattern="devices/*")
+    return config_store, callbacks
+
+
+def device(registry):
+    return {"driver_type": "fake", "registry_config": "config://" + registry}
+
+
+@pytest.fixture
+def service(tmpdir):
+    config_store, callbacks = driver_config_store()
+    service = ConfigStoreService.__new__(ConfigStoreService)
+    service.store = {}
+    service.store_path = str(tmpdir)
+    service.vip = FakeVIP(FakeRPC(config_store))
+    service.callbacks = callbacks
+    return service
+
+
+@pytest.mark.config_store
+def test_batch_triggers_one_callback_per_config():
+    config_store, callbacks = driver_config_store()
+    config_store._update_configs([("NEW", "registry.csv", [{"Point Name": "Temp"}]),
+                                  ("NEW", "devices/a", device("registry.csv")),
+                                  ("NEW", "devices/b", device("registry.csv")),
+                                  ("UPDATE", "registry.csv", [{"Point Name": "Humidity"}])],
+                                 trigger_callback=True)
+
+    assert sorted((name, action) for name, action, _ in callbacks) == [("devices/a", "NEW"),
+                                                                      ("devices/b", "NEW")]
+    for _, _, contents in callbacks:
+        assert contents["registry_config"] == [{"Point Name": "Humidity"}]
+
+
+@pytest.mark.config_store
+def test_batch_delete_and_replace():
+    config_store, callbacks = driver_config_store()
+    config_store._update_configs([("NEW", "devices/a", device("registry.csv")),
+                                  ("NEW", "devices/b", device("registry.csv"))],
+                                 trigger_callback=True)
+    del callbacks[:]
+
+    config_store._update_configs([("DELETE", "devices/a", None),
+                                  ("NEW", "devices/a", device("other.csv")),
+                                  ("DELETE", "devices/b", None)],
+                                 trigger_callback=True)
+
+    assert sorted((name, action) for name, action, _ in callbacks) == [("devices/a", "UPDATE"),
+                                                                      ("devices/b", "DELETE")]
+    assert config_store.list() == ["devices/a"]
+
+
+@pytest.mark.config_store
+def test_manage_store_bulk(service):
+    configs = [("registry.csv", "Point Name\nTemp\n", "csv")]
+    configs.extend(("devices/{}".format(i), json.dumps(device("registry.csv")), "json")
+                   for i in xrange(100))
+
+    service.manage_store_bulk("platform.driver", configs)
+
+    assert service.vip.rpc.calls == ["config.update_bulk"]
+    assert len(service.callbacks) == 100
+    assert service.manage_list_configs("platform.driver")[0] == "devices/0"
+    with open(os.path.join(service.store_path, "platform.driver.store")) as f:
+        assert len(f.readlines()) == 1
+
+
+@pytest.mark.config_store
+def test_manage_store_bulk_rejects_whole_batch(service):
+    configs = [("devices/a", json.dumps(device("registry.csv")), "json"),
+               ("devices/b", "{not json", "json")]
+
+    with pytest.raises(ValueError):
+        service.manage_store_bulk("platform.driver", configs)
+
+    assert service.manage_list_configs("platform.driver") == []
+    assert service.vip.rpc.calls == []
+
+
+@pytest.mark.config_store
+def test_manage_store_bulk_older_agent(service):
+    service.vip.rpc.bulk = False
+    service.manage_store_bulk("platform.driver",
+                              [("devices/{}".format(i), json.dumps(device("registry.csv")), "json")
+                               for i in xrange(3)])
+
+    assert service.vip.rpc.calls == ["config.update_bulk"] + ["config.update"] * 3
+    assert len(service.callbacks) == 3
@@ -0,0 +1,110 @@
+import json
+import os
+
+import pytest
+
+from volttron.utils.persistance import LogStructuredDict, PersistentDict
+
+
+def registry(index):
+    return {"type": "csv", "data": "Point Name,Index\nPoint{},{}\n".format(index, index) * 20}
+
+
+@pytest.fixture
+def store_path(tmpdir):
+    return str(tmpdir.join("platform.driver.store"))
+
+
+@pytest.mark.config_store
+def test_changes_survive_reload(store_path):
+    store = LogStructuredDict(store_path)
+    store["config"] = {"type": "json", "data": "{}"}
+    store["devices/a"] = registry(1)
+    store["devices/b"] = registry(2)
+    del store["devices/a"]
+    store.pop("missing", None)
+    store["devices/b"] = registry(3)
+    store.close()
+
+    assert LogStructuredDict(store_path) == {"config": {"type": "json", "data": "{}"},
+                                             "devices/b": registry(3)}
+
+
+@pytest.mark.config_store
+def test_update_writes_only_changed_entry(store_path):
+    store = LogStructuredDict(store_path)
+    for i in xrange(5000):
+        store["devices/{}".format(i)] = registry(i)
+
+    store.compact()
+    size = os.path.getsize(store_path)
+    store["devices/10"] = registry(11)
+
+    written = os.path.getsize(store_path) - size
+    assert written < 2 * len(json.dumps(registry(11)))
+
+
+@pytest.mark.config_store
+def test_compaction(store_path):
+    store = LogStructuredDict(store_path, compact_min_records=10)
+    for i in xrange(100):
+        store["config"] = registry(i)
+
+    with open(store_path) as fileobj:
+        assert len(fileobj.readlines()) <= 10
+    assert LogStructuredDict(store_path) == {"config": registry(99)}
+
+
+@pytest.mark.config_store
+def test_reads_persistent_dict_file(store_path):
+    old_store = PersistentDict(filename=store_path, flag='c', format='json')
+    old_store["config"] = {"type": "raw", "data": "value"}
+    old_store.sync()
+
+    store = LogStructuredDict(store_path)
+    assert store == {"config": {"type": "raw", "data": "value"}}
+    store["other"] = {"type": "raw", "data": "other"}
+
+    assert len(LogStructuredDict(store_path)) == 2
+
+
+@pytest.mark.config_store
+def test_partial_record_ignored(store_path):
+    store = LogStructuredDict(store_path)
+    store["config"] = registry(1)
+    store.close()
+    with open(store_path, 'a') as fileobj:
+        fileobj.write('["set","config",{"type":"cs')
+
+    assert LogStructuredDict(store_path) == {"config": registry(1)}
+
+
+@pytest.mark.config_store
+def test_partial_record_repaired(store_path):
+    store = LogStructuredDict(store_path)
+    store["config"] = registry(1)
+    store.close()
+    with open(store_path, 'a') as fileobj:
+        fileobj.write('["set","config",{"type":"cs')
+
+    store = LogStructuredDict(store_path)
+    store["other"] = registry(2)
+    store.close()
+
+    assert LogStructuredDict(store_path) == {"config": registry(1),
+                                             "other": registry(2)}
+
+
+@pytest.mark.config_store
+def test_empty_store_removes_file(store_path):
+    store = LogStructuredDict(store_path)
+    store["a"] = registry(1)
+    store["b"] = registry(2)
+    del store["a"]
+    assert os.path.exists(store_path)
+    store.pop("b")
+    assert not os.path.exists(store_path)
+
+    store["c"] = registry(3)
+    store.clear()
+    assert not os.path.exists(store_path)
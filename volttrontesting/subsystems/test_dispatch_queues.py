@@ -0,0 +1,114 @@
+import threading
+
+import gevent
+import pytest
+
+from volttron.platform.vip.agent.decorators import annotations, threaded
+from volttron.platform.vip.agent.dispatch import WorkQueue
+from volttron.platform.vip.agent.subsystems.rpc import RPC
+
+
+class FakeSignal(object):
+    def connect(self, receiver, owner=None):
+        pass
+
+
+class FakeCore(object):
+    onsetup = FakeSignal()
+
+    def register(self, name, handler, error_handler):
+        pass
+
+
+@pytest.mark.subsystems
+def test_work_queue_runs_in_order():
+    queue = WorkQueue('test', 1)
+    done = []
+
+    def work(index):
+        gevent.sleep(0.001 * (5 - index))
+        done.append(index)
+
+    for index in range(5):
+        queue.submit(work, index)
+    assert queue.stats.max_depth == 5
+    gevent.sleep(0.1)
+    assert done == range(5)
+    assert queue.stats.completed == 5
+    assert queue.stats.depth == 0
+
+
+@pytest.mark.subsystems
+def test_work_queue_bounds_concurrency():
+    queue = WorkQueue('test', 2)
+    running = []
+    most = []
+
+    def work():
+        running.append(1)
+        most.append(len(running))
+        gevent.sleep(0.01)
+        running.pop()
+
+    for _ in range(6):
+        queue.submit(work)
+    gevent.sleep(0.1)
+    assert max(most) == 2
+    assert queue.stats.completed == 6
+    assert queue.stats.wait_max > 0
+
+
+@pytest.mark.subsystems
+def test_work_queue_continues_after_exception():
+    queue = WorkQueue('test', 1)
+    done = []
+
+    def fail():
+        raise ValueError('bad')
+
+    queue.submit(fail)
+    queue.submit(done.append, 1)
+    gevent.sleep(0.01)
+    assert done == [1]
+    assert queue.stats.failed == 1
+    assert queue.stats.completed == 2
+
+
+@pytest.mark.subsystems
+def test_work_queue_thread_pool():
+    rpc = RPC(FakeCore(), object(), thread_pool_size=1)
+    queue = WorkQueue('test', 1, rpc.threadpool)
+    threads = []
+    queue.submit(lambda: threads.append(threading.current_thread()))
+    gevent.sleep(0.1)
+    assert threads and threads[0] is not threading.current_thread()
+
+
+@pytest.mark.subsystems
+def test_threaded_annotation():
+    @threaded
+    def method():
+        pass
+    assert annotations(method, set, 'dispatch.threaded')
+
+
+@pytest.mark.subsystems
+def test_rpc_request_routing():
+    rpc = RPC(FakeCore(), object(), pool_size=4)
+    pubsub_queue = WorkQueue('pubsub')
+    rpc.route('pubsub', pubsub_queue)
+
+    request = {'jsonrpc': '2.0', 'id': '1', 'method': 'query', 'params': {}}
+    push = {'jsonrpc': '2.0', 'method': 'pubsub.push', 'params': {}}
+    response = {'jsonrpc': '2.0', 'id': '1', 'result': 5}
+
+    assert rpc._request_queue([request]) is rpc._requests
+    assert rpc._requests.size == 4
+    assert rpc._request_queue([push]) is pubsub_queue
+    assert rpc._request_queue([[push, request]]) is pubsub_queue
+    # Responses are handled by the receive loop itself.
+    assert rpc._request_queue([response]) is None
+    assert rpc._request_queue([[response]]) is None
+    assert rpc._request_queue([b'not json']) is rpc._requests
+    assert sorted(stats['name'] for stats in rpc._dispatch_stats()) == \
+        ['pubsub', 'rpc']
@@ -0,0 +1,205 @@
+import random
+import weakref
+
+import gevent
+from gevent.event import AsyncResult
+import pytest
+
+from volttron.platform import jsonrpc
+from volttron.platform.vip.agent.subsystems.pubsub import (
+    PrefixSubscriptions, ProtectedPubSubTopics, PubSub)
+
+
+class FakeSocket(object):
+    def __init__(self):
+        self.sent = []
+
+    def send_multipart(self, frames, copy=True):
+        self.sent.append(list(frames))
+
+
+class FakeVIPMessage(object):
+    peer = 'publisher'
+    user = 'publisher'
+
+
+class FakeContext(object):
+    vip_message = FakeVIPMessage()
+
+
+class FakeRPC(object):
+    context = FakeContext()
+
+    def __init__(self):
+        self.capabilities = []
+        self.calls = []
+        self.dispatch_queues = set()
+
+    def call(self, peer, method, *args, **kwargs):
+        self.calls.append((peer, method))
+        result = AsyncResult()
+        result.set(list(self.capabilities))
+        return result
+
+
+class FakeCore(object):
+    def __init__(self):
+        self.socket = FakeSocket()
+
+
+def make_pubsub():
+    # Only the routing side of the subsystem is exercised, so skip setup.
+    pubsub = PubSub.__new__(PubSub)
+    pubsub._rpc_obj, pubsub._core_obj = FakeRPC(), FakeCore()
+    pubsub.rpc = weakref.ref(pubsub._rpc_obj)
+    pubsub.core = weakref.ref(pubsub._core_obj)
+    pubsub._peer_subscriptions = {}
+    pubsub._my_subscriptions = {}
+    pubsub.protected_topics = ProtectedPubSubTopics()
+    pubsub._user_capabilities = {}
+    pubsub._auth_generation = 0
+    pubsub._ordered_callbacks = True
+    pubsub._callback_queues = {}
+    pubsub.add_bus('')
+    return pubsub
+
+
+def linear_match(subscriptions, topic):
+    return sorted((prefix, value) for prefix, value in
+                  subscriptions.iteritems() if topic.startswith(prefix))
+
+
+@pytest.mark.subsystems
+def test_prefix_match():
+    subscriptions = PrefixSubscriptions()
+    subscriptions[''] = {'all'}
+    subscriptions['devices'] = {'historian'}
+    subscriptions['devices/campus/build'] = {'partial'}
+    subscriptions['devices/campus/building1/device1'] = {'driver'}
+    subscriptions['analysis'] = {'other'}
+
+    assert sorted(subscriptions.match(
+        'devices/campus/building1/device1/all')) == [
+        ('', {'all'}),
+        ('devices', {'historian'}),
+        ('devices/campus/build', {'partial'}),
+        ('devices/campus/building1/device1', {'driver'})]
+    assert subscriptions.match('record') == [('', {'all'})]
+
+    del subscriptions['']
+    assert subscriptions.pop('devices') == {'historian'}
+    assert subscriptions.pop('devices', None) is None
+    assert sorted(subscriptions.match(
+        'devices/campus/building1/device1/all')) == [
+        ('devices/campus/build', {'partial'}),
+        ('devices/campus/building1/device1', {'driver'})]
+    subscriptions.clear()
+    assert subscriptions.match('devices') == []
+
+
+@pytest.mark.subsystems
+def test_prefix_match_agrees_with_scan():
+    rand = random.Random(0)
+    subscriptions = PrefixSubscriptions()
+    topics = ['devices/campus/building{}/device{}/point{}'.format(
+        rand.randint(0, 3), rand.randint(0, 3), rand.randint(0, 3))
+        for _ in range(50)]
+    for _ in range(500):
+        topic = rand.choice(topics)
+        prefix = topic[:rand.randint(0, len(topic))]
+        if rand.random() < 0.3:
+            subscriptions.pop(prefix, None)
+        else:
+            subscriptions.setdefault(prefix, set()).add(rand.randint(0, 9))
+        for topic in topics[:5]:
+            assert sorted(subscriptions.match(topic)) == \
+                linear_match(subscriptions, topic)
+
+
+@pytest.mark.subsystems
+def test_publish_batch():
+    pubsub = make_pubsub()
+    pubsub._add_peer_subscription('historian', '', 'devices')
+    pubsub._add_peer_subscription('listener', '', '')
+
+    pubsub._peer_publish_batch([('devices/a/all', {}, [1]),
+                                ('record/b', {}, [2])])
+    sent = pubsub.core().socket.sent
+    assert sorted(frames[0] for frames in sent) == \
+        ['historian', 'listener', 'listener']
+    # Subscribers of a topic share the frames of one serialized message.
+    device_frames = [frames[1:] for frames in sent
+                     if 'devices/a/all' in frames[-1].bytes]
+    assert len(device_frames) == 2
+    assert all(a is b for a, b in zip(*device_frames))
+
+
+@pytest.mark.subsystems
+def test_publish_batch_protected_topic():
+    pubsub = make_pubsub()
+    pubsub._add_peer_subscription('listener', '', '')
+    pubsub.protected_topics.add('secret', ['can_publish_secret'])
+
+    def check_if_protected_topic(topic):
+        # The publisher has no capabilities.
+        if pubsub.protected_topics.get(topic):
+            raise jsonrpc.exception_from_json(jsonrpc.UNAUTHORIZED, topic)
+    pubsub._check_if_protected_topic = check_if_protected_topic
+
+    with pytest.raises(Exception):
+        pubsub._peer_publish_batch([('open', {}, [1]),
+                                    ('secret', {}, [2])])
+    assert pubsub.core().socket.sent == []
+
+
+@pytest.mark.subsystems
+def test_protected_topic_capabilities_cached():
+    pubsub = make_pubsub()
+    pubsub._add_peer_subscription('listener', '', '')
+    pubsub.protected_topics.add('secret', ['can_publish_secret'])
+    auth = pubsub.rpc()
+    auth.capabilities = ['can_publish_secret']
+
+    for _ in xrange(3):
+        pubsub._peer_publish('secret', {}, [1])
+    pubsub._peer_publish('open', {}, [1])
+    assert auth.calls == [('auth', 'get_capabilities')]
+    assert len(pubsub.core().socket.sent) == 4
+
+    # The auth file changed and the capability was removed.
+    auth.capabilities = []
+    pubsub._peer_auth_update()
+    with pytest.raises(Exception):
+        pubsub._peer_publish('secret', {}, [2])
+    with pytest.raises(Exception):
+        pubsub._peer_publish('secret', {}, [2])
+    assert len(auth.calls) == 2
+    assert len(pubsub.core().socket.sent) == 4
+
+
+@pytest.mark.subsystems
+def test_push_callbacks_ordered_per_subscription():
+    pubsub = make_pubsub()
+    received = []
+
+    def slow(peer, sender, bus, topic, headers, message):
+        gevent.sleep(0.01 * (3 - message[0]))
+        received.append(('slow', message[0]))
+
+    def fast(peer, sender, bus, topic, headers, message):
+        received.append(('fast', message[0]))
+
+    pubsub.add_subscription('publisher', 'devices', slow)
+    pubsub.add_subscription('publisher', 'devices/a', fast)
+    for index in range(3):
+        pubsub._peer_push('sender', '', 'devices/a/all', {}, [index])
+    gevent.sleep(0.1)
+
+    assert [item for item in received if item[0] == 'slow'] == \
+        [('slow', 0), ('slow', 1), ('slow', 2)]
+    # The slow callback does not hold up the other subscription.
+    assert received[:3] == [('fast', 0), ('fast', 1), ('fast', 2)]
+    assert len(pubsub.rpc().dispatch_queues) == 2
+
+    pubsub.drop_subscription('publisher', 'devices', slow)
+    assert len(pubsub.rpc().dispatch_queues) == 1